@@ -122,14 +122,14 @@ class AccessListFallback(Exception):
     pass
 
 
-def get_course_and_check_access(course_key, user, depth=0):
+def get_course_and_check_access(course_key, user, depth=0, **kwargs):
     """
     Internal method used to calculate and return the locator and course module
     for the view functions in this file.
     """
     if not has_studio_read_access(user, course_key):
         raise PermissionDenied()
-    course_module = modulestore().get_course(course_key, depth=depth)
+    course_module = modulestore().get_course(course_key, depth=depth, **kwargs)
     return course_module
 
 
@@ -573,8 +573,9 @@ def course_index(request, course_key):
     """
     # A depth of None implies the whole course. The course outline needs this in order to compute has_changes.
     # A unit may not have a draft version, but one of its components could, and hence the unit itself has changes.
+    # The outline doesn't need the content of the components, which is only fetched if accessed.
     with modulestore().bulk_operations(course_key):
-        course_module = get_course_and_check_access(course_key, request.user, depth=None)
+        course_module = get_course_and_check_access(course_key, request.user, depth=None, lazy=True)
         if not course_module:
             raise Http404
         lms_link = get_lms_link_for_item(course_module.location)
@@ -278,6 +278,7 @@ for database_name in DATABASES:
 MODULESTORE = convert_module_store_setting_if_needed(AUTH_TOKENS.get('MODULESTORE', MODULESTORE))
 CONTENTSTORE = AUTH_TOKENS['CONTENTSTORE']
 DOC_STORE_CONFIG = AUTH_TOKENS['DOC_STORE_CONFIG']
+COURSE_STRUCTURE_CACHE_FORMAT = ENV_TOKENS.get('COURSE_STRUCTURE_CACHE_FORMAT', COURSE_STRUCTURE_CACHE_FORMAT)
 # Datadog for events!
 DATADOG = AUTH_TOKENS.get("DATADOG", {})
 DATADOG.update(ENV_TOKENS.get("DATADOG", {}))
@@ -336,6 +336,10 @@ MIDDLEWARE_CLASSES = (
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 )
 
+# Whether responses report the hits and misses of the functions memoized in the request, in a
+# X-Request-Cache-Stats header.
+REQUEST_CACHE_STATS_HEADER = False
+
 # Clickjacking protection can be enabled by setting this to 'DENY'
 X_FRAME_OPTIONS = 'ALLOW'
 
@@ -365,6 +369,10 @@ XBLOCK_SELECT_FUNCTION = prefer_xmodules
 ############################ Modulestore Configuration ################################
 MODULESTORE_BRANCH = 'draft-preferred'
 
+# Encoding of the structures in the course_structure_cache: "pickle", or
+# "compact" for xmodule.modulestore.split_mongo.structure_codec.
+COURSE_STRUCTURE_CACHE_FORMAT = 'pickle'
+
 MODULESTORE = {
     'default': {
         'ENGINE': 'xmodule.modulestore.mixed.MixedModuleStore',
@@ -0,0 +1,116 @@
+"""
+Caching of large assets in chunks.
+
+Assets too large to be cached whole are cached as a `ChunkedContent`, which
+holds the metadata of the asset but not its data.  The data is cached lazily,
+in chunks of a fixed size, as byte ranges of the asset are served, so serving
+a range only fetches the chunks that cover it, from the cache or from GridFS.
+
+The keys of the chunks include the md5 digest of the asset, so chunks of an
+older version of an asset are never served once the asset is replaced, and
+simply expire from the cache.
+"""
+import logging
+
+from django.core.cache import cache
+
+from xmodule.assetstore.assetmgr import AssetManager
+from xmodule.contentstore.content import StaticContent
+
+log = logging.getLogger(__name__)
+
+# Number of chunks fetched from the cache at once, which bounds the memory
+# used to serve a range.
+CHUNKS_PER_FETCH = 4
+
+
+class ChunkedContent(StaticContent):
+    """
+    The metadata of the asset `content`, whose data is cached in chunks of
+    `chunk_size` bytes.
+
+    `stream` is an open StaticContentStream of the asset, to read chunks
+    missing from the cache from.  Otherwise the asset is opened when needed.
+    """
+    def __init__(self, content, chunk_size, stream=None):
+        super(ChunkedContent, self).__init__(
+            content.location, content.name, content.content_type, None,
+            last_modified_at=content.last_modified_at, thumbnail_location=content.thumbnail_location,
+            import_path=content.import_path, length=content.length, locked=getattr(content, 'locked', False),
+            content_digest=getattr(content, 'content_digest', None),
+        )
+        self.chunk_size = chunk_size
+        self._stream = stream
+
+    def __getstate__(self):
+        # The stream isn't cached.
+        state = self.__dict__.copy()
+        state['_stream'] = None
+        return state
+
+    @property
+    def data(self):
+        return ''.join(self.stream_data())
+
+    def chunk_key(self, index):
+        """
+        Return the cache key of the chunk at `index`.
+        """
+        version = self.content_digest or '{:%Y%m%d%H%M%S%f}'.format(self.last_modified_at)
+        return u'{}.chunk{}.{}.{}'.format(self.location, self.chunk_size, version, index).encode('utf-8')
+
+    def stream_data(self):
+        if self.length:
+            for data in self.stream_data_in_range(0, self.length - 1):
+                yield data
+
+    def stream_data_in_range(self, first_byte, last_byte):
+        """
+        Stream the data between first_byte and last_byte (included)
+        """
+        first_index = first_byte // self.chunk_size
+        last_index = last_byte // self.chunk_size
+        for start in xrange(first_index, last_index + 1, CHUNKS_PER_FETCH):
+            indexes = range(start, min(start + CHUNKS_PER_FETCH, last_index + 1))
+            chunks = self._get_chunks(indexes)
+            for index in indexes:
+                chunk = chunks[index]
+                offset = index * self.chunk_size
+                yield chunk[max(first_byte - offset, 0):last_byte - offset + 1]
+
+    def close(self):
+        """
+        Close the stream of the asset, if it was opened.
+        """
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    def _get_chunks(self, indexes):
+        """
+        Return a dict of the chunks at `indexes` by index, fetching those
+        missing from the cache from the contentstore and caching them.
+        """
+        keys = {self.chunk_key(index): index for index in indexes}
+        chunks = {keys[key]: chunk for key, chunk in cache.get_many(keys.keys()).iteritems()}
+        missing = {}
+        for index in indexes:
+            if index not in chunks:
+                chunk = self._read_chunk(index)
+                chunks[index] = missing[self.chunk_key(index)] = chunk
+        if missing:
+            cache.set_many(missing)
+        return chunks
+
+    def _read_chunk(self, index):
+        """
+        Read the chunk at `index` from the contentstore.
+        """
+        if self._stream is None:
+            self._stream = AssetManager.find(self.location, as_stream=True)
+        offset = index * self.chunk_size
+        last_byte = min(offset + self.chunk_size, self.length) - 1
+        chunk = self._stream.read_range(offset, last_byte)
+        if len(chunk) != last_byte - offset + 1:
+            log.warning(u"Asset %s changed while being served", self.location)
+        return chunk
@@ -2,10 +2,13 @@
 Middleware to serve assets.
 """
 
+import hashlib
 import logging
+from uuid import uuid4
 
+from django.conf import settings
 from django.http import (
-    HttpResponse, HttpResponseNotModified, HttpResponseForbidden
+    HttpResponse, HttpResponseNotModified, HttpResponseForbidden, StreamingHttpResponse
 )
 from student.models import CourseEnrollment
 
@@ -18,11 +21,22 @@ from cache_toolbox.core import get_cached_content, set_cached_content
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.exceptions import NotFoundError
 
+from .caching import ChunkedContent
+
 # TODO: Soon as we have a reasonable way to serialize/deserialize AssetKeys, we need
 # to change this file so instead of using course_id_partial, we're just using asset keys
 
 log = logging.getLogger(__name__)
 
+# Assets smaller than this many bytes are cached whole.
+STATIC_CONTENT_CACHE_MAX_SIZE = 1048576
+
+# Larger assets are cached in chunks of this many bytes, if not zero.
+STATIC_CONTENT_CACHE_CHUNK_SIZE = 262144
+
+# Range headers with more ranges than this, once merged, are ignored.
+MAX_BYTE_RANGES = 16
+
 
 class StaticContentServer(object):
     def process_request(self, request):
@@ -52,13 +66,18 @@ class StaticContentServer(object):
                     response.status_code = 404
                     return response
 
-                # since we fetched it from DB, let's cache it going forward, but only if it's < 1MB
-                # this is because I haven't been able to find a means to stream data out of memcached
+                # since we fetched it from DB, let's cache it going forward: small assets are cached whole,
+                # larger ones are cached in chunks as they are served, see caching.py
                 if content.length is not None:
-                    if content.length < 1048576:
+                    max_size = getattr(settings, 'STATIC_CONTENT_CACHE_MAX_SIZE', STATIC_CONTENT_CACHE_MAX_SIZE)
+                    chunk_size = getattr(settings, 'STATIC_CONTENT_CACHE_CHUNK_SIZE', STATIC_CONTENT_CACHE_CHUNK_SIZE)
+                    if content.length < max_size:
                         # since we've queried as a stream, let's read in the stream into memory to set in cache
                         content = content.copy_to_in_mem()
                         set_cached_content(content)
+                    elif chunk_size:
+                        content = ChunkedContent(content, chunk_size, stream=content)
+                        set_cached_content(content)
             else:
                 # NOP here, but we may wish to add a "cache-hit" counter in the future
                 pass
@@ -80,13 +99,19 @@ class StaticContentServer(object):
             # convert over the DB persistent last modified timestamp to a HTTP compatible
             # timestamp, so we can simply compare the strings
             last_modified_at_str = content.last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
+            etag = get_etag(content)
 
             # see if the client has cached this content, if so then compare the
-            # timestamps, if they are the same then just return a 304 (Not Modified)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
-                if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
-                if if_modified_since == last_modified_at_str:
-                    return HttpResponseNotModified()
+            # ETags, or else the timestamps, if they are the same then just return a 304 (Not Modified)
+            if 'HTTP_IF_NONE_MATCH' in request.META:
+                not_modified = etag_matches(request.META['HTTP_IF_NONE_MATCH'], etag)
+            else:
+                not_modified = request.META.get('HTTP_IF_MODIFIED_SINCE') == last_modified_at_str
+            if not_modified:
+                response = HttpResponseNotModified()
+                response['ETag'] = etag
+                response['Last-Modified'] = last_modified_at_str
+                return response
 
             # *** File streaming within a byte range ***
             # If a Range is provided, parse Range attribute of the request
@@ -94,12 +119,12 @@ class StaticContentServer(object):
             # Request -> Range attribute structure: "Range: bytes=first-[last]"
             # Response -> Content-Range attribute structure: "Content-Range: bytes first-last/totalLength"
             # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.35
+            # An If-Range header with an outdated ETag or timestamp asks for the full content instead.
+            # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.27
             response = None
-            if request.META.get('HTTP_RANGE'):
-                # Data from cache (StaticContent) has no easy byte management, so we use the DB instead (StaticContentStream)
-                if type(content) == StaticContent:
-                    content = AssetManager.find(loc, as_stream=True)
-
+            content_type = content.content_type
+            if_range = request.META.get('HTTP_IF_RANGE')
+            if request.META.get('HTTP_RANGE') and (if_range is None or if_range in (etag, last_modified_at_str)):
                 header_value = request.META['HTTP_RANGE']
                 try:
                     unit, ranges = parse_range_header(header_value, content.length)
@@ -112,43 +137,163 @@ class StaticContentServer(object):
                     if unit != 'bytes':
                         # Only accept ranges in bytes
                         log.warning(u"Unknown unit in Range header: %s for content: %s", header_value, unicode(loc))
-                    elif len(ranges) > 1:
-                        # According to Http/1.1 spec content for multiple ranges should be sent as a multipart message.
-                        # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
-                        # But we send back the full content.
-                        log.warning(
-                            u"More than 1 ranges in Range header: %s for content: %s", header_value, unicode(loc)
-                        )
                     else:
-                        first, last = ranges[0]
-
-                        if 0 <= first <= last < content.length:
-                            # If the byte range is satisfiable
-                            response = HttpResponse(content.stream_data_in_range(first, last))
+                        # Only the satisfiable byte ranges are served, merged.
+                        ranges = merge_ranges(
+                            [(first, last) for first, last in ranges if 0 <= first <= last < content.length]
+                        )
+                        if not ranges:
+                            log.warning(
+                                u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
+                            )
+                            return HttpResponse(status=416)  # Requested Range Not Satisfiable
+                        elif len(ranges) > MAX_BYTE_RANGES:
+                            # Too many ranges are costly to serve, the full content is served instead.
+                            log.warning(
+                                u"Too many ranges in Range header: %s for content: %s", header_value, unicode(loc)
+                            )
+                        elif len(ranges) == 1:
+                            first, last = ranges[0]
+                            response = make_response(content, content.stream_data_in_range(first, last))
                             response['Content-Range'] = 'bytes {first}-{last}/{length}'.format(
                                 first=first, last=last, length=content.length
                             )
                             response['Content-Length'] = str(last - first + 1)
-                            response.status_code = 206  # Partial Content
                         else:
-                            log.warning(
-                                u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
-                            )
-                            return HttpResponse(status=416)  # Requested Range Not Satisfiable
+                            # According to Http/1.1 spec content for multiple ranges is sent as a multipart message.
+                            # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.16
+                            boundary = uuid4().hex
+                            data, length = multipart_byteranges(content, ranges, boundary)
+                            response = make_response(content, data)
+                            content_type = 'multipart/byteranges; boundary={}'.format(boundary)
+                            response['Content-Length'] = str(length)
+                        if response is not None:
+                            response.status_code = 206  # Partial Content
 
             # If Range header is absent or syntactically invalid return a full content response.
             if response is None:
-                response = HttpResponse(content.stream_data())
+                response = make_response(content, content.stream_data())
                 response['Content-Length'] = content.length
 
             # "Accept-Ranges: bytes" tells the user that only "bytes" ranges are allowed
             response['Accept-Ranges'] = 'bytes'
-            response['Content-Type'] = content.content_type
+            response['Content-Type'] = content_type
             response['Last-Modified'] = last_modified_at_str
+            response['ETag'] = etag
 
             return response
 
 
+def make_response(content, data):
+    """
+    Returns a response with the iterable `data` from `content`.
+
+    The data of in-memory content is sent at once, the data of streamed
+    content (StaticContentStream and ChunkedContent) is streamed without
+    loading it all into memory, and the stream of the content is closed
+    when the response is.
+    """
+    if type(content) == StaticContent:
+        return HttpResponse(data)
+    return StreamingHttpResponse(ClosingIterator(data, content.close))
+
+
+class ClosingIterator(object):
+    """
+    Iterable over `iterable` that calls `close` when it is closed, as the
+    response closes its content once it is sent.
+    """
+    def __init__(self, iterable, close):
+        self.iterable = iterable
+        self._close = close
+
+    def __iter__(self):
+        return iter(self.iterable)
+
+    def close(self):
+        """
+        Close the iterable, if it can be closed, and call `close`.
+        """
+        try:
+            if hasattr(self.iterable, 'close'):
+                self.iterable.close()
+        finally:
+            self._close()
+
+
+def get_etag(content):
+    """
+    Returns the quoted strong ETag of `content`: the md5 digest of its data, if
+    known, or a digest of its location, length and timestamp.
+    """
+    digest = getattr(content, 'content_digest', None)
+    if digest is None:
+        digest = hashlib.md5(u'{}:{}:{}'.format(
+            content.location, content.length, content.last_modified_at
+        ).encode('utf-8')).hexdigest()
+    return '"{}"'.format(digest)
+
+
+def etag_matches(header_value, etag):
+    """
+    Returns whether the If-None-Match `header_value` matches `etag`.
+
+    Weak comparison is used, as the spec requires for If-None-Match.
+    http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.26
+    """
+    etags = [value.strip() for value in header_value.split(',')]
+    return '*' in etags or etag in [value[2:] if value.startswith('W/') else value for value in etags]
+
+
+def merge_ranges(ranges):
+    """
+    Returns the list of (first, last) byte `ranges`, sorted, with any
+    overlapping or adjacent ranges merged.
+    """
+    merged = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+
+def multipart_byteranges(content, ranges, boundary):
+    """
+    Returns a tuple of the multipart/byteranges message of the byte `ranges`
+    of `content`, as an iterable, and its length.
+
+    See spec for details: http://www.w3.org/Protocols/rfc2616/rfc2616-sec19.html#sec19.2
+    """
+    parts = []
+    length = 0
+    for first, last in ranges:
+        header = (
+            '--{boundary}\r\n'
+            'Content-Type: {content_type}\r\n'
+            'Content-Range: bytes {first}-{last}/{length}\r\n'
+            '\r\n'
+        ).format(boundary=boundary, content_type=content.content_type, first=first, last=last, length=content.length)
+        parts.append((header, first, last))
+        length += len(header) + last - first + 1 + 2
+    footer = '--{}--\r\n'.format(boundary)
+    length += len(footer)
+
+    def stream_parts():
+        """
+        Streams the parts of the message.
+        """
+        for header, first, last in parts:
+            yield header
+            for data in content.stream_data_in_range(first, last):
+                yield data
+            yield '\r\n'
+        yield footer
+
+    return stream_parts(), length
+
+
 def parse_range_header(header_value, content_length):
     """
     Returns the unit and a list of (start, end) tuples of ranges.
@@ -0,0 +1,94 @@
+"""
+Load test comparing the memory use and throughput of StaticContentServer for
+byte range requests of a large asset, when serving it from GridFS, from the
+cache whole, and from the cache in chunks.
+"""
+import gc
+import os
+import random
+import resource
+import time
+import unittest
+
+from django.core.cache import cache
+from django.test.client import Client
+from django.test.utils import override_settings
+
+from cache_toolbox.core import del_cached_content
+from xmodule.contentstore.content import StaticContent
+from xmodule.contentstore.django import contentstore
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory
+
+# Size of the asset, in bytes.
+ASSET_SIZE = 50 * 1024 * 1024
+
+# Number of range requests, and size of the requested ranges, in bytes.
+NUM_REQUESTS = 200
+RANGE_SIZE = 1024 * 1024
+
+# Settings of the static content cache for each configuration.
+CONFIGURATIONS = (
+    ('gridfs', {'STATIC_CONTENT_CACHE_MAX_SIZE': 0, 'STATIC_CONTENT_CACHE_CHUNK_SIZE': 0}),
+    ('chunked', {'STATIC_CONTENT_CACHE_MAX_SIZE': 0, 'STATIC_CONTENT_CACHE_CHUNK_SIZE': 256 * 1024}),
+    # Last, as its peak memory use hides that of the others.
+    ('whole', {'STATIC_CONTENT_CACHE_MAX_SIZE': ASSET_SIZE + 1, 'STATIC_CONTENT_CACHE_CHUNK_SIZE': 0}),
+)
+
+
+def max_rss():
+    """
+    Return the peak memory use of this process, in bytes.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class RangeRequestsPerfTest(ModuleStoreTestCase):
+    """
+    Times random byte range requests of a large asset, and measures the growth
+    of the peak memory use of the process while serving them, with each
+    configuration of the static content cache.
+    """
+
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    def setUp(self):
+        super(RangeRequestsPerfTest, self).setUp()
+        course = CourseFactory.create()
+        self.asset_key = course.id.make_asset_key('asset', 'large_video.mp4')
+        contentstore().save(StaticContent(self.asset_key, 'large_video.mp4', 'video/mp4', os.urandom(ASSET_SIZE)))
+        self.url = unicode(self.asset_key)
+        self.client = Client()
+        # The same ranges are requested with each configuration.
+        self.ranges = []
+        for __ in xrange(NUM_REQUESTS):
+            first = random.randint(0, ASSET_SIZE - RANGE_SIZE)
+            self.ranges.append((first, first + RANGE_SIZE - 1))
+
+    def test_range_requests(self):
+        for name, cache_settings in CONFIGURATIONS:
+            del_cached_content(self.asset_key)
+            cache.clear()
+            gc.collect()
+            rss_before = max_rss()
+
+            with override_settings(**cache_settings):
+                start = time.time()
+                for first, last in self.ranges:
+                    resp = self.client.get(self.url, HTTP_RANGE='bytes={}-{}'.format(first, last))
+                    self.assertEqual(resp.status_code, 206)
+                    body = resp.streaming_content if resp.streaming else [resp.content]
+                    self.assertEqual(sum(len(data) for data in body), RANGE_SIZE)
+                elapsed = time.time() - start
+
+            print "{:<8} {:8.1f} requests/s   {:8.1f} MB/s   peak memory growth {:8.1f} MB".format(
+                name,
+                NUM_REQUESTS / elapsed,
+                NUM_REQUESTS * RANGE_SIZE / elapsed / 1024 / 1024,
+                (max_rss() - rss_before) / 1024.0 / 1024,
+            )
@@ -4,12 +4,17 @@ Tests for StaticContentServer
 import copy
 import ddt
 import logging
+import re
 import unittest
 from uuid import uuid4
 
 from django.conf import settings
 from django.test.client import Client
 from django.test.utils import override_settings
+from mock import patch
+
+from cache_toolbox.core import del_cached_content
+from xmodule.assetstore.assetmgr import AssetManager
 
 from xmodule.contentstore.django import contentstore
 from xmodule.modulestore.django import modulestore
@@ -17,7 +22,8 @@ from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.xml_importer import import_course_from_xml
 
-from contentserver.middleware import parse_range_header
+from contentserver.caching import ChunkedContent
+from contentserver.middleware import MAX_BYTE_RANGES, etag_matches, merge_ranges, parse_range_header
 from student.models import CourseEnrollment
 
 log = logging.getLogger(__name__)
@@ -63,6 +69,10 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
         self.unlocked_asset = self.course_key.make_asset_key('asset', 'another_static.txt')
         self.url_unlocked = unicode(self.unlocked_asset)
         self.length_unlocked = self.contentstore.get_attr(self.unlocked_asset, 'length')
+        self.data_unlocked = self.contentstore.find(self.unlocked_asset).data
+        self.etag_unlocked = '"{}"'.format(self.contentstore.get_attr(self.unlocked_asset, 'md5'))
+        del_cached_content(self.unlocked_asset)
+        self.addCleanup(del_cached_content, self.unlocked_asset)
 
     def test_unlocked_asset(self):
         """
@@ -146,17 +156,57 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
 
     def test_range_request_multiple_ranges(self):
         """
-        Test that multiple ranges in request outputs the full content.
+        Test that multiple ranges in request outputs a multipart message of the ranges.
         """
         first_byte = self.length_unlocked / 4
         last_byte = self.length_unlocked / 2
-        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}, -100'.format(
-            first=first_byte, last=last_byte)
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes={first}-{last}, -100, {length}-'.format(
+            first=first_byte, last=last_byte, length=self.length_unlocked)
         )
 
+        self.assertEqual(resp.status_code, 206)
+        self.assertNotIn('Content-Range', resp)
+        match = re.match(r'multipart/byteranges; boundary=(\w+)$', resp['Content-Type'])
+        self.assertIsNotNone(match)
+        content = resp.content
+        self.assertEqual(resp['Content-Length'], str(len(content)))
+
+        # The unsatisfiable range is left out.
+        boundary = match.group(1)
+        parts = content.split('--{}'.format(boundary))
+        self.assertEqual(parts[0], '')
+        self.assertEqual(parts[-1], '--\r\n')
+        expected_ranges = [(first_byte, last_byte), (self.length_unlocked - 100, self.length_unlocked - 1)]
+        self.assertEqual(len(parts), len(expected_ranges) + 2)
+        for part, (first, last) in zip(parts[1:-1], expected_ranges):
+            headers, data = part.split('\r\n\r\n', 1)
+            self.assertIn('Content-Type: text/plain', headers)
+            self.assertIn('Content-Range: bytes {}-{}/{}'.format(first, last, self.length_unlocked), headers)
+            self.assertEqual(data, self.data_unlocked[first:last + 1] + '\r\n')
+
+    @ddt.data(
+        'bytes 0-',
+        'bits=0-',
+        'bytes=0',
+        'bytes=one-',
+    )
+    def test_range_request_overlapping_ranges(self):
+        """
+        Test that overlapping and adjacent ranges are served as one.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=10-20, 0-5, 15-30, 6-9')
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(resp['Content-Range'], 'bytes 0-30/{}'.format(self.length_unlocked))
+        self.assertEqual(resp.content, self.data_unlocked[:31])
+
+    def test_range_request_too_many_ranges(self):
+        """
+        Test that a range request with too many ranges outputs the full content.
+        """
+        header_value = 'bytes=' + ', '.join('{0}-{0}'.format(2 * index) for index in xrange(MAX_BYTE_RANGES + 1))
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE=header_value)
         self.assertEqual(resp.status_code, 200)
         self.assertNotIn('Content-Range', resp)
-        self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
 
     @ddt.data(
         'bytes 0-',
@@ -182,6 +232,89 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
         )
         self.assertEqual(resp.status_code, 416)
 
+    def test_etag(self):
+        """
+        Test that responses carry the md5 digest of the asset as ETag, and
+        that requests with a matching If-None-Match get 304 Not Modified.
+        """
+        resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp['ETag'], self.etag_unlocked)
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"other", W/{}'.format(self.etag_unlocked))
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], self.etag_unlocked)
+
+        # If-None-Match takes precedence over If-Modified-Since.
+        resp = self.client.get(
+            self.url_unlocked, HTTP_IF_NONE_MATCH='"other"', HTTP_IF_MODIFIED_SINCE=resp['Last-Modified']
+        )
+        self.assertEqual(resp.status_code, 200)
+
+    @ddt.data(True, False)
+    def test_if_range(self, current):
+        """
+        Test that a range request with an outdated If-Range outputs the full content.
+        """
+        resp = self.client.get(
+            self.url_unlocked, HTTP_RANGE='bytes=0-10', HTTP_IF_RANGE=self.etag_unlocked if current else '"other"'
+        )
+        self.assertEqual(resp.status_code, 206 if current else 200)
+
+    @ddt.data(
+        'bytes=0-',
+        'bytes=0-0',
+        'bytes=15-16',
+        'bytes=16-47',
+        'bytes=17-200, -30',
+        'bytes=-1',
+    )
+    def test_chunked_content(self, header_value):
+        """
+        Test that ranges of assets too large to be cached whole are served from chunks.
+        """
+        with override_settings(STATIC_CONTENT_CACHE_MAX_SIZE=100, STATIC_CONTENT_CACHE_CHUNK_SIZE=16):
+            resp = self.client.get(self.url_unlocked, HTTP_RANGE=header_value)
+            self.assertEqual(resp.status_code, 206)
+            self.assertEqual(resp['ETag'], self.etag_unlocked)
+            data = ''.join(resp.streaming_content)
+            self.assertEqual(resp['Content-Length'], str(len(data)))
+
+            # The chunks are then served from the cache.
+            with patch.object(AssetManager, 'find') as find:
+                resp = self.client.get(self.url_unlocked, HTTP_RANGE=header_value)
+                self.assertEqual(''.join(resp.streaming_content), data)
+            self.assertFalse(find.called)
+
+        __, ranges = parse_range_header(header_value, self.length_unlocked)
+        if len(ranges) == 1:
+            first, last = ranges[0]
+            self.assertEqual(data, self.data_unlocked[first:last + 1])
+
+    def test_chunked_content_full(self):
+        """
+        Test that assets too large to be cached whole are cached in chunks and served in full.
+        """
+        with override_settings(STATIC_CONTENT_CACHE_MAX_SIZE=100, STATIC_CONTENT_CACHE_CHUNK_SIZE=64):
+            with patch('contentserver.middleware.set_cached_content') as set_cached_content:
+                resp = self.client.get(self.url_unlocked)
+                self.assertEqual(resp.status_code, 200)
+                self.assertEqual(''.join(resp.streaming_content), self.data_unlocked)
+            self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
+
+            content = set_cached_content.call_args[0][0]
+            self.assertIsInstance(content, ChunkedContent)
+            self.assertEqual(content.chunk_size, 64)
+
+    def test_chunked_content_closed(self):
+        """
+        Test that the stream of an asset served in chunks is closed with the response.
+        """
+        with override_settings(STATIC_CONTENT_CACHE_MAX_SIZE=100, STATIC_CONTENT_CACHE_CHUNK_SIZE=64):
+            with patch.object(ChunkedContent, 'close') as close:
+                resp = self.client.get(self.url_unlocked)
+                self.assertEqual(''.join(resp.streaming_content), self.data_unlocked)
+            self.assertTrue(close.called)
+
     def test_range_request_malformed_out_of_bounds(self):
         """
         Test that a range request with malformed Range (first_byte, last_byte == totalLength, offset by 1 error)
@@ -237,3 +370,43 @@ class ParseRangeHeaderTestCase(unittest.TestCase):
         self.assertRaisesRegexp(
             exception_class, exception_message_regex, parse_range_header, header_value, self.content_length
         )
+
+
+@ddt.ddt
+class EtagMatchesTestCase(unittest.TestCase):
+    """
+    Tests for the etag_matches function.
+    """
+
+    @ddt.data(
+        ('"abc"', True),
+        ('W/"abc"', True),
+        ('"xyz", "abc"', True),
+        ('*', True),
+        ('"xyz"', False),
+        ('abc', False),
+        ('', False),
+    )
+    @ddt.unpack
+    def test_etag_matches(self, header_value, matches):
+        self.assertEqual(etag_matches(header_value, '"abc"'), matches)
+
+
+@ddt.ddt
+class MergeRangesTestCase(unittest.TestCase):
+    """
+    Tests for the merge_ranges function.
+    """
+
+    @ddt.data(
+        ([(0, 10)], [(0, 10)]),
+        ([(20, 30), (0, 10)], [(0, 10), (20, 30)]),
+        ([(0, 10), (5, 20)], [(0, 20)]),
+        ([(0, 10), (11, 20)], [(0, 20)]),
+        ([(0, 10), (12, 20)], [(0, 10), (12, 20)]),
+        ([(0, 100), (10, 20), (30, 40)], [(0, 100)]),
+        ([], []),
+    )
+    @ddt.unpack
+    def test_merge_ranges(self, ranges, expected_ranges):
+        self.assertEqual(merge_ranges(ranges), expected_ranges)
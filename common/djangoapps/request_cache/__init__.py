@@ -5,17 +5,25 @@ This module requires that :class:`request_cache.middleware.RequestCache`
 is installed in order to clear the cache after each request.
 """
 
+import functools
 import logging
+import time
 from urlparse import urlparse
 
 from django.conf import settings
+from django.db.models import Model
 from django.test.client import RequestFactory
+from xblock.core import XBlock
 
+from openedx.core.lib.cache_utils import SizeBoundedLRUCache
 from request_cache import middleware
 
 
 log = logging.getLogger(__name__)
 
+# Maximum number of results of each function that are cached in the process by `request_cached`.
+PROCESS_CACHE_MAX_ENTRIES = 1000
+
 
 def get_cache(name):
     """
@@ -69,3 +77,132 @@ def get_request_or_stub():
 
     else:
         return request
+
+
+def request_cached(name=None, key=None, process_ttl=None):
+    """
+    Memoize the results of a function (or of the function of a classmethod)
+    during the current request.
+
+    The calls are identified by their arguments, normalized so that equal
+    arguments give the same key: xblocks by their location, version and bound
+    user, model instances (including users) by their primary key, and other
+    values by their unicode.
+
+    Outside of a request (in tasks, commands, and tests that don't go through
+    the middleware), results are not cached in the request.
+
+    Counts of the hits and misses of each function in the current request are
+    kept in the request cache named ``middleware.STATS_CACHE_NAME``, and are
+    reported in a response header if ``settings.REQUEST_CACHE_STATS_HEADER``.
+
+    The decorated function has a ``clear_cache`` function, to forget its
+    results when what they depend on changes.
+
+    Arguments:
+        name (str): The name of the cache of the function, and of its stats.
+            Defaults to its module and name.
+        key (function): A function of the arguments of the function, returning
+            the values identifying the call, or None for calls not to cache.
+            Defaults to all the arguments.
+        process_ttl (int): If given, the results are also cached in the process
+            for that many seconds, across requests.  Only for results which are
+            the same for all users, and which may be that stale.
+    """
+    def _decorator(func):
+        """Outer function decorator."""
+        cache_name = name or '{}.{}'.format(func.__module__, func.__name__)
+        process_cache = SizeBoundedLRUCache(PROCESS_CACHE_MAX_ENTRIES) if process_ttl else None
+
+        @functools.wraps(func)
+        def _wrapper(*args, **kwargs):
+            """
+            Wraps a function to memoize results.
+            """
+            key_values = key(*args, **kwargs) if key else (args, kwargs)
+            if key_values is None:
+                return func(*args, **kwargs)
+            cache_key = _normalize_cache_key(key_values)
+
+            request_cache = None
+            if get_request() is not None:
+                request_cache = get_cache(cache_name)
+                if cache_key in request_cache:
+                    _record_request_cached_call(cache_name, 'hit')
+                    return request_cache[cache_key]
+
+            if process_cache is not None:
+                entry = process_cache.get(cache_key)
+                if entry is not None and entry[0] > time.time():
+                    if request_cache is not None:
+                        _record_request_cached_call(cache_name, 'process_hit')
+                        request_cache[cache_key] = entry[1]
+                    return entry[1]
+
+            result = func(*args, **kwargs)
+            if request_cache is not None:
+                _record_request_cached_call(cache_name, 'miss')
+                request_cache[cache_key] = result
+            if process_cache is not None:
+                process_cache.set(cache_key, (time.time() + process_ttl, result), 1)
+            return result
+
+        def clear_cache():
+            """
+            Forget the results cached in the current request, and in the process.
+
+            Only the request cache of the current thread is cleared; results
+            cached by requests being served by other threads are kept until
+            those requests end.
+            """
+            get_cache(cache_name).clear()
+            if process_cache is not None:
+                process_cache.clear()
+
+        _wrapper.clear_cache = clear_cache
+        return _wrapper
+    return _decorator
+
+
+def _normalize_cache_key(value):
+    """
+    Return a hashable key for value, equal for equal values.
+    """
+    if isinstance(value, (tuple, list)):
+        return tuple(_normalize_cache_key(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((item_key, _normalize_cache_key(item)) for item_key, item in value.iteritems()))
+    if value is None or isinstance(value, (basestring, int, long, bool)):
+        return value
+    if isinstance(value, XBlock):
+        # The same location holds different blocks in different branches
+        # and versions of a course, and for each user they are bound to.
+        return (unicode(value.location), _xblock_version(value), value.scope_ids.user_id)
+    if isinstance(value, Model):
+        # unsaved instances are only equal to themselves
+        identity = value.pk if value.pk is not None else id(value)
+        return (value._meta.app_label, value._meta.model_name, identity)  # pylint: disable=protected-access
+    # including anonymous users, which are all equal
+    return unicode(value)
+
+
+def _xblock_version(block):
+    """
+    Return what tells apart the blocks at the location of `block` in different
+    branches and versions of its course, as the modulestores return them with
+    their locations stripped of branch and version.
+    """
+    # Blocks of split modulestore courses are loaded from a course structure,
+    # those of old mongo courses are drafts or published.
+    course_entry = getattr(block.runtime, 'course_entry', None)
+    if course_entry is not None:
+        return (unicode(course_entry.course_key), unicode(course_entry.structure['_id']))
+    return getattr(block, 'is_draft', None)
+
+
+def _record_request_cached_call(cache_name, outcome):
+    """
+    Count a hit, process hit or miss of the cache of a function in the current request.
+    """
+    stats = get_cache(middleware.STATS_CACHE_NAME).setdefault(cache_name, {'hit': 0, 'process_hit': 0, 'miss': 0})
+    stats[outcome] += 1
@@ -1,5 +1,13 @@
 import threading
 
+from django.conf import settings
+
+# Name of the request cache holding the hits and misses of the functions memoized by `request_cache.request_cached`.
+STATS_CACHE_NAME = 'request_cache.stats'
+
+# Header of the responses reporting them, if settings.REQUEST_CACHE_STATS_HEADER.
+STATS_HEADER = 'X-Request-Cache-Stats'
+
 
 class _RequestCache(threading.local):
     """
@@ -46,5 +54,11 @@ class RequestCache(object):
         return None
 
     def process_response(self, request, response):
+        if getattr(settings, 'REQUEST_CACHE_STATS_HEADER', False):
+            stats = REQUEST_CACHE.data.get(STATS_CACHE_NAME)
+            if stats:
+                response[STATS_HEADER] = ', '.join(
+                    '{}={hit}/{process_hit}/{miss}'.format(name, **stats[name]) for name in sorted(stats)
+                )
         self.clear_request_cache()
         return response
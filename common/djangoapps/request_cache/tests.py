@@ -1,10 +1,19 @@
 """
 Tests for the request cache.
 """
+import ddt
 from django.conf import settings
+from django.contrib.auth.models import User
+from django.http import HttpResponse
 from django.test import TestCase
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+from mock import Mock, patch
+from xblock.core import XBlock
+from xblock.fields import ScopeIds
 
-from request_cache import get_request_or_stub
+from request_cache import get_cache, get_request_or_stub, middleware, request_cached
+from student.tests.factories import UserFactory
 
 
 class TestRequestCache(TestCase):
@@ -18,3 +27,112 @@ class TestRequestCache(TestCase):
         stub = get_request_or_stub()
         expected_url = "http://{site_name}/foobar".format(site_name=settings.SITE_NAME)
         self.assertEqual(stub.build_absolute_uri("foobar"), expected_url)
+
+
+@ddt.ddt
+class TestRequestCached(TestCase):
+    """
+    Tests for the request_cached decorator.
+    """
+
+    def setUp(self):
+        super(TestRequestCached, self).setUp()
+        self.middleware = middleware.RequestCache()
+        self.middleware.process_request(RequestFactory().get('/'))
+        self.addCleanup(middleware.RequestCache.clear_request_cache)
+        self.calls = []
+
+        @request_cached(name='test.double')
+        def double(value, **kwargs):
+            """Record the call, and return twice the value."""
+            self.calls.append((value, kwargs))
+            return 2 * value
+
+        self.double = double
+
+    def stats(self):
+        """Return the stats of the test function in the current request."""
+        return get_cache(middleware.STATS_CACHE_NAME)['test.double']
+
+    def test_memoized_in_request(self):
+        self.assertEqual(self.double(1), 2)
+        self.assertEqual(self.double(1), 2)
+        self.assertEqual(self.double(2), 4)
+        self.assertEqual(self.calls, [(1, {}), (2, {})])
+        self.assertEqual(self.stats(), {'hit': 1, 'process_hit': 0, 'miss': 2})
+
+    def test_normalized_arguments(self):
+        user = UserFactory.create()
+        self.double(1, user=user, extra={'b': 2, 'a': [1]})
+        self.double(1, extra={'a': (1,), 'b': 2}, user=User.objects.get(id=user.id))
+        self.assertEqual(len(self.calls), 1)
+
+    def test_xblock_arguments(self):
+        def block(user_id=None, is_draft=False):
+            """Return an xblock at the same location, bound to `user_id`."""
+            xblock = Mock(spec=XBlock, location='i4x://org/course/html/test', is_draft=is_draft)
+            xblock.runtime = Mock(spec=[])
+            xblock.scope_ids = ScopeIds(user_id, 'html', 'test', 'test')
+            return xblock
+
+        self.double(1, block=block())
+        self.double(1, block=block())
+        self.assertEqual(len(self.calls), 1)
+
+        # blocks bound to different users, or in different revisions, are different
+        self.double(1, block=block(user_id=1))
+        self.double(1, block=block(is_draft=True))
+        self.assertEqual(len(self.calls), 3)
+
+    def test_not_memoized_outside_request(self):
+        middleware.RequestCache.clear_request_cache()
+        self.double(1)
+        self.double(1)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_clear_cache(self):
+        self.double(1)
+        self.double.clear_cache()
+        self.double(1)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_key(self):
+        @request_cached(key=lambda value, cached=True: (value,) if cached else None)
+        def identity(value, cached=True):  # pylint: disable=unused-argument
+            """Record the call, and return the value."""
+            self.calls.append(value)
+            return value
+
+        identity(1)
+        identity(1)
+        identity(1, cached=False)
+        self.assertEqual(self.calls, [1, 1])
+
+    @patch('request_cache.time')
+    def test_process_ttl(self, mock_time):
+        @request_cached(process_ttl=10)
+        def identity(value):
+            """Record the call, and return the value."""
+            self.calls.append(value)
+            return value
+
+        mock_time.time.return_value = 100
+        identity(1)
+        # in later requests, until the results expire
+        for now, num_calls in ((109, 1), (111, 2)):
+            self.middleware.process_response(None, HttpResponse())
+            self.middleware.process_request(RequestFactory().get('/'))
+            mock_time.time.return_value = now
+            identity(1)
+            self.assertEqual(len(self.calls), num_calls)
+
+    @ddt.data(True, False)
+    def test_stats_header(self, enabled):
+        self.double(1)
+        self.double(1)
+        with override_settings(REQUEST_CACHE_STATS_HEADER=enabled):
+            response = self.middleware.process_response(None, HttpResponse())
+        if enabled:
+            self.assertEqual(response[middleware.STATS_HEADER], 'test.double=1/0/1')
+        else:
+            self.assertNotIn(middleware.STATS_HEADER, response)
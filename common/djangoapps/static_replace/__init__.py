@@ -1,11 +1,15 @@
 import logging
 import re
+from uuid import uuid4
 
 from django.contrib.staticfiles.storage import staticfiles_storage
 from django.contrib.staticfiles import finders
 from django.conf import settings
+from django.core.cache import cache
 
+from openedx.core.lib.cache_utils import SizeBoundedLRUCache
 from static_replace.models import AssetBaseUrlConfig
+from xmodule.contentstore.django import contentstore
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.contentstore.content import StaticContent
@@ -14,6 +18,9 @@ from opaque_keys.edx.locator import AssetLocator
 
 log = logging.getLogger(__name__)
 
+# Maximum number of urls kept by each StaticUrlRewriteMap.
+MAX_REWRITE_MAP_URLS = 10000
+
 
 def _url_replace_regex(prefix):
     """
@@ -138,6 +145,129 @@ def make_static_urls_absolute(request, html):
     )
 
 
+def _rewrite_course_static_url(course_id, rest, base_url, unlocked_assets=None):
+    """
+    Return the url of the static url `rest` of the Mongo-backed course
+    `course_id`: the url generated by collectstatic if `rest` is in the static
+    file pipeline, or else the canonical url of the course asset.
+    """
+    # first look in the static file pipeline and see if we are trying to reference
+    # a piece of static content which is in the edx-platform repo (e.g. JS associated with an xmodule)
+    exists_in_staticfiles_storage = False
+    try:
+        exists_in_staticfiles_storage = staticfiles_storage.exists(rest)
+    except Exception as err:
+        log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
+            rest, str(err)))
+
+    if exists_in_staticfiles_storage:
+        return staticfiles_storage.url(rest)
+
+    # if not, then assume it's courseware specific content and then look in the
+    # Mongo-backed database
+    url = StaticContent.get_canonicalized_asset_path(course_id, rest, base_url, unlocked_assets)
+
+    if AssetLocator.CANONICAL_NAMESPACE in url:
+        url = url.replace('block@', 'block/', 1)
+    return url
+
+
+class StaticUrlRewriteMap(object):
+    """
+    The rewritten static urls of a course, by the rest of the url after the
+    static prefix, for one version of the course and of its assets.
+
+    The map is built once: it holds whether the course is Mongo-backed, and
+    the unlocked assets of the course if assets are served from a CDN, so
+    that urls are rewritten without looking each asset up. Urls are then
+    rewritten once each, and kept.
+    """
+    def __init__(self, course_id, base_url):
+        self.course_id = course_id
+        self.base_url = base_url
+        self.mongo_backed = modulestore().get_modulestore_type(course_id) != ModuleStoreEnum.Type.xml
+        self.unlocked_assets = frozenset()
+        if self.mongo_backed and base_url:
+            self.unlocked_assets = frozenset(
+                (asset['asset_key'].block_type, asset['asset_key'].block_id)
+                for asset in (
+                    contentstore().get_all_content_for_course(course_id)[0] +
+                    contentstore().get_all_content_thumbnails_for_course(course_id)
+                )
+                if not asset.get('locked', False)
+            )
+        self._urls = {}
+
+    def url(self, rest):
+        """
+        Return the url of the static url `rest` of the course.
+        """
+        url = self._urls.get(rest)
+        if url is None:
+            url = _rewrite_course_static_url(self.course_id, rest, self.base_url, self.unlocked_assets)
+            if len(self._urls) < MAX_REWRITE_MAP_URLS:
+                self._urls[rest] = url
+        return url
+
+
+_rewrite_maps = None
+
+
+def get_rewrite_map_lru():
+    """
+    Return the process-local LRU of StaticUrlRewriteMaps, or None if
+    STATIC_URL_REWRITE_MAP_LRU_SIZE is 0.
+    """
+    global _rewrite_maps  # pylint: disable=global-statement
+    max_size = getattr(settings, 'STATIC_URL_REWRITE_MAP_LRU_SIZE', 0)
+    if not max_size:
+        return None
+    if _rewrite_maps is None or _rewrite_maps.max_size != max_size:
+        _rewrite_maps = SizeBoundedLRUCache(max_size, metric_name='static_replace.rewrite_map')
+    return _rewrite_maps
+
+
+def _rewrite_map_version_key(course_id):
+    """
+    Return the cache key of the version of the rewrite map of `course_id`.
+    """
+    return u'static_replace.rewrite_map_version.{}'.format(course_id)
+
+
+def get_static_url_rewrite_map(course_id):
+    """
+    Return the StaticUrlRewriteMap of the current version of `course_id`,
+    building it if needed, or None if rewrite maps are disabled.
+    """
+    rewrite_maps = get_rewrite_map_lru()
+    if rewrite_maps is None:
+        return None
+
+    version_key = _rewrite_map_version_key(course_id)
+    version = cache.get(version_key)
+    if version is None:
+        # Another process may be adding a version too: use whichever is cached.
+        version = uuid4().hex
+        cache.add(version_key, version, None)
+        version = cache.get(version_key) or version
+
+    base_url = AssetBaseUrlConfig.get_base_url()
+    key = (unicode(course_id), version, base_url)
+    rewrite_map = rewrite_maps.get(key)
+    if rewrite_map is None:
+        rewrite_map = StaticUrlRewriteMap(course_id, base_url)
+        rewrite_maps.set(key, rewrite_map, 1)
+    return rewrite_map
+
+
+def invalidate_static_url_rewrite_map(course_id):
+    """
+    Make every process rebuild the rewrite map of `course_id`, after its
+    assets changed or it was published.
+    """
+    cache.delete(_rewrite_map_version_key(course_id))
+
+
 def replace_static_urls(text, data_directory=None, course_id=None, static_asset_path=''):
     """
     Replace /static/$stuff urls either with their correct url as generated by collectstatic,
@@ -149,7 +279,27 @@ def replace_static_urls(text, data_directory=None, course_id=None, static_asset_
     data_directory: The directory in which course data is stored
     course_id: The course identifier used to distinguish static content for this course in studio
     static_asset_path: Path for static assets, which overrides data_directory and course_namespace, if nonempty
+
+    The urls of courses are rewritten with their StaticUrlRewriteMap, if enabled.
     """
+    rewrite_maps = []
+
+    def get_rewrite_map():
+        """
+        Return the rewrite map of the course, fetched on first use, or None.
+        """
+        if not rewrite_maps:
+            rewrite_maps.append(get_static_url_rewrite_map(course_id))
+        return rewrite_maps[0]
+
+    def is_mongo_backed():
+        """
+        Return whether the course is in a Mongo-backed store.
+        """
+        rewrite_map = get_rewrite_map()
+        if rewrite_map is not None:
+            return rewrite_map.mongo_backed
+        return modulestore().get_modulestore_type(course_id) != ModuleStoreEnum.Type.xml
 
     def replace_static_url(original, prefix, quote, rest):
         """
@@ -163,29 +313,12 @@ def replace_static_urls(text, data_directory=None, course_id=None, static_asset_
         if settings.DEBUG and finders.find(rest, True):
             return original
         # if we're running with a MongoBacked store course_namespace is not None, then use studio style urls
-        elif (not static_asset_path) \
-                and course_id \
-                and modulestore().get_modulestore_type(course_id) != ModuleStoreEnum.Type.xml:
-            # first look in the static file pipeline and see if we are trying to reference
-            # a piece of static content which is in the edx-platform repo (e.g. JS associated with an xmodule)
-
-            exists_in_staticfiles_storage = False
-            try:
-                exists_in_staticfiles_storage = staticfiles_storage.exists(rest)
-            except Exception as err:
-                log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
-                    rest, str(err)))
-
-            if exists_in_staticfiles_storage:
-                url = staticfiles_storage.url(rest)
+        elif (not static_asset_path) and course_id and is_mongo_backed():
+            rewrite_map = get_rewrite_map()
+            if rewrite_map is not None:
+                url = rewrite_map.url(rest)
             else:
-                # if not, then assume it's courseware specific content and then look in the
-                # Mongo-backed database
-                base_url = AssetBaseUrlConfig.get_base_url()
-                url = StaticContent.get_canonicalized_asset_path(course_id, rest, base_url)
-
-                if AssetLocator.CANONICAL_NAMESPACE in url:
-                    url = url.replace('block@', 'block/', 1)
+                url = _rewrite_course_static_url(course_id, rest, AssetBaseUrlConfig.get_base_url())
 
         # Otherwise, look the file up in staticfiles_storage, and append the data directory if needed
         else:
@@ -0,0 +1,17 @@
+"""
+Signal handlers for invalidating the static url rewrite maps of courses.
+"""
+from django.dispatch.dispatcher import receiver
+
+from xmodule.modulestore.django import SignalHandler
+
+from . import invalidate_static_url_rewrite_map
+
+
+@receiver(SignalHandler.course_published)
+def _listen_for_course_publish(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Catches the signal that a course has been published in the module
+    store and invalidates its static url rewrite map.
+    """
+    invalidate_static_url_rewrite_map(course_key)
@@ -0,0 +1,4 @@
+"""
+Setup the signals on startup.
+"""
+import static_replace.signals  # pylint: disable=unused-import
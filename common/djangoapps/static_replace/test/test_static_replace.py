@@ -4,16 +4,21 @@ from urllib import quote_plus
 
 import ddt
 import re
+import unittest
 from PIL import Image
 from cStringIO import StringIO
 
+from django.test.utils import override_settings
 from nose.tools import assert_equals, assert_true, assert_false  # pylint: disable=no-name-in-module
 from static_replace import (
     replace_static_urls,
     replace_course_urls,
     _url_replace_regex,
     process_static_urls,
-    make_static_urls_absolute
+    make_static_urls_absolute,
+    get_static_url_rewrite_map,
+    invalidate_static_url_rewrite_map,
+    StaticUrlRewriteMap,
 )
 from mock import patch, Mock
 
@@ -113,7 +118,7 @@ def test_mongo_filestore(mock_get_base_url, mock_modulestore, mock_static_conten
         replace_static_urls(STATIC_SOURCE, DATA_DIRECTORY, course_id=COURSE_KEY)
     )
 
-    mock_static_content.get_canonicalized_asset_path.assert_called_once_with(COURSE_KEY, 'file.png', u'')
+    mock_static_content.get_canonicalized_asset_path.assert_called_once_with(COURSE_KEY, 'file.png', u'', None)
 
 
 @patch('static_replace.settings', autospec=True)
@@ -157,6 +162,79 @@ def test_static_url_with_query(mock_modulestore, mock_storage):
     assert_equals(post_text, replace_static_urls(pre_text, DATA_DIRECTORY, COURSE_KEY))
 
 
+@override_settings(STATIC_URL_REWRITE_MAP_LRU_SIZE=10)
+class StaticUrlRewriteMapTest(unittest.TestCase):
+    """
+    Tests for rewriting the static urls of courses with their rewrite maps.
+    """
+    def setUp(self):
+        super(StaticUrlRewriteMapTest, self).setUp()
+        # Start with no rewrite maps.
+        patcher = patch('static_replace._rewrite_maps', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        invalidate_static_url_rewrite_map(COURSE_KEY)
+
+        patcher = patch('static_replace.modulestore', autospec=True)
+        patcher.start().return_value = Mock(MongoModuleStore)
+        self.addCleanup(patcher.stop)
+
+        patcher = patch('static_replace.staticfiles_storage', autospec=True)
+        self.mock_storage = patcher.start()
+        self.mock_storage.exists.side_effect = lambda path: path.startswith('js/')
+        self.mock_storage.url.side_effect = lambda path: '/static/hashed/' + path
+        self.addCleanup(patcher.stop)
+
+        patcher = patch('static_replace.AssetBaseUrlConfig.get_base_url')
+        self.mock_get_base_url = patcher.start()
+        self.mock_get_base_url.return_value = u''
+        self.addCleanup(patcher.stop)
+
+        patcher = patch('static_replace.StaticContent', autospec=True)
+        self.mock_static_content = patcher.start()
+        self.mock_static_content.get_canonicalized_asset_path.side_effect = (
+            lambda course_key, path, base_url, unlocked_assets: '/c4x/org/course/asset/' + path
+        )
+        self.addCleanup(patcher.stop)
+
+    def test_urls_rewritten_once(self):
+        text = '"/static/file.png" "/static/js/lib.js" "/static/file.png"'
+        expected = '"/c4x/org/course/asset/file.png" "/static/hashed/js/lib.js" "/c4x/org/course/asset/file.png"'
+        for __ in range(3):
+            assert_equals(expected, replace_static_urls(text, DATA_DIRECTORY, course_id=COURSE_KEY))
+
+        self.assertEqual(self.mock_storage.exists.call_count, 2)
+        self.mock_static_content.get_canonicalized_asset_path.assert_called_once_with(
+            COURSE_KEY, 'file.png', u'', frozenset()
+        )
+
+    def test_invalidate(self):
+        rewrite_map = get_static_url_rewrite_map(COURSE_KEY)
+        self.assertIs(get_static_url_rewrite_map(COURSE_KEY), rewrite_map)
+        invalidate_static_url_rewrite_map(COURSE_KEY)
+        self.assertIsNot(get_static_url_rewrite_map(COURSE_KEY), rewrite_map)
+
+    def test_disabled(self):
+        with override_settings(STATIC_URL_REWRITE_MAP_LRU_SIZE=0):
+            self.assertIsNone(get_static_url_rewrite_map(COURSE_KEY))
+            assert_equals(
+                '"/c4x/org/course/asset/file.png"',
+                replace_static_urls(STATIC_SOURCE, DATA_DIRECTORY, course_id=COURSE_KEY)
+            )
+
+    @patch('static_replace.contentstore')
+    def test_base_url_change(self, mock_contentstore):
+        rewrite_map = get_static_url_rewrite_map(COURSE_KEY)
+        self.assertFalse(mock_contentstore.called)
+
+        # With a CDN, the unlocked assets are listed when the map is built.
+        mock_contentstore.return_value.get_all_content_for_course.return_value = ([], 0)
+        mock_contentstore.return_value.get_all_content_thumbnails_for_course.return_value = []
+        self.mock_get_base_url.return_value = u'cdn'
+        self.assertIsNot(get_static_url_rewrite_map(COURSE_KEY), rewrite_map)
+        self.assertTrue(mock_contentstore.called)
+
+
 def test_regex():
     yes = ('"/static/foo.png"',
            '"/static/foo.png"',
@@ -446,3 +524,31 @@ class CanonicalContentTest(SharedModuleStoreTestCase):
         with check_mongo_calls(mongo_calls):
             asset_path = StaticContent.get_canonicalized_asset_path(self.courses[prefix].id, start, base_url)
             self.assertEqual(asset_path, expected)
+
+    @ddt.data('split', 'old')
+    def test_canonical_asset_path_with_unlocked_assets(self, prefix):
+        course_key = self.courses[prefix].id
+        rewrite_map = StaticUrlRewriteMap(course_key, u'dev')
+        paths = [
+            path.format(prefix=prefix) for path in (
+                u'{prefix}_unlock.png',
+                u'{prefix}_lock.png',
+                u'/static/weird {prefix}_unlock.png',
+                u'special/{prefix}_unlock.png',
+                u'special/{prefix}_lock.png',
+                u'/static/{prefix}_unlock.png?foo=/static/{prefix}_lock.png',
+                u'missing.png',
+            )
+        ]
+        paths.extend(
+            unicode(thumbnail['asset_key'])
+            for thumbnail in contentstore().get_all_content_thumbnails_for_course(course_key)
+        )
+
+        for path in paths:
+            expected = StaticContent.get_canonicalized_asset_path(course_key, path, u'dev')
+            with check_mongo_calls(0):
+                asset_path = StaticContent.get_canonicalized_asset_path(
+                    course_key, path, u'dev', rewrite_map.unlocked_assets
+                )
+            self.assertEqual(asset_path, expected)
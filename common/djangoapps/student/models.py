@@ -41,6 +41,7 @@ import dogstats_wrapper as dog_stats_api
 from eventtracking import tracker
 from opaque_keys.edx.keys import CourseKey
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
+from request_cache import request_cached
 from simple_history.models import HistoricalRecords
 from track import contexts
 from xmodule_django.models import CourseKeyField, NoneToEmptyManager
@@ -1273,6 +1274,7 @@ class CourseEnrollment(models.Model):
             )
 
     @classmethod
+    @request_cached()
     def is_enrolled(cls, user, course_key):
         """
         Returns True if the user is enrolled in the course (the entry must exist
@@ -1494,6 +1496,13 @@ def invalidate_enrollment_mode_cache(sender, instance, **kwargs):  # pylint: dis
     cache.delete(cache_key)
 
 
+@receiver(models.signals.post_save, sender=CourseEnrollment)
+@receiver(models.signals.post_delete, sender=CourseEnrollment)
+def invalidate_is_enrolled_request_cache(sender, **kwargs):  # pylint: disable=unused-argument, invalid-name
+    """Forget the enrollments checked during the current request. """
+    CourseEnrollment.is_enrolled.clear_cache()
+
+
 class ManualEnrollmentAudit(models.Model):
     """
     Table for tracking which enrollments were performed through manual enrollment.
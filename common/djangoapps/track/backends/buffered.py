@@ -0,0 +1,219 @@
+"""
+Event tracker backend that queues events in-process, and sends them in
+batches to another backend from a background thread, so that requests don't
+wait on the other backend.
+
+The backend is configured by wrapping the configuration of the other backend::
+
+  TRACKING_BACKENDS = {
+      'mongo': {
+          'ENGINE': 'track.backends.buffered.BufferedBackend',
+          'OPTIONS': {
+              'backend': {
+                  'ENGINE': 'track.backends.mongodb.MongoBackend',
+                  'OPTIONS': {...},
+              },
+              'max_queue_size': 10000,
+              'batch_size': 100,
+              'flush_interval': 1.0,
+              'overflow': 'drop',
+          }
+      }
+  }
+
+The `overflow` policy decides what happens to events sent while the queue is
+full: they are dropped (`drop`), the request waits for room in the queue for
+at most `block_timeout` seconds before dropping them (`block`), or they are
+sent synchronously to the other backend (`sync`).
+
+Queued events are flushed when the process exits.  Dropped events, events
+sent synchronously, failed sends, batch sizes, queue sizes and flush latencies
+are reported as "track.buffered.<metric>" metrics, tagged with the name of the
+other backend.
+
+"""
+
+from __future__ import absolute_import
+
+import atexit
+import logging
+import os
+import Queue
+import threading
+import time
+
+from django.db import close_old_connections
+from dogapi import dog_stats_api
+
+from track.backends import BaseBackend
+
+
+log = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ('drop', 'block', 'sync')
+
+# Seconds that close waits for the background thread to flush the queue.
+CLOSE_TIMEOUT = 10
+
+# Seconds between checks of the background thread for the backend being closed.
+CLOSE_POLL_INTERVAL = 0.1
+
+
+class BufferedBackend(BaseBackend):
+    """Event tracker backend that sends events to another backend in batches, in the background"""
+
+    def __init__(self, backend, max_queue_size=10000, batch_size=100, flush_interval=1.0, overflow='drop',
+                 block_timeout=0.1, **kwargs):
+        """
+        Configure the queue and the other backend.
+
+        :Parameters:
+
+          - `backend`: the configuration of the other backend, as a dict of
+            its `ENGINE` and `OPTIONS`, as in TRACKING_BACKENDS
+          - `max_queue_size`: the maximum number of queued events
+          - `batch_size`: the maximum number of events sent at once
+          - `flush_interval`: the maximum number of seconds that an event
+            waits for a batch to fill up
+          - `overflow`: what to do with events sent while the queue is full:
+            'drop', 'block' or 'sync'
+          - `block_timeout`: the maximum number of seconds that the 'block'
+            policy waits for room in the queue
+
+        """
+        super(BufferedBackend, self).__init__(**kwargs)
+
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError('Invalid overflow policy %s' % overflow)
+
+        # import here, as the tracker imports backends
+        from track.tracker import _instantiate_backend_from_name
+
+        self.backend_name = backend['ENGINE'].split('.')[-1]
+        self.backend = _instantiate_backend_from_name(backend['ENGINE'], backend.get('OPTIONS', {}))
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+
+        self._queue = Queue.Queue(max_queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._closing = threading.Event()
+
+        atexit.register(self.close)
+
+    def send(self, event):
+        """Queue the event, or apply the overflow policy if the queue is full."""
+        if self._closing.is_set():
+            # Events sent during shutdown aren't left in the queue.
+            self._send_batch([event])
+            return
+        self._ensure_thread()
+        try:
+            if self.overflow == 'block':
+                self._queue.put(event, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(event)
+        except Queue.Full:
+            if self.overflow == 'sync':
+                self._increment('sync')
+                self._send_batch([event])
+            else:
+                self._increment('dropped')
+
+    def close(self):
+        """
+        Stop the background thread once it has sent the queued events, and
+        send any events still queued.
+        """
+        self._closing.set()
+        thread = self._thread
+        if thread is not None and self._pid == os.getpid():
+            thread.join(CLOSE_TIMEOUT)
+        self._flush()
+
+    def _ensure_thread(self):
+        """Start the background thread of this process, if needed."""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            # A forked process doesn't inherit the thread of its parent.
+            if self._pid != os.getpid():
+                self._thread = threading.Thread(target=self._run, name='track-buffered-{}'.format(self.backend_name))
+                self._thread.daemon = True
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def _run(self):
+        """Send batches of queued events until the backend is closed."""
+        while not self._closing.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._send_batch(batch)
+        self._flush()
+
+    def _next_batch(self):
+        """
+        Return the next batch of events: as many as are queued until the
+        batch is full, `flush_interval` seconds after the first one, or the
+        backend is closed.
+        """
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size and not self._closing.is_set():
+            timeout = CLOSE_POLL_INTERVAL
+            if deadline is not None:
+                timeout = min(deadline - time.time(), timeout)
+                if timeout <= 0:
+                    break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except Queue.Empty:
+                continue
+            if deadline is None:
+                deadline = time.time() + self.flush_interval
+        return batch
+
+    def _flush(self):
+        """Send the queued events, in batches."""
+        while True:
+            batch = []
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except Queue.Empty:
+                pass
+            if not batch:
+                return
+            self._send_batch(batch)
+
+    def _send_batch(self, batch):
+        """Send the batch of events to the other backend."""
+        # Requests close their database connections when they finish, but
+        # the background thread has to close its own, so that they aren't
+        # used once they are broken or past their maximum age.
+        in_background = threading.current_thread() is self._thread
+        if in_background:
+            close_old_connections()
+        start = time.time()
+        try:
+            self.backend.send_many(batch)
+        except Exception:  # pylint: disable=broad-except
+            log.exception('Error sending %d events to %s event tracker backend', len(batch), self.backend_name)
+            self._increment('failed', len(batch))
+            return
+        finally:
+            if in_background:
+                close_old_connections()
+        tags = [u'backend:{}'.format(self.backend_name)]
+        dog_stats_api.histogram('track.buffered.flush_latency', time.time() - start, tags=tags)
+        dog_stats_api.histogram('track.buffered.batch_size', len(batch), tags=tags)
+        dog_stats_api.histogram('track.buffered.queue_size', self._queue.qsize(), tags=tags)
+
+    def _increment(self, metric, value=1):
+        """Increment the metric 'track.buffered.<metric>' of the other backend."""
+        dog_stats_api.increment(
+            'track.buffered.{}'.format(metric), value, tags=[u'backend:{}'.format(self.backend_name)]
+        )
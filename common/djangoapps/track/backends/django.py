@@ -81,3 +81,13 @@ class DjangoBackend(BaseBackend):
             tldat.save(using=self.name)
         except Exception as e:  # pylint: disable=broad-except
             log.exception(e)
+
+    def send_many(self, events):
+        """
+        Save the events with a single bulk INSERT.
+
+        Unlike `send`, errors are raised, for the caller to handle.
+
+        """
+        tldats = [TrackingLog(**{x: event.get(x, '') for x in LOGFIELDS}) for event in events]
+        TrackingLog.objects.using(self.name).bulk_create(tldats)
@@ -97,3 +97,14 @@ class MongoBackend(BaseBackend):
             # during the next event.
             msg = 'Error inserting to MongoDB event tracker backend'
             log.exception(msg)
+
+    def send_many(self, events):
+        """
+        Insert the events in to the Mongo collection with a single bulk insert.
+
+        Unlike `send`, errors are raised, for the caller to handle.
+
+        """
+        # Unlike insert_many, insert leaves the events unchanged when
+        # manipulate is False.
+        self.collection.insert(events, manipulate=False, continue_on_error=True)
@@ -0,0 +1,140 @@
+from __future__ import absolute_import
+
+import threading
+
+from django.test import TestCase
+from mock import patch
+
+from track.backends import BaseBackend
+from track.backends.buffered import BufferedBackend
+
+
+class RecordingBackend(BaseBackend):
+    """Backend recording the batches of events it is sent."""
+
+    def __init__(self, **options):
+        super(RecordingBackend, self).__init__(**options)
+        self.batches = []
+        # Set to make send_many wait until it is cleared.
+        self.blocked = threading.Event()
+        self.unblocked = threading.Event()
+        self.unblocked.set()
+
+    def send(self, event):
+        self.send_many([event])
+
+    def send_many(self, events):
+        self.blocked.set()
+        self.unblocked.wait()
+        self.batches.append(list(events))
+
+    @property
+    def events(self):
+        return [event for batch in self.batches for event in batch]
+
+
+def make_backend(**options):
+    """Return a BufferedBackend sending to a RecordingBackend."""
+    return BufferedBackend(
+        backend={'ENGINE': 'track.backends.tests.test_buffered.RecordingBackend'},
+        **options
+    )
+
+
+class TestBufferedBackend(TestCase):
+    def setUp(self):
+        super(TestBufferedBackend, self).setUp()
+        patcher = patch('track.backends.buffered.dog_stats_api')
+        self.dog_stats_api = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_events_sent_in_batches(self):
+        backend = make_backend(batch_size=4, flush_interval=60)
+        events = [{'test': index} for index in range(10)]
+        for event in events:
+            backend.send(event)
+        backend.close()
+
+        self.assertEqual(backend.backend.events, events)
+        self.assertTrue(all(len(batch) <= 4 for batch in backend.backend.batches))
+        self.assertLess(len(backend.backend.batches), 10)
+
+    def test_events_sent_after_flush_interval(self):
+        backend = make_backend(batch_size=100, flush_interval=0.01)
+        backend.send({'test': 1})
+        backend.backend.blocked.wait(5)
+        self.assertTrue(backend.backend.blocked.is_set())
+        backend.close()
+        self.assertEqual(backend.backend.events, [{'test': 1}])
+
+    def _fill_queue(self, backend):
+        """
+        Block the other backend while it sends a first event, and fill the
+        queue of `backend` with a second one.
+        """
+        backend.backend.unblocked.clear()
+        backend.send({'test': 1})
+        backend.backend.blocked.wait(5)
+        backend.send({'test': 2})
+
+    def test_overflow_drop(self):
+        backend = make_backend(max_queue_size=1, flush_interval=0.01)
+        self._fill_queue(backend)
+        backend.send({'test': 3})
+        backend.backend.unblocked.set()
+        backend.close()
+
+        self.assertEqual(backend.backend.events, [{'test': 1}, {'test': 2}])
+        self.dog_stats_api.increment.assert_called_once_with(
+            'track.buffered.dropped', 1, tags=[u'backend:RecordingBackend']
+        )
+
+    def test_overflow_block(self):
+        backend = make_backend(max_queue_size=1, flush_interval=0.01, overflow='block', block_timeout=5)
+        self._fill_queue(backend)
+        threading.Timer(0.1, backend.backend.unblocked.set).start()
+        backend.send({'test': 3})
+        backend.close()
+
+        self.assertEqual(backend.backend.events, [{'test': 1}, {'test': 2}, {'test': 3}])
+        self.assertFalse(self.dog_stats_api.increment.called)
+
+    def test_overflow_sync(self):
+        backend = make_backend(max_queue_size=1, flush_interval=0.01, overflow='sync')
+        self._fill_queue(backend)
+        # The third event is sent on this thread, once the other backend is unblocked.
+        threading.Timer(0.1, backend.backend.unblocked.set).start()
+        backend.send({'test': 3})
+        backend.close()
+
+        self.assertItemsEqual(backend.backend.events, [{'test': 1}, {'test': 2}, {'test': 3}])
+        self.dog_stats_api.increment.assert_called_once_with(
+            'track.buffered.sync', 1, tags=[u'backend:RecordingBackend']
+        )
+
+    def test_send_after_close(self):
+        backend = make_backend()
+        backend.close()
+        backend.send({'test': 1})
+        self.assertEqual(backend.backend.events, [{'test': 1}])
+
+    def test_failed_send(self):
+        backend = make_backend()
+        with patch.object(backend.backend, 'send_many', side_effect=Exception):
+            backend.send({'test': 1})
+            backend.close()
+        self.dog_stats_api.increment.assert_called_once_with(
+            'track.buffered.failed', 1, tags=[u'backend:RecordingBackend']
+        )
+
+    def test_connections_closed_around_batches(self):
+        backend = make_backend(batch_size=1, flush_interval=0.01)
+        with patch('track.backends.buffered.close_old_connections') as close_old_connections:
+            backend.send({'test': 1})
+            backend.backend.blocked.wait(5)
+            backend.close()
+        self.assertEqual(close_old_connections.call_count, 2)
+
+    def test_invalid_overflow(self):
+        with self.assertRaises(ValueError):
+            make_backend(overflow='wait')
@@ -7,6 +7,9 @@ Uses pyparsing to parse. Main function as of now is evaluator().
 import math
 import operator
 import numbers
+import threading
+from collections import OrderedDict
+
 import numpy
 import scipy.constants
 import functions
@@ -61,6 +64,10 @@ DEFAULT_VARIABLES = {
     'q': scipy.constants.e  # Fund. Charge: 1.602176565e-19 (Coulombs)
 }
 
+# Number of parsed expressions kept by `compile_expression`. Formula and
+# numerical responses evaluate the same few expressions over and over.
+EXPRESSION_CACHE_SIZE = 2048
+
 # We eliminated the following extreme suffixes:
 #   P (1e15), E (1e18), Z (1e21), Y (1e24),
 #   f (1e-15), a (1e-18), z (1e-21), y (1e-24)
@@ -200,6 +207,73 @@ def eval_product(parse_result):
     return prod
 
 
+# Versions of the actions above which also accept NumPy arrays, holding the
+# values of a node at many sample points. Unlike the actions above, they
+# can't tell numbers from other values, and don't compare values to the
+# operators, since comparing an array to a string is an error in NumPy.
+
+def eval_atom_vectorized(parse_result):
+    """
+    Return the value wrapped by the atom, ignoring parenthesis.
+    """
+    return next(k for k in parse_result if not isinstance(k, basestring))
+
+
+def eval_power_vectorized(parse_result):
+    """
+    Exponentiate the values, right to left. See `eval_power`.
+    """
+    parse_result = reversed(
+        [k for k in parse_result if not isinstance(k, basestring)]
+    )
+    return reduce(lambda a, b: b ** a, parse_result)
+
+
+def eval_parallel_vectorized(parse_result):
+    """
+    Compute the parallel resistors operator. See `eval_parallel`.
+
+    Return NaN at the sample points where there is a zero among the inputs.
+    """
+    if len(parse_result) == 1:
+        return parse_result[0]
+    values = [e for e in parse_result if not isinstance(e, basestring)]
+    has_zero = reduce(numpy.logical_or, [numpy.equal(e, 0) for e in values])
+    return numpy.where(has_zero, float('nan'), 1. / sum(1. / e for e in values))
+
+
+def eval_sum_vectorized(parse_result):
+    """
+    Add the inputs, keeping in mind their sign. See `eval_sum`.
+    """
+    total = 0.0
+    current_op = operator.add
+    for token in parse_result:
+        if not isinstance(token, basestring):
+            total = current_op(total, token)
+        elif token == '+':
+            current_op = operator.add
+        elif token == '-':
+            current_op = operator.sub
+    return total
+
+
+def eval_product_vectorized(parse_result):
+    """
+    Multiply the inputs. See `eval_product`.
+    """
+    prod = 1.0
+    current_op = operator.mul
+    for token in parse_result:
+        if not isinstance(token, basestring):
+            prod = current_op(prod, token)
+        elif token == '*':
+            current_op = operator.mul
+        elif token == '/':
+            current_op = operator.truediv
+    return prod
+
+
 def add_defaults(variables, functions, case_sensitive):
     """
     Create dictionaries with both the default and user-defined variables.
@@ -228,34 +302,291 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
     if math_expr.strip() == "":
         return float('nan')
 
-    # Parse the tree.
-    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
-    math_interpreter.parse_algebra()
+    return compile_expression(math_expr, case_sensitive).evaluate(variables, functions)
 
-    # Get our variables together.
-    all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
 
-    # ...and check them
-    math_interpreter.check_variables(all_variables, all_functions)
+def sample_evaluator(samples, functions, math_expr, case_sensitive=False):
+    """
+    Evaluate an expression at many sample points.
 
-    # Create a recursion to evaluate the tree.
-    if case_sensitive:
-        casify = lambda x: x
-    else:
-        casify = lambda x: x.lower()  # Lowercase for case insens.
+    `samples` is a list of dictionaries of variables, each as passed to
+    `evaluator`. Returns the list of the values `evaluator` would return for
+    each of them, but evaluates the expression for all of them at once with
+    NumPy arrays where possible. See `CompiledExpression.evaluate_samples`.
+    """
+    # No need to go further.
+    if math_expr.strip() == "":
+        return [float('nan')] * len(samples)
+
+    return compile_expression(math_expr, case_sensitive).evaluate_samples(samples, functions)
 
-    evaluate_actions = {
-        'number': eval_number,
-        'variable': lambda x: all_variables[casify(x[0])],
-        'function': lambda x: all_functions[casify(x[0])](x[1]),
-        'atom': eval_atom,
-        'power': eval_power,
-        'parallel': eval_parallel,
-        'product': eval_product,
-        'sum': eval_sum
-    }
 
-    return math_interpreter.reduce_tree(evaluate_actions)
+def compile_expression(math_expr, case_sensitive=False):
+    """
+    Return the `CompiledExpression` for the string `math_expr`.
+
+    Compiled expressions are kept in a bounded LRU cache keyed by the
+    expression and its case sensitivity, so each is parsed only once.
+    """
+    key = (math_expr, case_sensitive)
+    expression = _EXPRESSION_CACHE.get(key)
+    if expression is None:
+        expression = CompiledExpression(math_expr, case_sensitive)
+        _EXPRESSION_CACHE.set(key, expression)
+    return expression
+
+
+class _LRUCache(object):
+    """
+    A thread-safe dictionary holding at most `max_size` items, which drops
+    the least recently used item when full.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the item stored under `key`, or None.
+        """
+        with self._lock:
+            value = self._items.pop(key, None)
+            if value is not None:
+                self._items[key] = value
+            return value
+
+    def set(self, key, value):
+        """
+        Store `value` under `key`.
+        """
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = value
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove all items.
+        """
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+_EXPRESSION_CACHE = _LRUCache(EXPRESSION_CACHE_SIZE)
+
+
+class CompiledExpression(object):
+    """
+    A math expression parsed once, to be evaluated against many variable
+    bindings.
+
+    Parsing builds the tree of a `ParseAugmenter`, which `latex_preview`
+    also uses. The tree is then compiled into nested closures: numbers are
+    converted to floats up front and names are cased once, so evaluating
+    only looks up variables and calls the `eval_*` actions.
+    """
+    def __init__(self, math_expr, case_sensitive=False):
+        self.math_expr = math_expr
+        self.case_sensitive = case_sensitive
+        self.parse_augmenter = ParseAugmenter(math_expr, case_sensitive)
+        self.parse_augmenter.parse_algebra()
+
+        if case_sensitive:
+            self._casify = lambda x: x
+        else:
+            self._casify = lambda x: x.lower()  # Lowercase for case insens.
+        self._evaluate = self._compile_node(self.parse_augmenter.tree, EVALUATE_ACTIONS)
+        self._evaluate_vectorized = None
+
+    def evaluate(self, variables, functions):
+        """
+        Evaluate the expression with the given user-defined variables and
+        functions, in addition to the defaults. See `evaluator`.
+        """
+        all_variables, all_functions = add_defaults(variables, functions, self.case_sensitive)
+        self.parse_augmenter.check_variables(all_variables, all_functions)
+        return self._evaluate(all_variables, all_functions)
+
+    def evaluate_samples(self, samples, functions):
+        """
+        Evaluate the expression at each of the dictionaries of variables in
+        `samples`, with the given user-defined functions.
+
+        Returns the same list as calling `evaluate` for each sample, but, when
+        the samples bind the same variables to floats or complex numbers and
+        the expression only uses the default functions (other than
+        factorials), evaluates them all at once with NumPy arrays.
+
+        Where Python and NumPy arithmetic differ, e.g. on division by zero or
+        a negative number raised to a fractional power, NumPy gives infinite
+        or NaN results; the samples are then evaluated one by one, so that
+        the same values are returned and the same errors raised.
+        """
+        variables = self._vectorize_samples(samples)
+        if variables is None:
+            return [self.evaluate(sample, functions) for sample in samples]
+
+        all_variables, all_functions = add_defaults(variables, functions, self.case_sensitive)
+        self.parse_augmenter.check_variables(all_variables, all_functions)
+
+        results = None
+        if all(
+                all_functions[self._casify(function)] in VECTORIZED_FUNCTIONS
+                for function in self.parse_augmenter.functions_used
+        ):
+            if self._evaluate_vectorized is None:
+                self._evaluate_vectorized = self._compile_node(self.parse_augmenter.tree, VECTORIZED_ACTIONS)
+            try:
+                with numpy.errstate(all='ignore'):
+                    results = numpy.asarray(self._evaluate_vectorized(all_variables, all_functions))
+            except Exception:  # pylint: disable=broad-except
+                # Let the samples raise the error one by one.
+                results = None
+
+        if results is None or results.dtype.kind not in 'fc' or not numpy.isfinite(results).all():
+            return [self.evaluate(sample, functions) for sample in samples]
+        if results.ndim == 0:
+            # The expression doesn't depend on the variables.
+            return [results[()]] * len(samples)
+        return list(results)
+
+    @staticmethod
+    def _vectorize_samples(samples):
+        """
+        Return a dictionary mapping each variable in `samples` to the array of
+        its values, or None if the samples can't be evaluated together.
+        """
+        if not samples:
+            return None
+        names = set(samples[0])
+        values = [sample[name] for sample in samples for name in names]
+        if any(set(sample) != names for sample in samples) or \
+                not all(isinstance(value, (float, complex)) for value in values):
+            return None
+        return {name: numpy.array([sample[name] for sample in samples]) for name in names}
+
+    def _compile_node(self, node, actions):
+        """
+        Return a function of `(all_variables, all_functions)` computing the
+        value of the given node of the parse tree, with the given actions.
+        """
+        if not isinstance(node, ParseResults):
+            # Terminal nodes (operators and parenthesis) are passed to the
+            # actions as strings.
+            return lambda all_variables, all_functions: node
+
+        node_name = node.getName()
+        if node_name == 'number':
+            value = eval_number(node)
+            return lambda all_variables, all_functions: value
+        elif node_name == 'variable':
+            variable = self._casify(node[0])
+            return lambda all_variables, all_functions: all_variables[variable]
+        elif node_name == 'function':
+            function = self._casify(node[0])
+            argument = self._compile_node(node[1], actions)
+            return lambda all_variables, all_functions: all_functions[function](
+                argument(all_variables, all_functions)
+            )
+
+        action = actions.get(node_name)
+        if action is None:  # pragma: no cover
+            raise Exception(u"Unknown branch name '{}'".format(node_name))
+
+        kids = [self._compile_node(k, actions) for k in node]
+        return lambda all_variables, all_functions: action(
+            [kid(all_variables, all_functions) for kid in kids]
+        )
+
+
+# Actions evaluating the branches of the parse tree other than numbers,
+# variables and functions, which `CompiledExpression` resolves itself.
+EVALUATE_ACTIONS = {
+    'atom': eval_atom,
+    'power': eval_power,
+    'parallel': eval_parallel,
+    'product': eval_product,
+    'sum': eval_sum
+}
+VECTORIZED_ACTIONS = {
+    'atom': eval_atom_vectorized,
+    'power': eval_power_vectorized,
+    'parallel': eval_parallel_vectorized,
+    'product': eval_product_vectorized,
+    'sum': eval_sum_vectorized
+}
+
+# The default functions which accept NumPy arrays.
+VECTORIZED_FUNCTIONS = frozenset(
+    function for function in DEFAULT_FUNCTIONS.values() if function is not math.factorial
+)
+
+
+def _build_grammar():
+    """
+    Build the pyparsing grammar of algebraic expressions.
+
+    The tree it parses keeps parenthesis and order of operations in its
+    groups, and all operators and strings of numbers as terminals.
+    """
+    # 0.33 or 7 or .34 or 16.
+    number_part = Word(nums)
+    inner_number = (number_part + Optional("." + Optional(number_part))) | ("." + number_part)
+    # pyparsing allows spaces between tokens--`Combine` prevents that.
+    inner_number = Combine(inner_number)
+
+    # SI suffixes and percent.
+    number_suffix = MatchFirst(Literal(k) for k in SUFFIXES.keys())
+
+    # 0.33k or 17
+    plus_minus = Literal('+') | Literal('-')
+    number = Group(
+        Optional(plus_minus) +
+        inner_number +
+        Optional(CaselessLiteral("E") + Optional(plus_minus) + number_part) +
+        Optional(number_suffix)
+    )
+    number = number("number")
+
+    # Predefine recursive variables.
+    expr = Forward()
+
+    # Handle variables passed in. They must start with letters/underscores
+    # and may contain numbers afterward.
+    inner_varname = Word(alphas + "_", alphanums + "_")
+    varname = Group(inner_varname)("variable")
+
+    # Same thing for functions.
+    function = Group(inner_varname + Suppress("(") + expr + Suppress(")"))("function")
+
+    atom = number | function | varname | "(" + expr + ")"
+    atom = Group(atom)("atom")
+
+    # Do the following in the correct order to preserve order of operation.
+    pow_term = atom + ZeroOrMore("^" + atom)
+    pow_term = Group(pow_term)("power")
+
+    par_term = pow_term + ZeroOrMore('||' + pow_term)  # 5k || 4k
+    par_term = Group(par_term)("parallel")
+
+    prod_term = par_term + ZeroOrMore((Literal('*') | Literal('/')) + par_term)  # 7 * 5 / 4
+    prod_term = Group(prod_term)("product")
+
+    sum_term = Optional(plus_minus) + prod_term + ZeroOrMore(plus_minus + prod_term)  # -5 + 4 - 3
+    sum_term = Group(sum_term)("sum")
+
+    # Finish the recursion.
+    expr << sum_term  # pylint: disable=pointless-statement
+    return expr + stringEnd
+
+
+# The grammar has no parse actions, so it is built once and shared.
+GRAMMAR = _build_grammar()
 
 
 class ParseAugmenter(object):
@@ -278,23 +609,6 @@ class ParseAugmenter(object):
         self.variables_used = set()
         self.functions_used = set()
 
-        def vpa(tokens):
-            """
-            When a variable is recognized, store it in `variables_used`.
-            """
-            varname = tokens[0][0]
-            self.variables_used.add(varname)
-
-        def fpa(tokens):
-            """
-            When a function is recognized, store it in `functions_used`.
-            """
-            varname = tokens[0][0]
-            self.functions_used.add(varname)
-
-        self.variable_parse_action = vpa
-        self.function_parse_action = fpa
-
     def parse_algebra(self):
         """
         Parse an algebraic expression into a tree.
@@ -307,57 +621,23 @@ class ParseAugmenter(object):
         really gross. For debugging, use something like
           print OBJ.tree.asXML()
         """
-        # 0.33 or 7 or .34 or 16.
-        number_part = Word(nums)
-        inner_number = (number_part + Optional("." + Optional(number_part))) | ("." + number_part)
-        # pyparsing allows spaces between tokens--`Combine` prevents that.
-        inner_number = Combine(inner_number)
-
-        # SI suffixes and percent.
-        number_suffix = MatchFirst(Literal(k) for k in SUFFIXES.keys())
-
-        # 0.33k or 17
-        plus_minus = Literal('+') | Literal('-')
-        number = Group(
-            Optional(plus_minus) +
-            inner_number +
-            Optional(CaselessLiteral("E") + Optional(plus_minus) + number_part) +
-            Optional(number_suffix)
-        )
-        number = number("number")
-
-        # Predefine recursive variables.
-        expr = Forward()
-
-        # Handle variables passed in. They must start with letters/underscores
-        # and may contain numbers afterward.
-        inner_varname = Word(alphas + "_", alphanums + "_")
-        varname = Group(inner_varname)("variable")
-        varname.setParseAction(self.variable_parse_action)
+        self.tree = GRAMMAR.parseString(self.math_expr)[0]
+        self._find_names_used(self.tree)
 
-        # Same thing for functions.
-        function = Group(inner_varname + Suppress("(") + expr + Suppress(")"))("function")
-        function.setParseAction(self.function_parse_action)
-
-        atom = number | function | varname | "(" + expr + ")"
-        atom = Group(atom)("atom")
-
-        # Do the following in the correct order to preserve order of operation.
-        pow_term = atom + ZeroOrMore("^" + atom)
-        pow_term = Group(pow_term)("power")
-
-        par_term = pow_term + ZeroOrMore('||' + pow_term)  # 5k || 4k
-        par_term = Group(par_term)("parallel")
-
-        prod_term = par_term + ZeroOrMore((Literal('*') | Literal('/')) + par_term)  # 7 * 5 / 4
-        prod_term = Group(prod_term)("product")
-
-        sum_term = Optional(plus_minus) + prod_term + ZeroOrMore(plus_minus + prod_term)  # -5 + 4 - 3
-        sum_term = Group(sum_term)("sum")
-
-        # Finish the recursion.
-        expr << sum_term  # pylint: disable=pointless-statement
-        self.tree = (expr + stringEnd).parseString(self.math_expr)[0]
+    def _find_names_used(self, node):
+        """
+        Store the names of the variables and functions in the given tree in
+        `variables_used` and `functions_used`.
+        """
+        if not isinstance(node, ParseResults):
+            return
+        node_name = node.getName()
+        if node_name == 'variable':
+            self.variables_used.add(node[0])
+        elif node_name == 'function':
+            self.functions_used.add(node[0])
+        for child in node:
+            self._find_names_used(child)
 
     def reduce_tree(self, handle_actions, terminal_converter=None):
         """
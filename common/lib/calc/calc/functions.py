@@ -49,10 +49,7 @@ def arccot(val):
     """
     Inverse cotangent
     """
-    if numpy.real(val) < 0:
-        return -numpy.pi / 2 - numpy.arctan(val)
-    else:
-        return numpy.pi / 2 - numpy.arctan(val)
+    return numpy.where(numpy.real(val) < 0, -numpy.pi / 2, numpy.pi / 2) - numpy.arctan(val)
 
 
 # Hyperbolic Trig
@@ -0,0 +1,93 @@
+"""
+Microbenchmarks of evaluating and previewing math expressions.
+"""
+import random
+import timeit
+import unittest
+
+import calc
+from calc.preview import latex_preview
+
+# Number of times each expression is evaluated or previewed.
+NUM_CALLS = 2000
+
+# Number of sample points of a formula response check.
+NUM_SAMPLES = 20
+
+EXPRESSIONS = [
+    ('13', {}),
+    ('x^2 + 2*x + 1', {'x': 3.0}),
+    ('R1 || R2 + 5k', {'R1': 1000.0, 'R2': 2000.0}),
+    ('sin(omega*t)^2 + cos(omega*t)^2', {'omega': 2.0, 't': 0.5}),
+    ('m*c^2 / sqrt(1 - v^2/c^2)', {'m': 1e-3, 'v': 1e7}),
+    ('(a + b*i) * (a - b*i) / (4*pi*epsilon_0)', {'a': 1.0, 'b': 2.0, 'epsilon_0': 8.85e-12}),
+]
+
+
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class CalcPerfTest(unittest.TestCase):
+    """
+    Times evaluator and latex_preview on typical formula response answers,
+    with and without the cache of compiled expressions.
+    """
+
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    def _time(self, func):
+        """
+        Returns the microseconds per call of `func` on each expression.
+        """
+        return [
+            1e6 * timeit.timeit(lambda: func(expression, variables), number=NUM_CALLS) / NUM_CALLS
+            for expression, variables in EXPRESSIONS
+        ]
+
+    def _report(self, name, cached_timings, uncached_timings):
+        """
+        Prints the timings of `name` for each expression.
+        """
+        print "{}: usec per call, cached / uncached".format(name)
+        for (expression, __), cached, uncached in zip(EXPRESSIONS, cached_timings, uncached_timings):
+            print "  {:>8.1f} / {:>8.1f}  {}".format(cached, uncached, expression)
+
+    def _uncached(self, func):
+        """
+        Returns `func` modified to clear the cache of compiled expressions
+        before each call.
+        """
+        def uncached_func(expression, variables):
+            """Clears the cache and calls func."""
+            calc.calc._EXPRESSION_CACHE.clear()  # pylint: disable=protected-access
+            return func(expression, variables)
+        return uncached_func
+
+    def test_evaluator(self):
+        evaluate = lambda expression, variables: calc.evaluator(variables, {}, expression)
+        self._report('evaluator', self._time(evaluate), self._time(self._uncached(evaluate)))
+
+    def test_sample_evaluator(self):
+        print "sample_evaluator: usec per {} samples, at once / one by one".format(NUM_SAMPLES)
+        for expression, variables in EXPRESSIONS:
+            samples = [
+                {name: value * random.uniform(0.5, 1.5) for name, value in variables.iteritems()}
+                for __ in xrange(NUM_SAMPLES)
+            ]
+            at_once = timeit.timeit(
+                lambda: calc.sample_evaluator(samples, {}, expression),  # pylint: disable=cell-var-from-loop
+                number=NUM_CALLS / 10,
+            )
+            one_by_one = timeit.timeit(
+                lambda: [calc.evaluator(sample, {}, expression) for sample in samples],  # pylint: disable=cell-var-from-loop
+                number=NUM_CALLS / 10,
+            )
+            print "  {:>8.1f} / {:>8.1f}  {}".format(
+                1e7 * at_once / NUM_CALLS, 1e7 * one_by_one / NUM_CALLS, expression
+            )
+
+    def test_latex_preview(self):
+        preview = lambda expression, variables: latex_preview(expression, variables)
+        self._report('latex_preview', self._time(preview), self._time(self._uncached(preview)))
@@ -3,6 +3,7 @@ Unit tests for calc.py
 """
 
 import unittest
+import mock
 import numpy
 import calc
 from pyparsing import ParseException
@@ -559,3 +560,135 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({'r1': 5}, {}, "r1+r2")
         with self.assertRaisesRegexp(calc.UndefinedVariable, 'r1 r3'):
             calc.evaluator(variables, {}, "r1*r3", case_sensitive=True)
+
+
+class CompiledExpressionTest(unittest.TestCase):
+    """
+    Run tests for calc.compile_expression and the cache of compiled
+    expressions.
+    """
+
+    def setUp(self):
+        super(CompiledExpressionTest, self).setUp()
+        calc.calc._EXPRESSION_CACHE.clear()  # pylint: disable=protected-access
+        self.addCleanup(calc.calc._EXPRESSION_CACHE.clear)  # pylint: disable=protected-access
+
+    def test_evaluate_many_bindings(self):
+        """
+        A compiled expression can be evaluated against different variables
+        """
+        expression = calc.compile_expression('x^2 + f(y) * 2k')
+        functions = {'f': lambda y: y + 1}
+        self.assertEqual(expression.evaluate({'x': 3, 'y': 0}, functions), 2009)
+        self.assertEqual(expression.evaluate({'x': 1, 'y': 1}, functions), 4001)
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'y'):
+            expression.evaluate({'x': 1}, functions)
+
+    def test_cached(self):
+        """
+        Expressions are compiled once for each case sensitivity
+        """
+        expression = calc.compile_expression('3*x')
+        self.assertIs(calc.compile_expression('3*x'), expression)
+        self.assertIsNot(calc.compile_expression('3*x', case_sensitive=True), expression)
+
+        # Evaluating an expression compiles it once.
+        calc.evaluator({'x': 1}, {}, 'x+1')
+        self.assertIs(calc.compile_expression('x+1'), calc.compile_expression('x+1'))
+        self.assertEqual(calc.evaluator({'x': 2}, {}, 'x+1'), 3)
+
+    def test_cache_size(self):
+        """
+        The least recently used expressions are dropped from the cache
+        """
+        cache = calc.calc._LRUCache(2)  # pylint: disable=protected-access
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(len(cache), 2)
+
+    def assert_samples_match(self, math_expr, samples, functions=None):
+        """
+        Check that sample_evaluator returns what evaluator does, or raises
+        the same error
+        """
+        functions = functions or {}
+        try:
+            expected = [calc.evaluator(sample, functions, math_expr) for sample in samples]
+        except Exception as err:  # pylint: disable=broad-except
+            with self.assertRaises(type(err)):
+                calc.sample_evaluator(samples, functions, math_expr)
+            return
+
+        results = calc.sample_evaluator(samples, functions, math_expr)
+        self.assertEqual(len(results), len(samples))
+        for result, expected_result in zip(results, expected):
+            if numpy.isnan(expected_result):
+                self.assertTrue(numpy.isnan(result))
+            else:
+                self.assertAlmostEqual(result, expected_result, delta=1e-12 * abs(expected_result))
+            self.assertEqual(isinstance(result, complex), isinstance(expected_result, complex))
+
+    def test_sample_evaluator(self):
+        """
+        Evaluating many samples at once gives the same values and errors as
+        evaluating them one by one
+        """
+        samples = [{'x': x, 'y': y} for x, y in zip(numpy.linspace(-3, 3, 7), numpy.linspace(0.5, 2.5, 7))]
+        for math_expr in (
+                '13', '', 'x^2 + 2*x*y - 3/y', 'x || y', 'x || 0', '-x^y^2', '(-x)^0.5',
+                'sin(x)*cos(y) + arccot(x) + sech(y)', 'sqrt(x)', 'x/(y-y)', 'fact(3)*x', 'i*x + y*j',
+                '5k*x%', 'z*x',
+        ):
+            self.assert_samples_match(math_expr, samples)
+
+        # Samples that can't be evaluated as arrays are evaluated one by one.
+        self.assert_samples_match('x + 1', [{'x': 1}, {'x': 2.0}])
+        self.assert_samples_match('x + f(x)', samples[:2], {'f': lambda x: x * 2})
+
+    def test_sample_evaluator_vectorized(self):
+        """
+        Samples are evaluated at once where possible
+        """
+        samples = [{'x': float(x)} for x in range(1, 10)]
+        expression = calc.compile_expression('arccot(x)^2 - x/(x+1)')
+        with mock.patch.object(expression, 'evaluate', wraps=expression.evaluate) as mock_evaluate:
+            expression.evaluate_samples(samples, {})
+        self.assertFalse(mock_evaluate.called)
+
+        # Division by zero falls back to evaluating samples one by one,
+        # which raises the error.
+        expression = calc.compile_expression('1/(x-2)')
+        with mock.patch.object(expression, 'evaluate', wraps=expression.evaluate) as mock_evaluate:
+            with self.assertRaises(ZeroDivisionError):
+                expression.evaluate_samples(samples, {})
+        self.assertEqual(mock_evaluate.call_count, 2)
+
+    def test_sample_evaluator_constant(self):
+        """
+        A constant expression gives its value for each of the samples
+        """
+        samples = [{'x': float(x)} for x in range(1, 5)]
+        expression = calc.compile_expression('2*pi + 1')
+        with mock.patch.object(expression, 'evaluate', wraps=expression.evaluate) as mock_evaluate:
+            results = expression.evaluate_samples(samples, {})
+        self.assertFalse(mock_evaluate.called)
+        self.assertEqual(len(results), len(samples))
+        for result in results:
+            self.assertAlmostEqual(result, 2 * numpy.pi + 1)
+            self.assertNotIsInstance(result, complex)
+
+        results = calc.compile_expression('2*i').evaluate_samples(samples, {})
+        self.assertEqual(results, [2j] * len(samples))
+
+    def test_parse_error_not_cached(self):
+        """
+        Expressions that don't parse raise every time
+        """
+        for __ in range(2):
+            with self.assertRaises(ParseException):
+                calc.compile_expression('1 +')
@@ -0,0 +1,75 @@
+"""
+Benchmarks of executing typical Capa problem scripts, with and without the
+pool of warm sandbox workers.
+"""
+import sys
+import time
+import unittest
+
+from codejail import jail_code
+
+from capa.safe_exec import safe_exec, sandbox_pool
+
+# Number of times each script is executed.
+NUM_CALLS = 50
+
+# Scripts like those of <script> tags and custom response checks.
+SCRIPTS = [
+    "a = random.randint(2, 9)\nb = random.randint(2, 9)\nanswer = a * b",
+    "x = numpy.linspace(0, 1, 50)\ny = numpy.trapz(x ** 2, x)",
+    "roots = sorted(numpy.roots([1, -3, 2]).tolist())",
+    "value = calc.evaluator({'x': 2.0}, {}, 'x^2 + sin(x)')",
+]
+
+
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class SandboxPoolPerfTest(unittest.TestCase):
+    """
+    Times safe_exec of typical problem scripts, starting the sandboxed Python
+    for each execution, then using a pool of warm sandbox workers.
+
+    Runs the current Python without a sandbox user, so this measures the cost
+    of starting Python and importing modules rather than of sudo.
+    """
+
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    def setUp(self):
+        super(SandboxPoolPerfTest, self).setUp()
+        jail_code.configure("python", sys.executable)
+        self.addCleanup(sandbox_pool.configure, None, size=0)
+
+    def _time(self):
+        """
+        Returns the sorted milliseconds of each execution of the scripts.
+        """
+        timings = []
+        for script in SCRIPTS:
+            for seed in range(NUM_CALLS):
+                start = time.time()
+                safe_exec(script, {}, random_seed=seed)
+                timings.append(1000 * (time.time() - start))
+        return sorted(timings)
+
+    def _report(self, name, timings):
+        """
+        Prints the median and 99th percentile of `timings`.
+        """
+        print "{:<10} p50 {:8.1f} ms   p99 {:8.1f} ms".format(
+            name, timings[len(timings) // 2], timings[int(len(timings) * 0.99)],
+        )
+
+    def test_sandbox_pool(self):
+        codejail_timings = self._time()
+
+        sandbox_pool.configure(sys.executable, size=1)
+        # Start the worker before timing.
+        safe_exec("a = 1", {})
+        pool_timings = self._time()
+
+        self._report("codejail", codejail_timings)
+        self._report("pool", pool_timings)
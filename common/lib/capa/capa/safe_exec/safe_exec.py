@@ -4,9 +4,17 @@ from codejail.safe_exec import safe_exec as codejail_safe_exec
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
 from codejail.safe_exec import json_safe, SafeExecException
 from . import lazymod
+from . import sandbox_pool
 from dogapi import dog_stats_api
 
+from collections import defaultdict, OrderedDict
 import hashlib
+import json
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
 
 # Establish the Python environment for Capa.
 # Capa assumes float-friendly division always.
@@ -46,6 +54,28 @@ for name, modname in ASSUMED_IMPORTS:
 
 LAZY_IMPORTS = "".join(LAZY_IMPORTS)
 
+# Results are cached in a process-local cache, in front of the `cache` passed
+# to safe_exec.  This is the total size, in bytes of JSON, of the results it
+# holds.
+LOCAL_CACHE_SIZE = 16 * 1024 * 1024
+
+# Results bigger than this, in bytes of JSON, are not cached at all: they are
+# typically big numpy-derived globals, and would crowd out many small results.
+MAX_CACHED_RESULT_SIZE = 256 * 1024
+
+# Number of code hashes to remember, so that the code of a problem is hashed
+# once, rather than every time it is executed.
+CODE_HASH_CACHE_SIZE = 1000
+
+# Number of problems whose cache lookups are counted: the most recently
+# executed ones.
+CACHE_STATS_SIZE = 1000
+
+# Every this many seconds, the cache hit rates of the CACHE_STATS_LOG_TOP
+# problems with the most lookups are logged.
+CACHE_STATS_LOG_INTERVAL = 10 * 60
+CACHE_STATS_LOG_TOP = 20
+
 
 def update_hash(hasher, obj):
     """
@@ -70,6 +100,182 @@ def update_hash(hasher, obj):
         hasher.update(repr(obj))
 
 
+class LocalResultCache(object):
+    """
+    A process-local, least-recently-used cache of JSON-encoded results,
+    holding at most `max_size` bytes of them.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._size = 0
+        # OrderedDict {key: JSON}, from least to most recently used.
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the JSON cached for `key`, or None.
+        """
+        with self._lock:
+            data = self._entries.pop(key, None)
+            if data is not None:
+                self._entries[key] = data
+            return data
+
+    def set(self, key, data):
+        """
+        Cache the JSON `data` for `key`, evicting the least recently used
+        results as needed.
+        """
+        with self._lock:
+            self._size -= len(self._entries.pop(key, ""))
+            if len(data) > self.max_size:
+                return
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_size:
+                __, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        """
+        Remove all results.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+LOCAL_CACHE = LocalResultCache(LOCAL_CACHE_SIZE)
+
+
+class CacheLookupStats(object):
+    """
+    Counts of cache lookups by problem slug, then by result: "local_hit",
+    "remote_hit", "miss" or "too_large", for the `max_slugs` most recently
+    executed problems.
+
+    Every `log_interval` seconds, the hit rates of the `log_top` problems with
+    the most lookups are logged.
+    """
+    def __init__(self, max_slugs, log_interval, log_top):
+        self.max_slugs = max_slugs
+        self.log_interval = log_interval
+        self.log_top = log_top
+        # OrderedDict {slug: {result: count}}, from least to most recently
+        # executed.
+        self._counts = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_logged = time.time()
+
+    def __getitem__(self, slug):
+        """
+        Return the counts of the lookups for `slug`, by result.
+        """
+        with self._lock:
+            return dict(self._counts.get(slug, {}))
+
+    def record(self, slug, result):
+        """
+        Count a lookup for `slug`, and log the hit rates if it is time to.
+        """
+        with self._lock:
+            counts = self._counts.pop(slug, None)
+            if counts is None:
+                counts = defaultdict(int)
+                if len(self._counts) >= self.max_slugs:
+                    self._counts.popitem(last=False)
+            counts[result] += 1
+            self._counts[slug] = counts
+
+            now = time.time()
+            log_now = now - self._last_logged >= self.log_interval
+            if log_now:
+                self._last_logged = now
+        if log_now:
+            self.log_hit_rates()
+
+    def hit_rates(self):
+        """
+        Return {slug: (number of cache lookups, fraction of them that hit)}.
+        """
+        with self._lock:
+            counts_by_slug = [(slug, dict(counts)) for slug, counts in self._counts.iteritems()]
+        hit_rates = {}
+        for slug, counts in counts_by_slug:
+            lookups = sum(counts.values())
+            hits = counts.get("local_hit", 0) + counts.get("remote_hit", 0)
+            hit_rates[slug] = (lookups, float(hits) / lookups if lookups else 0.0)
+        return hit_rates
+
+    def log_hit_rates(self):
+        """
+        Log the hit rates of the problems with the most lookups.
+        """
+        top = sorted(self.hit_rates().iteritems(), key=lambda item: item[1][0], reverse=True)[:self.log_top]
+        log.info(
+            "safe_exec cache hit rates of the %d problems with the most lookups: %s",
+            len(top),
+            ", ".join("{} {:.0%} of {}".format(slug, rate, lookups) for slug, (lookups, rate) in top),
+        )
+
+    def clear(self):
+        """
+        Forget all lookups.
+        """
+        with self._lock:
+            self._counts.clear()
+
+# The md5 hex digests of recently executed code.
+_CODE_HASHES = {}
+
+CACHE_STATS = CacheLookupStats(CACHE_STATS_SIZE, CACHE_STATS_LOG_INTERVAL, CACHE_STATS_LOG_TOP)
+
+
+def code_hash(code):
+    """
+    Return the md5 hex digest of `code`, hashing each problem's code once.
+    """
+    digest = _CODE_HASHES.get(code)
+    if digest is None:
+        if len(_CODE_HASHES) >= CODE_HASH_CACHE_SIZE:
+            _CODE_HASHES.clear()
+        digest = _CODE_HASHES[code] = hashlib.md5(repr(code)).hexdigest()
+    return digest
+
+
+def cache_key(code, safe_globals, random_seed):
+    """
+    Return the cache key of executing `code` with the JSON-safe globals
+    `safe_globals` and `random_seed`.
+    """
+    # safe_globals has been through JSON already, so encoding it with sorted
+    # keys canonicalizes it, much faster than update_hash.
+    globals_hash = hashlib.md5(json.dumps(safe_globals, sort_keys=True)).hexdigest()
+    return "safe_exec.%r.%s.%s" % (random_seed, code_hash(code), globals_hash)
+
+
+def cache_hit_rates():
+    """
+    Return {slug: (number of cache lookups, fraction of them that hit)} for
+    the problems most recently executed by this process.
+    """
+    return CACHE_STATS.hit_rates()
+
+
+def _record_cache_lookup(slug, result):
+    """
+    Count a cache lookup for the problem `slug`.
+
+    The metric is only tagged with the result: problems are too many to tag
+    it with.  The hit rates of the problems are logged periodically instead,
+    see CacheLookupStats.
+    """
+    CACHE_STATS.record(slug, result)
+    log.debug("safe_exec cache lookup for %s: %s", slug, result)
+    dog_stats_api.increment("capa.safe_exec.cache", tags=[u"result:{}".format(result)])
+
+
 @dog_stats_api.timed('capa.safe_exec.time')
 def safe_exec(
     code,
@@ -99,7 +305,8 @@ def safe_exec(
 
     `cache` is an object with .get(key) and .set(key, value) methods.  It will be used
     to cache the execution, taking into account the code, the values of the globals,
-    and the random seed.
+    and the random seed.  Results are also cached in LOCAL_CACHE, in front of `cache`,
+    and results bigger than MAX_CACHED_RESULT_SIZE are not cached.
 
     `slug` is an arbitrary string, a description that's meaningful to the
     caller, that will be used in log messages.
@@ -109,12 +316,16 @@ def safe_exec(
     """
     # Check the cache for a previous result.
     if cache:
-        safe_globals = json_safe(globals_dict)
-        md5er = hashlib.md5()
-        md5er.update(repr(code))
-        update_hash(md5er, safe_globals)
-        key = "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
-        cached = cache.get(key)
+        key = cache_key(code, json_safe(globals_dict), random_seed)
+        cached = LOCAL_CACHE.get(key)
+        if cached is not None:
+            _record_cache_lookup(slug, "local_hit")
+            cached = json.loads(cached)
+        else:
+            cached = cache.get(key)
+            if cached is not None:
+                _record_cache_lookup(slug, "remote_hit")
+                LOCAL_CACHE.set(key, json.dumps(cached))
         if cached is not None:
             # We have a cached result.  The result is a pair: the exception
             # message, if any, else None; and the resulting globals dictionary.
@@ -128,8 +339,11 @@ def safe_exec(
     code_prolog = CODE_PROLOG % random_seed
 
     # Decide which code executor to use.
+    pool = sandbox_pool.get_pool()
     if unsafely:
         exec_fn = codejail_not_safe_exec
+    elif pool is not None:
+        exec_fn = _pooled_safe_exec(pool)
     else:
         exec_fn = codejail_safe_exec
 
@@ -148,8 +362,31 @@ def safe_exec(
     # the globals dict might not be entirely serializable.
     if cache:
         cleaned_results = json_safe(globals_dict)
-        cache.set(key, (emsg, cleaned_results))
+        encoded = json.dumps((emsg, cleaned_results))
+        if len(encoded) > MAX_CACHED_RESULT_SIZE:
+            _record_cache_lookup(slug, "too_large")
+        else:
+            _record_cache_lookup(slug, "miss")
+            LOCAL_CACHE.set(key, encoded)
+            cache.set(key, (emsg, cleaned_results))
 
     # If an exception happened, raise it now.
     if emsg:
         raise e
+
+
+def _pooled_safe_exec(pool):
+    """
+    Return a function executing code in the sandbox workers of `pool`, or
+    with codejail if the workers fail before running the code.
+    """
+    def exec_fn(code, globals_dict, python_path=None, extra_files=None, slug=None):
+        """
+        Execute `code` like `codejail.safe_exec.safe_exec`.
+        """
+        try:
+            pool.safe_exec(code, globals_dict, python_path=python_path, extra_files=extra_files, slug=slug)
+        except (sandbox_pool.SandboxWorkerError, OSError):
+            log.exception("Sandbox pool failed executing %s, falling back to codejail", slug)
+            codejail_safe_exec(code, globals_dict, python_path=python_path, extra_files=extra_files, slug=slug)
+    return exec_fn
@@ -0,0 +1,344 @@
+"""
+A pool of warm sandbox workers for Capa's safe_exec.
+
+CodeJail starts the sandboxed Python for every execution, which then imports
+numpy, scipy and the other modules available to Capa code all over again.  A
+`SandboxPool` instead keeps workers running the sandboxed Python, as the
+sandbox user, with those modules already imported.  The workers are started
+with the sudoers rule that CodeJail uses, and need no other privilege.  Each
+worker forks a fresh process for every execution, limited as CodeJail limits
+its processes, so executions stay isolated from the worker and from each
+other.  See sandbox_worker.py.
+
+Workers are recycled after `max_executions` executions, or once the memory
+use of their executions has grown past `max_memory`.
+
+The pool is enabled with `configure`, and used by `capa.safe_exec.safe_exec`
+when enabled.
+"""
+import json
+import logging
+import os
+import select
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+
+from codejail.safe_exec import json_safe, SafeExecException
+
+log = logging.getLogger(__name__)
+
+# The source of the workers, which is passed to the sandboxed Python.
+worker_py_file = os.path.join(os.path.dirname(__file__), "sandbox_worker.py")
+with open(worker_py_file) as worker_file:
+    WORKER_PY = worker_file.read()
+
+# The modules each worker imports up front. These are the modules that
+# LAZY_IMPORTS makes available to Capa code.
+WORKER_IMPORTS = [
+    "numpy",
+    "math",
+    "scipy",
+    "calc",
+    "eia",
+    "chem.chemcalc",
+    "chem.chemtools",
+    "chem.miller",
+    "verifiers.draganddrop",
+]
+
+# Seconds to wait for a worker to start, and for a reply beyond the real time
+# limit of the execution, before giving up on the worker.
+WORKER_START_TIMEOUT = 30
+WORKER_REPLY_GRACE = 5
+
+
+class SandboxWorkerError(Exception):
+    """
+    A sandbox worker failed, rather than the code it executed.
+    """
+    pass
+
+
+class SandboxWorkerDied(SandboxWorkerError):
+    """
+    A sandbox worker failed while executing code, possibly because of the
+    code.
+    """
+    pass
+
+
+class SandboxWorker(object):
+    """
+    A running sandbox worker process.
+    """
+    def __init__(self, python_bin, user=None, limits=None, imports=WORKER_IMPORTS):
+        self.limits = dict(limits or {})
+        self.executions = 0
+        self.maxrss = 0
+
+        config = json.dumps({"imports": imports, "limits": self.limits})
+        cmd = [python_bin, "-E", "-B", "-c", WORKER_PY, config]
+        if user:
+            cmd = ["sudo", "-u", user] + cmd
+        self.process = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, close_fds=True, env={},
+        )
+        try:
+            self._read_message(WORKER_START_TIMEOUT)
+        except SandboxWorkerError:
+            self.close()
+            raise
+
+    def execute(self, code, globals_dict, tmp_dir, python_path):
+        """
+        Execute `code` with the JSON-safe `globals_dict` in the directory
+        `tmp_dir`, and return the tuple (error message, resulting globals).
+
+        Raises SandboxWorkerDied if the worker fails once it has been sent
+        the code, and SandboxWorkerError if it couldn't run the code.
+        """
+        request = {"code": code, "globals": globals_dict, "tmp_dir": tmp_dir, "python_path": python_path}
+        self._write_message(request)
+        timeout = None
+        if self.limits.get("REALTIME"):
+            timeout = self.limits["REALTIME"] + WORKER_REPLY_GRACE
+        try:
+            reply = self._read_message(timeout)
+        except SandboxWorkerError as error:
+            raise SandboxWorkerDied(error.message)
+        self.executions += 1
+        self.maxrss = reply["maxrss"] * 1024
+        if "setup_error" in reply:
+            raise SandboxWorkerError("Sandbox worker couldn't run the code: {}".format(reply["setup_error"]))
+        return reply.get("error"), reply.get("globals")
+
+    def close(self):
+        """
+        Stop the worker.
+        """
+        try:
+            self.process.stdin.close()
+            if self.process.poll() is None:
+                self.process.terminate()
+            self.process.wait()
+        except (IOError, OSError):
+            pass
+
+    def _write_message(self, message):
+        """
+        Send `message` to the worker.
+        """
+        data = json.dumps(message)
+        try:
+            self.process.stdin.write(struct.pack(">I", len(data)) + data)
+            self.process.stdin.flush()
+        except (IOError, OSError) as error:
+            raise SandboxWorkerError("Couldn't write to sandbox worker: {}".format(error))
+
+    def _read_message(self, timeout):
+        """
+        Read a message from the worker, waiting at most `timeout` seconds.
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        header = self._read_bytes(4, deadline)
+        (length,) = struct.unpack(">I", header)
+        return json.loads(self._read_bytes(length, deadline))
+
+    def _read_bytes(self, length, deadline):
+        """
+        Read exactly `length` bytes from the worker by `deadline`.
+        """
+        data = []
+        stdout_fd = self.process.stdout.fileno()
+        while length:
+            timeout = max(deadline - time.time(), 0) if deadline is not None else None
+            readable, __, __ = select.select([stdout_fd], [], [], timeout)
+            if not readable:
+                raise SandboxWorkerError("Sandbox worker timed out")
+            chunk = os.read(stdout_fd, length)
+            if not chunk:
+                raise SandboxWorkerError("Sandbox worker exited with status {}".format(self.process.poll()))
+            data.append(chunk)
+            length -= len(chunk)
+        return "".join(data)
+
+
+class SandboxPool(object):
+    """
+    A pool of up to `size` sandbox workers, shared by the threads of a
+    process.
+
+    Workers are started when first needed, and replaced in the background
+    when recycled.
+    """
+    def __init__(self, python_bin, user=None, limits=None, size=1, max_executions=100, max_memory=0):
+        self.python_bin = python_bin
+        self.user = user
+        self.limits = dict(limits or {})
+        self.size = size
+        self.max_executions = max_executions
+        self.max_memory = max_memory
+
+        self._lock = threading.Lock()
+        self._available = threading.Semaphore(size)
+        self._idle_workers = []
+        self._pid = os.getpid()
+
+    def safe_exec(self, code, globals_dict, python_path=None, extra_files=None, slug=None):
+        """
+        Execute `code` in a sandbox worker, like `codejail.safe_exec.safe_exec`.
+
+        Changes the code makes to the JSON-safe values of `globals_dict` are
+        visible in `globals_dict` when this function returns. Raises
+        SafeExecException if the code raised an exception, or its worker
+        died executing it.
+        """
+        tmp_dir = tempfile.mkdtemp(prefix="codejail-")
+        try:
+            # The sandbox user needs to read and write the files.
+            os.chmod(tmp_dir, 0777)
+            sys_path = self._write_files(tmp_dir, python_path or (), extra_files or ())
+
+            emsg, result_globals = self._execute(code, json_safe(globals_dict), tmp_dir, sys_path, slug)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        if emsg:
+            raise SafeExecException("Couldn't execute jailed code: {}".format(emsg))
+        globals_dict.update(result_globals)
+
+    def close(self):
+        """
+        Stop the idle workers.
+        """
+        with self._lock:
+            idle_workers, self._idle_workers = self._idle_workers, []
+        for worker in idle_workers:
+            worker.close()
+
+    def _execute(self, code, globals_dict, tmp_dir, sys_path, slug):
+        """
+        Execute `code` in an idle worker, starting one if needed, and return
+        the tuple (error message, resulting globals).
+        """
+        self._available.acquire()
+        try:
+            worker = self._get_idle_worker() or self._start_worker()
+            try:
+                result = worker.execute(code, globals_dict, tmp_dir, sys_path)
+            except SandboxWorkerDied as error:
+                # The code may have killed the worker: report the failure
+                # as the code's error, rather than run the code again.
+                log.exception("Sandbox worker died executing %s", slug)
+                worker.close()
+                return "Sandbox worker died: {}".format(error.message), None
+            except SandboxWorkerError:
+                log.exception("Sandbox worker failed executing %s", slug)
+                worker.close()
+                raise
+            self._release_worker(worker)
+            return result
+        finally:
+            self._available.release()
+
+    def _get_idle_worker(self):
+        """
+        Return an idle worker of this process, or None.
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                # This process was forked: the workers belong to its parent.
+                self._pid = os.getpid()
+                self._idle_workers = []
+            return self._idle_workers.pop() if self._idle_workers else None
+
+    def _release_worker(self, worker):
+        """
+        Make `worker` available again, or replace it if it is worn out.
+        """
+        worn_out = worker.executions >= self.max_executions or (
+            self.max_memory and worker.maxrss > self.max_memory
+        )
+        if not worn_out:
+            with self._lock:
+                self._idle_workers.append(worker)
+            return
+
+        log.info(
+            "Recycling sandbox worker after %d executions, using up to %d bytes",
+            worker.executions,
+            worker.maxrss,
+        )
+        worker.close()
+        replacement = threading.Thread(target=self._add_idle_worker)
+        replacement.daemon = True
+        replacement.start()
+
+    def _add_idle_worker(self):
+        """
+        Start a worker, and make it available.
+        """
+        try:
+            worker = self._start_worker()
+        except SandboxWorkerError:
+            log.exception("Couldn't start a sandbox worker")
+            return
+        with self._lock:
+            self._idle_workers.append(worker)
+
+    def _start_worker(self):
+        """
+        Start and return a new worker.
+        """
+        return SandboxWorker(self.python_bin, self.user, self.limits)
+
+    @staticmethod
+    def _write_files(tmp_dir, python_path, extra_files):
+        """
+        Create the files that the code needs in `tmp_dir`, as CodeJail does,
+        and return the entries of `python_path` relative to `tmp_dir`.
+        """
+        extra_names = set(name for name, __ in extra_files)
+        for name, content in extra_files:
+            with open(os.path.join(tmp_dir, name), "wb") as extra_file:
+                extra_file.write(content)
+
+        sys_path = []
+        for path in python_path:
+            name = os.path.basename(path.rstrip("/"))
+            if name not in extra_names:
+                if os.path.isdir(path):
+                    shutil.copytree(path, os.path.join(tmp_dir, name))
+                else:
+                    shutil.copy(path, os.path.join(tmp_dir, name))
+            sys_path.append(name)
+        return sys_path
+
+
+_POOL = None
+
+
+def configure(python_bin, user=None, limits=None, size=1, max_executions=100, max_memory=0):
+    """
+    Make `safe_exec` execute code in a pool of sandbox workers running
+    `python_bin` as `user`, with the CodeJail `limits`. See `SandboxPool`.
+
+    A `size` of zero disables the pool.
+    """
+    global _POOL  # pylint: disable=global-statement
+    if _POOL is not None:
+        _POOL.close()
+    _POOL = None
+    if size:
+        _POOL = SandboxPool(python_bin, user, limits, size, max_executions, max_memory)
+
+
+def get_pool():
+    """
+    Return the configured `SandboxPool`, or None.
+    """
+    return _POOL
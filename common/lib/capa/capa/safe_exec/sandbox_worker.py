@@ -0,0 +1,236 @@
+"""
+The worker process of a `SandboxPool`.
+
+This file is not imported: `SandboxPool` reads it, and runs it with the
+sandboxed Python, passing its source on the command line.
+
+The worker imports the modules available to Capa code once, then serves
+execution requests read from stdin.  It never runs the requested code itself:
+it forks a fresh process for each request, which limits its own resources,
+runs the code and sends back the resulting globals.  The worker isn't
+dumpable, so the code can't trace it or read its memory, although both run as
+the sandbox user.  Each execution is thus as
+isolated from the others as if the sandboxed Python had been started for it,
+without paying for starting Python and importing numpy and scipy again.
+
+Messages in both directions are JSON documents, each preceded by its length as
+a 4 byte big endian integer.  The worker's configuration is a JSON document in
+its first argument::
+
+    {"imports": [module names], "limits": {"CPU": seconds, "REALTIME": seconds,
+     "VMEM": bytes, "FSIZE": bytes}}
+
+and each request is::
+
+    {"code": code, "globals": globals dict, "python_path": [paths], "tmp_dir": path}
+
+to which the worker replies with one of::
+
+    {"globals": resulting globals dict, "maxrss": executions' peak memory}
+    {"error": message, "maxrss": executions' peak memory}
+    {"setup_error": message, "maxrss": executions' peak memory}
+
+where "setup_error" reports that the process couldn't be set up for running
+the code, which therefore wasn't run.
+"""
+import ctypes
+import errno
+import json
+import os
+import resource
+import select
+import signal
+import struct
+import sys
+import time
+import traceback
+
+# From <linux/prctl.h>.
+PR_SET_DUMPABLE = 4
+
+
+def read_message(fd):
+    """
+    Read a message from the file descriptor `fd`, or return None at EOF.
+    """
+    header = read_bytes(fd, 4)
+    if header is None:
+        return None
+    (length,) = struct.unpack(">I", header)
+    return json.loads(read_bytes(fd, length))
+
+
+def read_bytes(fd, length):
+    """
+    Read exactly `length` bytes from `fd`, or return None at EOF.
+    """
+    data = []
+    while length:
+        chunk = os.read(fd, length)
+        if not chunk:
+            return None
+        data.append(chunk)
+        length -= len(chunk)
+    return "".join(data)
+
+
+def write_message(fd, message):
+    """
+    Write `message` to the file descriptor `fd`.
+    """
+    data = json.dumps(message)
+    data = struct.pack(">I", len(data)) + data
+    while data:
+        data = data[os.write(fd, data):]
+
+
+def json_safe(globals_dict):
+    """
+    Return the items of `globals_dict` that can be sent back as JSON.
+    """
+    safe = {}
+    for key, value in globals_dict.iteritems():
+        if not isinstance(key, basestring):
+            continue
+        try:
+            safe[key] = json.loads(json.dumps(value))
+        except Exception:  # pylint: disable=broad-except
+            continue
+    return safe
+
+
+def set_not_dumpable():
+    """
+    Keep other processes of the same user from tracing the current process,
+    or reading its memory.
+    """
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.prctl(PR_SET_DUMPABLE, 0, 0, 0, 0) != 0:
+        errnum = ctypes.get_errno()
+        raise OSError(errnum, os.strerror(errnum))
+
+
+def set_limits(limits):
+    """
+    Limit the resources of the current process, as CodeJail does for each
+    sandboxed process.
+    """
+    # No subprocesses.
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+    if limits.get("CPU"):
+        resource.setrlimit(resource.RLIMIT_CPU, (limits["CPU"], limits["CPU"]))
+    if limits.get("VMEM"):
+        resource.setrlimit(resource.RLIMIT_AS, (limits["VMEM"], limits["VMEM"]))
+    if limits.get("FSIZE"):
+        resource.setrlimit(resource.RLIMIT_FSIZE, (limits["FSIZE"], limits["FSIZE"]))
+
+
+def execute(request, limits, result_fd):
+    """
+    Run the code of `request` in the current (forked) process, and write
+    the result to `result_fd`.
+    """
+    try:
+        # The code can't use the worker's messages, and its output is
+        # discarded, as it is by CodeJail.
+        os.closerange(3, result_fd)
+        os.closerange(result_fd + 1, os.sysconf("SC_OPEN_MAX"))
+        devnull = os.open(os.devnull, os.O_RDWR)
+        for fd in (0, 1, 2):
+            os.dup2(devnull, fd)
+        os.close(devnull)
+
+        os.chdir(request["tmp_dir"])
+        sys.path.extend(request["python_path"])
+        set_limits(limits)
+    except BaseException:  # pylint: disable=broad-except
+        write_message(result_fd, {"setup_error": traceback.format_exc()})
+        return
+
+    try:
+        globals_dict = request["globals"]
+        exec compile(request["code"], "jailed_code", "exec") in globals_dict  # pylint: disable=exec-used
+        result = {"globals": json_safe(globals_dict)}
+    except BaseException:  # pylint: disable=broad-except
+        result = {"error": traceback.format_exc()}
+    write_message(result_fd, result)
+
+
+def run_in_child(request, limits):
+    """
+    Fork a process to execute `request`, wait for it to finish within the
+    real time limit, and return its result.
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        exit_status = 1
+        try:
+            os.close(read_fd)
+            execute(request, limits, write_fd)
+            exit_status = 0
+        finally:
+            os._exit(exit_status)  # pylint: disable=protected-access
+
+    os.close(write_fd)
+    deadline = time.time() + limits["REALTIME"] if limits.get("REALTIME") else None
+    output = []
+    timed_out = False
+    while True:
+        timeout = None if deadline is None else max(deadline - time.time(), 0)
+        try:
+            readable, __, __ = select.select([read_fd], [], [], timeout)
+        except select.error as error:
+            if error.args[0] == errno.EINTR:
+                continue
+            raise
+        if not readable:
+            timed_out = True
+            os.kill(pid, signal.SIGKILL)
+            break
+        chunk = os.read(read_fd, 65536)
+        if not chunk:
+            break
+        output.append(chunk)
+    os.close(read_fd)
+    __, status = os.waitpid(pid, 0)
+
+    output = "".join(output)
+    if timed_out:
+        return {"error": "Real time limit of {} seconds exceeded".format(limits["REALTIME"])}
+    if len(output) < 4:
+        return {"error": "Sandboxed process died with status {}".format(status)}
+    return json.loads(output[4:])
+
+
+def main():
+    """
+    Serve execution requests until stdin is closed.
+    """
+    config = json.loads(sys.argv[1])
+    limits = config["limits"]
+    set_not_dumpable()
+
+    # Keep stdout for messages: anything printed goes to stderr instead.
+    reply_fd = os.dup(1)
+    os.dup2(2, 1)
+
+    for module_name in config["imports"]:
+        try:
+            __import__(module_name)
+        except ImportError:
+            # The code will fail the same way when it uses the module.
+            pass
+
+    write_message(reply_fd, {"ready": True})
+    while True:
+        request = read_message(0)
+        if request is None:
+            break
+        reply = run_in_child(request, limits)
+        reply["maxrss"] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        write_message(reply_fd, reply)
+
+
+if __name__ == "__main__":
+    main()
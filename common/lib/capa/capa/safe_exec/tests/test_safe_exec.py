@@ -7,9 +7,11 @@ import random
 import textwrap
 import unittest
 
+from mock import patch
 from nose.plugins.skip import SkipTest
 
 from capa.safe_exec import safe_exec, update_hash
+from capa.safe_exec.safe_exec import LOCAL_CACHE, CACHE_STATS, CacheLookupStats, cache_hit_rates
 from codejail.safe_exec import SafeExecException
 from codejail.jail_code import is_configured
 
@@ -110,6 +112,11 @@ class DictCache(object):
 class TestSafeExecCaching(unittest.TestCase):
     """Test that caching works on safe_exec."""
 
+    def setUp(self):
+        super(TestSafeExecCaching, self).setUp()
+        LOCAL_CACHE.clear()
+        CACHE_STATS.clear()
+
     def test_cache_miss_then_hit(self):
         g = {}
         cache = {}
@@ -122,6 +129,7 @@ class TestSafeExecCaching(unittest.TestCase):
 
         # Fiddle with the cache, then try it again.
         cache[cache.keys()[0]] = (None, {'a': 17})
+        LOCAL_CACHE.clear()
 
         g = {}
         safe_exec("a = int(math.pi)", g, cache=DictCache(cache))
@@ -153,6 +161,7 @@ class TestSafeExecCaching(unittest.TestCase):
 
         # Change the value stored in the cache, the result should change.
         cache[cache.keys()[0]] = ("Hey there!", {})
+        LOCAL_CACHE.clear()
 
         with self.assertRaises(SafeExecException):
             safe_exec(code, g, cache=DictCache(cache))
@@ -163,9 +172,63 @@ class TestSafeExecCaching(unittest.TestCase):
 
         # Change it again, now no exception!
         cache[cache.keys()[0]] = (None, {'a': 17})
+        LOCAL_CACHE.clear()
         safe_exec(code, g, cache=DictCache(cache))
         self.assertEqual(g['a'], 17)
 
+    def test_local_cache_in_front(self):
+        cache = {}
+        safe_exec("a = int(math.pi)", {}, cache=DictCache(cache), slug="problem")
+
+        # The shared cache isn't needed while the result is in the local one.
+        cache.clear()
+        g = {}
+        safe_exec("a = int(math.pi)", g, cache=DictCache(cache), slug="problem")
+        self.assertEqual(g['a'], 3)
+        self.assertEqual(cache, {})
+
+        # Results of the shared cache are copied to the local one.
+        safe_exec("a = 2", {}, cache=DictCache(cache), slug="problem")
+        cache[cache.keys()[0]] = (None, {'a': 17})
+        LOCAL_CACHE.clear()
+        for __ in range(2):
+            g = {}
+            safe_exec("a = 2", g, cache=DictCache(cache), slug="problem")
+            self.assertEqual(g['a'], 17)
+            cache.clear()
+
+        self.assertEqual(
+            CACHE_STATS["problem"],
+            {"miss": 2, "local_hit": 2, "remote_hit": 1},
+        )
+        self.assertEqual(cache_hit_rates(), {"problem": (5, 0.6)})
+
+    def test_cached_results_are_copies(self):
+        g = {}
+        safe_exec("a = [1, 2]", g, cache=DictCache({}))
+        g['a'].append(3)
+        g = {}
+        safe_exec("a = [1, 2]", g, cache=DictCache({}))
+        self.assertEqual(g['a'], [1, 2])
+
+    def test_large_results_not_cached(self):
+        cache = {}
+        g = {}
+        safe_exec("a = 'x' * 1000000", g, cache=DictCache(cache), slug="problem")
+        self.assertEqual(len(g['a']), 1000000)
+        self.assertEqual(cache, {})
+        self.assertEqual(CACHE_STATS["problem"], {"too_large": 1})
+
+    def test_globals_key_order(self):
+        # Equal globals have the same key, whatever the order of their keys.
+        cache = {}
+        d1 = {k: 1 for k in "abcdefghijklmnopqrstuvwxyz"}
+        d2 = {k: 1 for k in reversed("abcdefghijklmnopqrstuvwxyz")}
+        safe_exec("b = a + 1", dict(d1), cache=DictCache(cache))
+        LOCAL_CACHE.clear()
+        safe_exec("b = a + 1", dict(d2), cache=DictCache(cache))
+        self.assertEqual(len(cache), 1)
+
     def test_unicode_submission(self):
         # Check that using non-ASCII unicode does not raise an encoding error.
         # Try several non-ASCII unicode characters.
@@ -177,6 +240,34 @@ class TestSafeExecCaching(unittest.TestCase):
                 self.fail("Tried executing code with non-ASCII unicode: {0}".format(code))
 
 
+class TestCacheLookupStats(unittest.TestCase):
+    """
+    Test counting the cache lookups of problems.
+    """
+    def test_most_recent_problems_counted(self):
+        stats = CacheLookupStats(2, 600, 10)
+        stats.record("p1", "miss")
+        stats.record("p2", "miss")
+        stats.record("p1", "local_hit")
+        stats.record("p3", "miss")
+        self.assertEqual(stats.hit_rates(), {"p1": (2, 0.5), "p3": (1, 0.0)})
+
+    def test_hit_rates_logged_periodically(self):
+        with patch("capa.safe_exec.safe_exec.time") as mock_time:
+            mock_time.time.return_value = 1000
+            stats = CacheLookupStats(10, 600, 1)
+            with patch.object(stats, "log_hit_rates") as log_hit_rates:
+                stats.record("p1", "miss")
+                mock_time.time.return_value = 1600
+                stats.record("p2", "miss")
+                stats.record("p2", "remote_hit")
+            self.assertEqual(log_hit_rates.call_count, 1)
+
+        with patch("capa.safe_exec.safe_exec.log") as mock_log:
+            stats.log_hit_rates()
+        self.assertIn("p2 50% of 2", mock_log.info.call_args[0][-1])
+
+
 class TestUpdateHash(unittest.TestCase):
     """Test the safe_exec.update_hash function to be sure it canonicalizes properly."""
 
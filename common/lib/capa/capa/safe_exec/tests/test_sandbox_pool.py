@@ -0,0 +1,154 @@
+"""Test sandbox_pool.py"""
+
+import os.path
+import sys
+import unittest
+
+from mock import patch
+
+from capa.safe_exec import safe_exec, sandbox_pool
+from capa.safe_exec.sandbox_pool import SandboxPool, SandboxWorkerError
+from codejail.safe_exec import SafeExecException
+
+# The module of safe_exec, which the package's safe_exec function hides.
+safe_exec_module = sys.modules[safe_exec.__module__]
+
+
+class TestSandboxPool(unittest.TestCase):
+    """
+    Test executing code in a pool of workers running the current Python.
+    """
+    def setUp(self):
+        super(TestSandboxPool, self).setUp()
+        self.pool = SandboxPool(sys.executable, limits={'CPU': 5, 'REALTIME': 5})
+        self.addCleanup(self.pool.close)
+
+    def test_set_values(self):
+        g = {'a': 1, 'not_json': object()}
+        self.pool.safe_exec("b = a + 1\nc = [b] * 2", g)
+        self.assertEqual(g['b'], 2)
+        self.assertEqual(g['c'], [2, 2])
+
+    def test_raising_exceptions(self):
+        g = {}
+        with self.assertRaises(SafeExecException) as cm:
+            self.pool.safe_exec("1/0", g)
+        self.assertIn("ZeroDivisionError", cm.exception.message)
+
+    def test_python_lib(self):
+        pylib = os.path.dirname(__file__) + "/test_files/pylib"
+        g = {}
+        self.pool.safe_exec("import constant; a = constant.THE_CONST", g, python_path=[pylib])
+        self.assertEqual(g['a'], 23)
+
+    def test_extra_files(self):
+        g = {}
+        extra_files = [("data.txt", "some data")]
+        self.pool.safe_exec("a = open('data.txt').read()", g, extra_files=extra_files)
+        self.assertEqual(g['a'], "some data")
+
+    def test_worker_is_reused(self):
+        self.pool.safe_exec("a = 1", {})
+        worker = self.pool._idle_workers[0]  # pylint: disable=protected-access
+        self.pool.safe_exec("a = 1", {})
+        self.assertEqual(self.pool._idle_workers, [worker])  # pylint: disable=protected-access
+        self.assertEqual(worker.executions, 2)
+
+    def test_executions_are_isolated(self):
+        # Changes to modules or files by one execution aren't seen by the next.
+        self.pool.safe_exec("import math; math.changed = True", {})
+        g = {}
+        self.pool.safe_exec("import math; changed = hasattr(math, 'changed')", g)
+        self.assertFalse(g['changed'])
+
+    def test_real_time_limit(self):
+        pool = SandboxPool(sys.executable, limits={'REALTIME': 1})
+        self.addCleanup(pool.close)
+        with self.assertRaises(SafeExecException) as cm:
+            pool.safe_exec("import time; time.sleep(10)", {})
+        self.assertIn("Real time limit", cm.exception.message)
+
+        # The worker is still usable.
+        g = {}
+        pool.safe_exec("a = 17", g)
+        self.assertEqual(g['a'], 17)
+
+    def test_worker_recycled_after_max_executions(self):
+        pool = SandboxPool(sys.executable, max_executions=2)
+        self.addCleanup(pool.close)
+        with patch.object(pool, '_add_idle_worker') as add_idle_worker:
+            pool.safe_exec("a = 1", {})
+            self.assertFalse(add_idle_worker.called)
+            pool.safe_exec("a = 1", {})
+            self.assertTrue(add_idle_worker.called)
+        self.assertEqual(pool._idle_workers, [])  # pylint: disable=protected-access
+
+    def test_worker_recycled_after_max_memory(self):
+        pool = SandboxPool(sys.executable, max_memory=1)
+        self.addCleanup(pool.close)
+        with patch.object(pool, '_add_idle_worker') as add_idle_worker:
+            pool.safe_exec("a = 1", {})
+        self.assertTrue(add_idle_worker.called)
+
+    def test_worker_failure(self):
+        self.pool.safe_exec("a = 1", {})
+        worker = self.pool._idle_workers[0]  # pylint: disable=protected-access
+        worker.process.kill()
+        worker.process.wait()
+        with self.assertRaises(SandboxWorkerError):
+            self.pool.safe_exec("a = 1", {})
+
+        # The failed worker is replaced.
+        g = {}
+        self.pool.safe_exec("a = 17", g)
+        self.assertEqual(g['a'], 17)
+
+    def test_worker_died_executing(self):
+        # The code is not run again: its error is returned.
+        with self.assertRaises(SafeExecException) as cm:
+            self.pool.safe_exec("import os, signal; os.kill(os.getppid(), signal.SIGKILL)", {})
+        self.assertIn("Sandbox worker died", cm.exception.message)
+        self.assertEqual(self.pool._idle_workers, [])  # pylint: disable=protected-access
+
+    def test_setup_failure(self):
+        # The code isn't run, and the failure isn't reported as its error.
+        with patch.object(sandbox_pool.tempfile, 'mkdtemp', return_value='/nonexistent-codejail-dir'):
+            with patch.object(sandbox_pool.os, 'chmod'), patch.object(sandbox_pool.shutil, 'rmtree'):
+                with self.assertRaises(SandboxWorkerError):
+                    self.pool.safe_exec("a = 1", {})
+
+    def test_worker_not_dumpable(self):
+        g = {}
+        self.pool.safe_exec("import ctypes; dumpable = ctypes.CDLL(None).prctl(3, 0, 0, 0, 0)", g)
+        self.assertEqual(g['dumpable'], 0)
+
+
+class TestSafeExecWithPool(unittest.TestCase):
+    """
+    Test that safe_exec uses the configured pool.
+    """
+    def setUp(self):
+        super(TestSafeExecWithPool, self).setUp()
+        sandbox_pool.configure(sys.executable, size=1)
+        self.addCleanup(sandbox_pool.configure, None, size=0)
+
+    def test_safe_exec(self):
+        g = {}
+        with patch.object(safe_exec_module, 'codejail_safe_exec') as codejail_safe_exec:
+            safe_exec("a = int(math.pi)\nb = random.randint(0, 999)", g, random_seed=17)
+        self.assertFalse(codejail_safe_exec.called)
+        self.assertEqual(g['a'], 3)
+
+    def test_raising_exceptions(self):
+        g = {}
+        with self.assertRaises(SafeExecException) as cm:
+            safe_exec("1/0", g)
+        self.assertIn("ZeroDivisionError", cm.exception.message)
+
+    def test_fallback_to_codejail(self):
+        g = {}
+        pool = sandbox_pool.get_pool()
+        with patch.object(pool, 'safe_exec', side_effect=SandboxWorkerError):
+            with patch.object(safe_exec_module, 'codejail_safe_exec') as codejail_safe_exec:
+                safe_exec("a = 1", g)
+        self.assertTrue(codejail_safe_exec.called)
@@ -26,7 +26,7 @@ from PIL import Image
 
 class StaticContent(object):
     def __init__(self, loc, name, content_type, data, last_modified_at=None, thumbnail_location=None, import_path=None,
-                 length=None, locked=False):
+                 length=None, locked=False, content_digest=None):
         self.location = loc
         self.name = name  # a display string which can be edited, and thus not part of the location which needs to be fixed
         self.content_type = content_type
@@ -38,6 +38,8 @@ class StaticContent(object):
         # cycles
         self.import_path = import_path
         self.locked = locked
+        # optional md5 hex digest of the data, as computed by GridFS
+        self.content_digest = content_digest
 
     @property
     def is_thumbnail(self):
@@ -168,7 +170,7 @@ class StaticContent(object):
             return StaticContent.compute_location(course_key, path)
 
     @staticmethod
-    def get_canonicalized_asset_path(course_key, path, base_url):
+    def get_canonicalized_asset_path(course_key, path, base_url, unlocked_assets=None):
         """
         Returns a fully-qualified path to a piece of static content.
 
@@ -178,6 +180,9 @@ class StaticContent(object):
         Args:
             course_key: key to the course which owns this asset
             path: the path to said content
+            unlocked_assets: optional set of the (block_type, block_id) of the unlocked assets and
+                thumbnails of the course, used instead of finding assets of the course to see whether
+                they are locked
 
         Returns:
             string: fully-qualified path to asset
@@ -191,13 +196,16 @@ class StaticContent(object):
 
         # Check the status of the asset to see if this can be served via CDN aka publicly.
         serve_from_cdn = False
-        try:
-            content = AssetManager.find(asset_key, as_stream=True)
-            is_locked = getattr(content, "locked", True)
-            serve_from_cdn = not is_locked
-        except (ItemNotFoundError, NotFoundError):
-            # If we can't find the item, just treat it as if it's locked.
-            serve_from_cdn = False
+        if unlocked_assets is not None and StaticContent._is_asset_of_course(asset_key, course_key):
+            serve_from_cdn = (asset_key.block_type, asset_key.block_id) in unlocked_assets
+        else:
+            try:
+                content = AssetManager.find(asset_key, as_stream=True)
+                is_locked = getattr(content, "locked", True)
+                serve_from_cdn = not is_locked
+            except (ItemNotFoundError, NotFoundError):
+                # If we can't find the item, just treat it as if it's locked.
+                serve_from_cdn = False
 
         # Update any query parameter values that have asset paths in them. This is for assets that
         # require their own after-the-fact values, like a Flash file that needs the path of a config
@@ -206,7 +214,9 @@ class StaticContent(object):
         updated_query_params = []
         for query_name, query_value in query_params:
             if query_value.startswith("/static/"):
-                new_query_value = StaticContent.get_canonicalized_asset_path(course_key, query_value, base_url)
+                new_query_value = StaticContent.get_canonicalized_asset_path(
+                    course_key, query_value, base_url, unlocked_assets
+                )
                 updated_query_params.append((query_name, new_query_value))
             else:
                 updated_query_params.append((query_name, query_value))
@@ -216,9 +226,25 @@ class StaticContent(object):
 
         return urlunparse((None, base_url, serialized_asset_key, params, urlencode(updated_query_params), fragment))
 
+    @staticmethod
+    def _is_asset_of_course(asset_key, course_key):
+        """
+        Returns whether asset_key is the key of an asset of the course course_key, ignoring branches and versions
+        """
+        asset_course_key = asset_key.course_key
+        return (asset_course_key.org, asset_course_key.course, asset_course_key.run) == (
+            course_key.org, course_key.course, course_key.run
+        )
+
     def stream_data(self):
         yield self._data
 
+    def stream_data_in_range(self, first_byte, last_byte):
+        """
+        Stream the data between first_byte and last_byte (included)
+        """
+        yield self.data[first_byte:last_byte + 1]
+
     @staticmethod
     def serialize_asset_key_with_slash(asset_key):
         """
@@ -233,10 +259,10 @@ class StaticContent(object):
 
 class StaticContentStream(StaticContent):
     def __init__(self, loc, name, content_type, stream, last_modified_at=None, thumbnail_location=None, import_path=None,
-                 length=None, locked=False):
+                 length=None, locked=False, content_digest=None):
         super(StaticContentStream, self).__init__(loc, name, content_type, None, last_modified_at=last_modified_at,
                                                   thumbnail_location=thumbnail_location, import_path=import_path,
-                                                  length=length, locked=locked)
+                                                  length=length, locked=locked, content_digest=content_digest)
         self._stream = stream
 
     def stream_data(self):
@@ -261,6 +287,13 @@ class StaticContentStream(StaticContent):
             position += STREAM_DATA_CHUNK_SIZE
             yield chunk
 
+    def read_range(self, first_byte, last_byte):
+        """
+        Return the data between first_byte and last_byte (included)
+        """
+        self._stream.seek(first_byte)
+        return self._stream.read(last_byte - first_byte + 1)
+
     def close(self):
         self._stream.close()
 
@@ -268,7 +301,8 @@ class StaticContentStream(StaticContent):
         self._stream.seek(0)
         content = StaticContent(self.location, self.name, self.content_type, self._stream.read(),
                                 last_modified_at=self.last_modified_at, thumbnail_location=self.thumbnail_location,
-                                import_path=self.import_path, length=self.length, locked=self.locked)
+                                import_path=self.import_path, length=self.length, locked=self.locked,
+                                content_digest=self.content_digest)
         return content
 
 
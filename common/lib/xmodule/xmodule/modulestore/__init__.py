@@ -119,6 +119,9 @@ class BulkOpsRecord(object):
     def __init__(self):
         self._active_count = 0
         self.has_publish_item = False
+        # Roots of the subtrees published during this bulk operation, or
+        # None if some publish did not identify the blocks it changed.
+        self.published_usage_keys = set()
         self.has_library_updated_item = False
 
     @property
@@ -316,8 +319,14 @@ class BulkOperationsMixin(object):
         """
         if self.signal_handler and bulk_ops_record.has_publish_item:
             # We remove the branch, because publishing always means copying from draft to published
-            self.signal_handler.send("course_published", course_key=course_id.for_branch(None))
+            published_usage_keys = bulk_ops_record.published_usage_keys
+            self.signal_handler.send(
+                "course_published",
+                course_key=course_id.for_branch(None),
+                usage_keys=list(published_usage_keys) if published_usage_keys is not None else None,
+            )
             bulk_ops_record.has_publish_item = False
+            bulk_ops_record.published_usage_keys = set()
 
     def send_bulk_library_updated_signal(self, bulk_ops_record, library_id):
         """
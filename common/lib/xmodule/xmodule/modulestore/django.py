@@ -82,12 +82,15 @@ class SignalHandler(object):
     2. The sender is going to be the class of the modulestore sending it.
     3. The names of your handler function's parameters *must* be "sender" and "course_key".
     4. Always have **kwargs in your signal handler, as new things may be added.
+       For example, course_published also sends "usage_keys", the roots of the
+       published subtrees, or None if the modulestore could not tell which
+       blocks were published.
     5. The thing that listens for the signal lives in process, but should do
        almost no work. Its main job is to kick off the celery task that will
        do the actual work.
     """
     pre_publish = django.dispatch.Signal(providing_args=["course_key"])
-    course_published = django.dispatch.Signal(providing_args=["course_key"])
+    course_published = django.dispatch.Signal(providing_args=["course_key", "usage_keys"])
     course_deleted = django.dispatch.Signal(providing_args=["course_key"])
     library_updated = django.dispatch.Signal(providing_args=["library_key"])
 
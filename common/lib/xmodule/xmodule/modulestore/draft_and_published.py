@@ -117,22 +117,42 @@ class ModuleStoreDraftAndPublished(BranchSettingMixin, BulkOperationsMixin):
         """
         raise NotImplementedError
 
-    def _flag_publish_event(self, course_key):
+    def _flag_publish_event(self, course_key, usage_key=None):
         """
         Wrapper around calls to fire the course_published signal
         Unless we're nested in an active bulk operation, this simply fires the signal
         otherwise a publish will be signalled at the end of the bulk operation
 
+        The signal's usage_keys are the roots of the published subtrees, so
+        that receivers can update only what changed. They are None if any
+        publish was flagged without a usage_key.
+
         Arguments:
             course_key - course_key to which the signal applies
+            usage_key - root of the subtree that was published, if known
         """
         if self.signal_handler:
+            if usage_key is not None:
+                # We remove the version and branch, as with the course_key
+                if hasattr(usage_key, 'version_agnostic'):
+                    usage_key = usage_key.version_agnostic()
+                if hasattr(usage_key, 'for_branch'):
+                    usage_key = usage_key.for_branch(None)
+
             bulk_record = self._get_bulk_ops_record(course_key) if isinstance(self, BulkOperationsMixin) else None
             if bulk_record and bulk_record.active:
                 bulk_record.has_publish_item = True
+                if usage_key is None:
+                    bulk_record.published_usage_keys = None
+                elif bulk_record.published_usage_keys is not None:
+                    bulk_record.published_usage_keys.add(usage_key)
             else:
                 # We remove the branch, because publishing always means copying from draft to published
-                self.signal_handler.send("course_published", course_key=course_key.for_branch(None))
+                self.signal_handler.send(
+                    "course_published",
+                    course_key=course_key.for_branch(None),
+                    usage_keys=[usage_key] if usage_key is not None else None,
+                )
 
 
 class UnsupportedRevisionError(ValueError):
@@ -17,6 +17,8 @@ import sys
 import logging
 import copy
 import re
+import time
+from collections import defaultdict
 from uuid import uuid4
 
 from bson.son import SON
@@ -79,6 +81,25 @@ _OSFS_INSTANCE = {}
 
 _DETACHED_CATEGORIES = [name for name, __ in XBlock.load_tagged_classes("detached")]
 
+# projection of the descendants fetched for lazy loads, whose definition data is fetched on first access
+LAZY_DESCENDANTS_PROJECTION = {'definition.data': False}
+
+# Version of the form in which metadata inheritance trees are stored in the metadata inheritance cache
+METADATA_INHERITANCE_TREE_VERSION = 2
+
+# Seconds during which a worker computing the metadata inheritance tree of a course keeps the others from
+# computing it too, and during which the generation of a tree it updates is claimed
+METADATA_INHERITANCE_LOCK_TIMEOUT = 60
+
+# Seconds that the other workers wait for the tree to be stored before computing it themselves
+METADATA_INHERITANCE_LOCK_WAIT = 5
+
+# Seconds between checks for the tree by the waiting workers
+METADATA_INHERITANCE_POLL_INTERVAL = 0.1
+
+# Number of times a worker tries updating a tree that concurrent workers keep updating before recomputing it
+METADATA_INHERITANCE_UPDATE_ATTEMPTS = 3
+
 
 class MongoRevisionKey(object):
     """
@@ -102,15 +123,34 @@ class MongoKeyValueStore(InheritanceKeyValueStore):
     A KeyValueStore that maps keyed data access to one of the 3 data areas
     known to the MongoModuleStore (data, children, and metadata)
     """
-    def __init__(self, data, parent, children, metadata):
+    def __init__(self, data, parent, children, metadata, data_loader=None):
+        """
+        data_loader: if the data wasn't fetched, a function returning it, called
+            on the first access to the data
+        """
         super(MongoKeyValueStore, self).__init__()
+        self._set_data(data)
+        self._data_loader = data_loader
+        self._parent = parent
+        self._children = children
+        self._metadata = metadata
+
+    def _set_data(self, data):
+        """
+        Set the data, wrapping non-dict data
+        """
         if not isinstance(data, dict):
             self._data = {'data': data}
         else:
             self._data = data
-        self._parent = parent
-        self._children = children
-        self._metadata = metadata
+
+    def _load_data(self):
+        """
+        Load the data, if it wasn't fetched yet
+        """
+        if self._data_loader is not None:
+            data_loader, self._data_loader = self._data_loader, None
+            self._set_data(data_loader())
 
     def get(self, key):
         if key.scope == Scope.children:
@@ -120,6 +160,7 @@ class MongoKeyValueStore(InheritanceKeyValueStore):
         elif key.scope == Scope.settings:
             return self._metadata[key.field_name]
         elif key.scope == Scope.content:
+            self._load_data()
             return self._data[key.field_name]
         else:
             raise InvalidScopeError(
@@ -133,6 +174,7 @@ class MongoKeyValueStore(InheritanceKeyValueStore):
         elif key.scope == Scope.settings:
             self._metadata[key.field_name] = value
         elif key.scope == Scope.content:
+            self._load_data()
             self._data[key.field_name] = value
         else:
             raise InvalidScopeError(
@@ -147,6 +189,7 @@ class MongoKeyValueStore(InheritanceKeyValueStore):
             if key.field_name in self._metadata:
                 del self._metadata[key.field_name]
         elif key.scope == Scope.content:
+            self._load_data()
             if key.field_name in self._data:
                 del self._data[key.field_name]
         else:
@@ -161,6 +204,7 @@ class MongoKeyValueStore(InheritanceKeyValueStore):
         elif key.scope == Scope.settings:
             return key.field_name in self._metadata
         elif key.scope == Scope.content:
+            self._load_data()
             return key.field_name in self._data
         else:
             return False
@@ -277,20 +321,32 @@ class CachingDescriptorSystem(MakoDescriptorSystem, EditInfoRuntimeMixin):
                         else ModuleStoreEnum.RevisionOption.draft_preferred
                     )
 
-                data = definition.get('data', {})
-                if isinstance(data, basestring):
-                    data = {'data': data}
-
                 mixed_class = self.mixologist.mix(class_)
-                if data:  # empty or None means no work
-                    data = self._convert_reference_fields_to_keys(mixed_class, location.course_key, data)
+
+                def load_data():
+                    """
+                    Return the definition data of the xblock, fetching it if it wasn't
+                    """
+                    if not json_data.get('definition_loaded', True):
+                        # keep the fetched data, in case the xblock is loaded again
+                        json_data.setdefault('definition', {})['data'] = self.modulestore._find_definition_data(
+                            json_data['location']
+                        )
+                        json_data['definition_loaded'] = True
+                    data = json_data.get('definition', {}).get('data', {})
+                    if isinstance(data, basestring):
+                        data = {'data': data}
+                    if data:  # empty or None means no work
+                        data = self._convert_reference_fields_to_keys(mixed_class, location.course_key, data)
+                    return data
+
                 metadata = self._convert_reference_fields_to_keys(mixed_class, location.course_key, metadata)
-                kvs = MongoKeyValueStore(
-                    data,
-                    parent,
-                    children,
-                    metadata,
-                )
+                if json_data.get('definition_loaded', True):
+                    kvs = MongoKeyValueStore(data=load_data(), parent=parent, children=children, metadata=metadata)
+                else:
+                    kvs = MongoKeyValueStore(
+                        data={}, parent=parent, children=children, metadata=metadata, data_loader=load_data
+                    )
 
                 field_data = KvsFieldData(kvs)
                 scope_ids = ScopeIds(None, category, location, location)
@@ -666,18 +722,21 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         else:
             return ParentLocationCache()
 
-    def _compute_metadata_inheritance_tree(self, course_id):
+    def _find_metadata_inheritance_records(self, course_id, categories=BLOCK_TYPES_WITH_CHILDREN, names=None):
         '''
-        Find all inheritable fields from all xblocks in the course which may define inheritable data
+        Find the inheritable metadata and the children of the xblocks of the course of the given categories (only
+        those with the given names, if any), merging the draft and published versions of each xblock.
+
+        Returns a dict of the records by location url
         '''
-        # get all collections in the course, this query should not return any leaf nodes
-        course_id = self.fill_in_run(course_id)
         query = SON([
             ('_id.tag', 'i4x'),
             ('_id.org', course_id.org),
             ('_id.course', course_id.course),
-            ('_id.category', {'$in': BLOCK_TYPES_WITH_CHILDREN})
+            ('_id.category', {'$in': categories})
         ])
+        if names is not None:
+            query['_id.name'] = {'$in': names}
         # if we're only dealing in the published branch, then only get published containers
         if self.get_branch_setting() == ModuleStoreEnum.Branch.published_only:
             query['_id.revision'] = None
@@ -695,7 +754,6 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         # it's ok to keep these as deprecated strings b/c the overall cache is indexed by course_key and this
         # is a dictionary relative to that course
         results_by_url = {}
-        root = None
 
         # now go through the results and order them by the location url
         for result in resultset:
@@ -714,47 +772,198 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                 results_by_url[location_url].setdefault('definition', {})['children'] = set(total_children)
             else:
                 results_by_url[location_url] = result
-            if location.category == 'course':
-                root = location_url
 
-        # now traverse the tree and compute down the inherited metadata
-        metadata_to_inherit = {}
+        return results_by_url
 
-        def _compute_inherited_metadata(url):
-            """
-            Helper method for computing inherited metadata for a specific location url
-            """
-            my_metadata = results_by_url[url].get('metadata', {})
-
-            # go through all the children and recurse, but only if we have
-            # in the result set. Remember results will not contain leaf nodes
-            for child in results_by_url[url].get('definition', {}).get('children', []):
-                if child in results_by_url:
-                    new_child_metadata = copy.deepcopy(my_metadata)
-                    new_child_metadata.update(results_by_url[child].get('metadata', {}))
-                    results_by_url[child]['metadata'] = new_child_metadata
-                    metadata_to_inherit[child] = new_child_metadata
-                    _compute_inherited_metadata(child)
-                else:
-                    # this is likely a leaf node, so let's record what metadata we need to inherit
-                    metadata_to_inherit[child] = my_metadata.copy()
+    def _compute_inherited_metadata(self, results_by_url, url, metadata_to_inherit):
+        '''
+        Compute the metadata inherited by the descendants of the container at location url into
+        metadata_to_inherit, given the records of the containers of its subtree, whose metadata
+        already includes what the container inherits.
+        '''
+        branch = self.get_branch_setting()
+        my_metadata = results_by_url[url].get('metadata', {})
+
+        # go through all the children and recurse, but only if we have
+        # in the result set. Remember results will not contain leaf nodes
+        for child in results_by_url[url].get('definition', {}).get('children', []):
+            if child in results_by_url:
+                new_child_metadata = copy.deepcopy(my_metadata)
+                new_child_metadata.update(results_by_url[child].get('metadata', {}))
+                results_by_url[child]['metadata'] = new_child_metadata
                 # WARNING: 'parent' is not part of inherited metadata, but
                 # we're piggybacking on this recursive traversal to grab
                 # and cache the child's parent, as a performance optimization.
                 # The 'parent' key will be popped out of the dictionary during
                 # CachingDescriptorSystem.load_item
-                metadata_to_inherit[child].setdefault('parent', {})[self.get_branch_setting()] = url
+                metadata_to_inherit[child] = dict(new_child_metadata, parent={branch: url})
+                self._compute_inherited_metadata(results_by_url, child, metadata_to_inherit)
+            else:
+                # this is likely a leaf node, so let's record what metadata we need to inherit
+                metadata_to_inherit[child] = dict(my_metadata, parent={branch: url})
+
+    def _compute_metadata_inheritance_tree(self, course_id):
+        '''
+        Find all inheritable fields from all xblocks in the course which may define inheritable data
+        '''
+        # get all collections in the course, this query should not return any leaf nodes
+        course_id = self.fill_in_run(course_id)
+        results_by_url = self._find_metadata_inheritance_records(course_id)
 
-        if root is not None:
-            _compute_inherited_metadata(root)
+        # now traverse the tree and compute down the inherited metadata
+        metadata_to_inherit = {}
+        for url, result in results_by_url.iteritems():
+            if result['_id']['category'] == 'course':
+                self._compute_inherited_metadata(results_by_url, url, metadata_to_inherit)
+                break
 
         return metadata_to_inherit
 
+    def _update_metadata_inheritance_subtree(self, course_id, tree, location):
+        '''
+        Update the metadata inheritance tree of the course for a change of the container at location, recomputing
+        only the metadata inherited by its subtree.
+
+        Returns the updated tree, which is tree itself if it didn't change, or None if the whole tree has to be
+        recomputed.
+        '''
+        branch = self.get_branch_setting()
+        url = unicode(as_published(location))
+        entry = tree.get(url)
+        if entry is None:
+            # the container isn't in the course (yet): it gets in the tree once added to its parent, as the
+            # subtree of the parent is updated then
+            return tree
+        parent_url = entry.get('parent', {}).get(branch)
+        if parent_url is None:
+            return None
+
+        # the parent inherits the same metadata as before
+        if parent_url in tree:
+            parent_metadata = tree[parent_url]
+        else:
+            # the root of the course is the only container that isn't in the tree
+            parent_metadata = self._find_metadata_inheritance_records(course_id, categories=['course']).get(
+                parent_url
+            )
+            if parent_metadata is None:
+                return None
+            parent_metadata = parent_metadata.get('metadata', {})
+        parent_metadata = {key: value for key, value in parent_metadata.iteritems() if key != 'parent'}
+
+        # forget the former subtree of the container, whose descendants may have moved or been deleted
+        tree = dict(tree)
+        children_by_parent = defaultdict(list)
+        for child_url, child_metadata in tree.iteritems():
+            children_by_parent[child_metadata.get('parent', {}).get(branch)].append(child_url)
+        to_forget = [url]
+        while to_forget:
+            descendant = to_forget.pop()
+            if tree.pop(descendant, None) is not None:
+                to_forget.extend(children_by_parent[descendant])
+
+        # find the containers of the subtree, a level at a time
+        results_by_url = self._find_metadata_inheritance_records(
+            course_id, categories=[location.category], names=[location.name]
+        )
+        results_by_url = {url: results_by_url[url]} if url in results_by_url else {}
+        level = results_by_url.keys()
+        while level:
+            children = set(
+                child
+                for container in level
+                for child in results_by_url[container].get('definition', {}).get('children', [])
+                if child not in results_by_url
+            )
+            child_keys = [course_id.make_usage_key_from_deprecated_string(child) for child in children]
+            names = list(set(key.name for key in child_keys if key.category in BLOCK_TYPES_WITH_CHILDREN))
+            if not names:
+                break
+            child_results = self._find_metadata_inheritance_records(course_id, names=names)
+            level = [child for child in children if child in child_results]
+            results_by_url.update((child, child_results[child]) for child in level)
+
+        if url in results_by_url:
+            metadata = copy.deepcopy(parent_metadata)
+            metadata.update(results_by_url[url].get('metadata', {}))
+            results_by_url[url]['metadata'] = metadata
+            tree[url] = dict(metadata, parent={branch: parent_url})
+            self._compute_inherited_metadata(results_by_url, url, tree)
+        return tree
+
+    def _metadata_inheritance_cache_key(self, course_id):
+        '''
+        Return the key of the metadata inheritance tree of the course in the caching subsystem
+        '''
+        return u'v{}.{}'.format(METADATA_INHERITANCE_TREE_VERSION, course_id)
+
+    def _store_metadata_inheritance_tree(self, course_id, tree, generation=None):
+        '''
+        Store the metadata inheritance tree of the course in the caching subsystem, as a new generation of it
+
+        If given the generation of the tree it replaces, the tree is only stored if the cached tree is still of
+        that generation. Returns whether the tree was stored.
+        '''
+        cache = self.metadata_inheritance_cache_subsystem
+        key = self._metadata_inheritance_cache_key(course_id)
+        if generation is not None:
+            stored = cache.get(key)
+            if stored is None or stored['generation'] != generation:
+                return False
+        cache.set(key, {
+            'tree': tree,
+            'branch': self.get_branch_setting(),
+            'generation': uuid4().hex,
+        })
+        return True
+
+    def _request_cache_metadata_inheritance_tree(self, course_id, tree):
+        '''
+        Put the metadata inheritance tree of the course in the request cache, if available
+        '''
+        if self.request_cache is not None:
+            # we can't assume the 'metadatat_inheritance' part of the request cache dict has been
+            # defined
+            if 'metadata_inheritance' not in self.request_cache.data:
+                self.request_cache.data['metadata_inheritance'] = {}
+            self.request_cache.data['metadata_inheritance'][unicode(course_id)] = tree
+
+    def _compute_and_store_metadata_inheritance_tree(self, course_id, force_refresh=False):
+        '''
+        Compute the metadata inheritance tree of the course, and write it out to the caching subsystem.
+
+        Unless force_refresh, the workers missing the tree while another one computes it wait for
+        that one to store it, rather than all computing it at once.
+        '''
+        cache = self.metadata_inheritance_cache_subsystem
+        if cache is None:
+            return self._compute_metadata_inheritance_tree(course_id)
+
+        key = self._metadata_inheritance_cache_key(course_id)
+        lock_key = u'{}.lock'.format(key)
+        locked = cache.add(lock_key, True, METADATA_INHERITANCE_LOCK_TIMEOUT)
+        if not locked and not force_refresh:
+            deadline = time.time() + METADATA_INHERITANCE_LOCK_WAIT
+            while time.time() < deadline:
+                time.sleep(METADATA_INHERITANCE_POLL_INTERVAL)
+                stored = cache.get(key)
+                if stored is not None:
+                    return stored['tree']
+            log.warning(u'Timed out waiting for the metadata inheritance tree of %s', course_id)
+
+        try:
+            tree = self._compute_metadata_inheritance_tree(course_id)
+            self._store_metadata_inheritance_tree(course_id, tree)
+        finally:
+            if locked:
+                cache.delete(lock_key)
+        return tree
+
     def _get_cached_metadata_inheritance_tree(self, course_id, force_refresh=False):
         '''
         Compute the metadata inheritance for the course.
         '''
-        tree = {}
+        tree = None
 
         course_id = self.fill_in_run(course_id)
         if not force_refresh:
@@ -764,45 +973,88 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
 
             # then look in any caching subsystem (e.g. memcached)
             if self.metadata_inheritance_cache_subsystem is not None:
-                tree = self.metadata_inheritance_cache_subsystem.get(unicode(course_id), {})
+                stored = self.metadata_inheritance_cache_subsystem.get(self._metadata_inheritance_cache_key(course_id))
+                if stored is not None:
+                    tree = stored['tree']
             else:
                 logging.warning(
                     'Running MongoModuleStore without a metadata_inheritance_cache_subsystem. This is \
                     OK in localdev and testing environment. Not OK in production.'
                 )
 
-        if not tree:
+        if tree is None:
             # if not in subsystem, or we are on force refresh, then we have to compute
-            tree = self._compute_metadata_inheritance_tree(course_id)
-
-            # now write out computed tree to caching subsystem (e.g. memcached), if available
-            if self.metadata_inheritance_cache_subsystem is not None:
-                self.metadata_inheritance_cache_subsystem.set(unicode(course_id), tree)
+            # (and write out the computed tree to the caching subsystem, if available)
+            tree = self._compute_and_store_metadata_inheritance_tree(course_id, force_refresh)
 
         # now populate a request_cache, if available. NOTE, we are outside of the
         # scope of the above if: statement so that after a memcache hit, it'll get
         # put into the request_cache
-        if self.request_cache is not None:
-            # we can't assume the 'metadatat_inheritance' part of the request cache dict has been
-            # defined
-            if 'metadata_inheritance' not in self.request_cache.data:
-                self.request_cache.data['metadata_inheritance'] = {}
-            self.request_cache.data['metadata_inheritance'][unicode(course_id)] = tree
+        self._request_cache_metadata_inheritance_tree(course_id, tree)
 
         return tree
 
-    def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None):
+    def _update_cached_metadata_inheritance_tree(self, course_id, location):
+        '''
+        Update the cached metadata inheritance tree of the course for a change of the container at location.
+
+        Concurrent updates of the tree don't overwrite each other: each claims the generation of the tree it
+        updates in the caching subsystem, and workers failing to claim it update the newer generation instead.
+        The claimed generation is compared to the cached one again before writing, so that a tree recomputed in
+        full meanwhile isn't overwritten either.
+
+        Returns the updated tree, or None if it has to be recomputed.
+        '''
+        cache = self.metadata_inheritance_cache_subsystem
+        if cache is None or location.category == 'course':
+            return None
+
+        course_id = self.fill_in_run(course_id)
+        key = self._metadata_inheritance_cache_key(course_id)
+        for attempt in xrange(METADATA_INHERITANCE_UPDATE_ATTEMPTS):
+            if attempt:
+                time.sleep(METADATA_INHERITANCE_POLL_INTERVAL)
+            stored = cache.get(key)
+            if stored is None or stored['branch'] != self.get_branch_setting():
+                return None
+            tree = self._update_metadata_inheritance_subtree(course_id, stored['tree'], location)
+            if tree is None or tree is stored['tree']:
+                break
+            if cache.add(u'{}.{}'.format(key, stored['generation']), True, METADATA_INHERITANCE_LOCK_TIMEOUT):
+                if self._store_metadata_inheritance_tree(course_id, tree, stored['generation']):
+                    break
+        else:
+            log.info(u'Recomputing the metadata inheritance tree of %s, as concurrent updates kept changing it',
+                     course_id)
+            return None
+
+        if tree is not None:
+            self._request_cache_metadata_inheritance_tree(course_id, tree)
+        return tree
+
+    def refresh_cached_metadata_inheritance_tree(self, course_id, runtime=None, location=None):
         """
         Refresh the cached metadata inheritance tree for the org/course combination
         for location
 
+        If given the location of the changed xblock, only the metadata inherited by its subtree
+        is recomputed, if possible.
+
         If given a runtime, it replaces the cached_metadata in that runtime. NOTE: failure to provide
         a runtime may mean that some objects report old values for inherited data.
         """
         course_id = course_id.for_branch(None)
         if not self._is_in_bulk_operation(course_id):
-            # below is done for side effects when runtime is None
-            cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
+            cached_metadata = None
+            if location is not None:
+                if location.category not in BLOCK_TYPES_WITH_CHILDREN:
+                    # the metadata inherited in the course doesn't depend on the leaves
+                    cached_metadata = self._get_cached_metadata_inheritance_tree(course_id)
+                else:
+                    cached_metadata = self._update_cached_metadata_inheritance_tree(course_id, location)
+            if cached_metadata is None:
+                # below is done for side effects when runtime is None
+                cached_metadata = self._get_cached_metadata_inheritance_tree(course_id, force_refresh=True)
             if runtime:
                 runtime.cached_metadata = cached_metadata
 
@@ -814,9 +1066,10 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         del item['_id']
 
     @autoretry_read()
-    def _query_children_for_cache_children(self, course_key, items):
+    def _query_children_for_cache_children(self, course_key, items, projection=None):
         """
-        Generate a pymongo in query for finding the items and return the payloads
+        Generate a pymongo in query for finding the items and return the payloads,
+        limited to the fields of projection if given
         """
         # first get non-draft in a round-trip
         query = {
@@ -824,15 +1077,26 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                 course_key.make_usage_key_from_deprecated_string(item).to_deprecated_son() for item in items
             ]}
         }
-        return list(self.collection.find(query))
+        return list(self.collection.find(query, projection))
+
+    @autoretry_read()
+    def _find_definition_data(self, location_son):
+        """
+        Return the definition data of the item with the given '_id', for items fetched without it
+        """
+        item = self.collection.find_one({'_id': location_son}, {'definition.data': True})
+        if item is None:
+            return {}
+        return item.get('definition', {}).get('data', {})
 
-    def _cache_children(self, course_key, items, depth=0):
+    def _cache_children(self, course_key, items, depth=0, lazy=False):
         """
         Returns a dictionary mapping Location -> item data, populated with json data
         for all descendents of items up to the specified depth.
         (0 = no descendents, 1 = children, 2 = grandchildren, etc)
         If depth is None, will load all the children.
         This will make a number of queries that is linear in the depth.
+        If lazy, the definition data of the descendents isn't fetched, until it's accessed.
         """
 
         data = {}
@@ -859,7 +1123,14 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             # for or-query syntax
             to_process = []
             if children:
-                to_process = self._query_children_for_cache_children(course_key, children)
+                if lazy:
+                    to_process = self._query_children_for_cache_children(
+                        course_key, children, projection=LAZY_DESCENDANTS_PROJECTION
+                    )
+                    for child in to_process:
+                        child['definition_loaded'] = False
+                else:
+                    to_process = self._query_children_for_cache_children(course_key, children)
 
             # If depth is None, then we just recurse until we hit all the descendents
             if depth is not None:
@@ -937,13 +1208,13 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
 
         return system.load_item(location, for_parent=for_parent)
 
-    def _load_items(self, course_key, items, depth=0, using_descriptor_system=None, for_parent=None):
+    def _load_items(self, course_key, items, depth=0, using_descriptor_system=None, for_parent=None, lazy=False):
         """
         Load a list of xmodules from the data in items, with children cached up
-        to specified depth
+        to specified depth, without their definition data if lazy
         """
         course_key = self.fill_in_run(course_key)
-        data_cache = self._cache_children(course_key, items, depth)
+        data_cache = self._cache_children(course_key, items, depth, lazy)
 
         # if we are loading a course object, if we're not prefetching children (depth != 0) then don't
         # bother with the metadata inheritance
@@ -1073,7 +1344,7 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
         course_key = self.fill_in_run(course_key)
         location = course_key.make_usage_key('course', course_key.run)
         try:
-            return self.get_item(location, depth=depth)
+            return self.get_item(location, depth=depth, lazy=kwargs.get('lazy', False))
         except ItemNotFoundError:
             return None
 
@@ -1132,6 +1403,8 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
                 calls to get_children() to cache. None indicates to cache all descendents.
             using_descriptor_system (CachingDescriptorSystem): The existing CachingDescriptorSystem
                 to add data to, and to load the XBlocks from.
+            lazy (bool): Whether to fetch the definition data of the prefetched descendents only
+                when it's accessed, for loads needing only their structure and settings.
         """
         item = self._find_one(usage_key)
         module = self._load_items(
@@ -1140,6 +1413,7 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             depth,
             using_descriptor_system=using_descriptor_system,
             for_parent=for_parent,
+            lazy=kwargs.get('lazy', False),
         )[0]
         return module
 
@@ -1507,7 +1781,9 @@ class MongoModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase, Mongo
             xblock._edit_info = payload['edit_info']
 
             # recompute (and update) the metadata inheritance tree which is cached
-            self.refresh_cached_metadata_inheritance_tree(xblock.scope_ids.usage_id.course_key, xblock.runtime)
+            self.refresh_cached_metadata_inheritance_tree(
+                xblock.scope_ids.usage_id.course_key, xblock.runtime, xblock.scope_ids.usage_id
+            )
             # fire signal that we've written to DB
         except ItemNotFoundError:
             if not allow_not_found:
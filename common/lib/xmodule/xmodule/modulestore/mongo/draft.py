@@ -83,13 +83,13 @@ class DraftModuleStore(MongoModuleStore):
         def get_published():
             return wrap_draft(super(DraftModuleStore, self).get_item(
                 usage_key, depth=depth, using_descriptor_system=using_descriptor_system,
-                for_parent=kwargs.get('for_parent'),
+                for_parent=kwargs.get('for_parent'), lazy=kwargs.get('lazy', False),
             ))
 
         def get_draft():
             return wrap_draft(super(DraftModuleStore, self).get_item(
                 as_draft(usage_key), depth=depth, using_descriptor_system=using_descriptor_system,
-                for_parent=kwargs.get('for_parent')
+                for_parent=kwargs.get('for_parent'), lazy=kwargs.get('lazy', False),
             ))
 
         # return the published version if ModuleStoreEnum.RevisionOption.published_only is requested
@@ -471,7 +471,7 @@ class DraftModuleStore(MongoModuleStore):
             item = super(DraftModuleStore, self).update_item(xblock, user_id, allow_not_found)
             course_key = xblock.location.course_key
             if isPublish or (item.category in DIRECT_ONLY_CATEGORIES and not child_update):
-                self._flag_publish_event(course_key)
+                self._flag_publish_event(course_key, xblock.location)
             return item
 
         if not super(DraftModuleStore, self).has_item(draft_loc):
@@ -606,7 +606,7 @@ class DraftModuleStore(MongoModuleStore):
         first_tier = [as_func(location) for as_func in as_functions]
         self._breadth_first(_delete_item, first_tier)
         # recompute (and update) the metadata inheritance tree which is cached
-        self.refresh_cached_metadata_inheritance_tree(location.course_key)
+        self.refresh_cached_metadata_inheritance_tree(location.course_key, location=location)
 
     def _breadth_first(self, function, root_usages):
         """
@@ -743,7 +743,7 @@ class DraftModuleStore(MongoModuleStore):
             bulk_record.dirty = True
             self.collection.remove({'_id': {'$in': to_be_deleted}})
 
-        self._flag_publish_event(course_key)
+        self._flag_publish_event(course_key, as_published(location))
 
         return self.get_item(as_published(location))
 
@@ -809,9 +809,11 @@ class DraftModuleStore(MongoModuleStore):
 
         delete_draft_only(location)
 
-    def _query_children_for_cache_children(self, course_key, items):
+    def _query_children_for_cache_children(self, course_key, items, projection=None):
         # first get non-draft in a round-trip
-        to_process_non_drafts = super(DraftModuleStore, self)._query_children_for_cache_children(course_key, items)
+        to_process_non_drafts = super(DraftModuleStore, self)._query_children_for_cache_children(
+            course_key, items, projection
+        )
 
         to_process_dict = {}
         for non_draft in to_process_non_drafts:
@@ -826,7 +828,7 @@ class DraftModuleStore(MongoModuleStore):
                     query.append(as_draft(item_usage_key).to_deprecated_son())
             if query:
                 query = {'_id': {'$in': query}}
-                to_process_drafts = list(self.collection.find(query))
+                to_process_drafts = list(self.collection.find(query, projection))
 
                 # now we have to go through all drafts and replace the non-draft
                 # with the draft. This is because the semantics of the DraftStore is to
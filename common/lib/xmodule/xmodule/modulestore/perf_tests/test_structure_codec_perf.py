@@ -0,0 +1,99 @@
+"""
+Performance test comparing the compact encoding of split course structures
+with pickle, as used by the course structure cache.
+"""
+import cPickle as pickle
+import timeit
+import unittest
+import zlib
+
+import ddt
+from path import Path as path
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.split_mongo import structure_codec
+from xmodule.modulestore.split_mongo.mongo_connection import structure_from_mongo
+from xmodule.modulestore.tests.utils import SPLIT_MODULESTORE_SETUP, TEST_DATA_DIR
+from xmodule.modulestore.xml_importer import import_course_from_xml
+
+# Number of times each structure is encoded and decoded.
+NUM_CALLS = 10
+
+# The test courses whose structures are measured.
+TEST_COURSES = ('toy', 'simple', 'split_test_module', 'manual-testing-complete')
+
+# pylint: disable=invalid-name
+TEST_DIR = path(__file__).dirname()
+PLATFORM_ROOT = TEST_DIR.parent.parent.parent.parent.parent.parent
+TEST_DATA_ROOT = PLATFORM_ROOT / TEST_DATA_DIR
+
+
+def pickle_dumps(structure):
+    """
+    Encode `structure` as the course structure cache does with pickle.
+    """
+    return zlib.compress(pickle.dumps(structure, pickle.HIGHEST_PROTOCOL), 1)
+
+
+def pickle_loads(data):
+    """
+    Decode data encoded by `pickle_dumps`.
+    """
+    return pickle.loads(zlib.decompress(data))
+
+
+def compact_dumps(structure):
+    """
+    Encode `structure` as the course structure cache does with structure_codec.
+    """
+    return zlib.compress(structure_codec.dumps(structure), 1)
+
+
+def compact_loads(data):
+    """
+    Decode data encoded by `compact_dumps`.
+    """
+    return structure_codec.loads(zlib.decompress(data))
+
+
+@ddt.ddt
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class StructureCodecPerfTest(unittest.TestCase):
+    """
+    Times encoding and decoding the structures of the test courses, and
+    measures the size of the encoded data, with pickle and structure_codec.
+    """
+
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    @ddt.data(*TEST_COURSES)
+    def test_structure_codec(self, course_name):
+        with SPLIT_MODULESTORE_SETUP.build() as (source_content, source_store):
+            course_key = source_store.make_course_key('a', 'course', course_name)
+            import_course_from_xml(
+                source_store,
+                'test_user',
+                TEST_DATA_ROOT,
+                source_dirs=[course_name],
+                static_content_store=source_content,
+                target_id=course_key,
+                create_if_not_present=True,
+                raise_on_failure=True,
+            )
+            split_store = source_store._get_modulestore_for_courselike(course_key)  # pylint: disable=protected-access
+            structure_id = split_store.get_course_index(course_key)['versions'][ModuleStoreEnum.BranchName.draft]
+            structure = structure_from_mongo(split_store.db_connection.structures.find_one({'_id': structure_id}))
+
+        print "{}: {} blocks".format(course_name, len(structure['blocks']))
+        for name, dumps, loads in (('pickle', pickle_dumps, pickle_loads), ('compact', compact_dumps, compact_loads)):
+            data = dumps(structure)
+            self.assertEqual(loads(data), structure)
+            encode_time = timeit.timeit(lambda: dumps(structure), number=NUM_CALLS) / NUM_CALLS
+            decode_time = timeit.timeit(lambda: loads(data), number=NUM_CALLS) / NUM_CALLS
+            print "  {:<8} encode {:8.2f} ms   decode {:8.2f} ms   size {:8d} bytes".format(
+                name, 1000 * encode_time, 1000 * decode_time, len(data),
+            )
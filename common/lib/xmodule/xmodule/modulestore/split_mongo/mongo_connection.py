@@ -3,6 +3,7 @@ Segregation of pymongo functions from the data modeling mechanisms for split mod
 """
 import datetime
 import cPickle as pickle
+import logging
 import math
 import zlib
 import pymongo
@@ -15,6 +16,7 @@ from time import time
 from pymongo.errors import DuplicateKeyError  # pylint: disable=unused-import
 
 try:
+    from django.conf import settings
     from django.core.cache import caches, InvalidCacheBackendError
     DJANGO_AVAILABLE = True
 except ImportError:
@@ -24,14 +26,17 @@ import dogstats_wrapper as dog_stats_api
 
 from contracts import check, new_contract
 from mongodb_proxy import autoretry_read
+from openedx.core.lib.cache_utils import SizeBoundedLRUCache
 from xmodule.exceptions import HeartbeatFailure
 from xmodule.modulestore import BlockData
-from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo import BlockKey, structure_codec
 from xmodule.mongo_connection import connect_to_mongodb
 
 
 new_contract('BlockData', BlockData)
 
+log = logging.getLogger(__name__)
+
 
 def get_cache(alias):
     """
@@ -42,6 +47,25 @@ def get_cache(alias):
     return caches[alias]
 
 
+_decoded_structures = None  # pylint: disable=invalid-name
+
+
+def get_decoded_structure_lru():
+    """
+    Return the process-local cache of decoded course structures, keyed by
+    structure id, or None if it is disabled.
+
+    Its total size, measured by the length of each structure's encoded data,
+    is bounded by the COURSE_STRUCTURE_LRU_MAX_SIZE setting; a value of 0, the
+    default, disables it.
+    """
+    global _decoded_structures  # pylint: disable=global-statement
+    if _decoded_structures is None:
+        max_size = getattr(settings, 'COURSE_STRUCTURE_LRU_MAX_SIZE', 0) if DJANGO_AVAILABLE else 0
+        _decoded_structures = SizeBoundedLRUCache(max_size)
+    return _decoded_structures if _decoded_structures.max_size else None
+
+
 def round_power_2(value):
     """
     Return value rounded up to the nearest power of 2.
@@ -228,16 +252,39 @@ class CourseStructureCache(object):
     Wrapper around django cache object to cache course structure objects.
     The course structures are pickled and compressed when cached.
 
+    If the COURSE_STRUCTURE_CACHE_FORMAT setting is "compact", structures are
+    encoded with structure_codec instead of pickled, and cached under keys
+    that include the version of the encoding, so that processes using another
+    format or version don't see them. Structures cached by pickle are still
+    found, and structures that can't be encoded are pickled.
+
+    Decoded structures are also kept in a process-local LRU (see
+    get_decoded_structure_lru), in front of the django cache. Structures are
+    immutable by id, so they can be shared by all callers, which must not
+    mutate them.
+
     If the 'course_structure_cache' doesn't exist, then don't do anything for
     for set and get.
     """
     def __init__(self):
         self.cache = None
+        self.decoded_structures = None
+        self.compact = False
         if DJANGO_AVAILABLE:
             try:
                 self.cache = get_cache('course_structure_cache')
             except InvalidCacheBackendError:
                 pass
+            else:
+                self.decoded_structures = get_decoded_structure_lru()
+                self.compact = getattr(settings, 'COURSE_STRUCTURE_CACHE_FORMAT', 'pickle') == 'compact'
+
+    @staticmethod
+    def compact_key(key):
+        """
+        Return the cache key of the compact encoding of the structure `key`.
+        """
+        return u'{}.compact{}'.format(key, structure_codec.FORMAT_VERSION)
 
     def get(self, key, course_context=None):
         """Pull the compressed, pickled struct data from cache and deserialize."""
@@ -245,20 +292,44 @@ class CourseStructureCache(object):
             return None
 
         with TIMER.timer("CourseStructureCache.get", course_context) as tagger:
-            compressed_pickled_data = self.cache.get(key)
-            tagger.tag(from_cache=str(compressed_pickled_data is not None).lower())
+            if self.decoded_structures is not None:
+                structure = self.decoded_structures.get(key)
+                tagger.tag(from_lru=str(structure is not None).lower())
+                tagger.measure('lru_size', self.decoded_structures.size)
+                if structure is not None:
+                    return structure
+
+            data_format = 'pickle'
+            if self.compact:
+                compact_key = self.compact_key(key)
+                cached = self.cache.get_many([compact_key, key])
+                compressed_data = cached.get(compact_key)
+                if compressed_data is not None:
+                    data_format = 'compact'
+                else:
+                    compressed_data = cached.get(key)
+            else:
+                compressed_data = self.cache.get(key)
+            tagger.tag(from_cache=str(compressed_data is not None).lower())
 
-            if compressed_pickled_data is None:
+            if compressed_data is None:
                 # Always log cache misses, because they are unexpected
                 tagger.sample_rate = 1
                 return None
 
-            tagger.measure('compressed_size', len(compressed_pickled_data))
+            tagger.tag(format=data_format)
+            tagger.measure('compressed_size', len(compressed_data))
 
-            pickled_data = zlib.decompress(compressed_pickled_data)
-            tagger.measure('uncompressed_size', len(pickled_data))
+            data = zlib.decompress(compressed_data)
+            tagger.measure('uncompressed_size', len(data))
 
-            return pickle.loads(pickled_data)
+            if data_format == 'compact':
+                structure = structure_codec.loads(data)
+            else:
+                structure = pickle.loads(data)
+            if self.decoded_structures is not None:
+                self.decoded_structures.set(key, structure, len(data))
+            return structure
 
     def set(self, key, structure, course_context=None):
         """Given a structure, will pickle, compress, and write to cache."""
@@ -266,15 +337,32 @@ class CourseStructureCache(object):
             return None
 
         with TIMER.timer("CourseStructureCache.set", course_context) as tagger:
-            pickled_data = pickle.dumps(structure, pickle.HIGHEST_PROTOCOL)
-            tagger.measure('uncompressed_size', len(pickled_data))
+            data = None
+            if self.compact:
+                try:
+                    data = structure_codec.dumps(structure)
+                    cache_key = self.compact_key(key)
+                    tagger.tag(format='compact')
+                except structure_codec.StructureEncodingError:
+                    log.warning("Course structure %s can't be encoded compactly; pickling it", key, exc_info=True)
+                    # Always count fallbacks, because they are unexpected
+                    tagger.tag(compact_fallback='true')
+                    tagger.sample_rate = 1
+            if data is None:
+                data = pickle.dumps(structure, pickle.HIGHEST_PROTOCOL)
+                cache_key = key
+                tagger.tag(format='pickle')
+            tagger.measure('uncompressed_size', len(data))
 
             # 1 = Fastest (slightly larger results)
-            compressed_pickled_data = zlib.compress(pickled_data, 1)
-            tagger.measure('compressed_size', len(compressed_pickled_data))
+            compressed_data = zlib.compress(data, 1)
+            tagger.measure('compressed_size', len(compressed_data))
 
             # Stuctures are immutable, so we set a timeout of "never"
-            self.cache.set(key, compressed_pickled_data, None)
+            self.cache.set(cache_key, compressed_data, None)
+
+            if self.decoded_structures is not None:
+                self.decoded_structures.set(key, structure, len(data))
 
 
 class MongoConnection(object):
@@ -0,0 +1,341 @@
+"""
+A compact encoding of course structures, for the course structure cache.
+
+Pickled structures repeat the class of every BlockKey, BlockData, EditInfo,
+ObjectId and datetime they contain, and every BlockKey once as a key and again
+in its parent's children.  This encoding instead:
+
+* interns block keys, ObjectIds and datetimes in tables, and refers to them by
+  index,
+* stores the fields of the blocks in columns, one per field name, and
+* encodes the result with marshal, which only handles built-in types and is
+  much faster than pickle.
+
+marshal doesn't handle the BlockKeys of reference fields either, as they are
+namedtuples: they are stored as plain tuples, and turned back into BlockKeys
+when decoded.  Field values therefore can't hold other tuples.
+
+Structures holding values that marshal can't encode, such as ObjectIds in
+fields, can't be encoded: `dumps` raises StructureEncodingError for them, and
+callers fall back to pickle.
+
+Encoded structures start with FORMAT_VERSION, which is to be incremented with
+any change of the encoding.  Data of another version can't be decoded.
+"""
+from datetime import datetime, timedelta
+from itertools import izip
+import marshal
+
+from bson.objectid import ObjectId
+import pytz
+
+from xmodule.modulestore import BlockData, EditInfo
+from xmodule.modulestore.split_mongo import BlockKey
+
+FORMAT_VERSION = 2
+
+# Version of the marshal format.
+MARSHAL_VERSION = 2
+
+EPOCH = datetime(1970, 1, 1, tzinfo=pytz.utc)
+
+# The attributes of BlockData and EditInfo, by how they are encoded.
+BLOCK_DATA_ATTRS = frozenset(['fields', 'block_type', 'definition', 'defaults', 'edit_info', 'definition_loaded'])
+EDIT_INFO_OBJECT_IDS = ('previous_version', 'update_version', 'source_version', 'original_usage_version')
+EDIT_INFO_DATETIMES = ('edited_on', '_subtree_edited_on')
+EDIT_INFO_VALUES = ('edited_by', 'original_usage', '_subtree_edited_by')
+EDIT_INFO_ATTRS = EDIT_INFO_OBJECT_IDS + EDIT_INFO_DATETIMES + EDIT_INFO_VALUES
+EDIT_INFO_ATTR_SET = frozenset(EDIT_INFO_ATTRS)
+
+# Tags of the values of the top level of structures.
+OBJECT_ID, DATETIME, VALUE = range(3)
+
+
+class StructureEncodingError(Exception):
+    """
+    A structure can't be encoded, or data can't be decoded.
+    """
+    pass
+
+
+def dumps(structure):
+    """
+    Return the compact encoding of `structure`, or raise
+    StructureEncodingError if it can't be encoded.
+    """
+    try:
+        return marshal.dumps(_StructureEncoder().encode(structure), MARSHAL_VERSION)
+    except ValueError as error:
+        raise StructureEncodingError(error)
+
+
+def loads(data):
+    """
+    Return the structure encoded in `data` by `dumps`.
+    """
+    try:
+        encoded = marshal.loads(data)
+    except (EOFError, ValueError, TypeError) as error:
+        raise StructureEncodingError(error)
+    if encoded[0] != FORMAT_VERSION:
+        raise StructureEncodingError("Unknown structure format version {}".format(encoded[0]))
+    return _decode(encoded)
+
+
+class _StructureEncoder(object):
+    """
+    Encodes a structure, interning its block keys, ObjectIds and datetimes.
+    """
+    def __init__(self):
+        self.types = _Table()
+        self.keys = _Table()
+        self.object_ids = _Table()
+        self.datetimes = _Table()
+
+    def encode(self, structure):
+        """
+        Return the structure as a tuple of built-in values.
+        """
+        blocks = structure['blocks']
+        block_keys = []
+        block_types = []
+        definitions = []
+        children = []
+        definition_loaded = []
+        fields = {}
+        defaults = {}
+        edit_info = {name: [] for name in EDIT_INFO_ATTRS}
+
+        for position, (block_key, block) in enumerate(blocks.iteritems()):
+            if not isinstance(block, BlockData) or not BLOCK_DATA_ATTRS.issuperset(vars(block)):
+                raise StructureEncodingError("Unexpected block data {!r}".format(block))
+            block_keys.append(self.key(block_key))
+            block_types.append(self.types.index(block.block_type))
+            definitions.append(self.object_id(block.definition))
+            if block.definition_loaded:
+                definition_loaded.append(position)
+
+            block_children = block.fields.get('children')
+            children.append(None if block_children is None else [self.key(child) for child in block_children])
+            for name, value in block.fields.iteritems():
+                if name != 'children':
+                    _add_to_column(fields, name, position, value)
+            for name, value in block.defaults.iteritems():
+                _add_to_column(defaults, name, position, value)
+
+            block_edit_info = vars(block.edit_info)
+            if set(block_edit_info) != EDIT_INFO_ATTR_SET:
+                raise StructureEncodingError("Unexpected edit info {!r}".format(block.edit_info))
+            for name in EDIT_INFO_OBJECT_IDS:
+                edit_info[name].append(self.object_id(block_edit_info[name]))
+            for name in EDIT_INFO_DATETIMES:
+                edit_info[name].append(self.datetime(block_edit_info[name]))
+            for name in EDIT_INFO_VALUES:
+                edit_info[name].append(block_edit_info[name])
+
+        top_level = {}
+        for name, value in structure.iteritems():
+            if name in ('blocks', 'root'):
+                continue
+            elif isinstance(value, ObjectId):
+                top_level[name] = (OBJECT_ID, self.object_id(value))
+            elif isinstance(value, datetime):
+                top_level[name] = (DATETIME, self.datetime(value))
+            else:
+                top_level[name] = (VALUE, value)
+
+        return (
+            FORMAT_VERSION,
+            self.types.values,
+            self.keys.values,
+            [object_id.binary for object_id in self.object_ids.values],
+            self.datetimes.values,
+            top_level,
+            self.key(structure['root']),
+            block_keys,
+            block_types,
+            definitions,
+            children,
+            definition_loaded,
+            fields,
+            defaults,
+            [edit_info[name] for name in EDIT_INFO_ATTRS],
+        )
+
+    def key(self, block_key):
+        """
+        Return the index of `block_key`.
+        """
+        if not isinstance(block_key, BlockKey):
+            raise StructureEncodingError("Unexpected block key {!r}".format(block_key))
+        return self.keys.index((self.types.index(block_key.type), block_key.id))
+
+    def object_id(self, object_id):
+        """
+        Return the index of the ObjectId `object_id`, or -1 for None.
+        """
+        if object_id is None:
+            return -1
+        if not isinstance(object_id, ObjectId):
+            raise StructureEncodingError("Unexpected ObjectId {!r}".format(object_id))
+        return self.object_ids.index(object_id)
+
+    def datetime(self, value):
+        """
+        Return the index of the timezone aware datetime `value`, as
+        microseconds since the epoch, or -1 for None.
+        """
+        if value is None:
+            return -1
+        if not isinstance(value, datetime) or value.tzinfo is None:
+            raise StructureEncodingError("Unexpected datetime {!r}".format(value))
+        delta = value - EPOCH
+        return self.datetimes.index((delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds)
+
+
+class _Table(object):
+    """
+    A list of distinct values, with the index of each.
+    """
+    def __init__(self):
+        self.values = []
+        self._indexes = {}
+
+    def index(self, value):
+        """
+        Return the index of `value`, adding it if needed.
+        """
+        index = self._indexes.get(value)
+        if index is None:
+            index = self._indexes[value] = len(self.values)
+            self.values.append(value)
+        return index
+
+
+def _add_to_column(columns, name, position, value):
+    """
+    Add the `value` of the field `name` of the block at `position` to
+    `columns`.
+    """
+    column = columns.get(name)
+    if column is None:
+        column = columns[name] = [[], [], False]
+    value, has_block_keys = _encode_block_keys(value)
+    column[0].append(position)
+    column[1].append(value)
+    if has_block_keys:
+        column[2] = True
+
+
+def _encode_block_keys(value):
+    """
+    Return the field value `value`, with the BlockKeys it holds replaced by
+    plain tuples, and whether it holds any.
+
+    Raises StructureEncodingError for other tuples, which couldn't be told
+    apart from BlockKeys once decoded.
+    """
+    if isinstance(value, BlockKey):
+        return tuple(value), True
+    elif isinstance(value, tuple):
+        raise StructureEncodingError("Unexpected tuple {!r}".format(value))
+    elif isinstance(value, list):
+        items = [_encode_block_keys(item) for item in value]
+        if any(has_block_keys for __, has_block_keys in items):
+            return [item for item, __ in items], True
+    elif isinstance(value, dict):
+        items = [(key, _encode_block_keys(item)) for key, item in value.iteritems()]
+        if any(has_block_keys for __, (__, has_block_keys) in items):
+            return {key: item for key, (item, __) in items}, True
+    return value, False
+
+
+def _decode_block_keys(value):
+    """
+    Return the field value `value`, with its tuples turned back into
+    BlockKeys.
+    """
+    if isinstance(value, tuple):
+        return tuple.__new__(BlockKey, value)
+    elif isinstance(value, list):
+        return [_decode_block_keys(item) for item in value]
+    elif isinstance(value, dict):
+        return {key: _decode_block_keys(item) for key, item in value.iteritems()}
+    return value
+
+
+def _decode(encoded):
+    """
+    Return the structure encoded as the tuple `encoded`.
+    """
+    (
+        __, types, keys, object_ids, datetimes, top_level, root, block_keys, block_types, definitions,
+        children, definition_loaded, fields, defaults, edit_info,
+    ) = encoded
+
+    # Create each block key, ObjectId and datetime once, bypassing the
+    # argument checks of BlockKey.
+    keys = [tuple.__new__(BlockKey, (types[type_index], block_id)) for type_index, block_id in keys]
+    # Index -1 stands for None.
+    object_ids = [ObjectId(binary) for binary in object_ids] + [None]
+    datetimes = [EPOCH + timedelta(microseconds=value) for value in datetimes] + [None]
+
+    block_fields = [{} for __ in block_keys]
+    block_defaults = [{} for __ in block_keys]
+    for position, block_children in enumerate(children):
+        if block_children is not None:
+            block_fields[position]['children'] = [keys[index] for index in block_children]
+    for columns, dicts in ((fields, block_fields), (defaults, block_defaults)):
+        for name, (positions, values, has_block_keys) in columns.iteritems():
+            if has_block_keys:
+                values = [_decode_block_keys(value) for value in values]
+            for position, value in izip(positions, values):
+                dicts[position][name] = value
+
+    edit_info_columns = []
+    for name, column in izip(EDIT_INFO_ATTRS, edit_info):
+        if name in EDIT_INFO_OBJECT_IDS:
+            column = [object_ids[index] for index in column]
+        elif name in EDIT_INFO_DATETIMES:
+            column = [datetimes[index] for index in column]
+        edit_info_columns.append(column)
+
+    loaded = [False] * len(block_keys)
+    for position in definition_loaded:
+        loaded[position] = True
+
+    # Create BlockData and EditInfo objects the way unpickling does, without
+    # calling their constructors.
+    blocks = {}
+    for block_key, block_type, definition, fields_dict, defaults_dict, block_loaded, edit_info_values in izip(
+            [keys[index] for index in block_keys],
+            [types[index] for index in block_types],
+            [object_ids[index] for index in definitions],
+            block_fields,
+            block_defaults,
+            loaded,
+            izip(*edit_info_columns),
+    ):
+        block_edit_info = object.__new__(EditInfo)
+        block_edit_info.__dict__ = dict(izip(EDIT_INFO_ATTRS, edit_info_values))
+        block = object.__new__(BlockData)
+        block.__dict__ = {
+            'fields': fields_dict,
+            'block_type': block_type,
+            'definition': definition,
+            'defaults': defaults_dict,
+            'edit_info': block_edit_info,
+            'definition_loaded': block_loaded,
+        }
+        blocks[block_key] = block
+
+    structure = {}
+    for name, (tag, value) in top_level.iteritems():
+        if tag == OBJECT_ID:
+            value = object_ids[value]
+        elif tag == DATETIME:
+            value = datetimes[value]
+        structure[name] = value
+    structure['root'] = keys[root]
+    structure['blocks'] = blocks
+    return structure
@@ -9,7 +9,7 @@ import itertools
 import mimetypes
 from uuid import uuid4
 from contextlib import contextmanager
-from mock import patch, Mock, call
+from mock import patch, Mock, call, ANY
 
 # Mixed modulestore depends on django, so we'll manually configure some django settings
 # before importing the module
@@ -2143,7 +2143,7 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
 
                 # Course creation and publication should fire the signal
                 course = self.store.create_course('org_x', 'course_y', 'run_z', self.user_id)
-                signal_handler.send.assert_called_with('course_published', course_key=course.id)
+                signal_handler.send.assert_called_with('course_published', course_key=course.id, usage_keys=ANY)
                 signal_handler.reset_mock()
 
                 course_key = course.id
@@ -2153,7 +2153,7 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
                     Check if the signal has been fired.
                     The course_published signal fires before the _clear_bulk_ops_record.
                     """
-                    signal_handler.send.assert_called_with('course_published', course_key=course.id)
+                    signal_handler.send.assert_called_with('course_published', course_key=course.id, usage_keys=ANY)
 
                 with patch.object(
                     self.store.thread_cache.default_store, '_clear_bulk_ops_record', wraps=_clear_bulk_ops_record
@@ -2167,7 +2167,7 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
 
                     self.assertEqual(mock_clear_bulk_ops_record.call_count, 1)
 
-                signal_handler.send.assert_called_with('course_published', course_key=course.id)
+                signal_handler.send.assert_called_with('course_published', course_key=course.id, usage_keys=ANY)
 
     @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
     def test_course_publish_signal_direct_firing(self, default):
@@ -2189,7 +2189,7 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
 
                 # Course creation and publication should fire the signal
                 course = self.store.create_course('org_x', 'course_y', 'run_z', self.user_id)
-                signal_handler.send.assert_called_with('course_published', course_key=course.id)
+                signal_handler.send.assert_called_with('course_published', course_key=course.id, usage_keys=ANY)
 
                 course_key = course.id
 
@@ -2199,16 +2199,16 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
                     log.debug('Testing with block type %s', block_type)
                     signal_handler.reset_mock()
                     block = self.store.create_item(self.user_id, course_key, block_type)
-                    signal_handler.send.assert_called_with('course_published', course_key=course.id)
+                    signal_handler.send.assert_called_with('course_published', course_key=course.id, usage_keys=ANY)
 
                     signal_handler.reset_mock()
                     block.display_name = block_type
                     self.store.update_item(block, self.user_id)
-                    signal_handler.send.assert_called_with('course_published', course_key=course.id)
+                    signal_handler.send.assert_called_with('course_published', course_key=course.id, usage_keys=ANY)
 
                     signal_handler.reset_mock()
                     self.store.publish(block.location, self.user_id)
-                    signal_handler.send.assert_called_with('course_published', course_key=course.id)
+                    signal_handler.send.assert_called_with('course_published', course_key=course.id, usage_keys=ANY)
 
     @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
     def test_course_publish_signal_rerun_firing(self, default):
@@ -2230,7 +2230,7 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
 
                 # Course creation and publication should fire the signal
                 course = self.store.create_course('org_x', 'course_y', 'run_z', self.user_id)
-                signal_handler.send.assert_called_with('course_published', course_key=course.id)
+                signal_handler.send.assert_called_with('course_published', course_key=course.id, usage_keys=ANY)
 
                 course_key = course.id
 
@@ -2238,7 +2238,7 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
                 signal_handler.reset_mock()
                 dest_course_id = self.store.make_course_key("org.other", "course.other", "run.other")
                 self.store.clone_course(course_key, dest_course_id, self.user_id)
-                signal_handler.send.assert_called_with('course_published', course_key=dest_course_id)
+                signal_handler.send.assert_called_with('course_published', course_key=dest_course_id, usage_keys=ANY)
 
     @patch('xmodule.tabs.CourseTab.from_json', side_effect=mock_tab_from_json)
     @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
@@ -2269,9 +2269,17 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
                 )
                 signal_handler.send.assert_has_calls([
                     call('pre_publish', course_key=self.store.make_course_key('edX', 'toy', '2012_Fall')),
-                    call('course_published', course_key=self.store.make_course_key('edX', 'toy', '2012_Fall')),
+                    call(
+                        'course_published',
+                        course_key=self.store.make_course_key('edX', 'toy', '2012_Fall'),
+                        usage_keys=ANY,
+                    ),
                     call('pre_publish', course_key=self.store.make_course_key('edX', 'toy', '2012_Fall')),
-                    call('course_published', course_key=self.store.make_course_key('edX', 'toy', '2012_Fall')),
+                    call(
+                        'course_published',
+                        course_key=self.store.make_course_key('edX', 'toy', '2012_Fall'),
+                        usage_keys=ANY,
+                    ),
                 ])
 
     @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
@@ -2294,18 +2302,18 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
 
                 # Course creation and publication should fire the signal
                 course = self.store.create_course('org_x', 'course_y', 'run_z', self.user_id)
-                signal_handler.send.assert_called_with('course_published', course_key=course.id)
+                signal_handler.send.assert_called_with('course_published', course_key=course.id, usage_keys=ANY)
 
                 # Test a draftable block type, which needs to be explicitly published, and nest it within the
                 # normal structure - this is important because some implementors change the parent when adding a
                 # non-published child; if parent is in DIRECT_ONLY_CATEGORIES then this should not fire the event
                 signal_handler.reset_mock()
                 section = self.store.create_item(self.user_id, course.id, 'chapter')
-                signal_handler.send.assert_called_with('course_published', course_key=course.id)
+                signal_handler.send.assert_called_with('course_published', course_key=course.id, usage_keys=ANY)
 
                 signal_handler.reset_mock()
                 subsection = self.store.create_child(self.user_id, section.location, 'sequential')
-                signal_handler.send.assert_called_with('course_published', course_key=course.id)
+                signal_handler.send.assert_called_with('course_published', course_key=course.id, usage_keys=ANY)
 
                 # 'units' and 'blocks' are draftable types
                 signal_handler.reset_mock()
@@ -2320,15 +2328,17 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
 
                 signal_handler.reset_mock()
                 self.store.publish(unit.location, self.user_id)
-                signal_handler.send.assert_called_with('course_published', course_key=course.id)
+                signal_handler.send.assert_called_with(
+                    'course_published', course_key=course.id, usage_keys=[unit.location]
+                )
 
                 signal_handler.reset_mock()
                 self.store.unpublish(unit.location, self.user_id)
-                signal_handler.send.assert_called_with('course_published', course_key=course.id)
+                signal_handler.send.assert_called_with('course_published', course_key=course.id, usage_keys=ANY)
 
                 signal_handler.reset_mock()
                 self.store.delete_item(unit.location, self.user_id)
-                signal_handler.send.assert_called_with('course_published', course_key=course.id)
+                signal_handler.send.assert_called_with('course_published', course_key=course.id, usage_keys=ANY)
 
     @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
     def test_bulk_course_publish_signal_direct_firing(self, default):
@@ -2350,7 +2360,7 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
 
                 # Course creation and publication should fire the signal
                 course = self.store.create_course('org_x', 'course_y', 'run_z', self.user_id)
-                signal_handler.send.assert_called_with('course_published', course_key=course.id)
+                signal_handler.send.assert_called_with('course_published', course_key=course.id, usage_keys=ANY)
 
                 course_key = course.id
 
@@ -2370,7 +2380,7 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
                         self.store.publish(block.location, self.user_id)
                         signal_handler.send.assert_not_called()
 
-                signal_handler.send.assert_called_with('course_published', course_key=course.id)
+                signal_handler.send.assert_called_with('course_published', course_key=course.id, usage_keys=ANY)
 
     @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
     def test_bulk_course_publish_signal_publish_firing(self, default):
@@ -2392,7 +2402,7 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
 
                 # Course creation and publication should fire the signal
                 course = self.store.create_course('org_x', 'course_y', 'run_z', self.user_id)
-                signal_handler.send.assert_called_with('course_published', course_key=course.id)
+                signal_handler.send.assert_called_with('course_published', course_key=course.id, usage_keys=ANY)
 
                 course_key = course.id
 
@@ -2426,7 +2436,7 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
                     self.store.delete_item(unit.location, self.user_id)
                     signal_handler.send.assert_not_called()
 
-                signal_handler.send.assert_called_with('course_published', course_key=course.id)
+                signal_handler.send.assert_called_with('course_published', course_key=course.id, usage_keys=ANY)
 
                 # Test editing draftable block type without publish
                 signal_handler.reset_mock()
@@ -2437,7 +2447,7 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
                     signal_handler.send.assert_not_called()
                     self.store.publish(unit.location, self.user_id)
                     signal_handler.send.assert_not_called()
-                signal_handler.send.assert_called_with('course_published', course_key=course.id)
+                signal_handler.send.assert_called_with('course_published', course_key=course.id, usage_keys=ANY)
 
                 signal_handler.reset_mock()
                 with self.store.bulk_operations(course_key):
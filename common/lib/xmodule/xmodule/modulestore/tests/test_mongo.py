@@ -313,6 +313,22 @@ class TestMongoModuleStore(TestMongoModuleStoreBase):
             self.draft_store.get_item(Location('edX', 'toy', '2012_Fall', 'video', 'Welcome')),
         )
 
+    def test_lazy_loads(self):
+        course_key = SlashSeparatedCourseKey('edX', 'toy', '2012_Fall')
+        html_location = course_key.make_usage_key('html', 'toyhtml')
+        course = self.draft_store.get_course(course_key, depth=None, lazy=True)
+
+        # the definition data of the descendents is fetched on first access
+        json_data = course.runtime.module_data[html_location]
+        assert_false(json_data['definition_loaded'])
+        assert_false('data' in json_data.get('definition', {}))
+        html = course.runtime.load_item(html_location)
+        assert_equals(html.data, self.draft_store.get_item(html_location).data)
+        assert_true(json_data['definition_loaded'])
+
+        # but not the course's
+        assert_true(course.runtime.module_data[course.location].get('definition_loaded', True))
+
     def test_unicode_loads(self):
         """
         Test that getting items from the test_unicode course works
@@ -0,0 +1,176 @@
+"""
+Tests for the incremental updates of the metadata inheritance trees of the Mongo modulestore.
+"""
+# pylint: disable=protected-access
+import unittest
+
+from mock import patch
+from nose.plugins.attrib import attr
+
+from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.mongo import base as mongo_base
+from xmodule.modulestore.tests.utils import MongoContentstoreBuilder, MongoModulestoreBuilder
+
+
+@attr('mongo')
+class TestMetadataInheritanceTreeUpdates(unittest.TestCase):
+    """
+    Check that the incrementally updated metadata inheritance tree of a course is the one computed in full.
+    """
+    user_id = ModuleStoreEnum.UserID.test
+
+    def setUp(self):
+        super(TestMetadataInheritanceTreeUpdates, self).setUp()
+        contentstore_context = MongoContentstoreBuilder().build()
+        contentstore = contentstore_context.__enter__()
+        self.addCleanup(contentstore_context.__exit__, None, None, None)
+        store_context = MongoModulestoreBuilder().build_with_contentstore(contentstore)
+        self.store = store_context.__enter__()
+        self.addCleanup(store_context.__exit__, None, None, None)
+
+        # course - chapter - sequential_{0,1} - vertical_{0,1} - problem
+        self.course = self.store.create_course('org', 'course', 'run', self.user_id, fields={'graded': False})
+        self.chapter = self.create_child(self.course, 'chapter', 'chapter')
+        self.sequentials = [self.create_child(self.chapter, 'sequential', 'sequential_{}'.format(i)) for i in range(2)]
+        self.verticals = [self.create_child(self.sequentials[0], 'vertical', 'vertical_{}'.format(i)) for i in range(2)]
+        self.problem = self.create_child(self.verticals[0], 'problem', 'problem')
+
+    def create_child(self, parent, block_type, block_id):
+        """
+        Create an xblock under parent, and return it.
+        """
+        return self.store.create_child(self.user_id, parent.location, block_type, block_id=block_id)
+
+    def cached_tree(self):
+        """
+        Return the metadata inheritance tree of the course in the caching subsystem.
+        """
+        key = self.store._metadata_inheritance_cache_key(self.course.id)
+        return self.store.metadata_inheritance_cache_subsystem.get(key)['tree']
+
+    def assert_tree_updated(self, update):
+        """
+        Check that the cached tree is updated by calling update without being computed in full, and that it is
+        then the tree computed in full.
+        """
+        self.store._get_cached_metadata_inheritance_tree(self.course.id)
+        with patch.object(self.store, '_compute_metadata_inheritance_tree') as compute:
+            update()
+        self.assertFalse(compute.called)
+        self.assertEqual(self.cached_tree(), self.store._compute_metadata_inheritance_tree(self.course.id))
+
+    def test_update_container(self):
+        sequential = self.store.get_item(self.sequentials[0].location)
+        sequential.graded = True
+        sequential.visible_to_staff_only = True
+        self.assert_tree_updated(lambda: self.store.update_item(sequential, self.user_id))
+
+        self.assertTrue(self.cached_tree()[unicode(self.problem.location)]['graded'])
+        self.assertFalse(self.cached_tree()[unicode(self.sequentials[1].location)]['graded'])
+
+    def test_update_leaf(self):
+        problem = self.store.get_item(self.problem.location)
+        problem.graded = True
+        stored = self.store.metadata_inheritance_cache_subsystem.get(
+            self.store._metadata_inheritance_cache_key(self.course.id)
+        )
+        self.assert_tree_updated(lambda: self.store.update_item(problem, self.user_id))
+        self.assertEqual(
+            self.store.metadata_inheritance_cache_subsystem.get(
+                self.store._metadata_inheritance_cache_key(self.course.id)
+            )['generation'],
+            stored['generation'],
+        )
+
+    def test_add_container(self):
+        self.assert_tree_updated(lambda: self.create_child(self.sequentials[1], 'vertical', 'vertical_2'))
+        self.assertIn(unicode(self.course.id.make_usage_key('vertical', 'vertical_2')), self.cached_tree())
+
+    def test_move_container(self):
+        def move():
+            """
+            Move the vertical with the problem to the other sequential.
+            """
+            for sequential in self.sequentials:
+                sequential = self.store.get_item(sequential.location)
+                if self.verticals[0].location in sequential.children:
+                    sequential.children.remove(self.verticals[0].location)
+                else:
+                    sequential.children.append(self.verticals[0].location)
+                self.store.update_item(sequential, self.user_id)
+
+        self.assert_tree_updated(move)
+        self.assertEqual(
+            self.cached_tree()[unicode(self.verticals[0].location)]['parent'][ModuleStoreEnum.Branch.draft_preferred],
+            unicode(self.sequentials[1].location),
+        )
+
+    def test_delete_container(self):
+        self.assert_tree_updated(lambda: self.store.delete_item(self.sequentials[0].location, self.user_id))
+        self.assertNotIn(unicode(self.problem.location), self.cached_tree())
+
+    def test_update_course(self):
+        course = self.store.get_course(self.course.id)
+        course.graded = True
+        with patch.object(
+            self.store, '_compute_metadata_inheritance_tree', wraps=self.store._compute_metadata_inheritance_tree
+        ) as compute:
+            self.store.update_item(course, self.user_id)
+        self.assertTrue(compute.called)
+        self.assertTrue(self.cached_tree()[unicode(self.problem.location)]['graded'])
+
+    @patch.object(mongo_base.time, 'sleep')
+    def test_concurrent_updates(self, _sleep):
+        sequential = self.store.get_item(self.sequentials[0].location)
+        sequential.graded = True
+        # the generation of the tree is claimed by another worker, which doesn't store its update
+        cache = self.store.metadata_inheritance_cache_subsystem
+        key = self.store._metadata_inheritance_cache_key(self.course.id)
+        self.store._get_cached_metadata_inheritance_tree(self.course.id)
+        cache.add(u'{}.{}'.format(key, cache.get(key)['generation']), True)
+        with patch.object(
+            self.store, '_compute_metadata_inheritance_tree', wraps=self.store._compute_metadata_inheritance_tree
+        ) as compute:
+            self.store.update_item(sequential, self.user_id)
+        self.assertEqual(compute.call_count, 1)
+        self.assertTrue(self.cached_tree()[unicode(self.problem.location)]['graded'])
+
+    @patch.object(mongo_base.time, 'sleep')
+    def test_concurrent_recompute(self, _sleep):
+        sequential = self.store.get_item(self.sequentials[0].location)
+        sequential.graded = True
+        self.store._get_cached_metadata_inheritance_tree(self.course.id)
+        update_subtree = self.store._update_metadata_inheritance_subtree
+        recomputed = []
+
+        def update_during_recompute(*args):
+            """
+            Update the subtree while another worker stores the tree computed in full, the first time.
+            """
+            tree = update_subtree(*args)
+            if not recomputed:
+                recomputed.append(self.store._compute_metadata_inheritance_tree(self.course.id))
+                self.store._store_metadata_inheritance_tree(self.course.id, recomputed[0])
+            return tree
+
+        with patch.object(
+            self.store, '_update_metadata_inheritance_subtree', side_effect=update_during_recompute
+        ) as update:
+            self.store.update_item(sequential, self.user_id)
+        # the recomputed tree isn't overwritten by the update of the older one, which is done again
+        self.assertEqual(update.call_count, 2)
+        self.assertTrue(self.cached_tree()[unicode(self.problem.location)]['graded'])
+
+    @patch.object(mongo_base.time, 'sleep')
+    def test_wait_for_other_worker(self, _sleep):
+        cache = self.store.metadata_inheritance_cache_subsystem
+        key = self.store._metadata_inheritance_cache_key(self.course.id)
+        tree = self.store._compute_metadata_inheritance_tree(self.course.id)
+        cache.delete(key)
+        # another worker is computing the tree, and stores it while this one waits
+        cache.add(u'{}.lock'.format(key), True)
+        _sleep.side_effect = lambda seconds: self.store._store_metadata_inheritance_tree(self.course.id, tree)
+        self.store.request_cache = None
+        with patch.object(self.store, '_compute_metadata_inheritance_tree') as compute:
+            self.assertEqual(self.store._get_cached_metadata_inheritance_tree(self.course.id), tree)
+        self.assertFalse(compute.called)
@@ -14,8 +14,10 @@ import ddt
 from contracts import contract
 from nose.plugins.attrib import attr
 from django.core.cache import caches, InvalidCacheBackendError
+from django.test.utils import override_settings
 
 from openedx.core.lib import tempdir
+from openedx.core.lib.cache_utils import SizeBoundedLRUCache
 from xblock.fields import Reference, ReferenceList, ReferenceValueDict
 from xmodule.course_module import CourseDescriptor
 from xmodule.modulestore import ModuleStoreEnum
@@ -32,6 +34,7 @@ from xmodule.fields import Date, Timedelta
 from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore
 from xmodule.modulestore.tests.test_modulestore import check_has_course_method
 from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.mongo_connection import CourseStructureCache
 from xmodule.modulestore.tests.factories import check_mongo_calls
 from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOST
 from xmodule.modulestore.tests.utils import mock_tab_from_json
@@ -980,6 +983,64 @@ class TestCourseStructureCache(SplitModuleTest):
         # now make sure that you get the same structure
         self.assertEqual(cached_structure, not_cached_structure)
 
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.get_decoded_structure_lru')
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.get_cache')
+    def test_decoded_structure_lru(self, mock_get_cache, mock_get_lru):
+        mock_get_cache.return_value = self.cache
+        mock_get_lru.return_value = SizeBoundedLRUCache(10 * 1024 * 1024)
+
+        with check_mongo_calls(1):
+            not_cached_structure = self._get_structure(self.new_course)
+
+        # The structure is served from the LRU, without the cache
+        self.cache.clear()
+        with check_mongo_calls(0):
+            cached_structure = self._get_structure(self.new_course)
+        self.assertIs(cached_structure, not_cached_structure)
+
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.get_decoded_structure_lru')
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.get_cache')
+    def test_decoded_structure_lru_from_cache(self, mock_get_cache, mock_get_lru):
+        mock_get_cache.return_value = self.cache
+        mock_get_lru.return_value = None
+        with check_mongo_calls(1):
+            not_cached_structure = self._get_structure(self.new_course)
+
+        # A structure decoded from the cache is added to the LRU
+        mock_get_lru.return_value = SizeBoundedLRUCache(10 * 1024 * 1024)
+        with check_mongo_calls(0):
+            cached_structure = self._get_structure(self.new_course)
+        self.assertEqual(cached_structure, not_cached_structure)
+
+        self.cache.clear()
+        with check_mongo_calls(0):
+            self.assertIs(self._get_structure(self.new_course), cached_structure)
+        self.assertEqual(mock_get_lru.return_value.stats, {'hit': 1, 'miss': 1, 'eviction': 0})
+
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.get_cache')
+    def test_compact_format(self, mock_get_cache):
+        mock_get_cache.return_value = self.cache
+        structure_id = self.new_course.location.as_object_id(self.new_course.location.version_guid)
+
+        # Structures cached by pickle are still found
+        with check_mongo_calls(1):
+            not_cached_structure = self._get_structure(self.new_course)
+        with override_settings(COURSE_STRUCTURE_CACHE_FORMAT='compact'):
+            with check_mongo_calls(0):
+                self.assertEqual(self._get_structure(self.new_course), not_cached_structure)
+
+        # Structures are cached compactly, under their own key
+        self.cache.clear()
+        with override_settings(COURSE_STRUCTURE_CACHE_FORMAT='compact'):
+            with check_mongo_calls(1):
+                self._get_structure(self.new_course)
+            self.assertIsNone(self.cache.get(structure_id))
+            self.assertIsNotNone(self.cache.get(CourseStructureCache.compact_key(structure_id)))
+            with check_mongo_calls(0):
+                cached_structure = self._get_structure(self.new_course)
+
+        self.assertEqual(cached_structure, not_cached_structure)
+
     def test_dummy_cache(self):
         with check_mongo_calls(1):
             not_cached_structure = self._get_structure(self.new_course)
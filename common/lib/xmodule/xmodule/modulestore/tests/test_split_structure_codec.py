@@ -0,0 +1,134 @@
+"""
+Tests for the compact encoding of split course structures.
+"""
+import cPickle as pickle
+import datetime
+import marshal
+import unittest
+
+from bson.objectid import ObjectId
+import ddt
+import pytz
+
+from xmodule.modulestore import BlockData
+from xmodule.modulestore.split_mongo import BlockKey, structure_codec
+from xmodule.modulestore.split_mongo.structure_codec import StructureEncodingError
+
+
+def make_structure(num_children=3):
+    """
+    Return a structure of a course with `num_children` (at least 1) chapters.
+    """
+    version = ObjectId()
+    edited_on = datetime.datetime(2016, 3, 1, 12, 30, 15, 123456, tzinfo=pytz.utc)
+    root = BlockKey('course', 'course')
+    children = [BlockKey('chapter', u'chapter_{}'.format(index)) for index in range(num_children)]
+
+    def block_data(block_key, **fields):
+        """Return the BlockData of a block."""
+        return BlockData(
+            fields=fields,
+            block_type=block_key.type,
+            definition=ObjectId(),
+            defaults={},
+            edit_info={
+                'edited_on': edited_on,
+                'edited_by': 42,
+                'previous_version': None,
+                'update_version': version,
+                'source_version': None,
+                'original_usage': None,
+                'original_usage_version': None,
+            },
+        )
+
+    blocks = {root: block_data(root, children=list(children), display_name=u'C\xf6urse', grading_policy={})}
+    for index, child in enumerate(children):
+        blocks[child] = block_data(child, display_name='Chapter {}'.format(index), format=None, weight=1.5)
+    # Children can refer to blocks missing from the structure.
+    blocks[children[0]].fields['children'] = [BlockKey('vertical', 'missing')]
+    blocks[children[-1]].defaults = {'display_name': 'Default'}
+    blocks[children[-1]].definition_loaded = True
+    blocks[children[-1]].edit_info.original_usage = u'block-v1:org+course+run+type@chapter+block@source'
+    blocks[children[-1]].edit_info.original_usage_version = ObjectId()
+    # Reference fields hold BlockKeys.
+    blocks[children[1 % num_children]].fields.update(
+        reference=children[0],
+        reference_list=[children[0], root],
+        reference_dict={'a': children[0], 'b': None},
+    )
+
+    return {
+        '_id': version,
+        'root': root,
+        'blocks': blocks,
+        'previous_version': ObjectId(),
+        'original_version': ObjectId(),
+        'edited_by': 42,
+        'edited_on': edited_on,
+        'schema_version': 1,
+    }
+
+
+@ddt.ddt
+class TestStructureCodec(unittest.TestCase):
+    """
+    Tests for structure_codec.dumps and loads.
+    """
+    @ddt.data(1, 2, 10)
+    def test_round_trip(self, num_children):
+        structure = make_structure(num_children)
+        decoded = structure_codec.loads(structure_codec.dumps(structure))
+        self.assertEqual(decoded, structure)
+
+        for block_key, block in structure['blocks'].iteritems():
+            decoded_block = decoded['blocks'][block_key]
+            self.assertEqual(decoded_block.definition_loaded, block.definition_loaded)
+            self.assertEqual(decoded_block.edit_info._subtree_edited_on, None)  # pylint: disable=protected-access
+            self.assertEqual(decoded_block.edit_info.edited_on, block.edit_info.edited_on)
+            self.assertIsNotNone(decoded_block.edit_info.edited_on.tzinfo)
+
+    def test_block_keys_in_fields(self):
+        structure = make_structure(2)
+        decoded = structure_codec.loads(structure_codec.dumps(structure))
+        fields = decoded['blocks'][BlockKey('chapter', u'chapter_1')].fields
+        self.assertIsInstance(fields['reference'], BlockKey)
+        self.assertEqual(fields['reference'].type, 'chapter')
+        self.assertIsInstance(fields['reference_list'][1], BlockKey)
+        self.assertIsInstance(fields['reference_dict']['a'], BlockKey)
+        self.assertIsNone(fields['reference_dict']['b'])
+
+    def test_values_are_not_shared(self):
+        structure = make_structure()
+        data = structure_codec.dumps(structure)
+        decoded = structure_codec.loads(data)
+        decoded['blocks'][structure['root']].fields['children'].pop()
+        self.assertEqual(structure_codec.loads(data), structure)
+
+    def test_smaller_than_pickle(self):
+        structure = make_structure(100)
+        self.assertLess(len(structure_codec.dumps(structure)), len(pickle.dumps(structure, pickle.HIGHEST_PROTOCOL)))
+
+    @ddt.data(
+        lambda structure: structure['blocks'][structure['root']].fields.update(ref=ObjectId()),
+        lambda structure: structure['blocks'][structure['root']].fields['children'].append(('chapter', 'tuple')),
+        lambda structure: structure['blocks'][structure['root']].fields.update(ref=[('chapter', 'tuple')]),
+        lambda structure: setattr(
+            structure['blocks'][structure['root']].edit_info, 'edited_on', datetime.datetime.now()
+        ),
+        lambda structure: setattr(structure['blocks'][structure['root']], 'extra', True),
+        lambda structure: structure.update(extra=datetime.date.today()),
+    )
+    def test_unencodable(self, make_unencodable):
+        structure = make_structure()
+        make_unencodable(structure)
+        with self.assertRaises(StructureEncodingError):
+            structure_codec.dumps(structure)
+
+    def test_other_version(self):
+        data = structure_codec.dumps(make_structure())
+        encoded = marshal.loads(data)
+        with self.assertRaises(StructureEncodingError):
+            structure_codec.loads(marshal.dumps((structure_codec.FORMAT_VERSION + 1,) + encoded[1:]))
+        with self.assertRaises(StructureEncodingError):
+            structure_codec.loads(data[:10])
@@ -216,6 +216,31 @@ class MemoryCache(object):
         """
         self._data[key] = value
 
+    def add(self, key, value, timeout=None):  # pylint: disable=unused-argument
+        """
+        Set a key in the cache, unless it's already set.
+
+        Args:
+            key: The key to add.
+            value: The value of the key.
+            timeout: Ignored, keys don't expire.
+
+        Returns whether the key was added.
+        """
+        if key in self._data:
+            return False
+        self._data[key] = value
+        return True
+
+    def delete(self, key):
+        """
+        Delete a key from the cache, if it's there.
+
+        Args:
+            key: The key to delete.
+        """
+        self._data.pop(key, None)
+
 
 class MongoContentstoreBuilder(object):
     """
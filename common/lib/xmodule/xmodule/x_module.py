@@ -1867,6 +1867,10 @@ class CombinedSystem(object):
 
 class DoNothingCache(object):
     """A duck-compatible object to use in ModuleSystem when there's no cache."""
+    def __nonzero__(self):
+        # Callers checking for a cache, like capa's safe_exec, don't cache at all.
+        return False
+
     def get(self, _key):
         return None
 
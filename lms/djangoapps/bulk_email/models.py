@@ -12,6 +12,9 @@ file and check it in at the same time as your model changes. To do that,
 
 """
 import logging
+import re
+from string import Formatter
+
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.db import models, transaction
@@ -20,7 +23,7 @@ from openedx.core.lib.html_to_text import html_to_text
 from openedx.core.lib.mail_utils import wrap_message
 
 from xmodule_django.models import CourseKeyField
-from util.keyword_substitution import substitute_keywords_with_data
+from util.keyword_substitution import anonymous_id_from_user_id, substitute_keywords, substitute_keywords_with_data
 
 log = logging.getLogger(__name__)
 
@@ -136,6 +139,106 @@ class Optout(models.Model):
 # the location where the email message body is to be inserted.
 COURSE_EMAIL_MESSAGE_BODY_TAG = '{{message_body}}'
 
+# The keys of the context of an email whose values depend on the recipient.
+RECIPIENT_CONTEXT_KEYS = ('name', 'email', 'user_id')
+
+# The keywords of message bodies whose values depend on the recipient, with
+# the functions computing them from the context of the email.
+RECIPIENT_KEYWORDS = {
+    '%%USER_ID%%': lambda context: anonymous_id_from_user_id(context['user_id']),
+    '%%USER_FULLNAME%%': lambda context: context.get('name'),
+}
+
+# Marks the places of the values that depend on the recipient in a compiled message.
+SLOT_FORMAT = u'\x00{}\x00'
+SLOT_PATTERN = re.compile(u'\x00(\\d+)\x00')
+
+
+class CompiledEmailMessage(object):
+    """
+    An email message rendered from a template and message body with the context common to
+    all its recipients, leaving only the values that depend on the recipient to substitute.
+
+    Rendering the message for a recipient substitutes these values and wraps the lines
+    that contain them; the other lines are wrapped once, here.  Templates which format
+    a value that depends on the recipient with a conversion or format spec can't be
+    compiled, and are rendered in full for each recipient instead.
+    """
+
+    def __init__(self, format_string, message_body, global_context):
+        self.format_string = format_string
+        self.message_body = message_body
+        self.global_context = global_context
+        self._slots = []
+        self._lines = None
+
+        compiled_format_string = self._compile_format_string(format_string)
+        if compiled_format_string is None:
+            return
+
+        # Substitute the %%-encoded keywords in the message body, as CourseEmailTemplate._render
+        # does for a context with a 'user_id' and 'course_id'.
+        if global_context.get('course_title') is not None:
+            for keyword, value_fcn in RECIPIENT_KEYWORDS.iteritems():
+                if keyword in message_body:
+                    message_body = message_body.replace(keyword, self._add_slot(value_fcn))
+            message_body = substitute_keywords(message_body, None, global_context)
+
+        result = compiled_format_string.format(**global_context)
+        result = result.replace(COURSE_EMAIL_MESSAGE_BODY_TAG.format(), message_body, 1)
+        self._lines = [
+            (line, True) if SLOT_PATTERN.search(line) else (wrap_message(line), False)
+            for line in result.split('\n')
+        ]
+
+    def _add_slot(self, value_fcn):
+        """
+        Return the mark of a new slot for the value returned by `value_fcn` for the context of a recipient.
+        """
+        self._slots.append(value_fcn)
+        return SLOT_FORMAT.format(len(self._slots) - 1)
+
+    def _compile_format_string(self, format_string):
+        """
+        Return `format_string` with the fields of the values that depend on the recipient replaced
+        by slots, or None if any of them has a conversion or format spec.
+        """
+        parts = []
+        for literal_text, field_name, format_spec, conversion in Formatter().parse(format_string):
+            parts.append(literal_text.replace('{', '{{').replace('}', '}}'))
+            if field_name is None:
+                continue
+            if '{' in format_spec:
+                return None
+            key = re.match(r'[^.[]*', field_name).group()
+            if key in RECIPIENT_CONTEXT_KEYS:
+                if key != field_name or format_spec or conversion:
+                    return None
+                parts.append(self._add_slot(lambda context, key=key: format(context[key], u'')))
+            else:
+                parts.append(u'{{{}{}{}}}'.format(
+                    field_name,
+                    u'!' + conversion if conversion else u'',
+                    u':' + format_spec if format_spec else u'',
+                ))
+        return u''.join(parts)
+
+    def render(self, context):
+        """
+        Return the message for the recipient whose values are in the `context` dict.
+        """
+        if self._lines is None:
+            full_context = dict(self.global_context)
+            full_context.update(context)
+            # pylint: disable=protected-access
+            return CourseEmailTemplate._render(self.format_string, self.message_body, full_context)
+
+        values = [value_fcn(context) for value_fcn in self._slots]
+        return u'\n'.join(
+            wrap_message(SLOT_PATTERN.sub(lambda match: values[int(match.group(1))], line)) if has_slots else line
+            for line, has_slots in self._lines
+        )
+
 
 class CourseEmailTemplate(models.Model):
     """
@@ -217,6 +320,24 @@ class CourseEmailTemplate(models.Model):
         """
         return CourseEmailTemplate._render(self.html_template, htmltext, context)
 
+    def compile_plaintext(self, plaintext, context):
+        """
+        Compile plain text message.
+
+        Convert plain text body (`plaintext`) into a CompiledEmailMessage using the stored
+        plain template and the provided `context` dict of the values common to all recipients.
+        """
+        return CompiledEmailMessage(self.plain_template, plaintext, context)
+
+    def compile_htmltext(self, htmltext, context):
+        """
+        Compile HTML text message.
+
+        Convert HTML text body (`htmltext`) into a CompiledEmailMessage using the stored
+        HTML template and the provided `context` dict of the values common to all recipients.
+        """
+        return CompiledEmailMessage(self.html_template, htmltext, context)
+
 
 class CourseAuthorization(models.Model):
     """
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Load test measuring the throughput of bulk email subtasks sending to a local
+SMTP sink, and the time spent rendering the messages of their recipients.
+"""
+import asyncore
+import json
+import smtpd
+import threading
+import time
+import unittest
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
+from mock import patch
+
+from bulk_email.models import CourseEmailTemplate
+from bulk_email.tasks import _get_course_email_context
+from instructor_task.subtasks import update_subtask_status
+from student.tests.factories import AdminFactory, CourseEnrollmentFactory, UserFactory
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory
+
+# Number of enrolled students, and of emails sent by each subtask.
+NUM_STUDENTS = 1000
+EMAILS_PER_TASK = 250
+
+MESSAGE = u"<p>Dear %%USER_FULLNAME%%,</p><p>%%COURSE_DISPLAY_NAME%% ends on %%COURSE_END_DATE%%.</p>" * 50
+
+
+class SMTPSink(smtpd.SMTPServer):
+    """
+    SMTP server listening on a free local port, which counts and discards the messages it receives.
+    """
+    def __init__(self):
+        smtpd.SMTPServer.__init__(self, ('localhost', 0), None)
+        self.port = self.socket.getsockname()[1]
+        self.num_messages = 0
+
+    def process_message(self, peer, mailfrom, rcpttos, data):
+        self.num_messages += 1
+
+
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+@patch.dict(settings.FEATURES, {'ENABLE_INSTRUCTOR_EMAIL': True, 'REQUIRE_COURSE_EMAIL_AUTH': False})
+class SendEmailPerfTest(ModuleStoreTestCase):
+    """
+    Sends an email to all the students of a course through a local SMTP sink, and reports the
+    throughput of each subtask, and the time spent rendering messages in full and compiled.
+    """
+
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    def setUp(self):
+        super(SendEmailPerfTest, self).setUp()
+        self.course = CourseFactory.create(display_name=u"Performance test course")
+        self.instructor = AdminFactory.create()
+        self.client.login(username=self.instructor.username, password="test")
+        for __ in xrange(NUM_STUDENTS):
+            CourseEnrollmentFactory.create(user=UserFactory(), course_id=self.course.id)
+        call_command("loaddata", "course_email_template.json")
+        self.send_mail_url = reverse('send_email', kwargs={'course_id': self.course.id.to_deprecated_string()})
+
+        self.sink = SMTPSink()
+        thread = threading.Thread(target=asyncore.loop, kwargs={'timeout': 0.1})
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.sink.close)
+
+    def test_send_email(self):
+        subtask_statuses = []
+
+        def record_subtask_status(entry_id, current_task_id, new_subtask_status):
+            """Records the status of the subtasks once they are done."""
+            subtask_statuses.append(new_subtask_status)
+            return update_subtask_status(entry_id, current_task_id, new_subtask_status)
+
+        with override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='localhost',
+            EMAIL_PORT=self.sink.port,
+            BULK_EMAIL_EMAILS_PER_TASK=EMAILS_PER_TASK,
+        ):
+            with patch('bulk_email.tasks.update_subtask_status', record_subtask_status):
+                start = time.time()
+                response = self.client.post(self.send_mail_url, {
+                    'action': 'Send email',
+                    'send_to': 'all',
+                    'subject': 'Performance test',
+                    'message': MESSAGE,
+                })
+                elapsed = time.time() - start
+        self.assertTrue(json.loads(response.content)['success'])
+
+        num_sent = sum(subtask_status.succeeded for subtask_status in subtask_statuses)
+        print "{} emails sent in {:.1f} s, {} received by the sink".format(num_sent, elapsed, self.sink.num_messages)
+        for subtask_status in subtask_statuses:
+            print "  subtask {}: {} emails, {:8.1f} emails/s".format(
+                subtask_status.task_id, subtask_status.attempted, subtask_status.get_throughput(),
+            )
+
+        template = CourseEmailTemplate.get_template()
+        global_context = _get_course_email_context(self.course)
+        global_context['course_id'] = self.course.id
+        recipient_contexts = [
+            {
+                'name': u'Student {}'.format(user_id),
+                'email': u'student{}@example.com'.format(user_id),
+                'user_id': user_id,
+            }
+            for user_id in xrange(EMAILS_PER_TASK)
+        ]
+
+        start = time.time()
+        for recipient_context in recipient_contexts:
+            context = dict(global_context, **recipient_context)
+            template.render_plaintext(MESSAGE, context)
+            template.render_htmltext(MESSAGE, context)
+        print "rendered in full: {:8.2f} ms/email".format(1000 * (time.time() - start) / EMAILS_PER_TASK)
+
+        start = time.time()
+        plaintext_message = template.compile_plaintext(MESSAGE, global_context)
+        html_message = template.compile_htmltext(MESSAGE, global_context)
+        for recipient_context in recipient_contexts:
+            plaintext_message.render(recipient_context)
+            html_message.render(recipient_context)
+        print "compiled:         {:8.2f} ms/email".format(1000 * (time.time() - start) / EMAILS_PER_TASK)
@@ -6,7 +6,7 @@ to a course.
 import re
 import random
 import json
-from time import sleep
+from time import sleep, time
 from collections import Counter
 import logging
 
@@ -300,6 +300,7 @@ def send_course_email(entry_id, email_id, to_list, global_email_context, subtask
         'retried_withmax' : number of times the subtask has been retried for conditions that
             should have a maximum count applied
         'state' : celery state of the subtask (e.g. QUEUING, PROGRESS, RETRY, FAILURE, SUCCESS)
+        'duration' : number of seconds spent sending emails, over all attempts
 
         Most values will be zero on initial call, but may be different when the task is
         invoked as part of a retry.
@@ -486,12 +487,15 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
     # use the CourseEmailTemplate that was associated with the CourseEmail
     course_email_template = course_email.get_template()
     try:
+        # The same connection is used to send all the emails of the subtask.
         connection = get_connection()
         connection.open()
 
-        # Define context values to use in all course emails:
-        email_context = {'name': '', 'email': ''}
-        email_context.update(global_email_context)
+        # Render the message content once with the context values common to all course emails,
+        # so that only the values specific to each recipient are substituted for them:
+        compile_context = dict(global_email_context, course_id=course_email.course_id)
+        plaintext_message = course_email_template.compile_plaintext(course_email.text_message, compile_context)
+        html_message = course_email_template.compile_htmltext(course_email.html_message, compile_context)
 
         while to_list:
             # Update context with user-specific values from the user at the end of the list.
@@ -499,17 +503,19 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
             # That way, the to_list will always contain the recipients remaining to be emailed.
             # This is convenient for retries, which will need to send to those who haven't
             # yet been emailed, but not send to those who have already been sent to.
+            recipient_start_time = time()
             recipient_num += 1
             current_recipient = to_list[-1]
             email = current_recipient['email']
-            email_context['email'] = email
-            email_context['name'] = current_recipient['profile__name']
-            email_context['user_id'] = current_recipient['pk']
-            email_context['course_id'] = course_email.course_id
+            email_context = {
+                'email': email,
+                'name': current_recipient['profile__name'],
+                'user_id': current_recipient['pk'],
+            }
 
-            # Construct message content using templates and context:
-            plaintext_msg = course_email_template.render_plaintext(course_email.text_message, email_context)
-            html_msg = course_email_template.render_htmltext(course_email.html_message, email_context)
+            # Construct message content using compiled templates and context:
+            plaintext_msg = plaintext_message.render(email_context)
+            html_msg = html_message.render(email_context)
 
             # Create email:
             email_msg = EmailMultiAlternatives(
@@ -617,18 +623,23 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
             # needed to be retried, the user is still on the list.)
             recipients_info[email] += 1
             to_list.pop()
+            subtask_status.increment(duration=time() - recipient_start_time)
 
+        throughput = subtask_status.get_throughput()
         log.info(
             "BulkEmail ==> Task: %s, SubTask: %s, EmailId: %s, Total Successful Recipients: %s/%s, \
-            Failed Recipients: %s/%s",
+            Failed Recipients: %s/%s, Throughput: %s emails/s",
             parent_task_id,
             task_id,
             email_id,
             total_recipients_successful,
             total_recipients,
             total_recipients_failed,
-            total_recipients
+            total_recipients,
+            throughput
         )
+        if throughput is not None:
+            dog_stats_api.histogram('course_email.subtask.throughput', throughput, tags=[_statsd_tag(course_title)])
         duplicate_recipients = ["{0} ({1})".format(email, repetition)
                                 for email, repetition in recipients_info.most_common() if repetition > 1]
         if duplicate_recipients:
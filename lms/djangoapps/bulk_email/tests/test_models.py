@@ -139,6 +139,58 @@ class CourseEmailTemplateTest(TestCase):
         context = self._get_sample_plain_context()
         template.render_plaintext("My new plain text.", context)
 
+    def _get_sample_recipient_context(self, user_id):
+        """Provide sample context values specific to a recipient"""
+        return {
+            'name': u"R\xe9cipient {}".format(user_id),
+            'email': 'recipient{}@test.com'.format(user_id),
+            'user_id': user_id,
+        }
+
+    @patch('bulk_email.models.anonymous_id_from_user_id', Mock(side_effect='anonymous{}'.format))
+    def test_compiled_messages_match_rendered_messages(self):
+        message = u"Dear %%USER_FULLNAME%% (%%USER_ID%%),\n%%COURSE_DISPLAY_NAME%% ends on %%COURSE_END_DATE%%.\n" * 20
+        # A long line, wrapped after the substitution of the values specific to the recipient.
+        message += u"%%USER_FULLNAME%% " * 300
+        global_context = self._get_sample_html_context()
+        del global_context['email']
+        global_context.update({'course_end_date': 'today', 'course_id': 'org/course/run'})
+        for name in (None, "branded.template"):
+            template = CourseEmailTemplate.get_template(name=name)
+            compiled_plaintext = template.compile_plaintext(message, global_context)
+            compiled_htmltext = template.compile_htmltext(message, global_context)
+            for user_id in range(3):
+                recipient_context = self._get_sample_recipient_context(user_id)
+                context = dict(global_context, **recipient_context)
+                self.assertEqual(
+                    compiled_plaintext.render(recipient_context), template.render_plaintext(message, context)
+                )
+                self.assertEqual(
+                    compiled_htmltext.render(recipient_context), template.render_htmltext(message, context)
+                )
+
+    def test_compiled_message_with_format_spec(self):
+        # Templates formatting values specific to recipients with a spec are rendered in full.
+        template = CourseEmailTemplate(plain_template=u"{name:>20} {course_title}\n{{message_body}}")
+        global_context = {'course_title': "Bogus Course Title"}
+        compiled_plaintext = template.compile_plaintext("My new plain text.", global_context)
+        recipient_context = self._get_sample_recipient_context(1)
+        self.assertEqual(
+            compiled_plaintext.render(recipient_context),
+            template.render_plaintext("My new plain text.", dict(global_context, **recipient_context)),
+        )
+
+    def test_compiled_message_without_context(self):
+        template = CourseEmailTemplate.get_template()
+        global_context = self._get_sample_plain_context()
+        del global_context['email']
+        compiled_plaintext = template.compile_plaintext("My new plain text.", global_context)
+        with self.assertRaises(KeyError):
+            compiled_plaintext.render({'name': 'Name'})
+        del global_context['course_url']
+        with self.assertRaises(KeyError):
+            template.compile_plaintext("My new plain text.", global_context)
+
 
 @attr('shard_1')
 class CourseAuthorizationTest(TestCase):
@@ -49,6 +49,15 @@ class CustomCoursesForEdxOverrideProvider(FieldOverrideProvider):
             return get_override_for_ccx(ccx, block, name, default)
         return default
 
+    def prefetch(self, course_key):
+        """
+        Load all of the overrides of the ccx being viewed, if any, in a
+        single query.
+        """
+        ccx = get_current_ccx(course_key)
+        if ccx:
+            _get_overrides_for_ccx(ccx)
+
     @classmethod
     def enabled_for(cls, course):
         """CCX field overrides are enabled per-course
@@ -0,0 +1,135 @@
+"""
+Performance test of reading overridden due dates in a CCX.
+"""
+import datetime
+import json
+import unittest
+
+import mock
+import pytz
+from django.db import connection
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from nose.plugins.skip import SkipTest
+
+from courseware.field_overrides import OverrideFieldData
+from courseware.models import StudentFieldOverride
+from lms.djangoapps.ccx.models import CcxFieldOverride
+from lms.djangoapps.ccx.tests.factories import CcxFactory
+from lms.djangoapps.ccx.tests.test_views import iter_blocks
+from lms.djangoapps.courseware.tests.test_field_overrides import inject_field_overrides
+from request_cache.middleware import RequestCache
+from student.tests.factories import UserFactory
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase, TEST_DATA_SPLIT_MODULESTORE
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+# The dependency below needs to be installed manually from the development.txt file, which doesn't
+# get installed during unit tests!
+try:
+    from code_block_timer import CodeBlockTimer
+except ImportError:
+    CodeBlockTimer = None
+
+# Shape of the synthetic course.
+NUM_CHAPTERS = 10
+NUM_SEQUENTIALS_PER_CHAPTER = 10
+NUM_VERTICALS_PER_SEQUENTIAL = 5
+
+# Number of simulated courseware requests to time.
+NUM_REQUESTS = 10
+
+ORIGINAL_DUE = datetime.datetime(2015, 1, 1, tzinfo=pytz.UTC)
+CCX_DUE = datetime.datetime(2016, 1, 1, tzinfo=pytz.UTC)
+EXTENDED_DUE = datetime.datetime(2016, 2, 1, tzinfo=pytz.UTC)
+
+
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+@override_settings(FIELD_OVERRIDE_PROVIDERS=(
+    'ccx.overrides.CustomCoursesForEdxOverrideProvider',
+    'courseware.student_field_overrides.IndividualStudentOverrideProvider',
+))
+class FieldOverridePrefetchPerfTest(ModuleStoreTestCase):
+    """
+    Times reading the due date of every block of a CCX where the learner
+    has a due date extension on every other vertical, and the coach
+    overrode the due date of all the other sequentials and verticals.
+    """
+    MODULESTORE = TEST_DATA_SPLIT_MODULESTORE
+
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    def setUp(self):
+        super(FieldOverridePrefetchPerfTest, self).setUp()
+        self.course = CourseFactory.create(enable_ccx=True)
+        self.student = UserFactory.create()
+        self.ccx = CcxFactory.create(course_id=self.course.id)
+
+        ccx_overrides = []
+        student_overrides = []
+        with self.store.bulk_operations(self.course.id):
+            for __ in xrange(NUM_CHAPTERS):
+                chapter = ItemFactory.create(category='chapter', parent=self.course)
+                for __ in xrange(NUM_SEQUENTIALS_PER_CHAPTER):
+                    sequential = ItemFactory.create(category='sequential', parent=chapter, due=ORIGINAL_DUE)
+                    ccx_overrides.append(self._ccx_due_override(sequential))
+                    for index in xrange(NUM_VERTICALS_PER_SEQUENTIAL):
+                        vertical = ItemFactory.create(category='vertical', parent=sequential)
+                        if index % 2 == 0:
+                            student_overrides.append(StudentFieldOverride(
+                                course_id=self.course.id,
+                                location=vertical.location,
+                                student=self.student,
+                                field='due',
+                                value=json.dumps(vertical.fields['due'].to_json(EXTENDED_DUE)),
+                            ))
+                        else:
+                            ccx_overrides.append(self._ccx_due_override(vertical))
+        CcxFieldOverride.objects.bulk_create(ccx_overrides)
+        StudentFieldOverride.objects.bulk_create(student_overrides)
+        self.num_ccx_overrides = len(ccx_overrides)
+        self.num_student_overrides = len(student_overrides)
+
+        patch = mock.patch('ccx.overrides.get_current_ccx', return_value=self.ccx)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.addCleanup(setattr, OverrideFieldData, 'provider_classes', None)
+        self.addCleanup(RequestCache.clear_request_cache)
+
+    def _ccx_due_override(self, block):
+        """
+        Returns an unsaved CCX override of the due date of the given block.
+        """
+        return CcxFieldOverride(
+            ccx=self.ccx,
+            location=block.location,
+            field='due',
+            value=json.dumps(block.fields['due'].to_json(CCX_DUE)),
+        )
+
+    def _read_due_dates(self):
+        """
+        Simulates a courseware request reading the due date of every block.
+        """
+        RequestCache().process_request(RequestFactory().get('/'))
+        blocks = list(iter_blocks(modulestore().get_course(self.course.id, depth=None)))
+        inject_field_overrides(blocks, self.course, self.student)
+        return [block.due for block in blocks]
+
+    def test_due_date_override_timings(self):
+        if CodeBlockTimer is None:
+            raise SkipTest("CodeBlockTimer undefined.")
+
+        num_blocks = NUM_CHAPTERS * NUM_SEQUENTIALS_PER_CHAPTER * (1 + NUM_VERTICALS_PER_SEQUENTIAL)
+        with CodeBlockTimer("FieldOverridePrefetch:{}_blocks:{}_requests".format(num_blocks, NUM_REQUESTS)):
+            with CaptureQueriesContext(connection) as queries:
+                for __ in xrange(NUM_REQUESTS):
+                    due_dates = self._read_due_dates()
+
+        print "Queries per request: {}".format(len(queries) / NUM_REQUESTS)
+        self.assertEqual(due_dates.count(EXTENDED_DUE), self.num_student_overrides)
+        self.assertEqual(due_dates.count(CCX_DUE), self.num_ccx_overrides)
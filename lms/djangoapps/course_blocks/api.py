@@ -1,10 +1,16 @@
 """
 API entry point to the course_blocks app with top-level
-get_course_blocks and clear_course_from_cache functions.
+get_course_blocks, update_course_in_cache, mark_course_stale_in_cache
+and clear_course_from_cache functions.
 """
 from django.core.cache import cache
 
-from openedx.core.lib.block_cache.block_cache import get_blocks, clear_block_cache
+from openedx.core.lib.block_cache.block_cache import (
+    get_blocks,
+    clear_block_cache,
+    mark_block_cache_stale,
+    update_block_cache,
+)
 from xmodule.modulestore.django import modulestore
 
 from .transformers import (
@@ -81,6 +87,34 @@ def get_course_blocks(
     )
 
 
+def update_course_in_cache(course_key, usage_keys=None):
+    """
+    A higher order function implemented on top of the
+    block_cache.update_block_cache function that recollects the block
+    structure in the cache for the block structure starting at the
+    root block of the course for the given course_key.
+
+    usage_keys are the roots of the subtrees that changed since the
+    block structure was cached, if known, so that only they are
+    recollected.
+    """
+    store = modulestore()
+    course_usage_key = store.make_course_usage_key(course_key)
+    return update_block_cache(cache, store, course_usage_key, usage_keys)
+
+
+def mark_course_stale_in_cache(course_key):
+    """
+    A higher order function implemented on top of the
+    block_cache.mark_block_cache_stale function that marks the block
+    structure starting at the root block of the course for the given
+    course_key as stale, so it is served only for a limited time while
+    it is updated.
+    """
+    course_usage_key = modulestore().make_course_usage_key(course_key)
+    return mark_block_cache_stale(cache, course_usage_key)
+
+
 def clear_course_from_cache(course_key):
     """
     A higher order function implemented on top of the
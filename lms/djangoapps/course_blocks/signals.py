@@ -1,20 +1,34 @@
 """
 Signal handlers for invalidating cached data.
 """
+from django.conf import settings
 from django.dispatch.dispatcher import receiver
 
 from xmodule.modulestore.django import SignalHandler
 
-from .api import clear_course_from_cache
+from .api import clear_course_from_cache, mark_course_stale_in_cache
 
 
 @receiver(SignalHandler.course_published)
-def _listen_for_course_publish(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+def _listen_for_course_publish(sender, course_key, usage_keys=None, **kwargs):  # pylint: disable=unused-argument
     """
     Catches the signal that a course has been published in the module
     store and invalidates the corresponding cache entry if one exists.
+
+    With the ENABLE_ASYNC_BLOCK_STRUCTURE_UPDATE feature, the cache entry
+    is instead marked stale, and continues to be served while a task
+    recollects the published blocks.
     """
-    clear_course_from_cache(course_key)
+    if settings.FEATURES.get('ENABLE_ASYNC_BLOCK_STRUCTURE_UPDATE', False):
+        # import here, because signal is registered at startup, but items in tasks are not yet able to be loaded
+        from .tasks import update_course_in_cache
+        mark_course_stale_in_cache(course_key)
+        update_course_in_cache.delay(
+            unicode(course_key),
+            [unicode(usage_key) for usage_key in usage_keys] if usage_keys is not None else None,
+        )
+    else:
+        clear_course_from_cache(course_key)
 
 
 @receiver(SignalHandler.course_deleted)
@@ -0,0 +1,47 @@
+"""
+Asynchronous tasks for the course_blocks app.
+"""
+from logging import getLogger
+
+from celery.task import task
+from django.conf import settings
+from django.core.cache import cache
+from opaque_keys.edx.keys import CourseKey, UsageKey
+
+from . import api
+
+
+log = getLogger(__name__)  # pylint: disable=invalid-name
+
+# Prefix of the cache key of the lock held while a course's block
+# structure is updated.
+UPDATE_LOCK_KEY_PREFIX = 'course_blocks.update_lock.'
+
+
+@task(
+    default_retry_delay=settings.BLOCK_STRUCTURE_UPDATE_RETRY_DELAY,
+    max_retries=settings.BLOCK_STRUCTURE_UPDATE_MAX_RETRIES,
+)
+def update_course_in_cache(course_id, usage_ids=None):
+    """
+    Updates the course's block structure in the cache, recollecting only
+    the subtrees rooted at usage_ids when given.
+
+    Updates of the same course are run one at a time, so each one starts
+    from the block structure cached by the one before; a task that finds
+    another update running is retried.
+    """
+    course_key = CourseKey.from_string(course_id)
+    usage_keys = None
+    if usage_ids is not None:
+        usage_keys = [UsageKey.from_string(usage_id).map_into_course(course_key) for usage_id in usage_ids]
+
+    lock_key = UPDATE_LOCK_KEY_PREFIX + course_id
+    if not cache.add(lock_key, True, settings.BLOCK_STRUCTURE_UPDATE_LOCK_EXPIRE):
+        log.info(u'Block structure update of course %s is in progress; retrying.', course_id)
+        raise update_course_in_cache.retry()
+
+    try:
+        api.update_course_in_cache(course_key, usage_keys)
+    finally:
+        cache.delete(lock_key)
@@ -0,0 +1,72 @@
+"""
+Unit tests for the Course Blocks signals
+"""
+from django.conf import settings
+from django.core.cache import cache
+from mock import patch
+
+from openedx.core.lib.block_cache.block_structure_factory import BlockStructureFactory
+from openedx.core.lib.block_cache.transformer_registry import TransformerRegistry
+from xmodule.modulestore.tests.factories import ItemFactory
+
+from ..api import get_course_blocks
+from ..transformers.tests.test_helpers import CourseStructureTestCase
+
+
+class CourseBlocksSignalTest(CourseStructureTestCase):
+    """
+    Tests for the Course Blocks signals.
+    """
+    def setUp(self):
+        super(CourseBlocksSignalTest, self).setUp()
+        self.course = self.build_course(self.get_course_hierarchy())['course']
+        self.course_usage_key = self.store.make_course_usage_key(self.course.id)
+
+    def get_course_hierarchy(self):
+        """
+        Returns a course with a chapter, to publish changes under.
+        """
+        return [{'org': 'CourseBlocksSignalTest', 'course': 'CBS101', 'run': 'test_run', '#type': 'course',
+                 '#ref': 'course', '#children': [{'#type': 'chapter', '#ref': 'chapter'}]}]
+
+    def _get_cached_structure(self):
+        """
+        Returns the block structure of the course in the cache, if any.
+        """
+        return BlockStructureFactory.create_from_cache(
+            self.course_usage_key,
+            cache,
+            TransformerRegistry.get_registered_transformers(),
+        )
+
+    def test_course_publish_clears_cache(self):
+        get_course_blocks(self.user, self.course_usage_key)
+        self.assertIsNotNone(self._get_cached_structure())
+
+        self.store.update_item(self.course, self.user.id)
+        self.assertIsNone(self._get_cached_structure())
+
+    @patch.dict(settings.FEATURES, {'ENABLE_ASYNC_BLOCK_STRUCTURE_UPDATE': True})
+    def test_course_publish_updates_cache(self):
+        get_course_blocks(self.user, self.course_usage_key)
+
+        with self.store.bulk_operations(self.course.id):
+            ItemFactory.create(
+                parent=self.store.get_item(self.course.location),
+                category='chapter',
+                display_name='new chapter',
+                user_id=self.user.id,
+            )
+
+        block_structure = self._get_cached_structure()
+        self.assertIsNotNone(block_structure)
+        self.assertEquals(len(list(block_structure.get_children(self.course_usage_key))), 2)
+
+    @patch.dict(settings.FEATURES, {'ENABLE_ASYNC_BLOCK_STRUCTURE_UPDATE': True})
+    @patch('lms.djangoapps.course_blocks.tasks.update_course_in_cache.delay')
+    def test_course_publish_marks_cache_stale(self, mock_update):
+        get_course_blocks(self.user, self.course_usage_key)
+        self.store.update_item(self.course, self.user.id)
+
+        mock_update.assert_called_with(unicode(self.course.id), [unicode(self.course.location)])
+        self.assertIsNotNone(self._get_cached_structure())
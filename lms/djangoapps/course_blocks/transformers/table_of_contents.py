@@ -0,0 +1,59 @@
+"""
+Table of Contents Transformer implementation.
+"""
+from openedx.core.lib.block_cache.transformer import BlockStructureTransformer
+
+
+class TableOfContentsTransformer(BlockStructureTransformer):
+    """
+    A transformer that collects the fields of the chapters and sections
+    shown in the courseware table of contents, and removes the blocks
+    below the sections from the block structure, so that the
+    transformers after it don't process blocks that aren't shown.
+    """
+    VERSION = 1
+
+    # Depth of the sections below the root block of the course.
+    SECTION_DEPTH = 2
+
+    TOC_FIELDS = ('display_name', 'format', 'due', 'graded', 'hide_from_toc', 'is_time_limited')
+
+    @classmethod
+    def name(cls):
+        """
+        Unique identifier for the transformer's class;
+        same identifier used in setup.py.
+        """
+        return "table_of_contents"
+
+    @classmethod
+    def collect(cls, block_structure):
+        """
+        Collects any information that's necessary to execute this
+        transformer's transform method.
+        """
+        block_structure.request_xblock_fields(*cls.TOC_FIELDS)
+
+    @classmethod
+    def get_display_name(cls, block_structure, block_key):
+        """
+        Returns the escaped display name of the block with the given
+        block_key, defaulting to its url name, as
+        display_name_with_default_escaped does for an xblock.
+        """
+        display_name = block_structure.get_xblock_field(block_key, 'display_name')
+        if display_name is None:
+            display_name = block_key.name.replace('_', ' ')
+        return display_name.replace('<', '&lt;').replace('>', '&gt;')
+
+    def transform(self, usage_info, block_structure):
+        """
+        Mutates block_structure based on the given usage_info.
+        """
+        level = [block_structure.root_block_usage_key]
+        toc_blocks = set(level)
+        for __ in xrange(self.SECTION_DEPTH):
+            level = [child_key for block_key in level for child_key in block_structure.get_children(block_key)]
+            toc_blocks.update(level)
+
+        block_structure.remove_block_if(lambda block_key: block_key not in toc_blocks)
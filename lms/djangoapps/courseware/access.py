@@ -10,7 +10,7 @@ Note: The access control logic in this file does NOT check for enrollment in
   If enrollment is to be checked, use get_course_with_access in courseware.courses.
   It is a wrapper around has_access that additionally checks for enrollment.
 """
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
 import pytz
 
@@ -35,6 +35,7 @@ from xmodule.partitions.partitions import NoSuchUserPartitionError, NoSuchUserPa
 from external_auth.models import ExternalAuthMap
 from courseware.masquerade import get_masquerade_role, is_masquerading_as_student
 from openedx.core.djangoapps.content.course_overviews.models import CourseOverview
+from request_cache import request_cached
 from student import auth
 from student.models import CourseEnrollmentAllowed
 from student.roles import (
@@ -59,9 +60,17 @@ import dogstats_wrapper as dog_stats_api
 from courseware.access_response import (
     MilestoneError,
     MobileAvailabilityError,
+    StartDateError,
     VisibilityError,
 )
-from courseware.access_utils import adjust_start_date, check_start_date, debug, ACCESS_GRANTED, ACCESS_DENIED
+from courseware.access_utils import (
+    adjust_start_date,
+    check_start_date,
+    debug,
+    in_preview_mode,
+    ACCESS_GRANTED,
+    ACCESS_DENIED,
+)
 
 from lms.djangoapps.ccx.custom_exception import CCXLocatorValidationException
 from lms.djangoapps.ccx.models import CustomCourseForEdX
@@ -98,6 +107,18 @@ def has_ccx_coach_role(user, course_key):
     return False
 
 
+def _has_access_cache_key(user, action, obj, course_key=None):
+    """
+    Return the values identifying a call of has_access in the request cache, or
+    None for the calls not to cache: those of masquerading users, whose access
+    changes as they masquerade.
+    """
+    if getattr(user, 'masquerade_settings', None):
+        return None
+    return (user, action, obj, course_key)
+
+
+@request_cached(key=_has_access_cache_key)
 def has_access(user, action, obj, course_key=None):
     """
     Check whether a user has the access to do action on obj.  Handles any magic
@@ -127,6 +148,9 @@ def has_access(user, action, obj, course_key=None):
 
     Returns an AccessResponse object.  It is up to the caller to actually
     deny access in a way that makes sense in context.
+
+    The access checks are memoized during the current request, and forgotten
+    when course access roles change.
     """
     # Just in case user is passed in as None, make them anonymous
     if not user:
@@ -171,6 +195,135 @@ def has_access(user, action, obj, course_key=None):
                     .format(type(obj)))
 
 
+def has_access_to_blocks(user, action, blocks, course_key=None):
+    """
+    Check whether a user has the access to do action on each of many blocks.
+
+    blocks: a list of descriptors, modules or usage keys, as accepted by has_access.
+
+    Returns a list of the AccessResponse objects that has_access returns for
+    each block, in the order of the blocks.  The roles, beta tester status and
+    groups of the user are only looked up once for all the blocks.
+    """
+    checker = BlockAccessChecker(user, course_key)
+    return [checker.has_access(action, block) for block in blocks]
+
+
+class BlockAccessChecker(object):
+    """
+    Checks the access of a user to the blocks of a course, as has_access does,
+    but looking up the roles, beta tester status and groups of the user only
+    once for all the blocks checked.
+
+    The checker is meant to live for the duration of a single operation (such
+    as grading a course or building its navigation), as the changes to the
+    roles and groups of the user after the first lookup aren't seen.
+    """
+
+    def __init__(self, user, course_key=None):
+        # Just in case user is passed in as None, make them anonymous
+        if not user:
+            user = AnonymousUser()
+        if isinstance(course_key, CCXLocator):
+            course_key = course_key.to_course_locator()
+        self.user = user
+        self.course_key = course_key
+        self._course_access = {}
+        self._user_groups = {}
+        self._is_beta_tester = None
+        self._now = datetime.now(UTC())
+        self._start_dates_disabled = (
+            settings.FEATURES['DISABLE_START_DATES'] and not is_masquerading_as_student(user, course_key)
+        )
+        self._in_preview_mode = None
+
+    def has_access(self, action, block):
+        """
+        Return the AccessResponse of has_access(user, action, block, course_key).
+        """
+        if isinstance(block, (CourseDescriptor, CourseOverview)):
+            return has_access(self.user, action, block, self.course_key)
+
+        if isinstance(block, XModule):
+            block = block.descriptor
+
+        if isinstance(block, ErrorDescriptor):
+            if action in ('load', 'staff'):
+                return self._has_access_to_course('staff', block.location)
+            if action == 'instructor':
+                return self._has_access_to_course('instructor', block.location)
+
+        elif isinstance(block, XBlock):
+            if action == 'load':
+                return self._can_load(block)
+            if action in ('staff', 'instructor'):
+                return self._has_access_to_course(action, block.location)
+
+        elif isinstance(block, UsageKey):
+            if action == 'staff':
+                return self._has_access_to_course(action, block)
+
+        # Unknown actions and other objects are left to has_access.
+        return has_access(self.user, action, block, self.course_key)
+
+    def _can_load(self, descriptor):
+        """
+        Check if the user can load the descriptor, as _has_access_descriptor does.
+        """
+        response = (
+            _visible_to_nonstaff_users(descriptor)
+            and _has_group_access(descriptor, self.user, self.course_key, self._user_groups)
+            and
+            (
+                _has_detached_class_tag(descriptor)
+                or self._can_access_with_start_date(descriptor)
+            )
+        )
+        return (
+            ACCESS_GRANTED if (response or self._has_access_to_course('staff', descriptor.location))
+            else response
+        )
+
+    def _can_access_with_start_date(self, descriptor):
+        """
+        Check if the user can access the descriptor based on its start date, as check_start_date does.
+        """
+        if self._start_dates_disabled:
+            return ACCESS_GRANTED
+
+        start = descriptor.start
+        if start is None:
+            return ACCESS_GRANTED
+        effective_start = start
+        if descriptor.days_early_for_beta is not None and self._user_is_beta_tester():
+            effective_start = start - timedelta(descriptor.days_early_for_beta)
+        if self._now > effective_start:
+            return ACCESS_GRANTED
+
+        if self._in_preview_mode is None:
+            self._in_preview_mode = in_preview_mode()
+        return ACCESS_GRANTED if self._in_preview_mode else StartDateError(start)
+
+    def _user_is_beta_tester(self):
+        """
+        Return whether the user is a beta tester of the course.
+        """
+        if self._is_beta_tester is None:
+            self._is_beta_tester = CourseBetaTesterRole(self.course_key).has_user(self.user)
+        return self._is_beta_tester
+
+    def _has_access_to_course(self, access_level, location):
+        """
+        Return the access of the user to the course of the checker, or to that of the location if there is none,
+        as _has_access_to_course does.
+        """
+        course_key = self.course_key if self.course_key is not None else location.course_key
+        key = (access_level, course_key)
+        if key not in self._course_access:
+            self._course_access[key] = _has_access_to_course(self.user, access_level, course_key)
+        return self._course_access[key]
+
+
 # ================ Implementation helpers ================================
 def _can_access_descriptor_with_start_date(user, descriptor, course_key):  # pylint: disable=invalid-name
     """
@@ -412,10 +565,13 @@ def _has_access_error_desc(user, action, descriptor, course_key):
     return _dispatch(checkers, action, user, descriptor)
 
 
-def _has_group_access(descriptor, user, course_key):
+def _has_group_access(descriptor, user, course_key, user_groups=None):
     """
     This function returns a boolean indicating whether or not `user` has
     sufficient group memberships to "load" a block (the `descriptor`)
+
+    `user_groups` is an optional dict of the groups of `user` already looked up,
+    by partition id, which is updated with the groups looked up here.
     """
     if len(descriptor.user_partitions) == len(get_split_user_partitions(descriptor.user_partitions)):
         # Short-circuit the process, since there are no defined user partitions that are not
@@ -468,13 +624,15 @@ def _has_group_access(descriptor, user, course_key):
         return ACCESS_DENIED
 
     # look up the user's group for each partition
-    user_groups = {}
+    if user_groups is None:
+        user_groups = {}
     for partition, groups in partition_groups:
-        user_groups[partition.id] = partition.scheme.get_group_for_user(
-            course_key,
-            user,
-            partition,
-        )
+        if partition.id not in user_groups:
+            user_groups[partition.id] = partition.scheme.get_group_for_user(
+                course_key,
+                user,
+                partition,
+            )
 
     # finally: check that the user has a satisfactory group assignment
     # for each partition.
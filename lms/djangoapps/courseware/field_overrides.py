@@ -71,21 +71,28 @@ class OverrideFieldData(FieldData):
         any performance impact of this feature if no override providers are
         configured.
         """
-        if cls.provider_classes is None:
-            cls.provider_classes = tuple(
-                (resolve_dotted(name) for name in
-                 settings.FIELD_OVERRIDE_PROVIDERS))
-
         enabled_providers = cls._providers_for_course(course)
         if enabled_providers:
             # TODO: we might not actually want to return here.  Might be better
             # to check for instance.providers after the instance is built. This
             # would allow for the case where we have registered providers but
             # none are enabled for the provided course
-            return cls(user, wrapped, enabled_providers)
+            field_data = cls(user, wrapped, enabled_providers)
+            if course is not None:
+                field_data.prefetch(course.id)
+            return field_data
 
         return wrapped
 
+    @classmethod
+    def has_overrides(cls, course, user):
+        """
+        Returns whether any override provider enabled for the given course
+        may override field values of its blocks for the given user, in which
+        case they may differ from those stored in the modulestore.
+        """
+        return any(provider.has_overrides(course, user) for provider in cls._providers_for_course(course))
+
     @classmethod
     def _providers_for_course(cls, course):
         """
@@ -96,6 +103,11 @@ class OverrideFieldData(FieldData):
         Arguments:
             course: The course XBlock
         """
+        if cls.provider_classes is None:
+            cls.provider_classes = tuple(
+                (resolve_dotted(name) for name in
+                 settings.FIELD_OVERRIDE_PROVIDERS))
+
         request_cache = RequestCache.get_request_cache()
         if course is None:
             cache_key = ENABLED_OVERRIDE_PROVIDERS_KEY.format(course_id='None')
@@ -114,6 +126,15 @@ class OverrideFieldData(FieldData):
         self.fallback = fallback
         self.providers = tuple(provider(user) for provider in providers)
 
+    def prefetch(self, course_key):
+        """
+        Asks each provider to load, in bulk, its overrides for the user in
+        the course with the given `course_key`, so that field lookups in the
+        course don't query for them block by block.
+        """
+        for provider in self.providers:
+            provider.prefetch(course_key)
+
     def get_override(self, block, name):
         """
         Checks for an override for the field identified by `name` in `block`.
@@ -225,6 +246,19 @@ class FieldOverrideProvider(object):
         """
         raise NotImplementedError
 
+    def prefetch(self, course_key):
+        """
+        Load all of the overrides for `self.user` in the course identified by
+        `course_key`, so that later calls to `get` are served from memory.
+        Loaded overrides should be kept in the request cache, and `get` must
+        still work for blocks whose overrides were not prefetched.
+
+        Called once for each block wrapped in a course, so implementations
+        should return quickly once the overrides are loaded. The default
+        implementation does nothing.
+        """
+        pass
+
     @abstractmethod
     def enabled_for(self, course):  # pragma no cover
         """
@@ -236,6 +270,18 @@ class FieldOverrideProvider(object):
         """
         return False
 
+    @classmethod
+    def has_overrides(cls, course, user):
+        """
+        Return whether this provider, enabled for `course`, may override
+        field values of its blocks for `user`.
+
+        The default implementation returns True. Providers that can tell
+        cheaply that a user has no overrides return False then, so that the
+        stored field values can be used without instantiating the blocks.
+        """
+        return True
+
 
 def _lineage(block):
     """
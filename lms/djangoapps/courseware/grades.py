@@ -2,6 +2,7 @@
 from __future__ import division
 from collections import defaultdict
 from functools import partial
+from itertools import islice
 import json
 import random
 import logging
@@ -14,7 +15,7 @@ from django.core.cache import cache
 import dogstats_wrapper as dog_stats_api
 
 from courseware import courses
-from courseware.access import has_access
+from courseware.access import BlockAccessChecker
 from courseware.model_data import FieldDataCache, ScoresClient
 from student.models import anonymous_id_for_user
 from util.db import outer_atomic
@@ -23,7 +24,7 @@ from xmodule import graders
 from xmodule.graders import Score
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.exceptions import ItemNotFoundError
-from .models import StudentModule
+from .models import PersistentSubsectionGrade, StudentModule
 from .module_render import get_module_for_descriptor
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.keys import CourseKey
@@ -295,13 +296,24 @@ def answer_distributions(course_key):
     return answer_counts
 
 
-def grade(student, request, course, keep_raw_scores=False, field_data_cache=None, scores_client=None):
+def grade(student, request, course, keep_raw_scores=False, field_data_cache=None, scores_client=None,
+          submissions_scores=None, max_scores_cache=None, invalidation_generation=None):
     """
     Returns the grade of the student.
 
     Also sends a signal to update the minimum grade requirement status.
     """
-    grade_summary = _grade(student, request, course, keep_raw_scores, field_data_cache, scores_client)
+    grade_summary = _grade(
+        student,
+        request,
+        course,
+        keep_raw_scores,
+        field_data_cache,
+        scores_client,
+        submissions_scores=submissions_scores,
+        max_scores_cache=max_scores_cache,
+        invalidation_generation=invalidation_generation,
+    )
     responses = GRADES_UPDATED.send_robust(
         sender=None,
         username=student.username,
@@ -316,7 +328,8 @@ def grade(student, request, course, keep_raw_scores=False, field_data_cache=None
     return grade_summary
 
 
-def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_client):
+def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_client, use_persisted_grades=True,
+           submissions_scores=None, max_scores_cache=None, invalidation_generation=None):
     """
     Unwrapped version of "grade"
 
@@ -335,37 +348,96 @@ def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_c
     - keep_raw_scores : if True, then value for key 'raw_scores' contains scores
       for every graded module
 
+    Callers grading many students may pass in a `scores_client`, the student's
+    `submissions_scores` and a `max_scores_cache` shared between students (see
+    `GradingBatch`). In that case student state is only loaded if a module has
+    to be instantiated, and the shared `max_scores_cache` is not pushed to the
+    remote cache.
+
+    When persistent subsection grades are enabled, subsection totals stored
+    for the current course version are used as they are, and only the other
+    subsections are graded (and then stored). Pass `use_persisted_grades=False`
+    to grade every subsection from scratch without reading or writing stored
+    grades. Callers passing in scores loaded beforehand also pass in the
+    `invalidation_generation` of the student's stored grades captured before
+    loading them (see `PersistentSubsectionGrade.invalidation_generations`),
+    so that grades computed from scores changed meanwhile aren't stored.
+
     More information on the format is in the docstring for CourseGrader.
     """
-    with outer_atomic():
-        if field_data_cache is None:
-            field_data_cache = field_data_cache_for_grading(course, student)
-        if scores_client is None:
-            scores_client = ScoresClient.from_field_data_cache(field_data_cache)
+    grading_context = course.grading_context
+    persist_grades = use_persisted_grades and persistent_grades_enabled()
+    course_version = course_version_for_grades(course)
+
+    if persist_grades and invalidation_generation is None:
+        invalidation_generation = PersistentSubsectionGrade.invalidation_generations(
+            [student.id], course.id
+        )[student.id]
+
+    persisted_grades = {}
+    if persist_grades and not keep_raw_scores:
+        with outer_atomic():
+            persisted_grades = PersistentSubsectionGrade.read_grades(student.id, course.id, course_version)
+
+    def use_persisted_grade(section):
+        """Can the stored grade of this section be used instead of grading it?"""
+        return (
+            section['section_descriptor'].location in persisted_grades and
+            not _section_always_recalculated(section)
+        )
 
-    # Dict of item_ids -> (earned, possible) point tuples. This *only* grabs
-    # scores that were registered with the submissions API, which for the moment
-    # means only openassessment (edx-ora2)
-    # We need to import this here to avoid a circular dependency of the form:
-    # XBlock --> submissions --> Django Rest Framework error strings -->
-    # Django translation --> ... --> courseware --> submissions
-    from submissions import api as sub_api  # installed from the edx-submissions repository
+    needs_grading = any(
+        not use_persisted_grade(section)
+        for sections in grading_context['graded_sections'].itervalues()
+        for section in sections
+    )
 
-    with outer_atomic():
-        submissions_scores = sub_api.get_scores(
-            course.id.to_deprecated_string(),
-            anonymous_id_for_user(student, course.id)
-        )
-        max_scores_cache = MaxScoresCache.create_for_course(course)
+    # The student's FieldDataCache is only loaded once something needs it.
+    loaded_field_data_cache = [field_data_cache] if field_data_cache is not None else []
 
-        # For the moment, we have to get scorable_locations from field_data_cache
-        # and not from scores_client, because scores_client is ignorant of things
-        # in the submissions API. As a further refactoring step, submissions should
-        # be hidden behind the ScoresClient.
-        max_scores_cache.fetch_from_remote(field_data_cache.scorable_locations)
+    def get_field_data_cache():
+        """Return the student's FieldDataCache, loading it on first use."""
+        if not loaded_field_data_cache:
+            with outer_atomic():
+                loaded_field_data_cache.append(field_data_cache_for_grading(course, student))
+        return loaded_field_data_cache[0]
+
+    # Student state is only loaded if at least one section has to be graded.
+    owns_max_scores_cache = max_scores_cache is None
+    if needs_grading:
+        with outer_atomic():
+            if scores_client is None:
+                scores_client = ScoresClient.from_field_data_cache(get_field_data_cache())
+
+        if submissions_scores is None:
+            # Dict of item_ids -> (earned, possible) point tuples. This *only* grabs
+            # scores that were registered with the submissions API, which for the moment
+            # means only openassessment (edx-ora2)
+            # We need to import this here to avoid a circular dependency of the form:
+            # XBlock --> submissions --> Django Rest Framework error strings -->
+            # Django translation --> ... --> courseware --> submissions
+            from submissions import api as sub_api  # installed from the edx-submissions repository
+
+            with outer_atomic():
+                submissions_scores = sub_api.get_scores(
+                    course.id.to_deprecated_string(),
+                    anonymous_id_for_user(student, course.id)
+                )
+
+        if max_scores_cache is None:
+            with outer_atomic():
+                max_scores_cache = MaxScoresCache.create_for_course(course)
+
+                # For the moment, we have to get scorable_locations from field_data_cache
+                # and not from scores_client, because scores_client is ignorant of things
+                # in the submissions API. As a further refactoring step, submissions should
+                # be hidden behind the ScoresClient.
+                max_scores_cache.fetch_from_remote(get_field_data_cache().scorable_locations)
 
-    grading_context = course.grading_context
     raw_scores = []
+    subsection_totals_to_persist = {}
+    # The student's roles and groups are only looked up once for all the graded modules.
+    access_checker = BlockAccessChecker(student, course.id)
 
     totaled_scores = {}
     # This next complicated loop is just to collect the totaled_scores, which is
@@ -376,98 +448,34 @@ def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_c
             section_descriptor = section['section_descriptor']
             section_name = section_descriptor.display_name_with_default_escaped
 
-            with outer_atomic():
-                # some problems have state that is updated independently of interaction
-                # with the LMS, so they need to always be scored. (E.g. combinedopenended ORA1)
-                # TODO This block is causing extra savepoints to be fired that are empty because no queries are executed
-                # during the loop. When refactoring this code please keep this outer_atomic call in mind and ensure we
-                # are not making unnecessary database queries.
-                should_grade_section = any(
-                    descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors']
-                )
-
-                # If there are no problems that always have to be regraded, check to
-                # see if any of our locations are in the scores from the submissions
-                # API. If scores exist, we have to calculate grades for this section.
-                if not should_grade_section:
-                    should_grade_section = any(
-                        descriptor.location.to_deprecated_string() in submissions_scores
-                        for descriptor in section['xmoduledescriptors']
-                    )
-
-                if not should_grade_section:
-                    should_grade_section = any(
-                        descriptor.location in scores_client
-                        for descriptor in section['xmoduledescriptors']
-                    )
-
-                # If we haven't seen a single problem in the section, we don't have
-                # to grade it at all! We can assume 0%
-                if should_grade_section:
-                    scores = []
-
-                    def create_module(descriptor):
-                        '''creates an XModule instance given a descriptor'''
-                        # TODO: We need the request to pass into here. If we could forego that, our arguments
-                        # would be simpler
-                        return get_module_for_descriptor(
-                            student, request, descriptor, field_data_cache, course.id, course=course
-                        )
-
-                    descendants = yield_dynamic_descriptor_descendants(section_descriptor, student.id, create_module)
-                    for module_descriptor in descendants:
-                        user_access = has_access(
-                            student, 'load', module_descriptor, module_descriptor.location.course_key
-                        )
-                        if not user_access:
-                            continue
-
-                        (correct, total) = get_score(
-                            student,
-                            module_descriptor,
-                            create_module,
-                            scores_client,
-                            submissions_scores,
-                            max_scores_cache,
-                        )
-                        if correct is None and total is None:
-                            continue
-
-                        if settings.GENERATE_PROFILE_SCORES:    # for debugging!
-                            if total > 1:
-                                correct = random.randrange(max(total - 2, 1), total + 1)
-                            else:
-                                correct = total
-
-                        graded = module_descriptor.graded
-                        if not total > 0:
-                            # We simply cannot grade a problem that is 12/0, because we might need it as a percentage
-                            graded = False
-
-                        scores.append(
-                            Score(
-                                correct,
-                                total,
-                                graded,
-                                module_descriptor.display_name_with_default_escaped,
-                                module_descriptor.location
-                            )
-                        )
-
-                    __, graded_total = graders.aggregate_scores(scores, section_name)
-                    if keep_raw_scores:
-                        raw_scores += scores
-                else:
-                    graded_total = Score(0.0, 1.0, True, section_name, None)
-
-                #Add the graded total to totaled_scores
-                if graded_total.possible > 0:
-                    format_scores.append(graded_total)
-                else:
-                    log.info(
-                        "Unable to grade a section with a total possible score of zero. " +
-                        str(section_descriptor.location)
+            if use_persisted_grade(section):
+                graded_total = persisted_grades[section_descriptor.location].graded_total(section_name)
+            else:
+                with outer_atomic():
+                    scores, all_total, graded_total = _grade_section(
+                        student,
+                        request,
+                        course,
+                        section,
+                        get_field_data_cache,
+                        scores_client,
+                        submissions_scores,
+                        max_scores_cache,
+                        access_checker,
                     )
+                if keep_raw_scores and scores:
+                    raw_scores += scores
+                if persist_grades and not _section_always_recalculated(section):
+                    subsection_totals_to_persist[section_descriptor.location] = (scores, all_total, graded_total)
+
+            #Add the graded total to totaled_scores
+            if graded_total.possible > 0:
+                format_scores.append(graded_total)
+            else:
+                log.info(
+                    "Unable to grade a section with a total possible score of zero. " +
+                    str(section_descriptor.location)
+                )
 
         totaled_scores[section_format] = format_scores
 
@@ -488,11 +496,147 @@ def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_c
             # so grader can be double-checked
             grade_summary['raw_scores'] = raw_scores
 
-        max_scores_cache.push_to_remote()
+        if owns_max_scores_cache and max_scores_cache is not None:
+            max_scores_cache.push_to_remote()
+
+    if subsection_totals_to_persist:
+        with outer_atomic():
+            PersistentSubsectionGrade.save_grades(
+                student.id, course.id, course_version, subsection_totals_to_persist, invalidation_generation
+            )
 
     return grade_summary
 
 
+def _grade_section(student, request, course, section, get_field_data_cache, scores_client, submissions_scores,
+                   max_scores_cache, access_checker):
+    """
+    Grade a single graded section (subsection) of the course for a student.
+
+    `section` is an entry of `course.grading_context['graded_sections']`,
+    `get_field_data_cache` is called to get the student's FieldDataCache when
+    a module has to be instantiated, and `access_checker` is the student's
+    BlockAccessChecker for the course.
+
+    Returns a tuple of (scores, all_total, graded_total) where `scores` is the
+    list of `Score` tuples for the problems in the section, or None if the
+    student hasn't seen any of them, and the totals are the aggregates returned
+    by `graders.aggregate_scores`.
+    """
+    section_descriptor = section['section_descriptor']
+    section_name = section_descriptor.display_name_with_default_escaped
+
+    # some problems have state that is updated independently of interaction
+    # with the LMS, so they need to always be scored. (E.g. combinedopenended ORA1)
+    should_grade_section = _section_always_recalculated(section)
+
+    # If there are no problems that always have to be regraded, check to
+    # see if any of our locations are in the scores from the submissions
+    # API. If scores exist, we have to calculate grades for this section.
+    if not should_grade_section:
+        should_grade_section = any(
+            descriptor.location.to_deprecated_string() in submissions_scores
+            for descriptor in section['xmoduledescriptors']
+        )
+
+    if not should_grade_section:
+        should_grade_section = any(
+            descriptor.location in scores_client
+            for descriptor in section['xmoduledescriptors']
+        )
+
+    # If we haven't seen a single problem in the section, we don't have
+    # to grade it at all! We can assume 0%
+    if not should_grade_section:
+        graded_total = Score(0.0, 1.0, True, section_name, None)
+        return None, graded_total, graded_total
+
+    scores = []
+
+    def create_module(descriptor):
+        '''creates an XModule instance given a descriptor'''
+        # TODO: We need the request to pass into here. If we could forego that, our arguments
+        # would be simpler
+        return get_module_for_descriptor(
+            student, request, descriptor, get_field_data_cache(), course.id, course=course
+        )
+
+    descendants = yield_dynamic_descriptor_descendants(section_descriptor, student.id, create_module)
+    for module_descriptor in descendants:
+        if not access_checker.has_access('load', module_descriptor):
+            continue
+
+        (correct, total) = get_score(
+            student,
+            module_descriptor,
+            create_module,
+            scores_client,
+            submissions_scores,
+            max_scores_cache,
+        )
+        if correct is None and total is None:
+            continue
+
+        if settings.GENERATE_PROFILE_SCORES:    # for debugging!
+            if total > 1:
+                correct = random.randrange(max(total - 2, 1), total + 1)
+            else:
+                correct = total
+
+        graded = module_descriptor.graded
+        if not total > 0:
+            # We simply cannot grade a problem that is 12/0, because we might need it as a percentage
+            graded = False
+
+        scores.append(
+            Score(
+                correct,
+                total,
+                graded,
+                module_descriptor.display_name_with_default_escaped,
+                module_descriptor.location
+            )
+        )
+
+    all_total, graded_total = graders.aggregate_scores(scores, section_name)
+    return scores, all_total, graded_total
+
+
+def _section_always_recalculated(section):
+    """
+    Returns True if the section contains problems whose state is updated
+    independently of interaction with the LMS, so it always has to be graded.
+    """
+    return any(descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors'])
+
+
+def persistent_grades_enabled():
+    """
+    Returns True if subsection grades should be read from and written to the
+    PersistentSubsectionGrade table.
+    """
+    return (
+        settings.FEATURES.get('ENABLE_PERSISTENT_SUBSECTION_GRADES', False) and
+        not settings.GENERATE_PROFILE_SCORES
+    )
+
+
+def course_version_for_grades(course):
+    """
+    Return a string identifying the published version of the course. Persisted
+    subsection grades computed against any other version are ignored.
+
+    Changes that affect the content graded for a learner without publishing
+    the course (cohorts, individual due dates and CCX overrides) don't change
+    this version; the handlers in `courseware.signals` delete the persisted
+    grades they affect instead.
+    """
+    if course.subtree_edited_on is None:
+        # check for subtree_edited_on because old XML courses doesn't have this attribute
+        return u""
+    return course.subtree_edited_on.isoformat()
+
+
 def grade_for_percentage(grade_cutoffs, percentage):
     """
     Returns a letter grade as defined in grading_policy (e.g. 'A' 'B' 'C' for 6.002x) or None.
@@ -530,15 +674,21 @@ def get_weighted_scores(student, course, field_data_cache=None, scores_client=No
     """
     Uses the _progress_summary method to return a ProgressSummmary object
     containing details of a students weighted scores for the course.
+
+    Persisted subsection grades aren't used, as they don't record the
+    verticals and other containers between subsections and problems.
     """
     request = _get_mock_request(student)
-    return _progress_summary(student, request, course, field_data_cache, scores_client)
+    return _progress_summary(
+        student, request, course, field_data_cache, scores_client, use_persisted_grades=False
+    )
 
 
 # TODO: This method is not very good. It was written in the old course style and
 # then converted over and performance is not good. Once the progress page is redesigned
 # to not have the progress summary this method should be deleted (so it won't be copied).
-def _progress_summary(student, request, course, field_data_cache=None, scores_client=None):
+def _progress_summary(student, request, course, field_data_cache=None, scores_client=None,
+                      use_persisted_grades=True):
     """
     Unwrapped version of "progress_summary".
 
@@ -558,6 +708,11 @@ def _progress_summary(student, request, course, field_data_cache=None, scores_cl
     If the student does not have access to load the course module, this function
     will return None.
 
+    When persistent subsection grades are enabled, the problem scores stored
+    for a subsection by grading the student are used, instead of walking the
+    problems of the subsection. The problems are then recorded as the direct
+    children of the subsection in `locations_to_children`.
+
     """
     with outer_atomic():
         if field_data_cache is None:
@@ -589,6 +744,12 @@ def _progress_summary(student, request, course, field_data_cache=None, scores_cl
         # be hidden behind the ScoresClient.
         max_scores_cache.fetch_from_remote(field_data_cache.scorable_locations)
 
+        persisted_grades = {}
+        if use_persisted_grades and persistent_grades_enabled():
+            persisted_grades = PersistentSubsectionGrade.read_grades(
+                student.id, course.id, course_version_for_grades(course)
+            )
+
     chapters = []
     locations_to_children = defaultdict(list)
     locations_to_weighted_scores = {}
@@ -606,35 +767,42 @@ def _progress_summary(student, request, course, field_data_cache=None, scores_cl
                     continue
 
                 graded = section_module.graded
-                scores = []
+                persisted_grade = persisted_grades.get(section_module.location)
+                scores = persisted_grade.get_problem_scores(graded) if persisted_grade is not None else None
 
-                module_creator = section_module.xmodule_runtime.get_module
+                if scores is not None:
+                    for score in scores:
+                        locations_to_children[section_module.location].append(score.module_id)
+                        locations_to_weighted_scores[score.module_id] = score
+                else:
+                    scores = []
+                    module_creator = section_module.xmodule_runtime.get_module
 
-                for module_descriptor in yield_dynamic_descriptor_descendants(
-                        section_module, student.id, module_creator
-                ):
-                    locations_to_children[module_descriptor.parent].append(module_descriptor.location)
-                    (correct, total) = get_score(
-                        student,
-                        module_descriptor,
-                        module_creator,
-                        scores_client,
-                        submissions_scores,
-                        max_scores_cache,
-                    )
-                    if correct is None and total is None:
-                        continue
-
-                    weighted_location_score = Score(
-                        correct,
-                        total,
-                        graded,
-                        module_descriptor.display_name_with_default_escaped,
-                        module_descriptor.location
-                    )
+                    for module_descriptor in yield_dynamic_descriptor_descendants(
+                            section_module, student.id, module_creator
+                    ):
+                        locations_to_children[module_descriptor.parent].append(module_descriptor.location)
+                        (correct, total) = get_score(
+                            student,
+                            module_descriptor,
+                            module_creator,
+                            scores_client,
+                            submissions_scores,
+                            max_scores_cache,
+                        )
+                        if correct is None and total is None:
+                            continue
 
-                    scores.append(weighted_location_score)
-                    locations_to_weighted_scores[module_descriptor.location] = weighted_location_score
+                        weighted_location_score = Score(
+                            correct,
+                            total,
+                            graded,
+                            module_descriptor.display_name_with_default_escaped,
+                            module_descriptor.location
+                        )
+
+                        scores.append(weighted_location_score)
+                        locations_to_weighted_scores[module_descriptor.location] = weighted_location_score
 
                 scores.reverse()
                 section_total, _ = graders.aggregate_scores(
@@ -752,7 +920,90 @@ def get_score(user, problem_descriptor, module_creator, scores_client, submissio
     return weighted_score(correct, total, problem_descriptor.weight)
 
 
-def iterate_grades_for(course_or_id, students, keep_raw_scores=False):
+class GradingBatch(object):
+    """
+    Student scores for a batch of students in a course, loaded in bulk.
+
+    Grading students one by one loads their StudentModule scores and
+    submissions scores with separate queries for every student. A batch loads
+    them for all of its students in a few queries.
+    """
+    def __init__(self, course, students):
+        self.course = course
+
+        scorable_locations = set(
+            descriptor.location
+            for descriptor in course.grading_context['all_descriptors']
+            if descriptor.has_score
+        )
+        # Captured before loading the scores, see _grade.
+        self._invalidation_generations = {}
+        if persistent_grades_enabled():
+            self._invalidation_generations = PersistentSubsectionGrade.invalidation_generations(
+                [student.id for student in students], course.id
+            )
+        with outer_atomic():
+            self._scores_clients = ScoresClient.for_users(
+                course.id, [student.id for student in students], scorable_locations
+            )
+            self._submissions_scores = _bulk_submissions_scores(course.id, students)
+
+    def scores_client(self, student):
+        """Return the ScoresClient of a student in the batch."""
+        return self._scores_clients[student.id]
+
+    def submissions_scores(self, student):
+        """Return the submissions API scores of a student in the batch."""
+        return self._submissions_scores.get(anonymous_id_for_user(student, self.course.id, save=False), {})
+
+    def invalidation_generation(self, student):
+        """Return the generation of the stored grades of a student in the batch, before loading the batch."""
+        return self._invalidation_generations.get(student.id)
+
+
+def _bulk_submissions_scores(course_key, students, chunk_size=500):
+    """
+    Return the submissions API scores of many students in a course, as a dict
+    mapping anonymous user ids to what `submissions.api.get_scores` returns
+    for that student.
+
+    The submissions API only reads the scores of one student at a time, so
+    this reads its score summaries directly, one query per `chunk_size`
+    students.
+    """
+    # We need to import this here to avoid a circular dependency of the form:
+    # XBlock --> submissions --> Django Rest Framework error strings -->
+    # Django translation --> ... --> courseware --> submissions
+    from submissions.models import ScoreSummary  # installed from the edx-submissions repository
+
+    anonymous_ids = [anonymous_id_for_user(student, course_key, save=False) for student in students]
+    scores = defaultdict(dict)
+    for anonymous_ids_chunk in _chunks(anonymous_ids, chunk_size):
+        score_summaries = ScoreSummary.objects.filter(
+            student_item__course_id=course_key.to_deprecated_string(),
+            student_item__student_id__in=anonymous_ids_chunk,
+        ).select_related('latest', 'student_item')
+        for summary in score_summaries:
+            if not summary.latest.is_hidden():
+                scores[summary.student_item.student_id][summary.student_item.item_id] = (
+                    summary.latest.points_earned, summary.latest.points_possible
+                )
+    return scores
+
+
+def _chunks(items, chunk_size):
+    """
+    Yields lists of up to chunk_size values from the iterable items, without
+    materializing all of items at once.
+    """
+    items = iter(items)
+    chunk = list(islice(items, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(items, chunk_size))
+
+
+def iterate_grades_for(course_or_id, students, keep_raw_scores=False, batch_size=None):
     """Given a course_id and an iterable of students (User), yield a tuple of:
 
     (student, gradeset, err_msg) for every student enrolled in the course.
@@ -769,34 +1020,68 @@ def iterate_grades_for(course_or_id, students, keep_raw_scores=False):
     - grade_breakdown : A breakdown of the major components that
         make up the final grade. (For display)
     - raw_scores: contains scores for every graded module
+
+    Students are graded in batches of `batch_size` (settings.GRADES_BATCH_SIZE
+    by default) whose scores are loaded together; see GradingBatch. A single
+    MaxScoresCache is shared by all students.
     """
     if isinstance(course_or_id, (basestring, CourseKey)):
         course = courses.get_course_by_id(course_or_id)
     else:
         course = course_or_id
 
-    for student in students:
-        with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course.id)]):
-            try:
-                request = _get_mock_request(student)
-                # Grading calls problem rendering, which calls masquerading,
-                # which checks session vars -- thus the empty session dict below.
-                # It's not pretty, but untangling that is currently beyond the
-                # scope of this feature.
-                request.session = {}
-                gradeset = grade(student, request, course, keep_raw_scores)
-                yield student, gradeset, ""
-            except Exception as exc:  # pylint: disable=broad-except
-                # Keep marching on even if this student couldn't be graded for
-                # some reason, but log it for future reference.
-                log.exception(
-                    'Cannot grade student %s (%s) in course %s because of exception: %s',
-                    student.username,
-                    student.id,
-                    course.id,
-                    exc.message
-                )
-                yield student, {}, exc.message
+    if batch_size is None:
+        batch_size = getattr(settings, 'GRADES_BATCH_SIZE', 100)
+
+    max_scores_cache = MaxScoresCache.create_for_course(course)
+    max_scores_cache.fetch_from_remote(
+        descriptor.location for descriptor in course.grading_context['all_descriptors'] if descriptor.has_score
+    )
+
+    for students_chunk in _chunks(students, batch_size):
+        try:
+            batch = GradingBatch(course, students_chunk)
+        except Exception:  # pylint: disable=broad-except
+            # Fall back to loading the scores of each student separately.
+            log.exception('Cannot load the scores of a batch of students in course %s', course.id)
+            batch = None
+
+        for student in students_chunk:
+            with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course.id)]):
+                try:
+                    request = _get_mock_request(student)
+                    # Grading calls problem rendering, which calls masquerading,
+                    # which checks session vars -- thus the empty session dict below.
+                    # It's not pretty, but untangling that is currently beyond the
+                    # scope of this feature.
+                    request.session = {}
+                    if batch is None:
+                        gradeset = grade(student, request, course, keep_raw_scores)
+                    else:
+                        gradeset = grade(
+                            student,
+                            request,
+                            course,
+                            keep_raw_scores,
+                            scores_client=batch.scores_client(student),
+                            submissions_scores=batch.submissions_scores(student),
+                            max_scores_cache=max_scores_cache,
+                            invalidation_generation=batch.invalidation_generation(student),
+                        )
+                    yield student, gradeset, ""
+                except Exception as exc:  # pylint: disable=broad-except
+                    # Keep marching on even if this student couldn't be graded for
+                    # some reason, but log it for future reference.
+                    log.exception(
+                        'Cannot grade student %s (%s) in course %s because of exception: %s',
+                        student.username,
+                        student.id,
+                        course.id,
+                        exc.message
+                    )
+                    yield student, {}, exc.message
+
+        max_scores_cache.push_to_remote()
 
 
 def _get_mock_request(student):
@@ -0,0 +1,75 @@
+"""
+Compute and store subsection grades for every learner enrolled in a course.
+
+Usage:
+    ./manage.py lms backfill_subsection_grades <course_id> [<course_id> ...] [--force] --settings=aws
+"""
+import logging
+from optparse import make_option
+from textwrap import dedent
+
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from courseware import grades
+from courseware.courses import get_course_by_id
+from courseware.models import PersistentSubsectionGrade
+from student.models import CourseEnrollment
+
+LOG = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Populate the PersistentSubsectionGrade table for the given courses.
+
+    Learners whose subsection grades are already stored for the current
+    course version are not regraded unless --force is given.
+    """
+    help = dedent(__doc__).strip()
+    args = '<course_id course_id ...>'
+    option_list = BaseCommand.option_list + (
+        make_option('--force',
+                    action='store_true',
+                    dest='force',
+                    default=False,
+                    help='Drop the stored grades of each learner before regrading them.'),
+    )
+
+    def handle(self, *args, **options):
+        if not args:
+            raise CommandError('At least one course_id must be provided.')
+
+        if not grades.persistent_grades_enabled():
+            raise CommandError('ENABLE_PERSISTENT_SUBSECTION_GRADES is not enabled.')
+
+        for course_id in args:
+            try:
+                course_key = CourseKey.from_string(course_id)
+            except InvalidKeyError:
+                raise CommandError(u'Invalid course_id: {}'.format(course_id))
+            self.backfill_course(course_key, options['force'])
+
+    def backfill_course(self, course_key, force):
+        """Grade every enrolled learner in the course, storing the results."""
+        course = get_course_by_id(course_key)
+        students = CourseEnrollment.objects.users_enrolled_in(course_key).order_by('id')
+
+        num_graded = num_errors = 0
+        for student in students.iterator():
+            if force:
+                PersistentSubsectionGrade.invalidate(student.id, course_key)
+            try:
+                request = grades._get_mock_request(student)  # pylint: disable=protected-access
+                request.session = {}
+                grades._grade(student, request, course, False, None, None)  # pylint: disable=protected-access
+                num_graded += 1
+            except Exception:  # pylint: disable=broad-except
+                LOG.exception(u'Unable to backfill grades of user %s in course %s', student.id, course_key)
+                num_errors += 1
+
+        LOG.info(
+            u'Backfilled subsection grades in course %s for %d learners (%d errors)',
+            course_key, num_graded, num_errors
+        )
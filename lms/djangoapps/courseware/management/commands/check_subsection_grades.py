@@ -0,0 +1,111 @@
+"""
+Compare stored subsection grades against grades computed from scratch.
+
+Usage:
+    ./manage.py lms check_subsection_grades <course_id> [--fix] [--limit=N] --settings=aws
+"""
+from itertools import izip_longest
+from optparse import make_option
+from textwrap import dedent
+
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from courseware import grades
+from courseware.courses import get_course_by_id
+from courseware.models import PersistentSubsectionGrade
+from student.models import CourseEnrollment
+
+
+class Command(BaseCommand):
+    """
+    Check that grading from the PersistentSubsectionGrade rows of a course
+    gives the same subsection totals as courseware.grades._grade computing
+    every subsection from scratch.
+
+    Every mismatch is reported. With --fix, the stored grades of the learners
+    with mismatches are dropped so that they are recomputed on the next read.
+    """
+    help = dedent(__doc__).strip()
+    args = '<course_id>'
+    option_list = BaseCommand.option_list + (
+        make_option('--fix',
+                    action='store_true',
+                    dest='fix',
+                    default=False,
+                    help='Drop the stored grades of learners whose grades do not match.'),
+        make_option('--limit',
+                    action='store',
+                    dest='limit',
+                    type='int',
+                    default=None,
+                    help='Only check the first N learners with stored grades.'),
+    )
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError('A single course_id must be provided.')
+        try:
+            course_key = CourseKey.from_string(args[0])
+        except InvalidKeyError:
+            raise CommandError(u'Invalid course_id: {}'.format(args[0]))
+
+        course = get_course_by_id(course_key)
+        course_version = grades.course_version_for_grades(course)
+
+        user_ids = PersistentSubsectionGrade.objects.filter(
+            course_id=course_key, course_version=course_version
+        ).values_list('user_id', flat=True).distinct().order_by('user_id')
+        if options['limit'] is not None:
+            user_ids = user_ids[:options['limit']]
+
+        students = CourseEnrollment.objects.users_enrolled_in(course_key).filter(id__in=list(user_ids))
+        num_checked = num_mismatched = 0
+        for student in students:
+            mismatches = self.check_student(student, course)
+            num_checked += 1
+            if mismatches:
+                num_mismatched += 1
+                for stored, computed in mismatches:
+                    self.stdout.write(u'Mismatch for user {}: stored {}, computed {}\n'.format(
+                        student.id, self._describe(stored), self._describe(computed)
+                    ))
+                if options['fix']:
+                    PersistentSubsectionGrade.invalidate(student.id, course_key)
+
+        self.stdout.write(u'Checked {} learners, {} with mismatched grades.\n'.format(num_checked, num_mismatched))
+
+    def check_student(self, student, course):
+        """
+        Grade the student with and without stored subsection grades.
+
+        Returns a list of (stored Score, computed Score) pairs for every
+        subsection total that differs; either side may be None if the
+        subsection is missing from that grade.
+        """
+        request = grades._get_mock_request(student)  # pylint: disable=protected-access
+        request.session = {}
+        stored_summary = grades._grade(  # pylint: disable=protected-access
+            student, request, course, False, None, None
+        )
+        computed_summary = grades._grade(  # pylint: disable=protected-access
+            student, request, course, False, None, None, use_persisted_grades=False
+        )
+
+        mismatches = []
+        for section_format, computed_scores in computed_summary['totaled_scores'].iteritems():
+            stored_scores = stored_summary['totaled_scores'].get(section_format, [])
+            for stored, computed in izip_longest(stored_scores, computed_scores):
+                if stored is None or computed is None or (
+                        (stored.earned, stored.possible) != (computed.earned, computed.possible)
+                ):
+                    mismatches.append((stored, computed))
+        return mismatches
+
+    @staticmethod
+    def _describe(score):
+        """Format a subsection Score for the report."""
+        if score is None:
+            return u'<missing>'
+        return u'{}/{} ({})'.format(score.earned, score.possible, score.section)
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courseware', '0002_persistentsubsectiongrade'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='persistentsubsectiongrade',
+            name='problem_scores',
+            field=models.TextField(default='', blank=True),
+        ),
+    ]
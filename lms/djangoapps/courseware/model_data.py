@@ -25,6 +25,7 @@ import json
 from abc import abstractmethod, ABCMeta
 from collections import defaultdict, namedtuple
 from .models import (
+    chunks,
     StudentModule,
     XModuleUserStateSummaryField,
     XModuleStudentPrefsField,
@@ -989,6 +990,33 @@ class ScoresClient(object):
         client.fetch_scores(fd_cache.scorable_locations)
         return client
 
+    @classmethod
+    def for_users(cls, course_key, user_ids, locations, chunk_size=500):
+        """
+        Create fetched ScoresClients for many users at once.
+
+        Scores are loaded with one query per `chunk_size` users instead of one
+        query per user. Returns a dict mapping each user id to its client.
+        """
+        clients = {user_id: cls(course_key, user_id) for user_id in user_ids}
+        locations = set(locations)
+        for user_ids_chunk in chunks(list(clients), chunk_size):
+            scores_qset = StudentModule.objects.filter(
+                student_id__in=user_ids_chunk,
+                course_id=course_key,
+            )
+            for user_id, location, correct, total in scores_qset.values_list(
+                    'student_id', 'module_state_key', 'grade', 'max_grade'
+            ):
+                # See fetch_scores() for why the course key is mapped back in.
+                location = UsageKey.from_string(location).map_into_course(course_key)
+                if location in locations:
+                    clients[user_id]._locations_to_scores[location] = cls.Score(correct, total)
+
+        for client in clients.itervalues():
+            client._has_fetched = True
+        return clients
+
 
 # @contract(user_id=int, usage_key=UsageKey, score="number|None", max_score="number|None")
 def set_score(user_id, usage_key, score, max_score):
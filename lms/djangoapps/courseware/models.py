@@ -12,19 +12,23 @@ file and check it in at the same time as your model changes. To do that,
 ASSUMPTIONS: modules have unique IDs, even across different module_types
 
 """
+import json
 import logging
 import itertools
 
 from django.contrib.auth.models import User
 from django.conf import settings
-from django.db import models
+from django.core.cache import cache
+from django.db import DatabaseError, IntegrityError, models, transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver, Signal
 
 from model_utils.models import TimeStampedModel
+from opaque_keys.edx.keys import UsageKey
 from student.models import user_by_anonymous_id
 from submissions.models import score_set, score_reset
 
+from xmodule.graders import Score
 from xmodule_django.models import CourseKeyField, LocationKeyField, BlockTypeKeyField
 log = logging.getLogger(__name__)
 
@@ -313,6 +317,279 @@ class StudentFieldOverride(TimeStampedModel):
     value = models.TextField(default='null')
 
 
+# Seconds during which the invalidations of subsection grades are remembered,
+# so that gradings started before them don't store the grades they computed
+SUBSECTION_GRADE_INVALIDATION_TIMEOUT = 24 * 60 * 60
+
+
+class PersistentSubsectionGrade(TimeStampedModel):
+    """
+    Stores a user's aggregated score on a single graded subsection.
+
+    Rows are written as a side effect of grading and are only trusted while
+    `course_version` matches the version of the course being graded. Score
+    changes within a subsection delete the affected rows, so the next grading
+    pass recomputes only those subsections instead of the whole course.
+    Changes to the cohorts of a learner or to the field overrides of a course
+    delete the rows they may affect, as the content graded may differ.
+
+    Invalidations also advance a generation of the grades of the user (or of
+    the whole course) in the cache, and record it for the subsections they
+    affect. Gradings capture the generation with `invalidation_generations`
+    before reading scores, and don't store the grades of subsections that
+    were invalidated since, which were computed from stale scores.
+    """
+    objects = ChunkingManager()
+
+    class Meta(object):
+        app_label = "courseware"
+        unique_together = (('user', 'course_id', 'usage_key'),)
+
+    user = models.ForeignKey(User, db_index=True)
+    course_id = CourseKeyField(max_length=255, db_index=True)
+
+    # The usage key of the subsection (the direct child of a chapter)
+    usage_key = LocationKeyField(max_length=255)
+
+    # Identifies the published version of the course the grade was computed against
+    course_version = models.CharField(max_length=255, blank=True)
+
+    # Aggregated weighted scores for all problems and for graded problems only
+    earned_all = models.FloatField()
+    possible_all = models.FloatField()
+    earned_graded = models.FloatField()
+    possible_graded = models.FloatField()
+
+    # JSON list of the [usage key, earned, possible, display name] of each
+    # scored problem of the subsection, in grading order, or empty if the
+    # subsection was graded without looking at its problems
+    problem_scores = models.TextField(blank=True, default='')
+
+    @classmethod
+    def read_grades(cls, user_id, course_key, course_version):
+        """
+        Return a dict of subsection usage key -> PersistentSubsectionGrade for
+        every grade stored for the user that is current for `course_version`.
+        """
+        grades = cls.objects.filter(user_id=user_id, course_id=course_key, course_version=course_version)
+        return {grade.usage_key.map_into_course(course_key): grade for grade in grades}
+
+    @classmethod
+    def invalidation_generations(cls, user_ids, course_key):
+        """
+        Return a dict mapping each of the users to the current generation of
+        the invalidations of their grades in the course, to be passed to
+        `save_grades` once they are graded.
+
+        The generations are to be captured before reading the scores that the
+        grades are computed from.
+        """
+        user_generation_keys = {user_id: cls._generation_key(course_key, user_id) for user_id in user_ids}
+        course_generation_key = cls._generation_key(course_key)
+        generations = cache.get_many(user_generation_keys.values() + [course_generation_key])
+        course_generation = generations.get(course_generation_key, 0)
+        return {
+            user_id: (course_generation, generations.get(key, 0))
+            for user_id, key in user_generation_keys.iteritems()
+        }
+
+    @classmethod
+    def save_grades(cls, user_id, course_key, course_version, subsection_totals, generation=None):
+        """
+        Replace the stored grades for the given subsections.
+
+        If the user is graded concurrently, e.g. by a progress page view and a
+        grade report, the grades stored by the other grading are kept. If
+        given the `generation` captured by `invalidation_generations` before
+        grading, the grades of subsections invalidated since are not stored.
+        Database errors are logged rather than raised, as storing grades is
+        only an optimization.
+
+        Arguments:
+            subsection_totals (dict): maps subsection usage keys to a
+                (scores, all_total, graded_total) tuple, where `scores` is the
+                list of `xmodule.graders.Score` tuples of the problems of the
+                subsection or None if they weren't looked at, and the totals
+                are as returned by `graders.aggregate_scores`.
+        """
+        grades = [
+            cls(
+                user_id=user_id,
+                course_id=course_key,
+                usage_key=usage_key,
+                course_version=course_version,
+                earned_all=all_total.earned,
+                possible_all=all_total.possible,
+                earned_graded=graded_total.earned,
+                possible_graded=graded_total.possible,
+                problem_scores=json.dumps([
+                    [unicode(score.module_id), score.earned, score.possible, score.section]
+                    for score in scores
+                ]) if scores is not None else '',
+            )
+            for usage_key, (scores, all_total, graded_total) in subsection_totals.iteritems()
+        ]
+        try:
+            with transaction.atomic():
+                if generation is not None:
+                    invalidated = cls._invalidated_since(user_id, course_key, subsection_totals.keys(), generation)
+                    if invalidated:
+                        log.info(
+                            u"Not storing the grades of user %s in course %s invalidated while grading: %s",
+                            user_id,
+                            course_key,
+                            u", ".join(unicode(usage_key) for usage_key in invalidated),
+                        )
+                        grades = [grade for grade in grades if grade.usage_key not in invalidated]
+                cls._delete_grades(user_id, course_key, [grade.usage_key for grade in grades])
+                cls.objects.bulk_create(grades)
+        except IntegrityError:
+            log.info(u"Subsection grades of user %s in course %s were stored concurrently", user_id, course_key)
+        except DatabaseError:
+            log.exception(u"Couldn't store the subsection grades of user %s in course %s", user_id, course_key)
+
+    @classmethod
+    def invalidate(cls, user_id, course_key, usage_keys=None):
+        """
+        Delete the stored grades of a user for the given subsections, or for
+        the whole course if `usage_keys` is None.
+        """
+        generation = cls._advance_generation(cls._generation_key(course_key, user_id))
+        if usage_keys is None:
+            cache.set(cls._invalidation_key(course_key, user_id), generation, SUBSECTION_GRADE_INVALIDATION_TIMEOUT)
+        else:
+            cache.set_many(
+                {cls._invalidation_key(course_key, user_id, usage_key): generation for usage_key in usage_keys},
+                SUBSECTION_GRADE_INVALIDATION_TIMEOUT,
+            )
+        cls._delete_grades(user_id, course_key, usage_keys)
+
+    @classmethod
+    def invalidate_users(cls, course_key, user_ids=None):
+        """
+        Delete the stored grades in the course of the given users, or of all
+        users if `user_ids` is None.
+        """
+        grades = cls.objects.filter(course_id=course_key)
+        if user_ids is None:
+            cls._advance_generation(cls._generation_key(course_key))
+            grades.delete()
+        else:
+            user_ids = list(user_ids)
+            cache.set_many(
+                {
+                    cls._invalidation_key(course_key, user_id):
+                    cls._advance_generation(cls._generation_key(course_key, user_id))
+                    for user_id in user_ids
+                },
+                SUBSECTION_GRADE_INVALIDATION_TIMEOUT,
+            )
+            for user_ids_chunk in chunks(user_ids, 500):
+                grades.filter(user_id__in=user_ids_chunk).delete()
+
+    @classmethod
+    def _delete_grades(cls, user_id, course_key, usage_keys=None):
+        """
+        Delete the stored grades of a user for the given subsections, or for
+        the whole course if `usage_keys` is None.
+        """
+        grades = cls.objects.filter(user_id=user_id, course_id=course_key)
+        if usage_keys is None:
+            grades.delete()
+        else:
+            for usage_keys_chunk in chunks(usage_keys, 500):
+                grades.filter(usage_key__in=usage_keys_chunk).delete()
+
+    @classmethod
+    def _invalidated_since(cls, user_id, course_key, usage_keys, generation):
+        """
+        Return the set of the subsections among `usage_keys` whose grades were
+        invalidated since the `generation` of the user's grades.
+
+        All of them are, if the generations were dropped from the cache.
+        """
+        course_generation, user_generation = generation
+        course_generation_key = cls._generation_key(course_key)
+        user_generation_key = cls._generation_key(course_key, user_id)
+        course_invalidation_key = cls._invalidation_key(course_key, user_id)
+        invalidation_keys = {
+            cls._invalidation_key(course_key, user_id, usage_key): usage_key for usage_key in usage_keys
+        }
+        values = cache.get_many(
+            [course_generation_key, user_generation_key, course_invalidation_key] + invalidation_keys.keys()
+        )
+        if (
+                values.get(course_generation_key, 0) != course_generation or
+                values.get(user_generation_key, 0) < user_generation or
+                values.get(course_invalidation_key, 0) > user_generation
+        ):
+            return set(usage_keys)
+        return set(
+            usage_key for key, usage_key in invalidation_keys.iteritems() if values.get(key, 0) > user_generation
+        )
+
+    @staticmethod
+    def _advance_generation(key):
+        """
+        Advance the generation cached under `key`, and return it.
+        """
+        if cache.add(key, 1, None):
+            return 1
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # The generation was dropped from the cache meanwhile.
+            cache.set(key, 1, None)
+            return 1
+
+    @staticmethod
+    def _generation_key(course_key, user_id=None):
+        """
+        Return the cache key of the generation of the grades in the course,
+        of the user if given.
+        """
+        if user_id is None:
+            return u'subsection_grades.generation.{}'.format(course_key)
+        return u'subsection_grades.generation.{}.{}'.format(course_key, user_id)
+
+    @staticmethod
+    def _invalidation_key(course_key, user_id, usage_key=None):
+        """
+        Return the cache key of the generation in which the grades of the user
+        were last invalidated, for the subsection if given, or else for the
+        whole course.
+        """
+        if usage_key is None:
+            return u'subsection_grades.invalidated.{}.{}'.format(course_key, user_id)
+        return u'subsection_grades.invalidated.{}.{}.{}'.format(course_key, user_id, usage_key)
+
+    def get_problem_scores(self, graded):
+        """
+        Return the scores of the problems of this subsection as `Score` tuples
+        in grading order, marked as `graded`, or None if they weren't stored.
+        """
+        if not self.problem_scores:
+            return None
+        return [
+            Score(
+                earned, possible, graded, display_name, UsageKey.from_string(usage_key).map_into_course(self.course_id)
+            )
+            for usage_key, earned, possible, display_name in json.loads(self.problem_scores)
+        ]
+
+    def graded_total(self, section_name):
+        """
+        Return the graded total of this subsection as a `Score`, in the same
+        shape that `graders.aggregate_scores` produces it.
+        """
+        return Score(self.earned_graded, self.possible_graded, True, section_name, None)
+
+    def __unicode__(self):
+        return u"[PersistentSubsectionGrade] {}: {} {} = {}/{}".format(
+            self.user_id, self.course_id, self.usage_key, self.earned_graded, self.possible_graded
+        )
+
+
 # Signal that indicates that a user's score for a problem has been updated.
 # This signal is generated when a scoring event occurs either within the core
 # platform or in the Submissions module. Note that this signal will be triggered
@@ -8,7 +8,7 @@ import logging
 
 import static_replace
 
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
 from functools import partial
 from requests.auth import HTTPBasicAuth
 import dogstats_wrapper as dog_stats_api
@@ -30,6 +30,7 @@ from courseware.access import has_access, get_user_role
 from courseware.masquerade import (
     MasqueradingKeyValueStore,
     filter_displayed_blocks,
+    get_course_masquerade,
     is_masquerading_as_specific_student,
     setup_masquerade,
 )
@@ -42,6 +43,8 @@ from courseware.entrance_exams import (
 )
 from edxmako.shortcuts import render_to_string
 from eventtracking import tracker
+from lms.djangoapps.course_blocks.api import COURSE_BLOCK_ACCESS_TRANSFORMERS, get_course_blocks
+from lms.djangoapps.course_blocks.transformers.table_of_contents import TableOfContentsTransformer
 from lms.djangoapps.lms_xblock.field_data import LmsFieldData
 from lms.djangoapps.lms_xblock.runtime import LmsModuleSystem, unquote_slashes, quote_slashes
 from lms.djangoapps.lms_xblock.models import XBlockAsidesConfig
@@ -122,6 +125,12 @@ def make_track_function(request):
     return function
 
 
+# The fields of a chapter or section shown in the table of contents.
+TocBlock = namedtuple(
+    'TocBlock', 'location url_name display_name hide_from_toc format due graded is_time_limited'
+)
+
+
 def toc_for_course(user, request, course, active_chapter, active_section, field_data_cache):
     '''
     Create a table of contents from the module store
@@ -143,18 +152,23 @@ def toc_for_course(user, request, course, active_chapter, active_section, field_
     NOTE: assumes that if we got this far, user has access to course.  Returns
     None if this is not the case.
 
-    field_data_cache must include data from the course module and 2 levels of its descendents
+    The chapters and sections are read from the course blocks of the user,
+    without instantiating their modules, unless field overrides for the user
+    or a masquerade apply to the course, which the course blocks don't
+    reflect.  In that case, the modules are instantiated, and the sections
+    are added to field_data_cache, which must include data from the course
+    module and its chapters.
     '''
 
     with modulestore().bulk_operations(course.id):
-        course_module = get_module_for_descriptor(
-            user, request, course, field_data_cache, course.id, course=course
-        )
-        if course_module is None:
+        if OverrideFieldData.has_overrides(course, user) or get_course_masquerade(user, course.id):
+            chapters = _get_toc_chapters_from_modules(user, request, course, field_data_cache)
+        else:
+            chapters = _get_toc_chapters_from_course_blocks(user, course)
+        if chapters is None:
             return None
 
         toc_chapters = list()
-        chapters = course_module.get_display_items()
 
         # See if the course is gated by one or more content milestones
         required_content = milestones_helpers.get_required_content(course, user)
@@ -163,10 +177,10 @@ def toc_for_course(user, request, course, active_chapter, active_section, field_
         if not user_must_complete_entrance_exam(request, user, course):
             required_content = [content for content in required_content if not content == course.entrance_exam_id]
 
-        for chapter in chapters:
+        for chapter, chapter_sections in chapters:
             # Only show required content, if there is required content
             # chapter.hide_from_toc is read-only (boo)
-            display_id = slugify(chapter.display_name_with_default_escaped)
+            display_id = slugify(chapter.display_name)
             local_hide_from_toc = False
             if required_content:
                 if unicode(chapter.location) not in required_content:
@@ -177,14 +191,14 @@ def toc_for_course(user, request, course, active_chapter, active_section, field_
                 continue
 
             sections = list()
-            for section in chapter.get_display_items():
+            for section in chapter_sections:
 
                 active = (chapter.url_name == active_chapter and
                           section.url_name == active_section)
 
                 if not section.hide_from_toc:
                     section_context = {
-                        'display_name': section.display_name_with_default_escaped,
+                        'display_name': section.display_name,
                         'url_name': section.url_name,
                         'format': section.format if section.format is not None else '',
                         'due': section.due,
@@ -197,7 +211,7 @@ def toc_for_course(user, request, course, active_chapter, active_section, field_
                     #
 
                     section_is_time_limited = (
-                        getattr(section, 'is_time_limited', False) and
+                        section.is_time_limited and
                         settings.FEATURES.get('ENABLE_SPECIAL_EXAMS', False)
                     )
                     if section_is_time_limited:
@@ -247,7 +261,7 @@ def toc_for_course(user, request, course, active_chapter, active_section, field_
 
                     sections.append(section_context)
             toc_chapters.append({
-                'display_name': chapter.display_name_with_default_escaped,
+                'display_name': chapter.display_name,
                 'display_id': display_id,
                 'url_name': chapter.url_name,
                 'sections': sections,
@@ -256,6 +270,78 @@ def toc_for_course(user, request, course, active_chapter, active_section, field_
         return toc_chapters
 
 
+def _get_toc_chapters_from_course_blocks(user, course):
+    """
+    Returns a list of the chapters of the course that the user has access
+    to, each as a tuple of its TocBlock and the TocBlocks of its sections,
+    read from the course blocks of the user.  Returns None if the user
+    doesn't have access to the course.
+    """
+    course_usage_key = modulestore().make_course_usage_key(course.id)
+    block_structure = get_course_blocks(
+        user, course_usage_key, [TableOfContentsTransformer()] + COURSE_BLOCK_ACCESS_TRANSFORMERS
+    )
+    if not block_structure.has_block(course_usage_key):
+        return None
+
+    def toc_block(block_key):
+        """
+        Returns the TocBlock of the block with the given block_key.
+        """
+        return TocBlock(
+            location=block_key,
+            url_name=block_key.name,
+            display_name=TableOfContentsTransformer.get_display_name(block_structure, block_key),
+            hide_from_toc=block_structure.get_xblock_field(block_key, 'hide_from_toc', False),
+            format=block_structure.get_xblock_field(block_key, 'format'),
+            due=block_structure.get_xblock_field(block_key, 'due'),
+            graded=block_structure.get_xblock_field(block_key, 'graded', False),
+            is_time_limited=block_structure.get_xblock_field(block_key, 'is_time_limited', False),
+        )
+
+    return [
+        (toc_block(chapter_key), [toc_block(section_key) for section_key in block_structure.get_children(chapter_key)])
+        for chapter_key in block_structure.get_children(course_usage_key)
+    ]
+
+
+def _get_toc_chapters_from_modules(user, request, course, field_data_cache):
+    """
+    Returns a list of the chapters of the course that the user has access
+    to, each as a tuple of its TocBlock and the TocBlocks of its sections,
+    read from the course module and its descendents.  Returns None if the
+    user doesn't have access to the course.
+    """
+    field_data_cache.add_descriptors_to_cache(
+        [section for chapter in course.get_children() for section in chapter.get_children()]
+    )
+    course_module = get_module_for_descriptor(
+        user, request, course, field_data_cache, course.id, course=course
+    )
+    if course_module is None:
+        return None
+
+    def toc_block(module):
+        """
+        Returns the TocBlock of the given module.
+        """
+        return TocBlock(
+            location=module.location,
+            url_name=module.url_name,
+            display_name=module.display_name_with_default_escaped,
+            hide_from_toc=module.hide_from_toc,
+            format=module.format,
+            due=module.due,
+            graded=module.graded,
+            is_time_limited=getattr(module, 'is_time_limited', False),
+        )
+
+    return [
+        (toc_block(chapter), [toc_block(section) for section in chapter.get_display_items()])
+        for chapter in course_module.get_display_items()
+    ]
+
+
 def get_module(user, request, usage_key, field_data_cache,
                position=None, log_if_not_found=True, wrap_xmodule_display=True,
                grade_bucket_type=None, depth=0,
@@ -0,0 +1,94 @@
+"""
+Performance test comparing checking the access of a user to each block of a
+large course with has_access, one block at a time, and with the batched
+has_access_to_blocks.
+"""
+import datetime
+import time
+import unittest
+
+import pytz
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from courseware.access import has_access, has_access_to_blocks
+from courseware.tests.factories import BetaTesterFactory, StaffFactory, UserFactory
+from request_cache.middleware import RequestCache
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+# Shape of the synthetic course, of about 5000 blocks.
+NUM_CHAPTERS = 10
+NUM_SEQUENTIALS_PER_CHAPTER = 10
+NUM_PROBLEMS_PER_VERTICAL = 48
+
+
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class BlockAccessPerfTest(ModuleStoreTestCase):
+    """
+    Times checking the 'load' access of students, beta testers and staff to
+    every block of a synthetic course, and checks that both ways give the same
+    decisions.
+    """
+
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    def setUp(self):
+        super(BlockAccessPerfTest, self).setUp()
+        next_week = datetime.datetime.now(pytz.UTC) + datetime.timedelta(days=7)
+        self.course = CourseFactory.create(days_early_for_beta=10)
+        with self.store.bulk_operations(self.course.id, emit_signals=False):
+            for chapter_index in xrange(NUM_CHAPTERS):
+                # Half of the chapters haven't started yet.
+                chapter = ItemFactory.create(
+                    category='chapter',
+                    parent=self.course,
+                    start=next_week if chapter_index % 2 else self.course.start,
+                )
+                for __ in xrange(NUM_SEQUENTIALS_PER_CHAPTER):
+                    sequential = ItemFactory.create(category='sequential', parent=chapter)
+                    vertical = ItemFactory.create(category='vertical', parent=sequential)
+                    for __ in xrange(NUM_PROBLEMS_PER_VERTICAL):
+                        ItemFactory.create(category='problem', parent=vertical)
+        course = self.store.get_course(self.course.id, depth=None)
+        self.blocks = []
+        stack = [course]
+        while stack:
+            block = stack.pop()
+            self.blocks.append(block)
+            stack.extend(block.get_children())
+        self.users = [
+            ('student', UserFactory()),
+            ('beta tester', BetaTesterFactory(course_key=self.course.id)),
+            ('staff', StaffFactory(course_key=self.course.id)),
+        ]
+
+    def test_block_access(self):
+        print "{} blocks".format(len(self.blocks))
+        for name, user in self.users:
+            RequestCache.clear_request_cache()
+            with CaptureQueriesContext(connection) as single_queries:
+                start = time.time()
+                single_responses = [bool(has_access(user, 'load', block, self.course.id)) for block in self.blocks]
+                single_time = time.time() - start
+
+            RequestCache.clear_request_cache()
+            with CaptureQueriesContext(connection) as batched_queries:
+                start = time.time()
+                batched_responses = [
+                    bool(response) for response in has_access_to_blocks(user, 'load', self.blocks, self.course.id)
+                ]
+                batched_time = time.time() - start
+
+            self.assertEqual(single_responses, batched_responses)
+            print "  {:<12} has_access {:8.1f} ms ({} queries)   has_access_to_blocks {:8.1f} ms ({} queries)".format(
+                name,
+                1000 * single_time,
+                len(single_queries),
+                1000 * batched_time,
+                len(batched_queries),
+            )
@@ -0,0 +1,121 @@
+"""
+Performance test comparing per-student and batched grading of a course.
+"""
+import unittest
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from nose.plugins.skip import SkipTest
+
+from courseware.grades import grade, iterate_grades_for
+from courseware.models import StudentModule
+from student.models import CourseEnrollment
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+# The dependency below needs to be installed manually from the development.txt file, which doesn't
+# get installed during unit tests!
+try:
+    from code_block_timer import CodeBlockTimer
+except ImportError:
+    CodeBlockTimer = None
+
+# Number of learners enrolled in the synthetic course.
+NUM_LEARNERS = 10000
+
+# Shape of the synthetic course.
+NUM_SUBSECTIONS = 10
+NUM_PROBLEMS_PER_SUBSECTION = 5
+
+
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class GradeIterationPerfTest(ModuleStoreTestCase):
+    """
+    Times grading every learner of a synthetic course one student at a time
+    and through the batched iterate_grades_for, and checks that both give the
+    same grades.
+    """
+
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    def setUp(self):
+        super(GradeIterationPerfTest, self).setUp()
+        self.course = CourseFactory.create()
+        chapter = ItemFactory.create(category='chapter', parent=self.course)
+        problems = []
+        for __ in xrange(NUM_SUBSECTIONS):
+            sequential = ItemFactory.create(
+                category='sequential', parent=chapter, metadata={'graded': True, 'format': 'Homework'}
+            )
+            vertical = ItemFactory.create(category='vertical', parent=sequential)
+            problems.extend(
+                ItemFactory.create(category='problem', parent=vertical)
+                for __ in xrange(NUM_PROBLEMS_PER_SUBSECTION)
+            )
+
+        User.objects.bulk_create([
+            User(username='perf_learner_{}'.format(index), email='perf_learner_{}@example.com'.format(index))
+            for index in xrange(NUM_LEARNERS)
+        ])
+        self.students = list(User.objects.filter(username__startswith='perf_learner_').order_by('id'))
+        CourseEnrollment.objects.bulk_create([
+            CourseEnrollment(user=student, course_id=self.course.id, is_active=True)
+            for student in self.students
+        ])
+
+        # Every learner has answered every other problem, and got half of those right.
+        StudentModule.objects.bulk_create([
+            StudentModule(
+                student=student,
+                course_id=self.course.id,
+                module_state_key=problem.location,
+                grade=(index % 4) / 2,
+                max_grade=1,
+            )
+            for student in self.students
+            for index, problem in enumerate(problems)
+            if index % 2 == 0
+        ])
+
+    def _grade_per_student(self):
+        """Grade every learner the way iterate_grades_for used to."""
+        gradesets = {}
+        for student in self.students:
+            request = RequestFactory().get('/')
+            request.user = student
+            request.session = {}
+            gradesets[student.id] = grade(student, request, self.course)
+        return gradesets
+
+    def _grade_batched(self):
+        """Grade every learner through the batched iterate_grades_for."""
+        return {
+            student.id: gradeset
+            for student, gradeset, __ in iterate_grades_for(self.course, self.students)
+        }
+
+    def test_grade_iteration_timings(self):
+        if CodeBlockTimer is None:
+            raise SkipTest("CodeBlockTimer undefined.")
+
+        with CodeBlockTimer("GradeIteration:per_student:{}".format(NUM_LEARNERS)):
+            with CaptureQueriesContext(connection) as per_student_queries:
+                per_student_gradesets = self._grade_per_student()
+
+        with CodeBlockTimer("GradeIteration:batched:{}".format(NUM_LEARNERS)):
+            with CaptureQueriesContext(connection) as batched_queries:
+                batched_gradesets = self._grade_batched()
+
+        print "Queries: per student {}, batched {}".format(
+            len(per_student_queries), len(batched_queries)
+        )
+        for student in self.students:
+            self.assertEqual(
+                per_student_gradesets[student.id]['percent'], batched_gradesets[student.id]['percent']
+            )
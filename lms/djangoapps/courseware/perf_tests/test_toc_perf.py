@@ -0,0 +1,87 @@
+"""
+Performance test comparing building the courseware table of contents of a
+large course from its course modules and from its cached course blocks.
+"""
+import time
+import unittest
+
+from django.test.client import RequestFactory
+from mock import patch
+
+from courseware import module_render as render
+from courseware.field_overrides import OverrideFieldData
+from courseware.model_data import FieldDataCache
+from courseware.tests.factories import UserFactory
+from request_cache.middleware import RequestCache
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+# Shape of the synthetic course.
+NUM_CHAPTERS = 20
+NUM_SEQUENTIALS_PER_CHAPTER = 10
+NUM_PROBLEMS_PER_SEQUENTIAL = 10
+
+# Number of times the table of contents is built each way.
+NUM_CALLS = 10
+
+
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class TableOfContentsPerfTest(ModuleStoreTestCase):
+    """
+    Times building the table of contents of a synthetic course for a student,
+    from the course modules and from the course blocks, and checks that both
+    ways give the same table of contents.
+    """
+
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    def setUp(self):
+        super(TableOfContentsPerfTest, self).setUp()
+        self.course = CourseFactory.create()
+        with self.store.bulk_operations(self.course.id):
+            for __ in xrange(NUM_CHAPTERS):
+                chapter = ItemFactory.create(category='chapter', parent=self.course)
+                for __ in xrange(NUM_SEQUENTIALS_PER_CHAPTER):
+                    sequential = ItemFactory.create(category='sequential', parent=chapter, format='Homework')
+                    vertical = ItemFactory.create(category='vertical', parent=sequential)
+                    for __ in xrange(NUM_PROBLEMS_PER_SEQUENTIAL):
+                        ItemFactory.create(category='problem', parent=vertical)
+        self.user = UserFactory()
+        self.request = RequestFactory().get('/')
+        self.request.user = self.user
+
+    def build_toc(self):
+        """
+        Build the table of contents as the courseware index does, loading the
+        course and its field data cache two levels deep, and return it.
+        """
+        RequestCache.clear_request_cache()
+        course = self.store.get_course(self.course.id, depth=2)
+        field_data_cache = FieldDataCache.cache_for_descriptor_descendents(course.id, self.user, course, depth=2)
+        return render.toc_for_course(self.user, self.request, course, None, None, field_data_cache)
+
+    def test_toc(self):
+        with patch.object(OverrideFieldData, 'has_overrides', return_value=True):
+            from_modules = self.build_toc()
+            start = time.time()
+            for __ in xrange(NUM_CALLS):
+                self.build_toc()
+            modules_time = (time.time() - start) / NUM_CALLS
+
+        # cache the course blocks
+        from_course_blocks = self.build_toc()
+        start = time.time()
+        for __ in xrange(NUM_CALLS):
+            self.build_toc()
+        course_blocks_time = (time.time() - start) / NUM_CALLS
+
+        self.assertEqual(from_modules, from_course_blocks)
+        print "{} sections   modules {:8.1f} ms   course blocks {:8.1f} ms".format(
+            NUM_CHAPTERS * NUM_SEQUENTIALS_PER_CHAPTER,
+            1000 * modules_time,
+            1000 * course_blocks_time,
+        )
@@ -0,0 +1,161 @@
+"""
+Signal handlers that keep persisted subsection grades in sync with scores,
+cohorts and field overrides, and the access checks of the current request in
+sync with course access roles.
+"""
+import logging
+
+from ccx_keys.locator import CCXLocator
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey, UsageKey
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.exceptions import ItemNotFoundError
+
+from lms.djangoapps.ccx.models import CcxFieldOverride
+from openedx.core.djangoapps.course_groups.models import CourseUserGroup, CourseUserGroupPartitionGroup
+from student.models import CourseAccessRole
+
+from .access import has_access
+from .grades import persistent_grades_enabled
+from .models import PersistentSubsectionGrade, SCORE_CHANGED, StudentFieldOverride, StudentModule
+
+log = logging.getLogger("edx.courseware")
+
+
+@receiver(post_save, sender=CourseAccessRole)
+@receiver(post_delete, sender=CourseAccessRole)
+def _invalidate_access_checks_on_role_change(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Forget the access checks of the current request, as they may depend on the changed role.
+    """
+    has_access.clear_cache()
+
+
+@receiver(SCORE_CHANGED)
+def _invalidate_subsection_grades_on_score_change(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Consume signals that indicate score changes. See the definition of
+    courseware.models.SCORE_CHANGED for a description of the signal.
+    """
+    if not persistent_grades_enabled():
+        return
+
+    user_id = kwargs.get('user_id', None)
+    course_id = kwargs.get('course_id', None)
+    usage_id = kwargs.get('usage_id', None)
+    if None in (user_id, course_id, usage_id):
+        return
+
+    try:
+        course_key = CourseKey.from_string(course_id)
+        usage_key = UsageKey.from_string(usage_id).map_into_course(course_key)
+    except InvalidKeyError:
+        log.warning(u"Unable to invalidate subsection grades for course %s, usage %s", course_id, usage_id)
+        return
+
+    invalidate_subsection_grades(user_id, course_key, usage_key)
+
+
+@receiver(post_delete, sender=StudentModule)
+def _invalidate_subsection_grades_on_state_delete(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Deleting student state (e.g. when an instructor resets a problem) can
+    change the student's score without sending SCORE_CHANGED.
+    """
+    if not persistent_grades_enabled():
+        return
+
+    course_key = instance.course_id
+    invalidate_subsection_grades(
+        instance.student_id, course_key, instance.module_state_key.map_into_course(course_key)
+    )
+
+
+@receiver(m2m_changed, sender=CourseUserGroup.users.through)
+def _invalidate_subsection_grades_on_cohort_change(
+        sender, instance, action, reverse, pk_set, **kwargs
+):  # pylint: disable=unused-argument
+    """
+    Moving users between cohorts can change the content groups, and so the
+    content, they are graded on.
+    """
+    if not persistent_grades_enabled() or action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    if reverse:
+        # The cohorts of a user changed.
+        groups = instance.course_groups.all()
+        if pk_set is not None:
+            groups = CourseUserGroup.objects.filter(pk__in=pk_set)
+        for course_key in set(group.course_id for group in groups):
+            PersistentSubsectionGrade.invalidate(instance.id, course_key)
+    else:
+        # The users of a cohort changed.
+        user_ids = pk_set
+        if user_ids is None:
+            user_ids = instance.users.values_list('id', flat=True)
+        PersistentSubsectionGrade.invalidate_users(instance.course_id, user_ids)
+
+
+@receiver(post_save, sender=CourseUserGroupPartitionGroup)
+@receiver(post_delete, sender=CourseUserGroupPartitionGroup)
+def _invalidate_subsection_grades_on_cohort_group_change(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Changing the content group of a cohort changes the content its users are
+    graded on.
+    """
+    if not persistent_grades_enabled():
+        return
+
+    cohort = instance.course_user_group
+    PersistentSubsectionGrade.invalidate_users(cohort.course_id, cohort.users.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=StudentFieldOverride)
+@receiver(post_delete, sender=StudentFieldOverride)
+def _invalidate_subsection_grades_on_student_override(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Individual due dates and other fields overridden for a student can change
+    what the student is graded on.
+    """
+    if not persistent_grades_enabled():
+        return
+
+    PersistentSubsectionGrade.invalidate(instance.student_id, instance.course_id)
+
+
+@receiver(post_save, sender=CcxFieldOverride)
+@receiver(post_delete, sender=CcxFieldOverride)
+def _invalidate_subsection_grades_on_ccx_override(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    The field overrides of a CCX, e.g. its schedule and grading policy, apply
+    to all of its learners.
+    """
+    if not persistent_grades_enabled():
+        return
+
+    ccx = instance.ccx
+    PersistentSubsectionGrade.invalidate_users(CCXLocator.from_course_locator(ccx.course_id, ccx.id))
+
+
+def invalidate_subsection_grades(user_id, course_key, usage_key):
+    """
+    Delete the persisted grades of the user for every subsection that contains
+    `usage_key`, so they are recomputed the next time the user is graded.
+
+    Only the ancestors of the block are invalidated. If the block can no longer
+    be found in the course, all of the user's grades in the course are dropped.
+    """
+    store = modulestore()
+    ancestors = []
+    try:
+        location = store.get_parent_location(usage_key)
+        while location is not None:
+            ancestors.append(location)
+            location = store.get_parent_location(location)
+    except ItemNotFoundError:
+        ancestors = None
+
+    PersistentSubsectionGrade.invalidate(user_id, course_key, ancestors)
@@ -4,6 +4,8 @@ by the individual due dates feature.
 """
 import json
 
+import request_cache
+
 from .field_overrides import FieldOverrideProvider
 from .models import StudentFieldOverride
 
@@ -17,11 +19,24 @@ class IndividualStudentOverrideProvider(FieldOverrideProvider):
     def get(self, block, name, default):
         return get_override_for_user(self.user, block, name, default)
 
+    def prefetch(self, course_key):
+        """
+        Load all of the user's overrides in the course in a single query.
+        """
+        _get_overrides_for_user(self.user, course_key)
+
     @classmethod
     def enabled_for(cls, course):
         """This simple override provider is always enabled"""
         return True
 
+    @classmethod
+    def has_overrides(cls, course, user):
+        """
+        Only users with individual overrides in the course have them.
+        """
+        return bool(_get_overrides_for_user(user, course.id))
+
 
 def get_override_for_user(user, block, name, default=None):
     """
@@ -29,31 +44,56 @@ def get_override_for_user(user, block, name, default=None):
     specify the block and the name of the field.  If the field is not
     overridden for the given user, returns `default`.
     """
-    if not hasattr(block, '_student_overrides'):
-        block._student_overrides = {}  # pylint: disable=protected-access
-    overrides = block._student_overrides.get(user.id)  # pylint: disable=protected-access
-    if overrides is None:
-        overrides = _get_overrides_for_user(user, block)
-        block._student_overrides[user.id] = overrides  # pylint: disable=protected-access
-    return overrides.get(name, default)
+    return _get_overrides_for_user(user, block.runtime.course_id).get(block, name, default)
 
 
-def _get_overrides_for_user(user, block):
+@request_cache.request_cached(name='student-field-overrides', key=lambda user, course_key: (user.id, course_key))
+def _get_overrides_for_user(user, course_key):
     """
-    Gets all of the individual student overrides for given user and block.
-    Returns a dictionary of field override values keyed by field name.
+    Gets all of the individual student overrides for given user in the given
+    course, as `_StudentOverrides`.
+
+    The overrides are loaded with one query, and kept in the request cache
+    during requests.  Outside of requests, e.g. when grading in tasks, they
+    are loaded again by every call, so they are never stale.
     """
+    overrides = {}
     query = StudentFieldOverride.objects.filter(
-        course_id=block.runtime.course_id,
-        location=block.location,
+        course_id=course_key,
         student_id=user.id,
     )
-    overrides = {}
     for override in query:
-        field = block.fields[override.field]
-        value = field.from_json(json.loads(override.value))
-        overrides[override.field] = value
-    return overrides
+        location = override.location.map_into_course(course_key)
+        overrides.setdefault(location, {})[override.field] = json.loads(override.value)
+    return _StudentOverrides(overrides)
+
+
+class _StudentOverrides(object):
+    """
+    The individual overrides of a student in a course.
+
+    The JSON values of the overrides are decoded on first use.
+    """
+    def __init__(self, json_values):
+        # block location -> field name -> JSON value
+        self.json_values = json_values
+        self._values = {}
+
+    def __nonzero__(self):
+        return bool(self.json_values)
+
+    def get(self, block, name, default):
+        """
+        Returns the value of the overridden field `name` of `block`, or
+        `default` if it is not overridden.
+        """
+        cache_key = (block.location, name)
+        if cache_key not in self._values:
+            block_overrides = self.json_values.get(block.location, {})
+            if name not in block_overrides:
+                return default
+            self._values[cache_key] = block.fields[name].from_json(block_overrides[name])
+        return self._values[cache_key]
 
 
 def override_field_for_user(user, block, name, value):
@@ -70,6 +110,7 @@ def override_field_for_user(user, block, name, value):
     field = block.fields[name]
     override.value = json.dumps(field.to_json(value))
     override.save()
+    _get_overrides_for_user.clear_cache()
 
 
 def clear_override_for_user(user, block, name):
@@ -87,3 +128,4 @@ def clear_override_for_user(user, block, name):
             field=name).delete()
     except StudentFieldOverride.DoesNotExist:
         pass
+    _get_overrides_for_user.clear_cache()
@@ -44,7 +44,7 @@ from xmodule.course_module import (
     CATALOG_VISIBILITY_ABOUT,
     CATALOG_VISIBILITY_NONE,
 )
-from xmodule.modulestore.tests.factories import CourseFactory
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.django_utils import (
     ModuleStoreTestCase,
     SharedModuleStoreTestCase,
@@ -691,3 +691,83 @@ class CourseOverviewAccessTestCase(ModuleStoreTestCase):
         course_overview = CourseOverview.get_from_id(course.id)
         with self.assertNumQueries(num_queries):
             bool(access.has_access(user, action, course_overview, course_key=course.id))
+
+
+@attr('shard_1')
+@ddt.ddt
+class BlockAccessCheckerTestCase(ModuleStoreTestCase):
+    """
+    Tests confirming that the batched access checks of has_access_to_blocks
+    give the same results as has_access.
+    """
+
+    def setUp(self):
+        super(BlockAccessCheckerTestCase, self).setUp()
+
+        today = datetime.datetime.now(pytz.UTC)
+        yesterday = today - datetime.timedelta(days=1)
+        next_week = today + datetime.timedelta(days=7)
+
+        self.course = CourseFactory.create(start=yesterday, days_early_for_beta=10)
+        self.blocks = []
+        for start, visible_to_staff_only in itertools.product((yesterday, next_week), (False, True)):
+            chapter = ItemFactory.create(
+                category='chapter',
+                parent=self.course,
+                start=start,
+                visible_to_staff_only=visible_to_staff_only,
+            )
+            sequential = ItemFactory.create(category='sequential', parent=chapter)
+            self.blocks.extend([chapter, sequential])
+        # A block the beta testers of the course can already load.
+        self.blocks.append(
+            ItemFactory.create(category='sequential', parent=chapter, start=today + datetime.timedelta(days=3))
+        )
+        self.blocks = [self.store.get_item(block.location) for block in self.blocks]
+
+        self.user_anonymous = AnonymousUserFactory()
+        self.user_normal = UserFactory()
+        self.user_beta_tester = BetaTesterFactory(course_key=self.course.id)
+        self.user_course_staff = StaffFactory(course_key=self.course.id)
+        self.user_course_instructor = InstructorFactory(course_key=self.course.id)
+        self.user_global_staff = GlobalStaffFactory()
+
+    @ddt.data(*itertools.product(
+        [
+            'user_anonymous', 'user_normal', 'user_beta_tester',
+            'user_course_staff', 'user_course_instructor', 'user_global_staff',
+        ],
+        ['load', 'staff', 'instructor'],
+    ))
+    @ddt.unpack
+    @patch.dict('django.conf.settings.FEATURES', {'DISABLE_START_DATES': False})
+    def test_parity_with_has_access(self, user_attr_name, action):
+        user = getattr(self, user_attr_name)
+        responses = access.has_access_to_blocks(user, action, self.blocks, self.course.id)
+        self.assertEqual(
+            [response.to_json() for response in responses],
+            [access.has_access(user, action, block, self.course.id).to_json() for block in self.blocks],
+        )
+
+    @ddt.data('user_normal', 'user_course_staff')
+    @patch.dict('django.conf.settings.FEATURES', {'DISABLE_START_DATES': False})
+    def test_parity_with_has_access_for_usage_keys(self, user_attr_name):
+        user = getattr(self, user_attr_name)
+        usage_keys = [block.location for block in self.blocks]
+        self.assertEqual(
+            [response.to_json() for response in access.has_access_to_blocks(user, 'staff', usage_keys)],
+            [access.has_access(user, 'staff', usage_key).to_json() for usage_key in usage_keys],
+        )
+
+    @patch.dict('django.conf.settings.FEATURES', {'DISABLE_START_DATES': False})
+    def test_roles_looked_up_once(self):
+        with patch('courseware.access._has_access_to_course', wraps=access._has_access_to_course) as mock_access:
+            with patch('courseware.access.CourseBetaTesterRole', wraps=access.CourseBetaTesterRole) as mock_role:
+                access.has_access_to_blocks(self.user_normal, 'load', self.blocks, self.course.id)
+        mock_access.assert_called_once_with(self.user_normal, 'staff', self.course.id)
+        mock_role.assert_called_once_with(self.course.id)
+
+    def test_unknown_action(self):
+        with self.assertRaises(ValueError):
+            access.has_access_to_blocks(self.user_normal, 'not_load_or_staff', self.blocks, self.course.id)
+
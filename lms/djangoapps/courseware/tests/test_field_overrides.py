@@ -2,6 +2,7 @@
 Tests for `field_overrides` module.
 """
 import unittest
+from mock import patch
 from nose.plugins.attrib import attr
 
 from django.test.utils import override_settings
@@ -89,6 +90,11 @@ class OverrideFieldDataTests(ModuleStoreTestCase):
         with disable_overrides():
             self.assertEqual(data.get('block', 'foo'), 'baz')
 
+    def test_prefetch(self):
+        with patch.object(TestOverrideProvider, 'prefetch') as mock_prefetch:
+            self.make_one()
+        mock_prefetch.assert_called_once_with(self.course.id)
+
     @override_settings(FIELD_OVERRIDE_PROVIDERS=())
     def test_no_overrides_configured(self):
         data = self.make_one()
@@ -1,6 +1,8 @@
 """
 Test grade calculation.
 """
+from django.conf import settings
+from django.db import DatabaseError
 from django.http import Http404
 from django.test import TestCase
 from django.test.client import RequestFactory
@@ -10,14 +12,26 @@ from nose.plugins.attrib import attr
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 from opaque_keys.edx.locator import CourseLocator, BlockUsageLocator
 
-from courseware.grades import field_data_cache_for_grading, grade, iterate_grades_for, MaxScoresCache, ProgressSummary
+from courseware.grades import (
+    course_version_for_grades,
+    field_data_cache_for_grading,
+    grade,
+    iterate_grades_for,
+    MaxScoresCache,
+    progress_summary,
+    ProgressSummary,
+)
+from courseware.model_data import set_score
+from courseware.models import PersistentSubsectionGrade, SCORE_CHANGED, StudentFieldOverride
+from courseware.tests.factories import StudentModuleFactory
+from openedx.core.djangoapps.course_groups.models import CourseUserGroup
 from student.tests.factories import UserFactory
 from student.models import CourseEnrollment
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 
 
-def _grade_with_errors(student, request, course, keep_raw_scores=False):
+def _grade_with_errors(student, request, course, keep_raw_scores=False, **kwargs):
     """This fake grade method will throw exceptions for student3 and
     student4, but allow any other students to go through normal grading.
 
@@ -28,7 +42,7 @@ def _grade_with_errors(student, request, course, keep_raw_scores=False):
     if student.username in ['student3', 'student4']:
         raise Exception("I don't like {}".format(student.username))
 
-    return grade(student, request, course, keep_raw_scores=keep_raw_scores)
+    return grade(student, request, course, keep_raw_scores=keep_raw_scores, **kwargs)
 
 
 @attr('shard_1')
@@ -111,8 +125,36 @@ class TestGradeIteration(ModuleStoreTestCase):
         self.assertTrue(all_gradesets[student2])
         self.assertTrue(all_gradesets[student5])
 
+    def test_batched_grades_match_individual_grades(self):
+        """Grading students in batches gives the same grades as grading them one by one."""
+        chapter = ItemFactory.create(category='chapter', parent=self.course)
+        sequential = ItemFactory.create(
+            category='sequential', parent=chapter, metadata={'graded': True, 'format': 'Homework'}
+        )
+        problems = [ItemFactory.create(category='problem', parent=sequential) for __ in xrange(2)]
+        set_score(self.students[0].id, problems[0].location, 1, 1)
+        set_score(self.students[1].id, problems[0].location, 0, 1)
+        set_score(self.students[1].id, problems[1].location, 1, 1)
+        self.course = self.store.get_course(self.course.id)
+
+        expected_percents = {}
+        for student in self.students:
+            request = RequestFactory().get('/')
+            request.user = student
+            request.session = {}
+            expected_percents[student] = grade(student, request, self.course)['percent']
+
+        all_gradesets, all_errors = self._gradesets_and_errors_for(self.course.id, self.students, batch_size=2)
+        self.assertEqual(all_errors, {})
+        self.assertEqual(
+            {student: gradeset['percent'] for student, gradeset in all_gradesets.items()},
+            expected_percents
+        )
+        self.assertGreater(expected_percents[self.students[0]], 0)
+        self.assertEqual(expected_percents[self.students[2]], 0)
+
     ################################# Helpers #################################
-    def _gradesets_and_errors_for(self, course_id, students):
+    def _gradesets_and_errors_for(self, course_id, students, batch_size=None):
         """Simple helper method to iterate through student grades and give us
         two dictionaries -- one that has all students and their respective
         gradesets, and one that has only students that could not be graded and
@@ -120,7 +162,7 @@ class TestGradeIteration(ModuleStoreTestCase):
         students_to_gradesets = {}
         students_to_errors = {}
 
-        for student, gradeset, err_msg in iterate_grades_for(course_id, students):
+        for student, gradeset, err_msg in iterate_grades_for(course_id, students, batch_size=batch_size):
             students_to_gradesets[student] = gradeset
             if err_msg:
                 students_to_errors[student] = err_msg
@@ -318,3 +360,142 @@ class TestProgressSummary(TestCase):
         earned, possible = self.progress_summary.score_for_module(self.loc_m)
         self.assertEqual(earned, 0)
         self.assertEqual(possible, 0)
+
+
+@patch.dict(settings.FEATURES, {'ENABLE_PERSISTENT_SUBSECTION_GRADES': True})
+class TestPersistentSubsectionGrades(ModuleStoreTestCase):
+    """
+    Tests for reading and writing grades through PersistentSubsectionGrade.
+    """
+    def setUp(self):
+        super(TestPersistentSubsectionGrades, self).setUp()
+        self.student = UserFactory.create()
+        self.course = CourseFactory.create()
+        chapter = ItemFactory.create(category='chapter', parent=self.course)
+        self.sequential = ItemFactory.create(
+            category='sequential', parent=chapter, metadata={'graded': True, 'format': 'Homework'}
+        )
+        vertical = ItemFactory.create(category='vertical', parent=self.sequential)
+        self.problem = ItemFactory.create(category='problem', parent=vertical)
+
+        CourseEnrollment.enroll(self.student, self.course.id)
+        self.request = RequestFactory().get('/')
+        self.request.user = self.student
+        self.request.session = {}
+
+    def _stored_grades(self):
+        """Return the stored grades of the student, keyed by usage key."""
+        return PersistentSubsectionGrade.read_grades(
+            self.student.id, self.course.id, course_version_for_grades(self.course)
+        )
+
+    def test_grading_stores_subsection_grades(self):
+        grade(self.student, self.request, self.course)
+        self.assertEqual(self._stored_grades().keys(), [self.sequential.location])
+
+    def test_stored_grades_skip_student_state(self):
+        first_grade = grade(self.student, self.request, self.course)
+        with patch('courseware.grades.field_data_cache_for_grading') as mock_field_data_cache:
+            second_grade = grade(self.student, self.request, self.course)
+        self.assertFalse(mock_field_data_cache.called)
+        self.assertEqual(first_grade['percent'], second_grade['percent'])
+        self.assertEqual(first_grade['totaled_scores'], second_grade['totaled_scores'])
+
+    def test_stored_grades_ignored_for_other_course_versions(self):
+        grade(self.student, self.request, self.course)
+        PersistentSubsectionGrade.objects.update(course_version='an older version')
+        with patch('courseware.grades.field_data_cache_for_grading') as mock_field_data_cache:
+            mock_field_data_cache.return_value = field_data_cache_for_grading(self.course, self.student)
+            grade(self.student, self.request, self.course)
+        self.assertTrue(mock_field_data_cache.called)
+
+    def test_score_change_invalidates_subsection(self):
+        grade(self.student, self.request, self.course)
+        SCORE_CHANGED.send(
+            sender=None,
+            points_possible=1,
+            points_earned=1,
+            user_id=self.student.id,
+            course_id=unicode(self.course.id),
+            usage_id=unicode(self.problem.location),
+        )
+        self.assertEqual(self._stored_grades(), {})
+
+    def test_concurrently_stored_grades_kept(self):
+        grade(self.student, self.request, self.course)
+        stored_grade = self._stored_grades()[self.sequential.location]
+        total = stored_grade.graded_total('')
+        # Another grading stored the subsection after this one deleted its grade.
+        with patch.object(PersistentSubsectionGrade, '_delete_grades'):
+            PersistentSubsectionGrade.save_grades(
+                self.student.id,
+                self.course.id,
+                course_version_for_grades(self.course),
+                {self.sequential.location: (None, total, total)},
+            )
+        self.assertEqual(self._stored_grades()[self.sequential.location].id, stored_grade.id)
+
+    def test_grades_invalidated_while_grading_not_stored(self):
+        generation = PersistentSubsectionGrade.invalidation_generations([self.student.id], self.course.id)
+        # The score changes after this grading read the scores.
+        grade_summary = grade(self.student, self.request, self.course)
+        PersistentSubsectionGrade.invalidate(self.student.id, self.course.id, [self.sequential.location])
+        total = grade_summary['totaled_scores']['Homework'][0]
+        PersistentSubsectionGrade.save_grades(
+            self.student.id,
+            self.course.id,
+            course_version_for_grades(self.course),
+            {self.sequential.location: (None, total, total)},
+            generation[self.student.id],
+        )
+        self.assertEqual(self._stored_grades(), {})
+
+        # Grades of subsections invalidated before the grading are stored.
+        PersistentSubsectionGrade.save_grades(
+            self.student.id,
+            self.course.id,
+            course_version_for_grades(self.course),
+            {self.sequential.location: (None, total, total)},
+            PersistentSubsectionGrade.invalidation_generations([self.student.id], self.course.id)[self.student.id],
+        )
+        self.assertEqual(self._stored_grades().keys(), [self.sequential.location])
+
+    def test_database_errors_logged(self):
+        with patch.object(PersistentSubsectionGrade.objects, 'bulk_create', side_effect=DatabaseError):
+            grade_summary = grade(self.student, self.request, self.course)
+        self.assertIn('percent', grade_summary)
+        self.assertEqual(self._stored_grades(), {})
+
+    def test_cohort_change_invalidates_grades(self):
+        grade(self.student, self.request, self.course)
+        cohort = CourseUserGroup.objects.create(
+            name='cohort', course_id=self.course.id, group_type=CourseUserGroup.COHORT
+        )
+        cohort.users.add(self.student)
+        self.assertEqual(self._stored_grades(), {})
+
+    def test_student_override_invalidates_grades(self):
+        grade(self.student, self.request, self.course)
+        StudentFieldOverride.objects.create(
+            course_id=self.course.id, location=self.sequential.location, student=self.student, field='due'
+        )
+        self.assertEqual(self._stored_grades(), {})
+
+    def test_progress_summary_uses_stored_problem_scores(self):
+        StudentModuleFactory.create(
+            student=self.student, course_id=self.course.id, module_state_key=self.problem.location,
+            grade=1, max_grade=2,
+        )
+        with patch.dict(settings.FEATURES, {'ENABLE_PERSISTENT_SUBSECTION_GRADES': False}):
+            expected = progress_summary(self.student, self.request, self.course)
+
+        grade(self.student, self.request, self.course)
+        with patch('courseware.grades.yield_dynamic_descriptor_descendants') as mock_descendants:
+            actual = progress_summary(self.student, self.request, self.course)
+        self.assertFalse(mock_descendants.called)
+        self.assertEqual(actual, expected)
+
+    @patch.dict(settings.FEATURES, {'ENABLE_PERSISTENT_SUBSECTION_GRADES': False})
+    def test_disabled(self):
+        grade(self.student, self.request, self.course)
+        self.assertEqual(self._stored_grades(), {})
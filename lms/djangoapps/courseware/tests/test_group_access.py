@@ -183,8 +183,14 @@ class GroupAccessTestCase(ModuleStoreTestCase):
         """
         DRY helper.
         """
+        block = modulestore().get_item(block_location)
+        self.assertIs(
+            bool(access.has_access(user, 'load', block, self.course.id)),
+            is_accessible
+        )
+        # The batched access checks give the same result.
         self.assertIs(
-            bool(access.has_access(user, 'load', modulestore().get_item(block_location), self.course.id)),
+            bool(access.has_access_to_blocks(user, 'load', [block], self.course.id)[0]),
             is_accessible
         )
 
@@ -5,6 +5,7 @@ Test for lms courseware app, module render unit
 import ddt
 import itertools
 import json
+from datetime import datetime
 from nose.plugins.attrib import attr
 from functools import partial
 
@@ -19,6 +20,7 @@ from mock import MagicMock, patch, Mock
 from opaque_keys.edx.keys import UsageKey, CourseKey
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 from pyquery import PyQuery
+from pytz import UTC
 from courseware.module_render import hash_resource
 from xblock.field_data import FieldData
 from xblock.runtime import Runtime
@@ -34,6 +36,7 @@ from courseware.field_overrides import OverrideFieldData
 from courseware.model_data import FieldDataCache
 from courseware.module_render import hash_resource, get_module_for_descriptor
 from courseware.models import StudentModule
+from courseware.student_field_overrides import override_field_for_user
 from courseware.tests.factories import StudentModuleFactory, UserFactory, GlobalStaffFactory
 from courseware.tests.tests import LoginEnrollmentTestCase
 from courseware.tests.test_submitting_problems import TestSubmittingProblems
@@ -630,11 +633,9 @@ class TestTOC(ModuleStoreTestCase):
     # Split makes 6 queries to load the course to depth 2:
     #     - load the structure
     #     - load 5 definitions
-    # Split makes 5 queries to render the toc:
+    # Split makes 1 query to render the toc, once the course blocks are cached:
     #     - it loads the active version at the start of the bulk operation
-    #     - it loads 4 definitions, because it instantiates 4 VideoModules
-    #       each of which access a Scope.content field in __init__
-    @ddt.data((ModuleStoreEnum.Type.mongo, 3, 0, 0), (ModuleStoreEnum.Type.split, 6, 0, 5))
+    @ddt.data((ModuleStoreEnum.Type.mongo, 3, 0, 0), (ModuleStoreEnum.Type.split, 6, 0, 1))
     @ddt.unpack
     def test_toc_toy_from_chapter(self, default_ms, setup_finds, setup_sends, toc_finds):
         with self.store.default_store(default_ms):
@@ -656,6 +657,8 @@ class TestTOC(ModuleStoreTestCase):
                           'url_name': 'secret:magic', 'display_name': 'secret:magic', 'display_id': 'secretmagic'}])
 
             course = self.store.get_course(self.toy_course.id, depth=2)
+            # cache the course blocks
+            render.toc_for_course(self.request.user, self.request, course, self.chapter, None, self.field_data_cache)
             with check_mongo_calls(toc_finds):
                 actual = render.toc_for_course(
                     self.request.user, self.request, course, self.chapter, None, self.field_data_cache
@@ -670,11 +673,9 @@ class TestTOC(ModuleStoreTestCase):
     # Split makes 6 queries to load the course to depth 2:
     #     - load the structure
     #     - load 5 definitions
-    # Split makes 5 queries to render the toc:
+    # Split makes 1 query to render the toc, once the course blocks are cached:
     #     - it loads the active version at the start of the bulk operation
-    #     - it loads 4 definitions, because it instantiates 4 VideoModules
-    #       each of which access a Scope.content field in __init__
-    @ddt.data((ModuleStoreEnum.Type.mongo, 3, 0, 0), (ModuleStoreEnum.Type.split, 6, 0, 5))
+    @ddt.data((ModuleStoreEnum.Type.mongo, 3, 0, 0), (ModuleStoreEnum.Type.split, 6, 0, 1))
     @ddt.unpack
     def test_toc_toy_from_section(self, default_ms, setup_finds, setup_sends, toc_finds):
         with self.store.default_store(default_ms):
@@ -695,6 +696,10 @@ class TestTOC(ModuleStoreTestCase):
                             'format': '', 'due': None, 'active': False}],
                           'url_name': 'secret:magic', 'display_name': 'secret:magic', 'display_id': 'secretmagic'}])
 
+            # cache the course blocks
+            render.toc_for_course(
+                self.request.user, self.request, self.toy_course, self.chapter, section, self.field_data_cache
+            )
             with check_mongo_calls(toc_finds):
                 actual = render.toc_for_course(
                     self.request.user, self.request, self.toy_course, self.chapter, section, self.field_data_cache
@@ -702,6 +707,69 @@ class TestTOC(ModuleStoreTestCase):
             for toc_section in expected:
                 self.assertIn(toc_section, actual)
 
+    @ddt.data((ModuleStoreEnum.Type.mongo, 3), (ModuleStoreEnum.Type.split, 6))
+    @ddt.unpack
+    def test_toc_from_course_blocks_matches_modules(self, default_ms, setup_finds):
+        with self.store.default_store(default_ms):
+            self.setup_request_and_course(setup_finds, 0)
+            section = 'Welcome'
+            with patch.object(render, 'get_module_for_descriptor') as get_module:
+                from_course_blocks = render.toc_for_course(
+                    self.request.user, self.request, self.toy_course, self.chapter, section, self.field_data_cache
+                )
+            self.assertFalse(get_module.called)
+
+            with patch.object(OverrideFieldData, 'has_overrides', return_value=True):
+                from_modules = render.toc_for_course(
+                    self.request.user, self.request, self.toy_course, self.chapter, section, self.field_data_cache
+                )
+            self.assertEqual(from_course_blocks, from_modules)
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_toc_hides_blocks_without_access(self, default_ms):
+        with self.store.default_store(default_ms):
+            course = CourseFactory.create()
+            chapter = ItemFactory.create(parent=course, category='chapter', display_name='Chapter <1>')
+            ItemFactory.create(parent=chapter, category='sequential', display_name='Visible')
+            ItemFactory.create(parent=chapter, category='sequential', display_name='Staff', visible_to_staff_only=True)
+            ItemFactory.create(parent=course, category='chapter', display_name='Staff', visible_to_staff_only=True)
+            user = UserFactory()
+            request = RequestFactory().get('/')
+            request.user = user
+            course = self.store.get_course(course.id, depth=2)
+            field_data_cache = FieldDataCache.cache_for_descriptor_descendents(course.id, user, course, depth=2)
+
+            toc = render.toc_for_course(user, request, course, None, None, field_data_cache)
+        self.assertEqual([chapter['display_name'] for chapter in toc], ['Chapter &lt;1&gt;'])
+
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    @override_settings(
+        FIELD_OVERRIDE_PROVIDERS=('courseware.student_field_overrides.IndividualStudentOverrideProvider',)
+    )
+    def test_toc_with_individual_due_dates(self, default_ms):
+        OverrideFieldData.provider_classes = None
+        self.addCleanup(setattr, OverrideFieldData, 'provider_classes', None)
+        with self.store.default_store(default_ms):
+            course = CourseFactory.create()
+            chapter = ItemFactory.create(parent=course, category='chapter')
+            ItemFactory.create(parent=chapter, category='sequential')
+            user = UserFactory()
+            request = RequestFactory().get('/')
+            request.user = user
+            course = self.store.get_course(course.id, depth=2)
+            field_data_cache = FieldDataCache.cache_for_descriptor_descendents(course.id, user, course, depth=1)
+
+            # The course blocks are used for users without individual due dates.
+            with patch.object(render, 'get_module_for_descriptor') as get_module:
+                render.toc_for_course(user, request, course, None, None, field_data_cache)
+            self.assertFalse(get_module.called)
+
+            due = datetime(2030, 1, 1, tzinfo=UTC)
+            override_field_for_user(user, course.get_children()[0].get_children()[0], 'due', due)
+            toc = render.toc_for_course(user, request, course, None, None, field_data_cache)
+        self.assertEqual(toc[0]['sections'][0]['due'], due)
+        self.assertEqual([section['display_name'] for section in toc[0]['sections']], ['Visible'])
+
 
 @attr('shard_1')
 @ddt.ddt
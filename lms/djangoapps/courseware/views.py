@@ -411,8 +411,9 @@ def _index_bulk_op(request, course_key, chapter, section, position):
     bookmarks_api_url = reverse('bookmarks')
 
     try:
+        # The sections are only added to the cache when they are needed.
         field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
-            course_key, user, course, depth=2)
+            course_key, user, course, depth=1)
 
         course_module = get_module_for_descriptor(
             user, request, course, field_data_cache, course_key, course=course
@@ -987,10 +988,11 @@ def _progress(request, course_key, student_id):
         field_data_cache = grades.field_data_cache_for_grading(course, student)
         scores_client = ScoresClient.from_field_data_cache(field_data_cache)
 
-    courseware_summary = grades.progress_summary(
+    # Grade first, so that the progress summary reads the subsection grades it stores.
+    grade_summary = grades.grade(
         student, request, course, field_data_cache=field_data_cache, scores_client=scores_client
     )
-    grade_summary = grades.grade(
+    courseware_summary = grades.progress_summary(
         student, request, course, field_data_cache=field_data_cache, scores_client=scores_client
     )
     studio_url = get_studio_url(course, 'settings/grading')
@@ -26,7 +26,7 @@ from django_comment_common.models import (
 from lms.lib.comment_client.comment import Comment
 from lms.lib.comment_client.thread import Thread
 from lms.lib.comment_client.user import User as CommentClientUser
-from lms.lib.comment_client.utils import CommentClientRequestError
+from lms.lib.comment_client.utils import CommentClientRequestError, perform_concurrently
 from openedx.core.djangoapps.course_groups.cohorts import get_cohort_names
 
 
@@ -35,22 +35,26 @@ def get_context(course, request, thread=None):
     Returns a context appropriate for use with ThreadSerializer or
     (if thread is provided) CommentSerializer.
     """
-    # TODO: cache staff_user_ids and ta_user_ids if we need to improve perf
-    staff_user_ids = {
-        user.id
-        for role in Role.objects.filter(
-            name__in=[FORUM_ROLE_ADMINISTRATOR, FORUM_ROLE_MODERATOR],
-            course_id=course.id
-        )
-        for user in role.users.all()
-    }
-    ta_user_ids = {
-        user.id
-        for role in Role.objects.filter(name=FORUM_ROLE_COMMUNITY_TA, course_id=course.id)
-        for user in role.users.all()
-    }
+    def get_user_ids(role_names):
+        """
+        Return the ids of the users with the forum roles role_names in the course.
+        """
+        # TODO: cache staff_user_ids and ta_user_ids if we need to improve perf
+        return {
+            user.id
+            for role in Role.objects.filter(name__in=role_names, course_id=course.id)
+            for user in role.users.all()
+        }
+
     requester = request.user
-    cc_requester = CommentClientUser.from_django_user(requester).retrieve()
+    # The comments service retrieves the requester while the roles are queried.
+    (staff_user_ids, ta_user_ids), cc_requester = perform_concurrently(
+        lambda: (
+            get_user_ids([FORUM_ROLE_ADMINISTRATOR, FORUM_ROLE_MODERATOR]),
+            get_user_ids([FORUM_ROLE_COMMUNITY_TA]),
+        ),
+        CommentClientUser.from_django_user(requester).retrieve,
+    )
     cc_requester["course_id"] = course.id
     return {
         "course": course,
@@ -0,0 +1,90 @@
+"""
+Performance test comparing building the discussion category map of a course
+with many inline discussions from its discussion modules, and from the cached
+discussion data of the course.
+"""
+import datetime
+import time
+import unittest
+
+from django.test.utils import override_settings
+from pytz import UTC
+
+from django_comment_client.utils import get_discussion_category_map, get_discussion_categories_ids
+from student.tests.factories import CourseEnrollmentFactory, UserFactory
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+# Shape of the synthetic course: every vertical has an inline discussion, and
+# one discussion of each chapter is visible to staff only.
+NUM_CHAPTERS = 26
+NUM_VERTICALS_PER_CHAPTER = 20
+
+# Number of times the category map is built with each configuration.
+NUM_CALLS = 20
+
+
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class CategoryMapPerfTest(ModuleStoreTestCase):
+    """
+    Times building the category map and the accessible discussion ids of a
+    course with 520 inline discussions for a learner, with and without the
+    discussion data of the course cached, and checks that both give the same
+    results.
+    """
+
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    def setUp(self):
+        super(CategoryMapPerfTest, self).setUp()
+        course = CourseFactory.create(start=datetime.datetime(2012, 2, 3, tzinfo=UTC))
+        for chapter_index in xrange(NUM_CHAPTERS):
+            chapter = ItemFactory.create(category='chapter', parent=course)
+            sequential = ItemFactory.create(category='sequential', parent=chapter)
+            for vertical_index in xrange(NUM_VERTICALS_PER_CHAPTER):
+                vertical = ItemFactory.create(category='vertical', parent=sequential)
+                ItemFactory.create(
+                    category='discussion',
+                    parent=vertical,
+                    discussion_id='discussion_{}_{}'.format(chapter_index, vertical_index),
+                    discussion_category='Chapter {} / Section 1'.format(chapter_index),
+                    discussion_target='Discussion {}'.format(vertical_index),
+                    visible_to_staff_only=(vertical_index == 0),
+                )
+        self.course = modulestore().get_course(course.id)
+        self.learner = UserFactory.create()
+        CourseEnrollmentFactory.create(user=self.learner, course_id=self.course.id)
+
+    def time_calls(self, func):
+        """
+        Return the result of func, and the average number of milliseconds it takes.
+        """
+        start = time.time()
+        for __ in xrange(NUM_CALLS):
+            result = func()
+        return result, 1000 * (time.time() - start) / NUM_CALLS
+
+    def test_category_map(self):
+        results = {}
+        for name, timeout in (('uncached', 0), ('cached', 60)):
+            with override_settings(DISCUSSION_DATA_CACHE_TIMEOUT=timeout):
+                with modulestore().bulk_operations(self.course.id):
+                    category_map, map_time = self.time_calls(
+                        lambda: get_discussion_category_map(self.course, self.learner)
+                    )
+                    ids, ids_time = self.time_calls(
+                        lambda: get_discussion_categories_ids(self.course, self.learner)
+                    )
+            results[name] = (category_map, ids)
+            print "{:<8} category map {:8.2f} ms   category ids {:8.2f} ms".format(name, map_time, ids_time)
+
+        self.assertEqual(results['cached'], results['uncached'])
+        self.assertEqual(
+            len(results['cached'][1]),
+            len(self.course.top_level_discussion_topic_ids) + NUM_CHAPTERS * (NUM_VERTICALS_PER_CHAPTER - 1)
+        )
@@ -8,6 +8,7 @@ from django.utils.timezone import UTC as django_utc
 
 from django.core.urlresolvers import reverse
 from django.test import TestCase, RequestFactory
+from django.test.utils import override_settings
 from edxmako import add_lookup
 
 from django_comment_client.tests.factories import RoleFactory
@@ -854,6 +855,40 @@ class CategoryMapTestCase(CategoryMapTestMixin, ModuleStoreTestCase):
             }
         )
 
+    @override_settings(DISCUSSION_DATA_CACHE_TIMEOUT=60)
+    def test_cached_by_course_version(self):
+        self.create_discussion("Chapter 1", "Discussion 1")
+        self.course = modulestore().get_course(self.course.id)
+        category_map = utils.get_discussion_category_map(self.course, self.instructor)
+
+        self.create_discussion("Chapter 1", "Discussion 2")
+        self.assertEqual(utils.get_discussion_category_map(self.course, self.instructor), category_map)
+
+        self.course = modulestore().get_course(self.course.id)
+        self.assertEqual(
+            utils.get_discussion_category_map(self.course, self.instructor)["subcategories"]["Chapter 1"]["children"],
+            ["Discussion 1", "Discussion 2"]
+        )
+        self.assertItemsEqual(
+            utils.get_discussion_categories_ids(self.course, self.user, include_all=True),
+            self.course.top_level_discussion_topic_ids + ["discussion1", "discussion2"]
+        )
+
+    @override_settings(DISCUSSION_DATA_CACHE_TIMEOUT=60)
+    def test_cached_staff_only(self):
+        self.create_discussion("Chapter 1", "Discussion 1")
+        self.create_discussion("Chapter 1", "Discussion 2", visible_to_staff_only=True)
+        self.course = modulestore().get_course(self.course.id)
+        for user, expected_children in (
+                (self.instructor, ["Discussion 1", "Discussion 2"]),
+                (self.user, ["Discussion 1"]),
+                (self.instructor, ["Discussion 1", "Discussion 2"]),
+        ):
+            self.assertEqual(
+                utils.get_discussion_category_map(self.course, user)["subcategories"]["Chapter 1"]["children"],
+                expected_children
+            )
+
     def test_ids_empty(self):
         self.assertEqual(utils.get_discussion_categories_ids(self.course, self.user), [])
 
@@ -1062,6 +1097,22 @@ class ContentGroupCategoryMapTestCase(CategoryMapTestMixin, ContentGroupTestCase
         )
 
 
+@attr('shard_1')
+@override_settings(DISCUSSION_DATA_CACHE_TIMEOUT=60)
+class CachedContentGroupCategoryMapTestCase(ContentGroupCategoryMapTestCase):
+    """
+    Tests `get_discussion_category_map` on discussion modules which are
+    only visible to some content groups, with the discussion data of the
+    course cached.
+    """
+    def assert_category_map_equals(self, expected, requesting_user=None):
+        super(CachedContentGroupCategoryMapTestCase, self).assert_category_map_equals(expected, requesting_user)
+        # The discussion modules are not loaded again.
+        with mock.patch.object(modulestore(), 'get_items') as mock_get_items:
+            super(CachedContentGroupCategoryMapTestCase, self).assert_category_map_equals(expected, requesting_user)
+        self.assertFalse(mock_get_items.called)
+
+
 class JsonResponseTestCase(TestCase, UnicodeTestMixin):
     def _test_unicode_data(self, text):
         response = utils.JsonResponse(text)
@@ -5,7 +5,9 @@ import logging
 from django.conf import settings
 
 import pytz
+from ccx_keys.locator import CCXLocator
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.db import connection
 from django.http import HttpResponse
@@ -14,6 +16,7 @@ import pystache_custom as pystache
 from opaque_keys.edx.locations import i4xEncoder
 from opaque_keys.edx.keys import CourseKey
 from xmodule.modulestore.django import modulestore
+from xmodule.split_test_module import get_split_user_partitions
 from ccx.overrides import get_current_ccx
 
 from django_comment_common.models import Role, FORUM_ROLE_STUDENT
@@ -239,7 +242,7 @@ def _filter_unstarted_categories(category_map):
     return result_map
 
 
-def _sort_map_entries(category_map, sort_alpha):
+def _sort_map_entries(category_map, sort_alpha, recursive=True):
     """
     Internal helper method to list category entries according to the provided sort order
     """
@@ -250,10 +253,162 @@ def _sort_map_entries(category_map, sort_alpha):
         things.append((title, entry))
     for title, category in category_map["subcategories"].items():
         things.append((title, category))
-        _sort_map_entries(category_map["subcategories"][title], sort_alpha)
+        if recursive:
+            _sort_map_entries(category_map["subcategories"][title], sort_alpha)
     category_map["children"] = [x[0] for x in sorted(things, key=lambda x: x[1]["sort_key"])]
 
 
+def _has_access_restrictions(module):
+    """
+    Returns True if users can be denied access to the discussion module for
+    another reason than its start date: it is visible to staff only, or only
+    to some groups of users.
+    """
+    if module.visible_to_staff_only:
+        return True
+    if len(module.user_partitions) == len(get_split_user_partitions(module.user_partitions)):
+        return False
+    return bool(module.merged_group_access)
+
+
+def _get_discussion_module_entry(module):
+    """
+    Returns the data of the discussion module that the category map is built from.
+    """
+    return {
+        "id": module.discussion_id,
+        "title": module.discussion_target,
+        "sort_key": module.sort_key,
+        "category": " / ".join([x.strip() for x in module.discussion_category.split("/")]),
+        # Handle case where module.start is None
+        "start_date": module.start if module.start else datetime.max.replace(tzinfo=pytz.UTC),
+        "location": module.location,
+        "has_access_restrictions": _has_access_restrictions(module),
+    }
+
+
+def _build_category_map(entries, sort_alpha):
+    """
+    Returns the category map of the discussion modules with the given entries,
+    sorted, without the course-wide discussion topics.  The entries of the map
+    aren't marked is_cohorted yet.
+    """
+    unexpanded_category_map = defaultdict(list)
+    for entry in entries:
+        unexpanded_category_map[entry["category"]].append(entry)
+
+    category_map = {"entries": defaultdict(dict), "subcategories": defaultdict(dict)}
+    for category_path, category_entries in unexpanded_category_map.items():
+        node = category_map["subcategories"]
+        path = [x.strip() for x in category_path.split("/")]
+
+        # Find the earliest start date for the entries in this category
+        category_start_date = None
+        for entry in category_entries:
+            if category_start_date is None or entry["start_date"] < category_start_date:
+                category_start_date = entry["start_date"]
+
+        for level in path[:-1]:
+            if level not in node:
+                node[level] = {"subcategories": defaultdict(dict),
+                               "entries": defaultdict(dict),
+                               "sort_key": level,
+                               "start_date": category_start_date}
+            else:
+                if node[level]["start_date"] > category_start_date:
+                    node[level]["start_date"] = category_start_date
+            node = node[level]["subcategories"]
+
+        level = path[-1]
+        if level not in node:
+            node[level] = {"subcategories": defaultdict(dict),
+                           "entries": defaultdict(dict),
+                           "sort_key": level,
+                           "start_date": category_start_date}
+        else:
+            if node[level]["start_date"] > category_start_date:
+                node[level]["start_date"] = category_start_date
+
+        dupe_counters = defaultdict(lambda: 0)  # counts the number of times we see each title
+        for entry in category_entries:
+            title = entry["title"]
+            if node[level]["entries"][title]:
+                # If we've already seen this title, append an incrementing number to disambiguate
+                # the category from other categores sharing the same title in the course discussion UI.
+                dupe_counters[title] += 1
+                title = u"{title} ({counter})".format(title=title, counter=dupe_counters[title])
+            node[level]["entries"][title] = {"id": entry["id"],
+                                             "sort_key": entry["sort_key"],
+                                             "start_date": entry["start_date"]}
+
+    _sort_map_entries(category_map, sort_alpha)
+    return category_map
+
+
+def _get_course_discussion_data(course):
+    """
+    Returns a dict of the entries of the discussion modules of the course, in
+    the order of the modulestore, and of the category map of all of them.
+
+    The data is cached by version of the course, for
+    DISCUSSION_DATA_CACHE_TIMEOUT seconds, so that forum pages don't load and
+    sort every discussion module of the course.
+    """
+    timeout = getattr(settings, 'DISCUSSION_DATA_CACHE_TIMEOUT', 0)
+    cache_key = None
+    # The discussion modules of CCX courses depend on the overrides of the CCX.
+    if timeout and course.subtree_edited_on is not None and not isinstance(course.id, CCXLocator):
+        cache_key = u'django_comment_client.discussion_data.{}.{}.{}'.format(
+            course.id, modulestore().get_branch_setting(), course.subtree_edited_on.isoformat()
+        )
+        data = cache.get(cache_key)
+        if data is not None:
+            return data
+
+    modules = modulestore().get_items(course.id, qualifiers={'category': 'discussion'})
+    entries = [_get_discussion_module_entry(module) for module in modules if has_required_keys(module)]
+    data = {"entries": entries, "category_map": _build_category_map(entries, course.discussion_sort_alpha)}
+    if cache_key is not None:
+        cache.set(cache_key, data, timeout)
+    return data
+
+
+def _get_accessible_entries(entries, course, user):
+    """
+    Returns the entries of the discussion modules that are accessible to the
+    given user.  Only the modules that have access restrictions or haven't
+    started are loaded to check the access of the user, as the others are
+    accessible to every user.
+    """
+    now = datetime.now(UTC())
+    return [
+        entry for entry in entries
+        if (
+            not (entry["has_access_restrictions"] or entry["start_date"] >= now) or
+            has_access(user, 'load', modulestore().get_item(entry["location"]), course.id)
+        )
+    ]
+
+
+def _copy_category_map(category_map, is_entry_cohorted):
+    """
+    Returns a copy of the category map, with its entries marked is_cohorted if
+    is_entry_cohorted returns True for their id.
+    """
+    return dict(
+        category_map,
+        entries={
+            title: dict(entry, is_cohorted=is_entry_cohorted(entry["id"]))
+            for title, entry in category_map["entries"].iteritems()
+        },
+        subcategories={
+            title: _copy_category_map(subcategory, is_entry_cohorted)
+            for title, subcategory in category_map["subcategories"].iteritems()
+        },
+        children=list(category_map["children"]),
+    )
+
+
 def get_discussion_category_map(course, user, cohorted_if_in_list=False, exclude_unstarted=True):
     """
     Transform the list of this course's discussion modules into a recursive dictionary structure.  This is used
@@ -299,74 +454,23 @@ def get_discussion_category_map(course, user, cohorted_if_in_list=False, exclude
         >>>          }
 
     """
-    unexpanded_category_map = defaultdict(list)
-
-    modules = get_accessible_discussion_modules(course, user)
+    data = _get_course_discussion_data(course)
+    entries = _get_accessible_entries(data["entries"], course, user)
+    if len(entries) == len(data["entries"]):
+        category_map = data["category_map"]
+    else:
+        category_map = _build_category_map(entries, course.discussion_sort_alpha)
 
     course_cohort_settings = get_course_cohort_settings(course.id)
-
-    for module in modules:
-        id = module.discussion_id
-        title = module.discussion_target
-        sort_key = module.sort_key
-        category = " / ".join([x.strip() for x in module.discussion_category.split("/")])
-        # Handle case where module.start is None
-        entry_start_date = module.start if module.start else datetime.max.replace(tzinfo=pytz.UTC)
-        unexpanded_category_map[category].append({"title": title, "id": id, "sort_key": sort_key, "start_date": entry_start_date})
-
-    category_map = {"entries": defaultdict(dict), "subcategories": defaultdict(dict)}
-    for category_path, entries in unexpanded_category_map.items():
-        node = category_map["subcategories"]
-        path = [x.strip() for x in category_path.split("/")]
-
-        # Find the earliest start date for the entries in this category
-        category_start_date = None
-        for entry in entries:
-            if category_start_date is None or entry["start_date"] < category_start_date:
-                category_start_date = entry["start_date"]
-
-        for level in path[:-1]:
-            if level not in node:
-                node[level] = {"subcategories": defaultdict(dict),
-                               "entries": defaultdict(dict),
-                               "sort_key": level,
-                               "start_date": category_start_date}
-            else:
-                if node[level]["start_date"] > category_start_date:
-                    node[level]["start_date"] = category_start_date
-            node = node[level]["subcategories"]
-
-        level = path[-1]
-        if level not in node:
-            node[level] = {"subcategories": defaultdict(dict),
-                           "entries": defaultdict(dict),
-                           "sort_key": level,
-                           "start_date": category_start_date}
-        else:
-            if node[level]["start_date"] > category_start_date:
-                node[level]["start_date"] = category_start_date
-
-        always_cohort_inline_discussions = (  # pylint: disable=invalid-name
-            not cohorted_if_in_list and course_cohort_settings.always_cohort_inline_discussions
+    always_cohort_inline_discussions = (  # pylint: disable=invalid-name
+        not cohorted_if_in_list and course_cohort_settings.always_cohort_inline_discussions
+    )
+    category_map = _copy_category_map(
+        category_map,
+        lambda discussion_id: course_cohort_settings.is_cohorted and (
+            always_cohort_inline_discussions or discussion_id in course_cohort_settings.cohorted_discussions
         )
-        dupe_counters = defaultdict(lambda: 0)  # counts the number of times we see each title
-        for entry in entries:
-            is_entry_cohorted = (
-                course_cohort_settings.is_cohorted and (
-                    always_cohort_inline_discussions or entry["id"] in course_cohort_settings.cohorted_discussions
-                )
-            )
-
-            title = entry["title"]
-            if node[level]["entries"][title]:
-                # If we've already seen this title, append an incrementing number to disambiguate
-                # the category from other categores sharing the same title in the course discussion UI.
-                dupe_counters[title] += 1
-                title = u"{title} ({counter})".format(title=title, counter=dupe_counters[title])
-            node[level]["entries"][title] = {"id": entry["id"],
-                                             "sort_key": entry["sort_key"],
-                                             "start_date": entry["start_date"],
-                                             "is_cohorted": is_entry_cohorted}
+    )
 
     # TODO.  BUG! : course location is not unique across multiple course runs!
     # (I think Kevin already noticed this)  Need to send course_id with requests, store it
@@ -380,7 +484,8 @@ def get_discussion_category_map(course, user, cohorted_if_in_list=False, exclude
                             entry["id"] in course_cohort_settings.cohorted_discussions)
         }
 
-    _sort_map_entries(category_map, course.discussion_sort_alpha)
+    # The categories are already sorted.
+    _sort_map_entries(category_map, course.discussion_sort_alpha, recursive=False)
 
     return _filter_unstarted_categories(category_map) if exclude_unstarted else category_map
 
@@ -415,9 +520,10 @@ def get_discussion_categories_ids(course, user, include_all=False):
         include_all (bool): If True, return all ids. Used by configuration views.
 
     """
-    accessible_discussion_ids = [
-        module.discussion_id for module in get_accessible_discussion_modules(course, user, include_all=include_all)
-    ]
+    entries = _get_course_discussion_data(course)["entries"]
+    if not include_all:
+        entries = _get_accessible_entries(entries, course, user)
+    accessible_discussion_ids = [entry["id"] for entry in entries]
     return course.top_level_discussion_topic_ids + accessible_discussion_ids
 
 
@@ -8,11 +8,14 @@ import json
 import unittest
 
 from django.utils.timezone import utc
+from django.test.client import RequestFactory
 from django.test.utils import override_settings
 from nose.plugins.attrib import attr
 
 from courseware.field_overrides import OverrideFieldData
 from lms.djangoapps.ccx.tests.test_overrides import inject_field_overrides
+from request_cache import get_cache
+from request_cache.middleware import RequestCache
 from student.tests.factories import UserFactory
 from xmodule.fields import Date
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase, SharedModuleStoreTestCase
@@ -246,6 +249,27 @@ class TestSetDueDateExtension(ModuleStoreTestCase):
             tools.set_due_date_extension(self.course, self.week1, self.user, extended)
             self._clear_field_data_cache()
 
+    def test_get_due_date_extensions_num_queries(self):
+        extended = datetime.datetime(2013, 12, 25, 0, 0, tzinfo=utc)
+        tools.set_due_date_extension(self.course, self.week1, self.user, extended)
+        tools.set_due_date_extension(self.course, self.week2, self.user, extended)
+
+        # All of the user's extensions in the course are loaded at once.
+        RequestCache().process_request(RequestFactory().get('/'))
+        self.addCleanup(RequestCache.clear_request_cache)
+        self._clear_field_data_cache()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.week1.due, extended)
+            self.assertEqual(self.week2.due, extended)
+            self.assertEqual(self.assignment.due, extended)
+
+    def test_due_date_extensions_not_cached_outside_requests(self):
+        extended = datetime.datetime(2013, 12, 25, 0, 0, tzinfo=utc)
+        tools.set_due_date_extension(self.course, self.week1, self.user, extended)
+        self._clear_field_data_cache()
+        self.assertEqual(self.week1.due, extended)
+        self.assertEqual(get_cache('student-field-overrides'), {})
+
     def test_set_due_date_extension_invalid_date(self):
         extended = datetime.datetime(2009, 1, 1, 0, 0, tzinfo=utc)
         with self.assertRaises(tools.DashboardError):
@@ -208,6 +208,15 @@ def enrolled_students_features(course_key, features):
         {'username': 'username3', 'first_name': 'firstname3'}
     ]
     """
+    return list(iterate_enrolled_students_features(course_key, features))
+
+
+def iterate_enrolled_students_features(course_key, features, chunk_size=1000):
+    """
+    Yield the student features of `enrolled_students_features` one student at
+    a time. Students are loaded `chunk_size` at a time, ordered by username,
+    so memory use does not grow with the size of the course.
+    """
     include_cohort_column = 'cohort' in features
     include_team_column = 'team' in features
 
@@ -265,7 +274,15 @@ def enrolled_students_features(course_key, features):
             )
         return student_dict
 
-    return [extract_student(student, features) for student in students]
+    last_username = None
+    while True:
+        chunk = students if last_username is None else students.filter(username__gt=last_username)
+        chunk = list(chunk[:chunk_size])
+        for student in chunk:
+            yield extract_student(student, features)
+        if len(chunk) < chunk_size:
+            break
+        last_username = chunk[-1].username
 
 
 def list_may_enroll(course_key, features):
@@ -13,6 +13,7 @@ from course_modes.models import CourseMode
 from courseware.tests.factories import InstructorFactory
 from instructor_analytics.basic import (
     StudentModule, sale_record_features, sale_order_record_features, enrolled_students_features,
+    iterate_enrolled_students_features,
     course_registration_features, coupon_codes_features, get_proctored_exam_results, list_may_enroll,
     list_problem_responses, AVAILABLE_FEATURES, STUDENT_FEATURES, PROFILE_FEATURES
 )
@@ -103,6 +104,13 @@ class TestAnalyticsBasic(ModuleStoreTestCase):
             self.assertEqual(userreport.keys(), ['username'])
             self.assertIn(userreport['username'], [user.username for user in self.users])
 
+    def test_iterate_enrolled_students_features_in_chunks(self):
+        userreports = list(iterate_enrolled_students_features(self.course_key, ['username'], chunk_size=3))
+        self.assertEqual(
+            [userreport['username'] for userreport in userreports],
+            sorted(user.username for user in self.users)
+        )
+
     def test_enrolled_students_features_keys(self):
         query_features = ('username', 'name', 'email')
         for feature in query_features:
@@ -14,6 +14,7 @@ ASSUMPTIONS: modules have unique IDs, even across different module_types
 """
 from cStringIO import StringIO
 from gzip import GzipFile
+from tempfile import NamedTemporaryFile
 from uuid import uuid4
 import csv
 import json
@@ -179,21 +180,25 @@ class InstructorTask(models.Model):
 class ReportStore(object):
     """
     Simple abstraction layer that can fetch and store CSV files for reports
-    download. Should probably refactor later to create a ReportFile object that
-    can simply be appended to for the sake of memory efficiency, rather than
-    passing in the whole dataset. Doing that for now just because it's simpler.
+    download. CSV rows are passed to `store_rows()` as any iterable, such as a
+    generator, and are written out as they are produced, so a report never has
+    to be held in memory in full.
     """
     @classmethod
-    def from_config(cls, config_name):
+    def from_config(cls, config_name, subdirectory=None):
         """
         Return one of the ReportStore subclasses depending on django
         configuration. Look at subclasses for expected configuration.
+
+        If `subdirectory` is given, files are kept under that directory of the
+        configured root path, apart from the reports that `links_for()` lists
+        for each course.
         """
         storage_type = getattr(settings, config_name).get("STORAGE_TYPE")
         if storage_type.lower() == "s3":
-            return S3ReportStore.from_config(config_name)
+            return S3ReportStore.from_config(config_name, subdirectory)
         elif storage_type.lower() == "localfs":
-            return LocalFSReportStore.from_config(config_name)
+            return LocalFSReportStore.from_config(config_name, subdirectory)
 
     def _get_utf8_encoded_rows(self, rows):
         """
@@ -204,6 +209,14 @@ class ReportStore(object):
         for row in rows:
             yield [unicode(item).encode('utf-8') for item in row]
 
+    def _get_utf8_decoded_rows(self, csv_file):
+        """
+        Given a file-like object containing a utf-8 encoded CSV, return an
+        iterator over its rows with each value decoded to unicode.
+        """
+        for row in csv.reader(csv_file):
+            yield [item.decode('utf-8') for item in row]
+
 
 class S3ReportStore(ReportStore):
     """
@@ -217,6 +230,10 @@ class S3ReportStore(ReportStore):
     conventions on where files are stored to know what to display. Clients using
     this class can name the final file whatever they want.
     """
+    # Size of the parts of multipart uploads. All parts but the last must be
+    # at least 5MB.
+    MULTIPART_CHUNK_SIZE = 5 * 1024 * 1024
+
     def __init__(self, bucket_name, root_path):
         self.root_path = root_path
 
@@ -228,7 +245,7 @@ class S3ReportStore(ReportStore):
         self.bucket = conn.get_bucket(bucket_name)
 
     @classmethod
-    def from_config(cls, config_name):
+    def from_config(cls, config_name, subdirectory=None):
         """
         The expected configuration for an `S3ReportStore` is to have a
         `GRADES_DOWNLOAD` dict in settings with the following fields::
@@ -242,10 +259,10 @@ class S3ReportStore(ReportStore):
         Since S3 access relies on boto, you must also define `AWS_ACCESS_KEY_ID`
         and `AWS_SECRET_ACCESS_KEY` in settings.
         """
-        return cls(
-            getattr(settings, config_name).get("BUCKET"),
-            getattr(settings, config_name).get("ROOT_PATH")
-        )
+        root_path = getattr(settings, config_name).get("ROOT_PATH")
+        if subdirectory:
+            root_path = "{}/{}".format(root_path, subdirectory)
+        return cls(getattr(settings, config_name).get("BUCKET"), root_path)
 
     def key_for(self, course_id, filename):
         """Return the S3 key we would use to store and retrieve the data for the
@@ -299,8 +316,13 @@ class S3ReportStore(ReportStore):
     def store_rows(self, course_id, filename, rows):
         """
         Given a `course_id`, `filename`, and `rows` (each row is an iterable of
-        strings), create a buffer that is a gzip'd csv file, and then `store()`
-        that buffer.
+        strings), write the rows to a gzip'd csv file in S3.
+
+        `rows` can be any iterable, and is consumed as the file is written.
+        Compressed data is buffered up to `MULTIPART_CHUNK_SIZE` bytes; files
+        larger than that are sent in parts with a multipart upload, which only
+        becomes visible in S3 once it has been completed. Smaller files are
+        sent with a single `store()`.
 
         Even though we store it in gzip format, browsers will transparently
         download and decompress it. Filenames should end in `.csv`, not `.gz`.
@@ -308,10 +330,51 @@ class S3ReportStore(ReportStore):
         output_buffer = StringIO()
         gzip_file = GzipFile(fileobj=output_buffer, mode="wb")
         csvwriter = csv.writer(gzip_file)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
-        gzip_file.close()
+        multipart_upload = None
+        part_number = 0
+        try:
+            for row in self._get_utf8_encoded_rows(rows):
+                csvwriter.writerow(row)
+                if output_buffer.tell() >= self.MULTIPART_CHUNK_SIZE:
+                    if multipart_upload is None:
+                        multipart_upload = self.bucket.initiate_multipart_upload(
+                            self.key_for(course_id, filename).key,
+                            headers={"Content-Encoding": "gzip", "Content-Type": "text/csv"},
+                        )
+                    part_number += 1
+                    self._upload_part(multipart_upload, part_number, output_buffer)
+            gzip_file.close()
+
+            if multipart_upload is None:
+                self.store(course_id, filename, output_buffer)
+            else:
+                self._upload_part(multipart_upload, part_number + 1, output_buffer)
+                multipart_upload.complete_upload()
+        except Exception:
+            if multipart_upload is not None:
+                multipart_upload.cancel_upload()
+            raise
+
+    def _upload_part(self, multipart_upload, part_number, output_buffer):
+        """
+        Upload the contents of `output_buffer` as part `part_number` of
+        `multipart_upload`, and empty the buffer.
+        """
+        multipart_upload.upload_part_from_file(StringIO(output_buffer.getvalue()), part_number)
+        output_buffer.seek(0)
+        output_buffer.truncate()
+
+    def rows_for(self, course_id, filename):
+        """
+        Return an iterator over the rows of the CSV file `filename` that was
+        stored for `course_id` with `store_rows()`. Values are unicode.
+        """
+        data = self.key_for(course_id, filename).get_contents_as_string()
+        return self._get_utf8_decoded_rows(GzipFile(fileobj=StringIO(data), mode="rb"))
 
-        self.store(course_id, filename, output_buffer)
+    def delete(self, course_id, filename):
+        """Delete the file `filename` stored for `course_id`."""
+        self.key_for(course_id, filename).delete()
 
     def links_for(self, course_id):
         """
@@ -345,7 +408,7 @@ class LocalFSReportStore(ReportStore):
             os.makedirs(root_path)
 
     @classmethod
-    def from_config(cls, config_name):
+    def from_config(cls, config_name, subdirectory=None):
         """
         Generate an instance of this object from Django settings. It assumes
         that there is a dict in settings named GRADES_DOWNLOAD and that it has
@@ -356,7 +419,10 @@ class LocalFSReportStore(ReportStore):
             STORAGE_TYPE : "localfs"
             ROOT_PATH : /tmp/edx/report-downloads/
         """
-        return cls(getattr(settings, config_name).get("ROOT_PATH"))
+        root_path = getattr(settings, config_name).get("ROOT_PATH")
+        if subdirectory:
+            root_path = os.path.join(root_path, subdirectory)
+        return cls(root_path)
 
     def path_to(self, course_id, filename):
         """Return the full path to a given file for a given course."""
@@ -381,12 +447,38 @@ class LocalFSReportStore(ReportStore):
         """
         Given a course_id, filename, and rows (each row is an iterable of strings),
         write this data out.
+
+        `rows` can be any iterable, and each row is appended to the file as it
+        is produced. The rows are written to a temporary file which is only
+        moved into the course directory once complete, so `links_for()` never
+        lists a partly written report.
         """
-        output_buffer = StringIO()
-        csvwriter = csv.writer(output_buffer)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
+        full_path = self.path_to(course_id, filename)
+        directory = os.path.dirname(full_path)
+        if not os.path.exists(directory):
+            os.mkdir(directory)
+
+        with NamedTemporaryFile(dir=self.root_path, suffix='.tmp', delete=False) as temp_file:
+            try:
+                csvwriter = csv.writer(temp_file)
+                csvwriter.writerows(self._get_utf8_encoded_rows(rows))
+            except Exception:
+                os.remove(temp_file.name)
+                raise
+        os.rename(temp_file.name, full_path)
+
+    def rows_for(self, course_id, filename):
+        """
+        Return an iterator over the rows of the CSV file `filename` that was
+        stored for `course_id` with `store_rows()`. Values are unicode.
+        """
+        with open(self.path_to(course_id, filename), "rb") as csv_file:
+            for row in self._get_utf8_decoded_rows(csv_file):
+                yield row
 
-        self.store(course_id, filename, output_buffer)
+    def delete(self, course_id, filename):
+        """Delete the file `filename` stored for `course_id`."""
+        os.remove(self.path_to(course_id, filename))
 
     def links_for(self, course_id):
         """
@@ -24,6 +24,8 @@ SUBTASK_LOCK_EXPIRE = 60 * 10  # Lock expires in 10 minutes
 # Number of times to retry if a subtask update encounters a lock on the InstructorTask.
 # (These are recursive retries, so don't make this number too large.)
 MAX_DATABASE_LOCK_RETRIES = 5
+# Number of items fetched by each query when generating the items for subtasks.
+ITEMS_PER_QUERY = 1000
 
 
 class DuplicateTaskException(Exception):
@@ -70,6 +72,27 @@ def track_memory_usage(metric, course_id):
         )
 
 
+def _iterate_items_by_pk(queryset, item_fields):
+    """
+    Iterates over the values of `item_fields` of the items of `queryset`, in order of primary key.
+
+    The items are fetched ITEMS_PER_QUERY at a time, each query starting after the last primary key
+    fetched by the previous one, so that neither the database nor the process has to hold the whole
+    result set at once, and no query has to skip over the rows already fetched.
+    `item_fields` must include the 'pk' field.
+    """
+    queryset = queryset.order_by('pk').values(*item_fields)
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        items = list(page[:ITEMS_PER_QUERY])
+        for item in items:
+            yield item
+        if len(items) < ITEMS_PER_QUERY:
+            return
+        last_pk = items[-1]['pk']
+
+
 def _generate_items_for_subtask(
     item_querysets,  # pylint: disable=bad-continuation
     item_fields,
@@ -83,10 +106,10 @@ def _generate_items_for_subtask(
 
     Arguments:
         `item_querysets` : a list of query sets, each of which defines the "items" that should be passed to subtasks.
+            The items of each query set are generated in order of primary key, ITEMS_PER_QUERY at a time.
         `item_fields` : the fields that should be included in the dict that is returned.
             These are in addition to the 'pk' field.
         `total_num_items` : the result of summing the count of each queryset in `item_querysets`.
-        `items_per_query` : size of chunks to break the query operation into.
         `items_per_task` : maximum size of chunks to break each query chunk into for use by a subtask.
         `course_id` : course_id of the course. Only needed for the track_memory_usage context manager.
 
@@ -103,7 +126,7 @@ def _generate_items_for_subtask(
 
     with track_memory_usage('course_email.subtask_generation.memory', course_id):
         for queryset in item_querysets:
-            for item in queryset.values(*all_item_fields).iterator():
+            for item in _iterate_items_by_pk(queryset, all_item_fields):
                 if len(items_for_task) == items_per_task and num_subtasks < total_num_subtasks - 1:
                     yield items_for_task
                     num_items_queued += items_per_task
@@ -142,6 +165,8 @@ class SubtaskStatus(object):
       'retried_withmax' : number of times the subtask has been retried for conditions that
           should have a maximum count applied
       'state' : celery state of the subtask (e.g. QUEUING, PROGRESS, RETRY, FAILURE, SUCCESS)
+      'duration' : number of seconds spent processing items, over all attempts.  Together with
+          'attempted', this gives the throughput of the workers running the subtask.
 
     Object is not JSON-serializable, so to_dict and from_dict methods are provided so that
     it can be passed as a serializable argument to tasks (and be reconstituted within such tasks).
@@ -151,7 +176,8 @@ class SubtaskStatus(object):
     Also, we should count up "not attempted" separately from attempted/failed.
     """
 
-    def __init__(self, task_id, attempted=None, succeeded=0, failed=0, skipped=0, retried_nomax=0, retried_withmax=0, state=None):
+    def __init__(self, task_id, attempted=None, succeeded=0, failed=0, skipped=0, retried_nomax=0, retried_withmax=0,
+                 state=None, duration=0.0):
         """Construct a SubtaskStatus object."""
         self.task_id = task_id
         if attempted is not None:
@@ -164,6 +190,7 @@ class SubtaskStatus(object):
         self.retried_nomax = retried_nomax
         self.retried_withmax = retried_withmax
         self.state = state if state is not None else QUEUING
+        self.duration = duration
 
     @classmethod
     def from_dict(cls, d):
@@ -186,7 +213,7 @@ class SubtaskStatus(object):
         """
         return self.__dict__
 
-    def increment(self, succeeded=0, failed=0, skipped=0, retried_nomax=0, retried_withmax=0, state=None):
+    def increment(self, succeeded=0, failed=0, skipped=0, retried_nomax=0, retried_withmax=0, state=None, duration=0.0):
         """
         Update the result of a subtask with additional results.
 
@@ -199,6 +226,7 @@ class SubtaskStatus(object):
         self.skipped += skipped
         self.retried_nomax += retried_nomax
         self.retried_withmax += retried_withmax
+        self.duration += duration
         if state is not None:
             self.state = state
 
@@ -206,6 +234,14 @@ class SubtaskStatus(object):
         """Returns the number of retries of any kind."""
         return self.retried_nomax + self.retried_withmax
 
+    def get_throughput(self):
+        """
+        Returns the number of items attempted per second spent processing items, or None if no time was spent.
+        """
+        if self.duration <= 0:
+            return None
+        return self.attempted / self.duration
+
     def __repr__(self):
         """Return print representation of a SubtaskStatus object."""
         return 'SubtaskStatus<%r>' % (self.to_dict(),)
@@ -463,10 +499,13 @@ def check_subtask_is_valid(entry_id, current_task_id, new_subtask_status):
         raise DuplicateTaskException(msg)
 
 
-def update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_count=0):
+def update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_count=0, complete_parent=True):
     """
     Update the status of the subtask in the parent InstructorTask object tracking its progress.
 
+    If `complete_parent` is False, the parent InstructorTask is left in progress once its last
+    subtask is done, so that the caller can mark it complete when it has finished its own work.
+
     Because select_for_update is used to lock the InstructorTask object while it is being updated,
     multiple subtasks updating at the same time may time out while waiting for the lock.
     The actual update operation is surrounded by a try/except/else that permits the update to be
@@ -476,7 +515,7 @@ def update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_c
     the attempting of retries has concluded.
     """
     try:
-        _update_subtask_status(entry_id, current_task_id, new_subtask_status)
+        _update_subtask_status(entry_id, current_task_id, new_subtask_status, complete_parent)
     except DatabaseError:
         # If we fail, try again recursively.
         retry_count += 1
@@ -484,7 +523,7 @@ def update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_c
             TASK_LOG.info("Retrying to update status for subtask %s of instructor task %d with status %s:  retry %d",
                           current_task_id, entry_id, new_subtask_status, retry_count)
             dog_stats_api.increment('instructor_task.subtask.retry_after_failed_update')
-            update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_count)
+            update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_count, complete_parent)
         else:
             TASK_LOG.info("Failed to update status after %d retries for subtask %s of instructor task %d with status %s",
                           retry_count, current_task_id, entry_id, new_subtask_status)
@@ -498,7 +537,7 @@ def update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_c
 
 
 @transaction.atomic
-def _update_subtask_status(entry_id, current_task_id, new_subtask_status):
+def _update_subtask_status(entry_id, current_task_id, new_subtask_status, complete_parent=True):
     """
     Update the status of the subtask in the parent InstructorTask object tracking its progress.
 
@@ -518,7 +557,7 @@ def _update_subtask_status(entry_id, current_task_id, new_subtask_status):
     subtasks.  'Total' is expected to have been set at the time the subtasks were created.
     The other three counters are incremented depending on the value of `status`.  Once the counters
     for 'succeeded' and 'failed' match the 'total', the subtasks are done and the InstructorTask's
-    "status" is changed to SUCCESS.
+    "status" is changed to SUCCESS, unless `complete_parent` is False.
 
     The "subtasks" field also contains a 'status' key, that contains a dict that stores status
     information for each subtask.  At the moment, the value for each subtask (keyed by its task_id)
@@ -574,7 +613,7 @@ def _update_subtask_status(entry_id, current_task_id, new_subtask_status):
         # At present, we mark the task as having succeeded.  In future, we should see
         # if there was a catastrophic failure that occurred, and figure out how to
         # report that here.
-        if num_remaining <= 0:
+        if num_remaining <= 0 and complete_parent:
             entry.task_state = SUCCESS
         entry.subtasks = json.dumps(subtask_dict)
         entry.task_output = InstructorTask.create_output_for_success(task_progress)
@@ -44,8 +44,10 @@ from instructor_task.tasks_helper import (
     upload_exec_summary_report,
     upload_course_survey_report,
     generate_students_certificates,
-    upload_proctored_exam_results_report
+    upload_proctored_exam_results_report,
+    run_grade_report_shard,
 )
+from instructor_task.subtasks import DuplicateTaskException
 
 
 TASK_LOG = logging.getLogger('edx.celery.task')
@@ -192,6 +194,42 @@ def calculate_problem_grade_report(entry_id, xmodule_instance_args):
     return run_main_task(entry_id, task_fn, action_name)
 
 
+@task(  # pylint: disable=not-callable
+    default_retry_delay=settings.GRADE_REPORT_SHARD_RETRY_DELAY,
+    max_retries=settings.GRADE_REPORT_SHARD_MAX_RETRIES,
+    routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
+)
+def calculate_grade_report_shard(entry_id, report_name, action_name, shard_index, first_student_id, last_student_id,
+                                 subtask_status_dict):
+    """
+    Grade one shard of the students of a grade report or problem grade report,
+    as queued by `queue_grade_report_shards`.
+
+    `entry_id` is the id value of the InstructorTask entry of the report, and
+    the shard covers the enrolled students with ids from `first_student_id` to
+    `last_student_id`. Progress is tracked in the InstructorTask entry using
+    the status in `subtask_status_dict`.
+    """
+    try:
+        return run_grade_report_shard(
+            entry_id,
+            report_name,
+            action_name,
+            shard_index,
+            first_student_id,
+            last_student_id,
+            subtask_status_dict,
+        )
+    except DuplicateTaskException:
+        # Another worker has already run (or is running) this shard, so
+        # there is nothing to do, and nothing to record.
+        TASK_LOG.warning(
+            u"InstructorTask ID: %s, grade report shard %s was already run: %s",
+            entry_id, shard_index, subtask_status_dict, exc_info=True
+        )
+        return subtask_status_dict
+
+
 @task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
 def calculate_students_features_csv(entry_id, xmodule_instance_args):
     """
@@ -5,18 +5,20 @@ running state of a course.
 """
 import json
 import re
+import traceback
 from collections import OrderedDict
 from datetime import datetime
 from django.conf import settings
 from eventtracking import tracker
-from itertools import chain
+from itertools import chain, count
 from time import time
 import unicodecsv
 import logging
 
 from celery import Task, current_task
-from celery.states import SUCCESS, FAILURE
+from celery.states import SUCCESS, FAILURE, RETRY
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.files.storage import DefaultStorage
 from django.db import transaction, reset_queries
 from django.db.models import Q
@@ -51,13 +53,19 @@ from courseware.models import StudentModule
 from courseware.model_data import DjangoKeyValueStore, FieldDataCache
 from courseware.module_render import get_module_for_descriptor_internal
 from instructor_analytics.basic import (
-    enrolled_students_features,
+    iterate_enrolled_students_features,
     get_proctored_exam_results,
     list_may_enroll,
     list_problem_responses
 )
-from instructor_analytics.csvs import format_dictlist
+from instructor_analytics.csvs import format_dictlist, iterate_dictlist_rows
 from instructor_task.models import ReportStore, InstructorTask, PROGRESS
+from instructor_task.subtasks import (
+    SubtaskStatus,
+    check_subtask_is_valid,
+    queue_subtasks_for_query,
+    update_subtask_status,
+)
 from lms.djangoapps.lms_xblock.runtime import LmsPartitionService
 from openedx.core.djangoapps.course_groups.cohorts import get_cohort
 from openedx.core.djangoapps.course_groups.models import CourseUserGroup
@@ -78,6 +86,10 @@ FILTERED_OUT_ROLES = ['staff', 'instructor', 'finance_admin', 'sales_admin']
 UPDATE_STATUS_SUCCEEDED = 'succeeded'
 UPDATE_STATUS_FAILED = 'failed'
 UPDATE_STATUS_SKIPPED = 'skipped'
+# subdirectory of the GRADES_DOWNLOAD report store that holds partial grade reports
+GRADE_REPORT_SHARDS_DIRECTORY = 'grade_report_shards'
+# lock expiration for merging the partial grade reports of a task
+GRADE_REPORT_MERGE_LOCK_EXPIRE = 60 * 60
 
 # The setting name used for events when "settings" (account settings, preferences, profile information) change.
 REPORT_REQUESTED_EVENT_NAME = u'edx.instructor.report.requested'
@@ -303,7 +315,8 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
 
     StudentModule instances are those that match the specified `course_id` and `module_state_key`.
     If `student_identifier` is not None, it is used as an additional filter to limit the modules to those belonging
-    to that student. If `student_identifier` is None, performs update on modules for all students on the specified problem.
+    to that student. If `student_identifier` is None, performs update on modules for all students on the specified
+    problem.
 
     If a `filter_fcn` is not None, it is applied to the query that has been constructed.  It takes one
     argument, which is the query being filtered, and returns the filtered version of the query.
@@ -398,7 +411,9 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
 
 def _get_task_id_from_xmodule_args(xmodule_instance_args):
     """Gets task_id from `xmodule_instance_args` dict, or returns default value if missing."""
-    return xmodule_instance_args.get('task_id', UNKNOWN_TASK_ID) if xmodule_instance_args is not None else UNKNOWN_TASK_ID
+    if xmodule_instance_args is None:
+        return UNKNOWN_TASK_ID
+    return xmodule_instance_args.get('task_id', UNKNOWN_TASK_ID)
 
 
 def _get_xqueue_callback_url_prefix(xmodule_instance_args):
@@ -610,6 +625,8 @@ def upload_csv_to_report_store(rows, csv_name, course_id, timestamp, config_name
                 [row1_colum1, row1_colum2, ...],
                 ...
             ]
+            Any iterable of rows can be passed; a generator is consumed as
+            the CSV is written, so the rows never have to be held in memory.
         csv_name: Name of the resulting CSV
         course_id: ID of the course
     """
@@ -626,6 +643,22 @@ def upload_csv_to_report_store(rows, csv_name, course_id, timestamp, config_name
     tracker.emit(REPORT_REQUESTED_EVENT_NAME, {"report_type": csv_name, })
 
 
+def _rows_if_any_data(rows):
+    """
+    Given `rows` of a CSV that starts with a header row, return an iterator
+    over the same rows, or None if there are no rows after the header.
+
+    Only the header and the first data row are read ahead, so `rows` can be
+    a generator whose rows are produced as the CSV is written.
+    """
+    rows = iter(rows)
+    header = next(rows, None)
+    first_row = next(rows, None)
+    if first_row is None:
+        return None
+    return chain([header, first_row], rows)
+
+
 def upload_exec_summary_to_store(data_dict, report_name, course_id, generated_at, config_name='FINANCIAL_REPORTS'):
     """
     Upload Executive Summary Html file using ReportStore.
@@ -656,7 +689,7 @@ def upload_exec_summary_to_store(data_dict, report_name, course_id, generated_at
     tracker.emit(REPORT_REQUESTED_EVENT_NAME, {"report_type": report_name})
 
 
-def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):  # pylint: disable=too-many-statements
+def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):
     """
     For a given `course_id`, generate a grades CSV file for all students that
     are enrolled, and store using a `ReportStore`. Once created, the files can
@@ -668,12 +701,20 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     As we start to add more CSV downloads, it will probably be worthwhile to
     make a more general CSVDoc class instead of building out the rows like we
     do here.
+
+    Courses with more enrolled students than `GRADE_REPORT_SHARD_SIZE` are
+    graded by parallel subtasks when the ENABLE_SHARDED_GRADE_REPORTS feature
+    is enabled; see `queue_grade_report_shards`.
     """
     start_time = time()
     start_date = datetime.now(UTC)
-    status_interval = 100
     enrolled_students = CourseEnrollment.objects.users_enrolled_in(course_id)
-    task_progress = TaskProgress(action_name, enrolled_students.count(), start_time)
+    total_enrolled_students = enrolled_students.count()
+
+    if _use_sharded_grade_report(total_enrolled_students):
+        return queue_grade_report_shards(_entry_id, 'grade_report', enrolled_students, action_name)
+
+    task_progress = TaskProgress(action_name, total_enrolled_students, start_time)
 
     fmt = u'Task: {task_id}, InstructorTask ID: {entry_id}, Course: {course_id}, Input: {task_input}'
     task_info_string = fmt.format(
@@ -684,6 +725,48 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     )
     TASK_LOG.info(u'%s, Task type: %s, Starting task execution', task_info_string, action_name)
 
+    # Students are graded as their rows are streamed to the report store.
+    rows, err_rows = _grade_report_rows(course_id, enrolled_students, task_progress, task_info_string, action_name)
+    upload_csv_to_report_store(rows, 'grade_report', course_id, start_date)
+
+    current_step = {'step': 'Uploading CSVs'}
+    task_progress.update_task_state(extra_meta=current_step)
+    TASK_LOG.info(u'%s, Task type: %s, Current step: %s', task_info_string, action_name, current_step)
+
+    # If there are any error rows (don't count the header), write them out as well
+    if len(err_rows) > 1:
+        upload_csv_to_report_store(err_rows, 'grade_report_err', course_id, start_date)
+
+    # One last update before we close out...
+    TASK_LOG.info(u'%s, Task type: %s, Finalizing grade task', task_info_string, action_name)
+    return task_progress.update_task_state(extra_meta=current_step)
+
+
+def _grade_report_rows(course_id, students, task_progress, task_info_string, action_name):
+    """
+    Build the rows of the grade report for `students`, updating
+    `task_progress` as students are graded.
+
+    Returns a tuple of (rows, err_rows). `rows` is a generator that grades
+    the students as it is consumed, so the report can be streamed to the
+    ReportStore; it starts with a header row if any student could be graded.
+    `err_rows` starts with a header row, and is complete once `rows` has been
+    exhausted.
+    """
+    err_rows = [["id", "username", "error_msg"]]
+    rows = _iter_grade_report_rows(course_id, students, task_progress, task_info_string, action_name, err_rows)
+    return rows, err_rows
+
+
+def _iter_grade_report_rows(  # pylint: disable=too-many-statements
+        course_id, students, task_progress, task_info_string, action_name, err_rows
+):
+    """
+    Grade each of `students` in the course and yield the rows of the grade
+    report, appending a row to `err_rows` for each student that could not
+    be graded.
+    """
+    status_interval = 100
     course = get_course_by_id(course_id)
     course_is_cohorted = is_course_cohorted(course.id)
     teams_enabled = course.teams_enabled
@@ -697,13 +780,11 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     certificate_whitelist = CertificateWhitelist.objects.filter(course_id=course_id, whitelist=True)
     whitelisted_user_ids = [entry.user_id for entry in certificate_whitelist]
 
-    # Loop over all our students and build our CSV lists in memory
+    # Loop over all our students and yield their rows as they are graded
     header = None
-    rows = []
-    err_rows = [["id", "username", "error_msg"]]
     current_step = {'step': 'Calculating Grades'}
 
-    total_enrolled_students = enrolled_students.count()
+    total_students = task_progress.total
     student_counter = 0
     TASK_LOG.info(
         u'%s, Task type: %s, Current step: %s, Starting grade calculation for total students: %s',
@@ -711,9 +792,9 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
         action_name,
         current_step,
 
-        total_enrolled_students
+        total_students
     )
-    for student, gradeset, err_msg in iterate_grades_for(course_id, enrolled_students):
+    for student, gradeset, err_msg in iterate_grades_for(course_id, students):
         # Periodically update task status (this is a cache write)
         if task_progress.attempted % status_interval == 0:
             task_progress.update_task_state(extra_meta=current_step)
@@ -728,7 +809,7 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
             action_name,
             current_step,
             student_counter,
-            total_enrolled_students
+            total_students
         )
 
         if gradeset:
@@ -736,7 +817,7 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
             task_progress.succeeded += 1
             if not header:
                 header = [section['label'] for section in gradeset[u'section_breakdown']]
-                rows.append(
+                yield (
                     ["id", "email", "username", "grade"] + header + cohorts_header +
                     group_configs_header + teams_header +
                     ['Enrollment Track', 'Verification Status'] + certificate_info_header
@@ -786,7 +867,7 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
             # possible for a student to have a 0.0 show up in their row but
             # still have 100% for the course.
             row_percents = [percents.get(label, 0.0) for label in header]
-            rows.append(
+            yield (
                 [student.id, student.email, student.username, gradeset['percent']] +
                 row_percents + cohorts_group_name + group_configs_group_names + team_name +
                 [enrollment_mode] + [verification_status] + certificate_info
@@ -802,25 +883,9 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
         action_name,
         current_step,
         student_counter,
-        total_enrolled_students
+        total_students
     )
 
-    # By this point, we've got the rows we're going to stuff into our CSV files.
-    current_step = {'step': 'Uploading CSVs'}
-    task_progress.update_task_state(extra_meta=current_step)
-    TASK_LOG.info(u'%s, Task type: %s, Current step: %s', task_info_string, action_name, current_step)
-
-    # Perform the actual upload
-    upload_csv_to_report_store(rows, 'grade_report', course_id, start_date)
-
-    # If there are any error rows (don't count the header), write them out as well
-    if len(err_rows) > 1:
-        upload_csv_to_report_store(err_rows, 'grade_report_err', course_id, start_date)
-
-    # One last update before we close out...
-    TASK_LOG.info(u'%s, Task type: %s, Finalizing grade task', task_info_string, action_name)
-    return task_progress.update_task_state(extra_meta=current_step)
-
 
 def _order_problems(blocks):
     """
@@ -910,33 +975,85 @@ def upload_problem_grade_report(_xmodule_instance_args, _entry_id, course_id, _t
     """
     Generate a CSV containing all students' problem grades within a given
     `course_id`.
+
+    Like the grade report, this is split across parallel subtasks for large
+    courses when the ENABLE_SHARDED_GRADE_REPORTS feature is enabled.
     """
     start_time = time()
     start_date = datetime.now(UTC)
-    status_interval = 100
     enrolled_students = CourseEnrollment.objects.users_enrolled_in(course_id)
     task_progress = TaskProgress(action_name, enrolled_students.count(), start_time)
 
-    # This struct encapsulates both the display names of each static item in the
-    # header row as values as well as the django User field names of those items
-    # as the keys.  It is structured in this way to keep the values related.
-    header_row = OrderedDict([('id', 'Student ID'), ('email', 'Email'), ('username', 'Username')])
-
     try:
-        course_structure = CourseStructure.objects.get(course_id=course_id)
-        blocks = course_structure.ordered_blocks
-        problems = _order_problems(blocks)
+        problems = _problems_for_grade_report(course_id)
     except CourseStructure.DoesNotExist:
         return task_progress.update_task_state(
             extra_meta={'step': 'Generating course structure. Please refresh and try again.'}
         )
 
-    # Just generate the static fields for now.
-    rows = [list(header_row.values()) + ['Final Grade'] + list(chain.from_iterable(problems.values()))]
+    if _use_sharded_grade_report(task_progress.total):
+        return queue_grade_report_shards(_entry_id, 'problem_grade_report', enrolled_students, action_name)
+
+    rows, error_rows = _problem_grade_report_rows(course_id, enrolled_students, task_progress, problems=problems)
+
+    # Perform the upload if any students have been successfully graded
+    rows = _rows_if_any_data(rows)
+    if rows is not None:
+        upload_csv_to_report_store(rows, 'problem_grade_report', course_id, start_date)
+    # If there are any error rows, write them out as well
+    if len(error_rows) > 1:
+        upload_csv_to_report_store(error_rows, 'problem_grade_report_err', course_id, start_date)
+
+    return task_progress.update_task_state(extra_meta={'step': 'Uploading CSV'})
+
+
+def _problems_for_grade_report(course_id):
+    """
+    Return the ordered problems of the course for the problem grade report,
+    as returned by `_order_problems`.
+
+    Raises CourseStructure.DoesNotExist if the course structure has not been
+    generated yet.
+    """
+    course_structure = CourseStructure.objects.get(course_id=course_id)
+    return _order_problems(course_structure.ordered_blocks)
+
+
+def _problem_grade_report_rows(course_id, students, task_progress, _task_info_string=None, _action_name=None,
+                               problems=None):
+    """
+    Build the rows of the problem grade report for `students`, updating
+    `task_progress` as students are graded.
+
+    Returns a tuple of (rows, error_rows), both of which start with a header
+    row. `rows` is a generator that grades the students as it is consumed;
+    `error_rows` is complete once `rows` has been exhausted.
+    """
+    if problems is None:
+        problems = _problems_for_grade_report(course_id)
+
+    # This struct encapsulates both the display names of each static item in the
+    # header row as values as well as the django User field names of those items
+    # as the keys.  It is structured in this way to keep the values related.
+    header_row = OrderedDict([('id', 'Student ID'), ('email', 'Email'), ('username', 'Username')])
     error_rows = [list(header_row.values()) + ['error_msg']]
+    rows = _iter_problem_grade_report_rows(course_id, students, task_progress, problems, header_row, error_rows)
+    return rows, error_rows
+
+
+def _iter_problem_grade_report_rows(course_id, students, task_progress, problems, header_row, error_rows):
+    """
+    Grade each of `students` in the course and yield the rows of the problem
+    grade report, appending a row to `error_rows` for each student that could
+    not be graded.
+    """
+    status_interval = 100
+
+    # Just generate the static fields for now.
+    yield list(header_row.values()) + ['Final Grade'] + list(chain.from_iterable(problems.values()))
     current_step = {'step': 'Calculating Grades'}
 
-    for student, gradeset, err_msg in iterate_grades_for(course_id, enrolled_students, keep_raw_scores=True):
+    for student, gradeset, err_msg in iterate_grades_for(course_id, students, keep_raw_scores=True):
         student_fields = [getattr(student, field_name) for field_name in header_row]
         task_progress.attempted += 1
 
@@ -964,20 +1081,278 @@ def upload_problem_grade_report(_xmodule_instance_args, _entry_id, course_id, _t
                 # the case that the student does not have access to it (e.g. A/B
                 # test or cohorted courseware).
                 earned_possible_values.append(['N/A', 'N/A'])
-        rows.append(student_fields + [final_grade] + list(chain.from_iterable(earned_possible_values)))
+        yield student_fields + [final_grade] + list(chain.from_iterable(earned_possible_values))
 
         task_progress.succeeded += 1
         if task_progress.attempted % status_interval == 0:
             task_progress.update_task_state(extra_meta=current_step)
 
-    # Perform the upload if any students have been successfully graded
-    if len(rows) > 1:
-        upload_csv_to_report_store(rows, 'problem_grade_report', course_id, start_date)
-    # If there are any error rows, write them out as well
-    if len(error_rows) > 1:
-        upload_csv_to_report_store(error_rows, 'problem_grade_report_err', course_id, start_date)
 
-    return task_progress.update_task_state(extra_meta={'step': 'Uploading CSV'})
+# Functions that build the rows of each report that can be generated by
+# `calculate_grade_report_shard` subtasks, keyed by report name.  Each returns
+# a tuple of (rows, err_rows) for the given students.
+GRADE_REPORT_ROW_BUILDERS = {
+    'grade_report': _grade_report_rows,
+    'problem_grade_report': _problem_grade_report_rows,
+}
+
+
+def _use_sharded_grade_report(num_students):
+    """
+    Return True if a grade report for `num_students` enrolled students should
+    be generated by parallel subtasks.
+    """
+    return (
+        settings.FEATURES.get('ENABLE_SHARDED_GRADE_REPORTS', False) and
+        num_students > settings.GRADE_REPORT_SHARD_SIZE
+    )
+
+
+def _grade_report_shard_store():
+    """
+    Return the ReportStore that holds partial grade reports. These are kept
+    out of the course directories so instructors never see them listed.
+    """
+    return ReportStore.from_config('GRADES_DOWNLOAD', subdirectory=GRADE_REPORT_SHARDS_DIRECTORY)
+
+
+def _grade_report_shard_filename(entry_id, csv_name, shard_index):
+    """Return the name of the partial `csv_name` CSV written by a shard."""
+    return u"{entry_id}_{csv_name}_shard{shard_index:05d}.csv".format(
+        entry_id=entry_id,
+        csv_name=csv_name,
+        shard_index=shard_index,
+    )
+
+
+def queue_grade_report_shards(entry_id, report_name, enrolled_students, action_name):
+    """
+    Split the grade report `report_name` of the InstructorTask `entry_id`
+    into subtasks that each grade up to `GRADE_REPORT_SHARD_SIZE` students.
+
+    Each shard covers a contiguous range of user ids, writes partial CSVs to
+    the shard store, and records its progress with the subtask machinery used
+    by bulk email. The last shard to finish merges the partial CSVs, in shard
+    order, into the final report, and only then marks the InstructorTask as
+    successful.
+
+    Returns the task progress as stored in the InstructorTask object.
+    """
+    # Imported here to avoid a circular import; tasks.py imports this module.
+    from instructor_task.tasks import calculate_grade_report_shard
+
+    entry = InstructorTask.objects.get(pk=entry_id)
+
+    # If this task was requeued after its shards had been queued, don't queue
+    # another set of them; the first set will complete the report.
+    if len(entry.subtasks) > 0 and len(entry.task_output) > 0:
+        TASK_LOG.warning(u"Task %s has already queued grade report shards! InstructorTask = %s", entry.task_id, entry)
+        return json.loads(entry.task_output)
+
+    shard_indexes = count()
+
+    def _create_shard_subtask(student_list, subtask_status):
+        """Creates a subtask grading the range of user ids in `student_list`."""
+        return calculate_grade_report_shard.subtask(
+            (
+                entry_id,
+                report_name,
+                action_name,
+                next(shard_indexes),
+                student_list[0]['pk'],
+                student_list[-1]['pk'],
+                subtask_status.to_dict(),
+            ),
+            task_id=subtask_status.task_id,
+            routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
+        )
+
+    return queue_subtasks_for_query(
+        entry,
+        action_name,
+        _create_shard_subtask,
+        [enrolled_students.order_by('id')],
+        [],
+        settings.GRADE_REPORT_SHARD_SIZE,
+        enrolled_students.count(),
+    )
+
+
+def run_grade_report_shard(entry_id, report_name, action_name, shard_index, first_student_id, last_student_id,
+                           subtask_status_dict):
+    """
+    Grade the enrolled students with ids from `first_student_id` to
+    `last_student_id` for one shard of the report `report_name`.
+
+    The shard's rows are written to partial CSVs in the shard store and its
+    counts are accumulated into the parent InstructorTask. On an unexpected
+    error the shard is retried up to `GRADE_REPORT_SHARD_MAX_RETRIES` times;
+    shards that already completed are never run again, so a retry only
+    regrades the students of the failed shard.
+
+    Returns the subtask status, as a dict.
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+
+    # Raises DuplicateTaskException if this shard is unknown to the InstructorTask
+    # or has already been completed by another worker.
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    entry = InstructorTask.objects.get(pk=entry_id)
+    course_id = entry.course_id
+    students = CourseEnrollment.objects.users_enrolled_in(course_id).filter(
+        id__gte=first_student_id,
+        id__lte=last_student_id,
+    ).order_by('id')
+    task_progress = TaskProgress(action_name, students.count(), time())
+
+    fmt = u'Task: {task_id}, InstructorTask ID: {entry_id}, Course: {course_id}, Shard: {shard_index}'
+    task_info_string = fmt.format(
+        task_id=current_task_id,
+        entry_id=entry_id,
+        course_id=course_id,
+        shard_index=shard_index,
+    )
+    TASK_LOG.info(
+        u'%s, Task type: %s, Grading students %s to %s',
+        task_info_string, action_name, first_student_id, last_student_id
+    )
+
+    try:
+        rows, err_rows = GRADE_REPORT_ROW_BUILDERS[report_name](
+            course_id, students, task_progress, task_info_string, action_name
+        )
+        shard_store = _grade_report_shard_store()
+        shard_store.store_rows(course_id, _grade_report_shard_filename(entry_id, report_name, shard_index), rows)
+        shard_store.store_rows(
+            course_id, _grade_report_shard_filename(entry_id, report_name + '_err', shard_index), err_rows
+        )
+    except Exception as exc:  # pylint: disable=broad-except
+        TASK_LOG.exception(u'%s, Task type: %s, Grade report shard failed', task_info_string, action_name)
+        if subtask_status.get_retry_count() < settings.GRADE_REPORT_SHARD_MAX_RETRIES:
+            subtask_status.increment(retried_withmax=1, state=RETRY)
+            update_subtask_status(entry_id, current_task_id, subtask_status)
+            raise _get_current_task().retry(
+                args=[
+                    entry_id,
+                    report_name,
+                    action_name,
+                    shard_index,
+                    first_student_id,
+                    last_student_id,
+                    subtask_status.to_dict(),
+                ],
+                exc=exc,
+                countdown=settings.GRADE_REPORT_SHARD_RETRY_DELAY,
+                max_retries=settings.GRADE_REPORT_SHARD_MAX_RETRIES,
+                throw=True,
+            )
+        # Out of retries: count every student of the shard as failed, so that
+        # the remaining shards can still complete the report.
+        subtask_status.increment(failed=task_progress.total, state=FAILURE)
+        update_subtask_status(entry_id, current_task_id, subtask_status, complete_parent=False)
+        merge_grade_report_shards_if_complete(entry_id, report_name)
+        raise
+
+    subtask_status.increment(
+        succeeded=task_progress.succeeded,
+        failed=task_progress.failed,
+        skipped=task_progress.skipped,
+        state=SUCCESS,
+    )
+    update_subtask_status(entry_id, current_task_id, subtask_status, complete_parent=False)
+    TASK_LOG.info(u'%s, Task type: %s, Grade report shard completed: %s', task_info_string, action_name, subtask_status)
+
+    merge_grade_report_shards_if_complete(entry_id, report_name)
+    return subtask_status.to_dict()
+
+
+def merge_grade_report_shards_if_complete(entry_id, report_name):
+    """
+    Once every shard of the InstructorTask `entry_id` has finished, merge
+    their partial CSVs into the final report and delete them.
+
+    Shards are merged in order, so students appear in the report in user id
+    order. Only the header of the first non-empty partial CSV is kept. A
+    cache lock makes sure that only one worker performs the merge; once the
+    report is merged, the lock is kept until it expires so that it isn't
+    merged again.
+
+    The shards leave the InstructorTask in progress, and it is only marked as
+    successful once the merged report has been uploaded. If the merge fails,
+    the InstructorTask is marked as failed.
+
+    Returns True if this call merged the report.
+    """
+    entry = InstructorTask.objects.get(pk=entry_id)
+    subtask_dict = json.loads(entry.subtasks)
+    num_shards = subtask_dict['total']
+    if subtask_dict['succeeded'] + subtask_dict['failed'] < num_shards:
+        return False
+
+    # cache.add fails if the key already exists
+    lock_key = 'grade-report-merge-{}'.format(entry_id)
+    if not cache.add(lock_key, 'true', GRADE_REPORT_MERGE_LOCK_EXPIRE):
+        return False
+
+    merged = False
+    try:
+        course_id = entry.course_id
+        shard_store = _grade_report_shard_store()
+        for csv_name in (report_name, report_name + '_err'):
+            filenames = [_grade_report_shard_filename(entry_id, csv_name, index) for index in xrange(num_shards)]
+            # Only upload reports that contain at least one student.
+            rows = _rows_if_any_data(_merged_shard_rows(shard_store, course_id, filenames))
+            if rows is not None:
+                upload_csv_to_report_store(rows, csv_name, course_id, entry.created)
+
+            for filename in filenames:
+                try:
+                    shard_store.delete(course_id, filename)
+                except Exception:  # pylint: disable=broad-except
+                    TASK_LOG.warning(u'Unable to delete grade report shard %s', filename, exc_info=True)
+
+        entry = InstructorTask.objects.get(pk=entry_id)
+        entry.task_state = SUCCESS
+        entry.save_now()
+        merged = True
+    except Exception as exc:  # pylint: disable=broad-except
+        TASK_LOG.exception(u'InstructorTask ID: %s, unable to merge grade report shards', entry_id)
+        entry = InstructorTask.objects.get(pk=entry_id)
+        entry.task_output = InstructorTask.create_output_for_failure(exc, traceback.format_exc())
+        entry.task_state = FAILURE
+        entry.save_now()
+    finally:
+        if not merged:
+            cache.delete(lock_key)
+
+    if merged:
+        TASK_LOG.info(u'InstructorTask ID: %s, merged %s grade report shards', entry_id, num_shards)
+    return merged
+
+
+def _merged_shard_rows(shard_store, course_id, filenames):
+    """
+    Yield the rows of the partial CSVs `filenames` in order. Each non-empty
+    partial CSV starts with the same header row, which is only yielded once.
+    Missing partial CSVs (from shards that failed) are skipped.
+    """
+    header_seen = False
+    for filename in filenames:
+        try:
+            rows = iter(shard_store.rows_for(course_id, filename))
+            header = next(rows, None)
+        except Exception:  # pylint: disable=broad-except
+            TASK_LOG.warning(u'Unable to read grade report shard %s', filename, exc_info=True)
+            continue
+        if header is None:
+            continue
+        if not header_seen:
+            header_seen = True
+            yield header
+        for row in rows:
+            yield row
 
 
 def upload_students_csv(_xmodule_instance_args, _entry_id, course_id, task_input, action_name):
@@ -994,22 +1369,22 @@ def upload_students_csv(_xmodule_instance_args, _entry_id, course_id, task_input
     current_step = {'step': 'Calculating Profile Info'}
     task_progress.update_task_state(extra_meta=current_step)
 
-    # compute the student features table and format it
+    # compute the student features table, streaming it to the report store
     query_features = task_input.get('features')
-    student_data = enrolled_students_features(course_id, query_features)
-    header, rows = format_dictlist(student_data, query_features)
 
-    task_progress.attempted = task_progress.succeeded = len(rows)
-    task_progress.skipped = task_progress.total - task_progress.attempted
+    def rows():
+        """Yield the header row, then a row for each student."""
+        yield query_features
+        student_data = iterate_enrolled_students_features(course_id, query_features)
+        for row in iterate_dictlist_rows(student_data, query_features):
+            task_progress.attempted += 1
+            task_progress.succeeded += 1
+            yield row
 
-    rows.insert(0, header)
+    upload_csv_to_report_store(rows(), 'student_profile_info', course_id, start_date)
+    task_progress.skipped = task_progress.total - task_progress.attempted
 
     current_step = {'step': 'Uploading CSV'}
-    task_progress.update_task_state(extra_meta=current_step)
-
-    # Perform the upload
-    upload_csv_to_report_store(rows, 'student_profile_info', course_id, start_date)
-
     return task_progress.update_task_state(extra_meta=current_step)
 
 
@@ -1021,7 +1396,6 @@ def upload_enrollment_report(_xmodule_instance_args, _entry_id, course_id, _task
     """
     start_time = time()
     start_date = datetime.now(UTC)
-    status_interval = 100
     students_in_course = CourseEnrollment.objects.enrolled_and_dropped_out_users(course_id)
     task_progress = TaskProgress(action_name, students_in_course.count(), start_time)
 
@@ -1034,12 +1408,29 @@ def upload_enrollment_report(_xmodule_instance_args, _entry_id, course_id, _task
     )
     TASK_LOG.info(u'%s, Task type: %s, Starting task execution', task_info_string, action_name)
 
-    # Loop over all our students and build our CSV lists in memory
-    rows = []
+    # Students' rows are gathered as they are streamed to the report store.
+    rows = _iter_enrollment_report_rows(course_id, students_in_course, task_progress, task_info_string, action_name)
+    upload_csv_to_report_store(rows, 'enrollment_report', course_id, start_date, config_name='FINANCIAL_REPORTS')
+
+    current_step = {'step': 'Uploading CSVs'}
+    task_progress.update_task_state(extra_meta=current_step)
+    TASK_LOG.info(u'%s, Task type: %s, Current step: %s', task_info_string, action_name, current_step)
+
+    # One last update before we close out...
+    TASK_LOG.info(u'%s, Task type: %s, Finalizing detailed enrollment task', task_info_string, action_name)
+    return task_progress.update_task_state(extra_meta=current_step)
+
+
+def _iter_enrollment_report_rows(course_id, students_in_course, task_progress, task_info_string, action_name):
+    """
+    Yield the rows of the detailed enrollment report for `students_in_course`,
+    starting with a header row, and update `task_progress` as it goes.
+    """
+    status_interval = 100
     header = None
     current_step = {'step': 'Gathering Profile Information'}
     enrollment_report_provider = PaidCourseEnrollmentReportProvider()
-    total_students = students_in_course.count()
+    total_students = task_progress.total
     student_counter = 0
     TASK_LOG.info(
         u'%s, Task type: %s, Current step: %s, generating detailed enrollment report for total students: %s',
@@ -1107,9 +1498,9 @@ def upload_enrollment_report(_xmodule_instance_args, _entry_id, course_id, _task
             for header_element in header:
                 # translate header into a localizable display string
                 display_headers.append(enrollment_report_headers.get(header_element, header_element))
-            rows.append(display_headers)
+            yield display_headers
 
-        rows.append(user_data.values() + course_enrollment_data.values() + payment_data.values())
+        yield user_data.values() + course_enrollment_data.values() + payment_data.values()
         task_progress.succeeded += 1
 
     TASK_LOG.info(
@@ -1121,18 +1512,6 @@ def upload_enrollment_report(_xmodule_instance_args, _entry_id, course_id, _task
         total_students
     )
 
-    # By this point, we've got the rows we're going to stuff into our CSV files.
-    current_step = {'step': 'Uploading CSVs'}
-    task_progress.update_task_state(extra_meta=current_step)
-    TASK_LOG.info(u'%s, Task type: %s, Current step: %s', task_info_string, action_name, current_step)
-
-    # Perform the actual upload
-    upload_csv_to_report_store(rows, 'enrollment_report', course_id, start_date, config_name='FINANCIAL_REPORTS')
-
-    # One last update before we close out...
-    TASK_LOG.info(u'%s, Task type: %s, Finalizing detailed enrollment task', task_info_string, action_name)
-    return task_progress.update_task_state(extra_meta=current_step)
-
 
 def upload_may_enroll_csv(_xmodule_instance_args, _entry_id, course_id, task_input, action_name):
     """
@@ -1370,7 +1749,9 @@ def upload_course_survey_report(_xmodule_instance_args, _entry_id, course_id, _t
     return task_progress.update_task_state(extra_meta=current_step)
 
 
-def upload_proctored_exam_results_report(_xmodule_instance_args, _entry_id, course_id, _task_input, action_name):  # pylint: disable=invalid-name
+def upload_proctored_exam_results_report(  # pylint: disable=invalid-name
+        _xmodule_instance_args, _entry_id, course_id, _task_input, action_name
+):
     """
     For a given `course_id`, generate a CSV file containing
     information about proctored exam results, and store using a `ReportStore`.
@@ -1572,7 +1953,9 @@ def students_require_certificate(course_id, enrolled_students, statuses_to_regen
         return list(set(enrolled_students) - set(students_already_have_certs))
 
 
-def invalidate_generated_certificates(course_id, enrolled_students, certificate_statuses):  # pylint: disable=invalid-name
+def invalidate_generated_certificates(  # pylint: disable=invalid-name
+        course_id, enrolled_students, certificate_statuses
+):
     """
     Invalidate generated certificates for all enrolled students in the given course having status in
     'certificate_statuses'.
@@ -3,8 +3,12 @@ Tests for instructor_task/models.py.
 """
 
 from cStringIO import StringIO
+import csv
+from gzip import GzipFile
 import mock
+import os
 import time
+from uuid import uuid4
 from datetime import datetime
 from unittest import TestCase
 
@@ -23,6 +27,7 @@ class MockKey(object):
 
     def set_contents_from_string(self, contents, headers):  # pylint: disable=unused-argument
         """ Expected method on a Key object. """
+        self.contents = contents
         self.bucket.store_key(self)
 
     def generate_url(self, expires_in):  # pylint: disable=unused-argument
@@ -30,10 +35,42 @@ class MockKey(object):
         return "http://fake-edx-s3.edx.org/"
 
 
+class MockMultiPartUpload(object):
+    """ Mocking a boto S3 MultiPartUpload object. """
+    def __init__(self, bucket, key_name):
+        self.bucket = bucket
+        self.key_name = key_name
+        self.parts = {}
+        self.completed = False
+        self.cancelled = False
+
+    def upload_part_from_file(self, fp, part_num):
+        """ Expected method on a MultiPartUpload object. """
+        self.parts[part_num] = fp.read()
+
+    def complete_upload(self):
+        """ Expected method on a MultiPartUpload object. """
+        self.completed = True
+        key = MockKey(self.bucket)
+        key.contents = ''.join(self.parts[part_num] for part_num in sorted(self.parts))
+        self.bucket.store_key(key)
+
+    def cancel_upload(self):
+        """ Expected method on a MultiPartUpload object. """
+        self.cancelled = True
+
+
 class MockBucket(object):
     """ Mocking a boto S3 Bucket object. """
     def __init__(self, _name):
         self.keys = []
+        self.multipart_uploads = []
+
+    def initiate_multipart_upload(self, key_name, headers):  # pylint: disable=unused-argument
+        """ Expected method on a Bucket object. """
+        multipart_upload = MockMultiPartUpload(self, key_name)
+        self.multipart_uploads.append(multipart_upload)
+        return multipart_upload
 
     def store_key(self, key):
         """ Not a Bucket method, created just to store the keys in the Bucket for testing purposes. """
@@ -93,6 +130,35 @@ class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase
         """ Create and return a LocalFSReportStore. """
         return LocalFSReportStore.from_config(config_name='GRADES_DOWNLOAD')
 
+    def test_store_rows_from_generator(self):
+        """
+        Test that rows produced by a generator are written out, and that no
+        temporary file is left behind.
+        """
+        report_store = self.create_report_store()
+        rows = ([u'r\xf6w', unicode(index)] for index in range(1000))
+        report_store.store_rows(self.course_id, 'report.csv', rows)
+
+        self.assertEqual(
+            list(report_store.rows_for(self.course_id, 'report.csv')),
+            [[u'r\xf6w', unicode(index)] for index in range(1000)]
+        )
+        self.assertFalse([name for name in os.listdir(report_store.root_path) if name.endswith('.tmp')])
+
+    def test_store_rows_failure(self):
+        """
+        Test that a report whose rows fail to be produced is not listed.
+        """
+        def failing_rows():
+            """ Yield a row, then fail. """
+            yield ['row']
+            raise ValueError()
+
+        report_store = self.create_report_store()
+        with self.assertRaises(ValueError):
+            report_store.store_rows(self.course_id, 'report.csv', failing_rows())
+        self.assertEqual(report_store.links_for(self.course_id), [])
+
 
 @mock.patch('instructor_task.models.S3Connection', new=MockS3Connection)
 @mock.patch('instructor_task.models.Key', new=MockKey)
@@ -105,3 +171,53 @@ class S3ReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase):
     def create_report_store(self):
         """ Create and return a S3ReportStore. """
         return S3ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+
+    def _rows(self, num_rows):
+        """ Return a generator of `num_rows` rows of hard to compress data. """
+        return ([uuid4().hex, unicode(index)] for index in xrange(num_rows))
+
+    def _decompress(self, contents):
+        """ Return the rows of a gzip'd csv file. """
+        return list(csv.reader(GzipFile(fileobj=StringIO(contents), mode="rb")))
+
+    def test_store_small_report(self):
+        """
+        Test that a report smaller than a multipart chunk is stored at once.
+        """
+        report_store = self.create_report_store()
+        report_store.store_rows(self.course_id, 'report.csv', self._rows(10))
+
+        self.assertEqual(report_store.bucket.multipart_uploads, [])
+        self.assertEqual(len(self._decompress(report_store.bucket.keys[0].contents)), 10)
+
+    @mock.patch.object(S3ReportStore, 'MULTIPART_CHUNK_SIZE', 1024)
+    def test_store_report_in_parts(self):
+        """
+        Test that a larger report is streamed with a multipart upload.
+        """
+        report_store = self.create_report_store()
+        report_store.store_rows(self.course_id, 'report.csv', self._rows(1000))
+
+        multipart_upload = report_store.bucket.multipart_uploads[0]
+        self.assertTrue(multipart_upload.completed)
+        self.assertGreater(len(multipart_upload.parts), 1)
+        rows = self._decompress(report_store.bucket.keys[0].contents)
+        self.assertEqual([row[1] for row in rows], [unicode(index) for index in range(1000)])
+
+    @mock.patch.object(S3ReportStore, 'MULTIPART_CHUNK_SIZE', 1024)
+    def test_store_report_in_parts_failure(self):
+        """
+        Test that a multipart upload is cancelled if producing the rows fails.
+        """
+        def failing_rows():
+            """ Yield some rows, then fail. """
+            for row in self._rows(1000):
+                yield row
+            raise ValueError()
+
+        report_store = self.create_report_store()
+        with self.assertRaises(ValueError):
+            report_store.store_rows(self.course_id, 'report.csv', failing_rows())
+
+        self.assertTrue(report_store.bucket.multipart_uploads[0].cancelled)
+        self.assertEqual(report_store.bucket.keys, [])
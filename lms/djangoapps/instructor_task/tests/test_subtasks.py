@@ -1,13 +1,14 @@
 """
 Unit tests for instructor_task subtasks.
 """
+from unittest import TestCase
 from uuid import uuid4
 
 from mock import Mock, patch
 
 from student.models import CourseEnrollment
 
-from instructor_task.subtasks import queue_subtasks_for_query
+from instructor_task.subtasks import SubtaskStatus, queue_subtasks_for_query
 from instructor_task.tests.factories import InstructorTaskFactory
 from instructor_task.tests.test_base import InstructorTaskCourseTestCase
 
@@ -80,3 +81,33 @@ class TestSubtasks(InstructorTaskCourseTestCase):
         self.assertEqual(len(mock_create_subtask_fcn_args[0][0][0]), 3)
         self.assertEqual(len(mock_create_subtask_fcn_args[1][0][0]), 3)
         self.assertEqual(len(mock_create_subtask_fcn_args[2][0][0]), 5)
+
+    @patch('instructor_task.subtasks.ITEMS_PER_QUERY', 2)
+    def test_queue_subtasks_for_query_by_pk(self):
+        """Test that queue_subtasks_for_query() generates the items of each query set in order of pk."""
+
+        mock_create_subtask_fcn = Mock()
+        self._queue_subtasks(mock_create_subtask_fcn, 3, 7, 0)
+
+        items = [item for args in mock_create_subtask_fcn.call_args_list for item in args[0][0]]
+        enrollments = CourseEnrollment.objects.filter(course_id=self.course.id).order_by('pk')
+        self.assertEqual([item['pk'] for item in items], list(enrollments.values_list('pk', flat=True)))
+
+
+class TestSubtaskStatus(TestCase):
+    """Tests for SubtaskStatus."""
+
+    def test_throughput(self):
+        subtask_status = SubtaskStatus.create('task_id')
+        self.assertIsNone(subtask_status.get_throughput())
+        subtask_status.increment(succeeded=6, failed=2, duration=1.5)
+        subtask_status.increment(skipped=3, duration=0.5)
+        self.assertEqual(subtask_status.get_throughput(), 4)
+
+    def test_duration_across_retries(self):
+        subtask_status = SubtaskStatus.create('task_id')
+        subtask_status.increment(succeeded=1, duration=2.0)
+        subtask_status = SubtaskStatus.from_dict(subtask_status.to_dict())
+        subtask_status.increment(succeeded=1, duration=2.0)
+        self.assertEqual(subtask_status.duration, 4.0)
+        self.assertEqual(subtask_status.get_throughput(), 0.5)
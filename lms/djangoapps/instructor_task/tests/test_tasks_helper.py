@@ -8,10 +8,15 @@ Tests that CSV grade report generation works with unicode emails.
 """
 import ddt
 from mock import Mock, patch
+import os
 import tempfile
 import json
+from uuid import uuid4
+from celery.exceptions import RetryTaskError
+from celery.states import FAILURE, PROGRESS, RETRY, SUCCESS
 from openedx.core.djangoapps.course_groups import cohorts
 import unicodecsv
+from django.conf import settings
 from django.core.urlresolvers import reverse
 from django.test.utils import override_settings
 
@@ -32,7 +37,9 @@ from student.models import CourseEnrollment, CourseEnrollmentAllowed, ManualEnro
 from lms.djangoapps.verify_student.tests.factories import SoftwareSecurePhotoVerificationFactory
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.partitions.partitions import Group, UserPartition
-from instructor_task.models import ReportStore
+from instructor_task.models import InstructorTask, ReportStore
+from instructor_task.subtasks import SubtaskStatus, initialize_subtask_info
+from instructor_task.tests.factories import InstructorTaskFactory
 from survey.models import SurveyForm, SurveyAnswer
 from instructor_task.tasks_helper import (
     cohort_students_and_upload,
@@ -45,6 +52,10 @@ from instructor_task.tasks_helper import (
     upload_exec_summary_report,
     upload_course_survey_report,
     generate_students_certificates,
+    run_grade_report_shard,
+    merge_grade_report_shards_if_complete,
+    GRADE_REPORT_ROW_BUILDERS,
+    GRADE_REPORT_SHARDS_DIRECTORY,
 )
 from instructor_analytics.basic import UNAVAILABLE
 from openedx.core.djangoapps.util.testing import ContentGroupTestCase, TestConditionalContent
@@ -651,6 +662,135 @@ class TestProblemGradeReport(TestReportMixin, InstructorTaskModuleTestCase):
         ])
 
 
+@patch.dict(settings.FEATURES, {'ENABLE_SHARDED_GRADE_REPORTS': True})
+@override_settings(GRADE_REPORT_SHARD_SIZE=2)
+class TestShardedGradeReports(TestReportMixin, InstructorTaskModuleTestCase):
+    """
+    Test that grade reports split across parallel subtasks are merged into
+    the same report as one generated by a single task.
+    """
+    def setUp(self):
+        super(TestShardedGradeReports, self).setUp()
+        self.initialize_course()
+        self.students = [self.create_student(u'üser_{}'.format(index)) for index in range(5)]
+
+    def _create_entry(self, task_type='grade_problems'):
+        """Create the InstructorTask entry of a report."""
+        return InstructorTaskFactory.create(
+            course_id=self.course.id,
+            task_id=str(uuid4()),
+            task_key='dummy_task_key',
+            task_type=task_type,
+        )
+
+    def _shard_files(self):
+        """Return the partial reports left in the shard store."""
+        shard_store = ReportStore.from_config('GRADES_DOWNLOAD', subdirectory=GRADE_REPORT_SHARDS_DIRECTORY)
+        course_dir = shard_store.path_to(self.course.id, '')
+        return os.listdir(course_dir) if os.path.exists(course_dir) else []
+
+    @patch('instructor_task.tasks_helper._get_current_task')
+    def test_sharded_grade_report(self, _get_current_task):
+        entry = self._create_entry()
+        upload_grades_csv(None, entry.id, self.course.id, None, 'graded')
+
+        entry = InstructorTask.objects.get(pk=entry.id)
+        self.assertEqual(entry.task_state, SUCCESS)
+        subtasks = json.loads(entry.subtasks)
+        self.assertEqual(subtasks['total'], 3)
+        self.assertEqual(subtasks['succeeded'], 3)
+        self.assertDictContainsSubset(
+            {'attempted': 5, 'succeeded': 5, 'failed': 0, 'total': 5},
+            json.loads(entry.task_output)
+        )
+
+        # Students are listed once each, in user id order, under a single header.
+        self.verify_rows_in_csv(
+            [{u'id': unicode(student.id), u'username': student.username} for student in self.students],
+            ignore_other_columns=True,
+        )
+        self.assertEqual(len(ReportStore.from_config('GRADES_DOWNLOAD').links_for(self.course.id)), 1)
+        self.assertEqual(self._shard_files(), [])
+
+    @patch('instructor_task.tasks_helper._get_current_task')
+    def test_sharded_problem_grade_report(self, _get_current_task):
+        entry = self._create_entry()
+        upload_problem_grade_report(None, entry.id, self.course.id, None, 'graded')
+
+        self.verify_rows_in_csv([
+            {
+                u'Student ID': unicode(student.id),
+                u'Email': student.email,
+                u'Username': student.username,
+                u'Final Grade': '0.0',
+            }
+            for student in self.students
+        ])
+        self.assertEqual(self._shard_files(), [])
+
+    def test_failed_shard_is_retried(self):
+        entry = self._create_entry()
+        subtask_id = str(uuid4())
+        initialize_subtask_info(entry, 'graded', len(self.students), [subtask_id])
+        shard_args = [entry.id, 'grade_report', 'graded', 0, self.students[0].id, self.students[-1].id]
+
+        current_task = Mock()
+        current_task.retry.side_effect = RetryTaskError()
+        failing_builder = Mock(side_effect=Exception('grading failed'))
+        with patch('instructor_task.tasks_helper._get_current_task', return_value=current_task):
+            with patch.dict(GRADE_REPORT_ROW_BUILDERS, {'grade_report': failing_builder}):
+                with self.assertRaises(RetryTaskError):
+                    run_grade_report_shard(*(shard_args + [SubtaskStatus.create(subtask_id).to_dict()]))
+
+            retry_kwargs = current_task.retry.call_args[1]
+            retried_status = SubtaskStatus.from_dict(retry_kwargs['args'][-1])
+            self.assertEqual(retried_status.state, RETRY)
+            self.assertEqual(retried_status.retried_withmax, 1)
+            self.assertEqual(retry_kwargs['countdown'], settings.GRADE_REPORT_SHARD_RETRY_DELAY)
+            self.assertFalse(ReportStore.from_config('GRADES_DOWNLOAD').links_for(self.course.id))
+
+            # The retried shard completes the report.
+            run_grade_report_shard(*(shard_args + [retried_status.to_dict()]))
+
+        subtasks = json.loads(InstructorTask.objects.get(pk=entry.id).subtasks)
+        self.assertEqual(subtasks['succeeded'], 1)
+        self.verify_rows_in_csv(
+            [{u'id': unicode(student.id)} for student in self.students],
+            ignore_other_columns=True,
+        )
+
+    @patch('instructor_task.tasks_helper._get_current_task')
+    def test_task_in_progress_until_merged(self, _get_current_task):
+        entry = self._create_entry()
+        with patch('instructor_task.tasks_helper.merge_grade_report_shards_if_complete'):
+            upload_grades_csv(None, entry.id, self.course.id, None, 'graded')
+
+        # Every shard has completed, but the report hasn't been merged yet.
+        entry = InstructorTask.objects.get(pk=entry.id)
+        self.assertEqual(json.loads(entry.subtasks)['succeeded'], 3)
+        self.assertEqual(entry.task_state, PROGRESS)
+        self.assertFalse(ReportStore.from_config('GRADES_DOWNLOAD').links_for(self.course.id))
+
+        self.assertTrue(merge_grade_report_shards_if_complete(entry.id, 'grade_report'))
+        self.assertEqual(InstructorTask.objects.get(pk=entry.id).task_state, SUCCESS)
+
+    @patch('instructor_task.tasks_helper._get_current_task')
+    def test_failed_merge(self, _get_current_task):
+        entry = self._create_entry()
+        with patch('instructor_task.tasks_helper.upload_csv_to_report_store', side_effect=Exception('upload failed')):
+            upload_grades_csv(None, entry.id, self.course.id, None, 'graded')
+
+        entry = InstructorTask.objects.get(pk=entry.id)
+        self.assertEqual(entry.task_state, FAILURE)
+        self.assertEqual(json.loads(entry.task_output)['message'], 'upload failed')
+
+        # The lock is released, so the merge can be run again.
+        self.assertTrue(merge_grade_report_shards_if_complete(entry.id, 'grade_report'))
+        self.assertEqual(InstructorTask.objects.get(pk=entry.id).task_state, SUCCESS)
+        self.assertEqual(len(ReportStore.from_config('GRADES_DOWNLOAD').links_for(self.course.id)), 1)
+        self.assertFalse(merge_grade_report_shards_if_complete(entry.id, 'grade_report'))
+
+
 class TestProblemReportSplitTestContent(TestReportMixin, TestConditionalContent, InstructorTaskModuleTestCase):
     """
     Test the problem report on a course that has split tests.
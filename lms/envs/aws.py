@@ -277,6 +277,12 @@ VIRTUAL_UNIVERSITIES = ENV_TOKENS.get('VIRTUAL_UNIVERSITIES', [])
 META_UNIVERSITIES = ENV_TOKENS.get('META_UNIVERSITIES', {})
 COMMENTS_SERVICE_URL = ENV_TOKENS.get("COMMENTS_SERVICE_URL", '')
 COMMENTS_SERVICE_KEY = ENV_TOKENS.get("COMMENTS_SERVICE_KEY", '')
+COMMENTS_SERVICE_POOL_SIZE = ENV_TOKENS.get("COMMENTS_SERVICE_POOL_SIZE", COMMENTS_SERVICE_POOL_SIZE)
+COMMENTS_SERVICE_TIMEOUT = ENV_TOKENS.get("COMMENTS_SERVICE_TIMEOUT", COMMENTS_SERVICE_TIMEOUT)
+COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS = ENV_TOKENS.get(
+    "COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS", COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS
+)
+DISCUSSION_DATA_CACHE_TIMEOUT = ENV_TOKENS.get("DISCUSSION_DATA_CACHE_TIMEOUT", DISCUSSION_DATA_CACHE_TIMEOUT)
 CERT_QUEUE = ENV_TOKENS.get("CERT_QUEUE", 'test-pull')
 ZENDESK_URL = ENV_TOKENS.get("ZENDESK_URL")
 FEEDBACK_SUBMISSION_EMAIL = ENV_TOKENS.get("FEEDBACK_SUBMISSION_EMAIL")
@@ -519,10 +525,33 @@ TRACKING_SEGMENTIO_SOURCE_MAP = ENV_TOKENS.get("TRACKING_SEGMENTIO_SOURCE_MAP",
 # Student identity verification settings
 VERIFY_STUDENT = AUTH_TOKENS.get("VERIFY_STUDENT", VERIFY_STUDENT)
 
+# Static content server
+STATIC_CONTENT_CACHE_MAX_SIZE = ENV_TOKENS.get('STATIC_CONTENT_CACHE_MAX_SIZE', STATIC_CONTENT_CACHE_MAX_SIZE)
+STATIC_CONTENT_CACHE_CHUNK_SIZE = ENV_TOKENS.get('STATIC_CONTENT_CACHE_CHUNK_SIZE', STATIC_CONTENT_CACHE_CHUNK_SIZE)
+STATIC_URL_REWRITE_MAP_LRU_SIZE = ENV_TOKENS.get('STATIC_URL_REWRITE_MAP_LRU_SIZE', STATIC_URL_REWRITE_MAP_LRU_SIZE)
+
+# Block structures
+COURSE_STRUCTURE_LRU_MAX_SIZE = ENV_TOKENS.get('COURSE_STRUCTURE_LRU_MAX_SIZE', COURSE_STRUCTURE_LRU_MAX_SIZE)
+COURSE_STRUCTURE_CACHE_FORMAT = ENV_TOKENS.get('COURSE_STRUCTURE_CACHE_FORMAT', COURSE_STRUCTURE_CACHE_FORMAT)
+BLOCK_STRUCTURE_LRU_MAX_SIZE = ENV_TOKENS.get('BLOCK_STRUCTURE_LRU_MAX_SIZE', BLOCK_STRUCTURE_LRU_MAX_SIZE)
+BLOCK_STRUCTURE_MAX_STALENESS = ENV_TOKENS.get('BLOCK_STRUCTURE_MAX_STALENESS', BLOCK_STRUCTURE_MAX_STALENESS)
+BLOCK_STRUCTURE_UPDATE_RETRY_DELAY = ENV_TOKENS.get(
+    'BLOCK_STRUCTURE_UPDATE_RETRY_DELAY', BLOCK_STRUCTURE_UPDATE_RETRY_DELAY
+)
+BLOCK_STRUCTURE_UPDATE_MAX_RETRIES = ENV_TOKENS.get(
+    'BLOCK_STRUCTURE_UPDATE_MAX_RETRIES', BLOCK_STRUCTURE_UPDATE_MAX_RETRIES
+)
+BLOCK_STRUCTURE_UPDATE_LOCK_EXPIRE = ENV_TOKENS.get(
+    'BLOCK_STRUCTURE_UPDATE_LOCK_EXPIRE', BLOCK_STRUCTURE_UPDATE_LOCK_EXPIRE
+)
+
 # Grades download
 GRADES_DOWNLOAD_ROUTING_KEY = HIGH_MEM_QUEUE
 
 GRADES_DOWNLOAD = ENV_TOKENS.get("GRADES_DOWNLOAD", GRADES_DOWNLOAD)
+GRADE_REPORT_SHARD_SIZE = ENV_TOKENS.get('GRADE_REPORT_SHARD_SIZE', GRADE_REPORT_SHARD_SIZE)
+GRADE_REPORT_SHARD_RETRY_DELAY = ENV_TOKENS.get('GRADE_REPORT_SHARD_RETRY_DELAY', GRADE_REPORT_SHARD_RETRY_DELAY)
+GRADE_REPORT_SHARD_MAX_RETRIES = ENV_TOKENS.get('GRADE_REPORT_SHARD_MAX_RETRIES', GRADE_REPORT_SHARD_MAX_RETRIES)
 
 # financial reports
 FINANCIAL_REPORTS = ENV_TOKENS.get("FINANCIAL_REPORTS", FINANCIAL_REPORTS)
@@ -60,6 +60,18 @@ DISCUSSION_SETTINGS = {
     'MAX_COMMENT_DEPTH': 2,
 }
 
+# Connections to the comments service: the number of connections that each
+# process keeps alive, the timeout of requests in seconds (or a tuple of the
+# connect and read timeouts), and the number of requests that a view sends
+# concurrently.
+COMMENTS_SERVICE_POOL_SIZE = 10
+COMMENTS_SERVICE_TIMEOUT = 5
+COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS = 4
+
+# Seconds that the discussion modules and category map of each version of a
+# course are cached for, or 0 to load them on every request.
+DISCUSSION_DATA_CACHE_TIMEOUT = 24 * 60 * 60
+
 
 # Features
 FEATURES = {
@@ -367,6 +379,19 @@ FEATURES = {
     # Enable the max score cache to speed up grading
     'ENABLE_MAX_SCORE_CACHE': True,
 
+    # Store subsection grades per user and only regrade the subsections whose
+    # scores changed, instead of walking the whole course on every grade.
+    'ENABLE_PERSISTENT_SUBSECTION_GRADES': False,
+
+    # Generate the grade and problem grade reports of large courses with
+    # parallel subtasks that each grade GRADE_REPORT_SHARD_SIZE students.
+    'ENABLE_SHARDED_GRADE_REPORTS': False,
+
+    # On course publish, keep serving the cached block structure of the
+    # course for up to BLOCK_STRUCTURE_MAX_STALENESS seconds while a task
+    # recollects only the published blocks, instead of clearing it.
+    'ENABLE_ASYNC_BLOCK_STRUCTURE_UPDATE': False,
+
     # Enable LTI Provider feature.
     'ENABLE_LTI_PROVIDER': False,
 }
@@ -751,6 +776,19 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # Pool of warm sandbox workers, used instead of starting the sandboxed
+    # Python for every execution.  See capa.safe_exec.sandbox_pool.
+    'pool': {
+        # How many workers can run code at once in each process?  0 disables
+        # the pool.
+        'size': 0,
+        # How many executions before a worker is replaced?
+        'max_executions': 100,
+        # How many bytes of memory can a worker's executions grow to before it
+        # is replaced?  0 means no limit.
+        'max_memory': 0,
+    },
 }
 
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
@@ -1142,6 +1180,10 @@ MIDDLEWARE_CLASSES = (
     'microsite_configuration.middleware.MicrositeSessionCookieDomainMiddleware',
 )
 
+# Whether responses report the hits and misses of the functions memoized in the request, in a
+# X-Request-Cache-Stats header.
+REQUEST_CACHE_STATS_HEADER = False
+
 # Clickjacking protection can be enabled by setting this to 'DENY'
 X_FRAME_OPTIONS = 'ALLOW'
 
@@ -2150,6 +2192,48 @@ BADGR_API_TOKEN = None
 BADGR_BASE_URL = "http://localhost:8005"
 BADGR_ISSUER_SLUG = "example-issuer"
 
+################### Static Content Server ####################
+
+# Assets smaller than this many bytes are cached whole by
+# contentserver.middleware.StaticContentServer. Larger assets are cached in
+# chunks of STATIC_CONTENT_CACHE_CHUNK_SIZE bytes as byte ranges of them are
+# served, or not at all if it is 0.
+STATIC_CONTENT_CACHE_MAX_SIZE = 1024 * 1024
+STATIC_CONTENT_CACHE_CHUNK_SIZE = 256 * 1024
+
+# Number of courses whose static url rewrite maps each process keeps, see
+# static_replace.StaticUrlRewriteMap. Set to 0 to disable the maps.
+STATIC_URL_REWRITE_MAP_LRU_SIZE = 100
+
+###################### Split Modulestore ######################
+
+# Maximum size, in bytes of encoded data, of the course structures each
+# process keeps decoded in memory in front of the course_structure_cache.
+# Set to 0 to disable.
+COURSE_STRUCTURE_LRU_MAX_SIZE = 100 * 1024 * 1024
+
+# Encoding of the structures in the course_structure_cache: "pickle", or
+# "compact" for xmodule.modulestore.split_mongo.structure_codec.
+COURSE_STRUCTURE_CACHE_FORMAT = 'pickle'
+
+###################### Block Structures ######################
+
+# Maximum size, in bytes of pickled data, of the block structures each
+# process keeps deserialized in memory in front of the block structure
+# cache. Set to 0 to disable.
+BLOCK_STRUCTURE_LRU_MAX_SIZE = 100 * 1024 * 1024
+
+# Seconds a block structure marked stale by a course publish is served
+# before it is recollected on request.
+BLOCK_STRUCTURE_MAX_STALENESS = 30 * 60
+
+# Retry policy of the task updating a block structure while another
+# update of the same course holds its lock, and the lock's expiry in
+# seconds.
+BLOCK_STRUCTURE_UPDATE_RETRY_DELAY = 30
+BLOCK_STRUCTURE_UPDATE_MAX_RETRIES = 5
+BLOCK_STRUCTURE_UPDATE_LOCK_EXPIRE = 10 * 60
+
 ###################### Grade Downloads ######################
 GRADES_DOWNLOAD_ROUTING_KEY = HIGH_MEM_QUEUE
 
@@ -2159,6 +2243,16 @@ GRADES_DOWNLOAD = {
     'ROOT_PATH': '/tmp/edx-s3/grades',
 }
 
+# Number of students whose scores are loaded together by
+# courseware.grades.iterate_grades_for
+GRADES_BATCH_SIZE = 100
+
+# Maximum number of students graded by each subtask of a sharded grade report
+GRADE_REPORT_SHARD_SIZE = 5000
+# Seconds to wait, and number of times to retry, before giving up on a shard
+GRADE_REPORT_SHARD_RETRY_DELAY = 30
+GRADE_REPORT_SHARD_MAX_RETRIES = 3
+
 FINANCIAL_REPORTS = {
     'STORAGE_TYPE': 'localfs',
     'BUCKET': 'edx-financial-reports',
@@ -58,6 +58,13 @@ FEATURES['DISABLE_START_DATES'] = True
 # the one in cms/envs/test.py
 FEATURES['ENABLE_DISCUSSION_SERVICE'] = False
 
+# Send the requests to the comments service in order, for the tests that check
+# the requests sent by the views.
+COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS = 1
+
+# Tests change the discussion modules of courses without publishing them.
+DISCUSSION_DATA_CACHE_TIMEOUT = 0
+
 FEATURES['ENABLE_SERVICE_STATUS'] = True
 
 FEATURES['ENABLE_HINTER_INSTRUCTOR_VIEW'] = True
@@ -235,6 +242,14 @@ CACHES = {
     },
 }
 
+# The course_structure_cache is a dummy cache, so don't keep decoded course
+# structures in front of it either.
+COURSE_STRUCTURE_LRU_MAX_SIZE = 0
+
+# Tests mock the modulestore and staticfiles storage, so don't keep the static
+# url rewrite maps of courses between tests.
+STATIC_URL_REWRITE_MAP_LRU_SIZE = 0
+
 # Dummy secret key for dev
 SECRET_KEY = '85920908f28904ed733fe576320db18cabd7b6cd'
 
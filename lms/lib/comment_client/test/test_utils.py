@@ -0,0 +1,110 @@
+"""
+Tests of the connections to the comments service.
+"""
+# pylint: disable=protected-access
+import threading
+
+import requests
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils.translation import get_language, override
+from mock import Mock, patch
+
+from lms.lib.comment_client import utils
+
+
+class SessionTestCase(TestCase):
+    """
+    Tests of the session of each process.
+    """
+    def test_session_reused(self):
+        session = utils._get_process_state()['session']
+        self.assertIs(utils._get_process_state()['session'], session)
+        with patch.object(utils.os, 'getpid', return_value=-1):
+            self.assertIsNot(utils._get_process_state()['session'], session)
+        self.assertIsNot(utils._get_process_state()['session'], session)
+
+    def test_cookies_not_kept(self):
+        session = utils._get_process_state()['session']
+        headers = Mock()
+        headers.getheaders.side_effect = lambda name: ['sessionid=secret; Path=/'] if name == 'Set-Cookie' else []
+        requests.cookies.extract_cookies_to_jar(
+            session.cookies,
+            requests.Request('GET', 'http://localhost:4567/api/v1/users/1').prepare(),
+            Mock(_original_response=Mock(msg=headers)),
+        )
+        self.assertEqual(len(session.cookies), 0)
+
+    @override_settings(COMMENTS_SERVICE_TIMEOUT=[1, 10])
+    @patch('lms.lib.comment_client.utils.session_request', autospec=True)
+    def test_timeout(self, mock_request):
+        mock_request.return_value = Mock(status_code=200, text='{}', json=Mock(return_value={}))
+        utils.perform_request('get', 'http://localhost:4567/api/v1/users/1')
+        self.assertEqual(mock_request.call_args[1]['timeout'], (1, 10))
+
+
+@override_settings(COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS=3)
+class PerformConcurrentlyTestCase(TestCase):
+    """
+    Tests of perform_concurrently.
+    """
+    def test_concurrent(self):
+        started = threading.Event()
+
+        def wait():
+            """
+            Wait for the other function to have started.
+            """
+            return started.wait(5)
+
+        def start():
+            """
+            Let the other function return.
+            """
+            started.set()
+            return threading.current_thread()
+
+        self.assertEqual(utils.perform_concurrently(wait, start)[0], True)
+        self.assertIsNot(utils.perform_concurrently(start, start)[1], threading.current_thread())
+
+    @override_settings(COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS=1)
+    def test_in_order(self):
+        calls = []
+        results = utils.perform_concurrently(
+            lambda: calls.append(1) or threading.current_thread(),
+            lambda: calls.append(2) or threading.current_thread(),
+        )
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(results, [threading.current_thread()] * 2)
+
+    def test_results(self):
+        self.assertEqual(utils.perform_concurrently(lambda: 1, lambda: 2, lambda: 3, lambda: 4), [1, 2, 3, 4])
+
+    def test_nested(self):
+        self.assertEqual(
+            utils.perform_concurrently(lambda: 1, lambda: utils.perform_concurrently(lambda: 2, lambda: 3)),
+            [1, [2, 3]],
+        )
+
+    def test_exception(self):
+        calls = []
+
+        def fail(exception):
+            """
+            Return a function that raises exception once called.
+            """
+            def _fail():  # pylint: disable=missing-docstring
+                calls.append(exception)
+                raise exception
+            return _fail
+
+        first = utils.CommentClientRequestError('not found', 404)
+        second = utils.CommentClient500Error('error')
+        with self.assertRaises(utils.CommentClientRequestError) as context:
+            utils.perform_concurrently(lambda: None, fail(first), fail(second))
+        self.assertIs(context.exception, first)
+        self.assertEqual(len(calls), 2)
+
+    def test_language(self):
+        with override('eo'):
+            self.assertEqual(utils.perform_concurrently(get_language, get_language), ['eo', 'eo'])
@@ -1,14 +1,29 @@
 from contextlib import contextmanager
+import cookielib
 import dogstats_wrapper as dog_stats_api
 import logging
+import os
 import requests
+import sys
+import threading
 from django.conf import settings
+from multiprocessing.pool import ThreadPool
+from requests.adapters import HTTPAdapter
 from time import time
 from uuid import uuid4
-from django.utils.translation import get_language
+from django.utils.translation import get_language, override
 
 log = logging.getLogger(__name__)
 
+# The session and the thread pool of this process, with the id of the process
+# they were created in, as a forked process can't use those of its parent.
+_process_state = {'pid': None, 'session': None, 'thread_pool': None}
+_process_state_lock = threading.Lock()
+
+# Whether the current thread is calling one of the functions of
+# perform_concurrently.
+_thread_state = threading.local()
+
 
 def strip_none(dic):
     return dict([(k, v) for k, v in dic.iteritems() if v is not None])
@@ -50,6 +65,105 @@ def request_timer(request_id, method, url, tags=None):
     )
 
 
+def _get_process_state():
+    """
+    Return the session and the thread pool of this process, creating them if
+    needed.
+    """
+    if _process_state['pid'] != os.getpid():
+        with _process_state_lock:
+            if _process_state['pid'] != os.getpid():
+                session = requests.Session()
+                # The session is shared by the requests of all users, so it
+                # must not keep the cookies of any response.
+                session.cookies.set_policy(cookielib.DefaultCookiePolicy(allowed_domains=[]))
+                adapter = HTTPAdapter(
+                    pool_maxsize=getattr(settings, "COMMENTS_SERVICE_POOL_SIZE", 10)
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _process_state['session'] = session
+                _process_state['thread_pool'] = None
+                _process_state['pid'] = os.getpid()
+    return _process_state
+
+
+def _max_concurrent_requests():
+    """
+    Return the number of requests that a view sends concurrently.
+    """
+    return getattr(settings, "COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS", 4)
+
+
+def _get_thread_pool():
+    """
+    Return the thread pool of this process for concurrent requests, creating
+    it if needed.
+    """
+    state = _get_process_state()
+    if state['thread_pool'] is None:
+        with _process_state_lock:
+            if state['thread_pool'] is None:
+                # The current thread calls one of the functions.
+                state['thread_pool'] = ThreadPool(_max_concurrent_requests() - 1)
+    return state['thread_pool']
+
+
+def session_request(method, url, **kwargs):
+    """
+    Send a request with the session of this process, which keeps the
+    connections to the comments service alive between requests.  Takes the
+    arguments of `requests.request`.
+    """
+    return _get_process_state()['session'].request(method, url, **kwargs)
+
+
+def perform_concurrently(*funcs):
+    """
+    Call the functions `funcs`, which take no arguments and send independent
+    requests to the comments service, concurrently, and return the list of
+    their results.
+
+    The first function is called in the current thread, and the others in the
+    thread pool of the process, so that at most
+    COMMENTS_SERVICE_MAX_CONCURRENT_REQUESTS of them run at once; the
+    functions are called in order when it is 1.  Only the first function may
+    use the database or the modulestore, whose connections and bulk
+    operations belong to the current thread.  If any of the functions raises
+    an exception, the exception of the first one is raised once all of them
+    have returned.
+    """
+    # A function called concurrently can't wait for the thread pool.
+    if len(funcs) < 2 or _max_concurrent_requests() < 2 or getattr(_thread_state, 'in_pool', False):
+        return [func() for func in funcs]
+
+    language = get_language()
+
+    def call(func):
+        """
+        Call func in the language of the current request, and return whether
+        it succeeded with its result or exception info.
+        """
+        _thread_state.in_pool = True
+        try:
+            with override(language):
+                return True, func()
+        except Exception:  # pylint: disable=broad-except
+            return False, sys.exc_info()
+        finally:
+            _thread_state.in_pool = False
+
+    with dog_stats_api.timer('comment_client.concurrent_requests.time', tags=[u'count:{}'.format(len(funcs))]):
+        pending = [_get_thread_pool().apply_async(call, (func,)) for func in funcs[1:]]
+        outcomes = [call(funcs[0])]
+        outcomes.extend(result.get() for result in pending)
+
+    for succeeded, outcome in outcomes:
+        if not succeeded:
+            raise outcome[0], outcome[1], outcome[2]
+    return [outcome for __, outcome in outcomes]
+
+
 def perform_request(method, url, data_or_params=None, raw=False,
                     metric_action=None, metric_tags=None, paged_results=False):
 
@@ -75,14 +189,19 @@ def perform_request(method, url, data_or_params=None, raw=False,
     else:
         data = None
         params = merge_dict(data_or_params, request_id_dict)
+    timeout = getattr(settings, "COMMENTS_SERVICE_TIMEOUT", 5)
+    if isinstance(timeout, list):
+        # a (connect, read) tuple read from JSON
+        timeout = tuple(timeout)
+
     with request_timer(request_id, method, url, metric_tags):
-        response = requests.request(
+        response = session_request(
             method,
             url,
             data=data,
             params=params,
             headers=headers,
-            timeout=5
+            timeout=timeout
         )
 
     metric_tags.append(u'status_code:{}'.format(response.status_code))
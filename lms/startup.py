@@ -44,6 +44,8 @@ def run():
 
     add_mimetypes()
 
+    configure_sandbox_pool()
+
     # Mako requires the directories to be added after the django setup.
     microsite.enable_microsites(log)
 
@@ -89,6 +91,26 @@ def add_mimetypes():
     mimetypes.add_type('application/font-woff', '.woff')
 
 
+def configure_sandbox_pool():
+    """
+    Configure the pool of warm sandbox workers that runs Capa code, if
+    enabled by CODE_JAIL['pool'].
+    """
+    pool_settings = settings.CODE_JAIL.get('pool', {})
+    if not (settings.CODE_JAIL.get('python_bin') and pool_settings.get('size')):
+        return
+
+    from capa.safe_exec import sandbox_pool
+    sandbox_pool.configure(
+        settings.CODE_JAIL['python_bin'],
+        user=settings.CODE_JAIL.get('user'),
+        limits=settings.CODE_JAIL.get('limits'),
+        size=pool_settings['size'],
+        max_executions=pool_settings.get('max_executions', 100),
+        max_memory=pool_settings.get('max_memory', 0),
+    )
+
+
 def enable_stanford_theme():
     """
     Enable the settings for a custom theme, whose files should be stored
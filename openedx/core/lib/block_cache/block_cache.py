@@ -1,12 +1,17 @@
 """
 Top-level module for the Block Cache framework with higher order
-functions for getting and clearing cached blocks.
+functions for getting, updating and clearing cached blocks.
 """
+from logging import getLogger
+
 from .block_structure_factory import BlockStructureFactory
 from .exceptions import TransformerException
 from .transformer_registry import TransformerRegistry
 
 
+logger = getLogger(__name__)  # pylint: disable=invalid-name
+
+
 def get_blocks(cache, modulestore, usage_info, root_block_usage_key, transformers):
     """
     Top-level function in the Block Cache framework that manages
@@ -59,18 +64,12 @@ def get_blocks(cache, modulestore, usage_info, root_block_usage_key, transformer
     if not root_block_structure:
 
         # Create the block structure from the modulestore.
+        generation = BlockStructureFactory.get_generation(root_block_usage_key, cache)
         root_block_structure = BlockStructureFactory.create_from_modulestore(root_block_usage_key, modulestore)
-
-        # Collect data from each registered transformer.
-        for transformer in TransformerRegistry.get_registered_transformers():
-            root_block_structure._add_transformer(transformer)  # pylint: disable=protected-access
-            transformer.collect(root_block_structure)
-
-        # Collect all fields that were requested by the transformers.
-        root_block_structure._collect_requested_xblock_fields()  # pylint: disable=protected-access
+        _collect(root_block_structure)
 
         # Cache this information.
-        BlockStructureFactory.serialize_to_cache(root_block_structure, cache)
+        BlockStructureFactory.serialize_to_cache(root_block_structure, cache, generation)
 
     # Execute requested transforms on block structure.
     for transformer in transformers:
@@ -82,9 +81,80 @@ def get_blocks(cache, modulestore, usage_info, root_block_usage_key, transformer
     return root_block_structure
 
 
+def update_block_cache(cache, modulestore, root_block_usage_key, changed_usage_keys=None):
+    """
+    Recollects the block structure associated with the given root
+    block key and updates the cache with it.
+
+    If the subtrees that changed since the block structure was cached
+    are known, only they (and their ancestors) are recollected, reusing
+    the cached data of all other blocks.  Otherwise, or if the cached
+    block structure cannot be updated, it is collected in full.
+
+    Arguments:
+        cache, modulestore, root_block_usage_key - See the descriptions
+            in get_blocks.
+
+        changed_usage_keys ([UsageKey]) - Usage keys of the roots of the
+            changed subtrees, or None if not known.
+    """
+    # If the block structure is marked stale again while it is
+    # collected, it remains stale once cached.
+    generation = BlockStructureFactory.get_generation(root_block_usage_key, cache)
+
+    block_structure = None
+    if changed_usage_keys is not None:
+        cached_block_structure = BlockStructureFactory.create_from_cache(
+            root_block_usage_key,
+            cache,
+            TransformerRegistry.get_registered_transformers(),
+        )
+        if cached_block_structure:
+            block_structure = BlockStructureFactory.create_for_update(
+                cached_block_structure, modulestore, changed_usage_keys
+            )
+
+    if block_structure:
+        logger.info(
+            "Recollecting %d blocks of BlockStructure %r.",
+            len(block_structure._blocks_to_collect),  # pylint: disable=protected-access
+            root_block_usage_key,
+        )
+        _collect(block_structure)
+        block_structure._blocks_to_collect = None  # pylint: disable=protected-access
+    else:
+        block_structure = BlockStructureFactory.create_from_modulestore(root_block_usage_key, modulestore)
+        _collect(block_structure)
+
+    BlockStructureFactory.serialize_to_cache(block_structure, cache, generation)
+
+
+def mark_block_cache_stale(cache, root_block_usage_key):
+    """
+    Marks the block structure associated with the given root block key
+    as stale.  It continues to be served from the cache for a limited
+    time, until it is updated by update_block_cache.
+    """
+    BlockStructureFactory.mark_stale_in_cache(root_block_usage_key, cache)
+
+
 def clear_block_cache(cache, root_block_usage_key):
     """
     Removes the block structure associated with the given root block
     key.
     """
     BlockStructureFactory.remove_from_cache(root_block_usage_key, cache)
+
+
+def _collect(block_structure):
+    """
+    Executes the collect phase of each registered transformer on the
+    given block structure.
+    """
+    # Collect data from each registered transformer.
+    for transformer in TransformerRegistry.get_registered_transformers():
+        block_structure._add_transformer(transformer)  # pylint: disable=protected-access
+        transformer.collect(block_structure)
+
+    # Collect all fields that were requested by the transformers.
+    block_structure._collect_requested_xblock_fields()  # pylint: disable=protected-access
@@ -38,6 +38,16 @@ class _BlockRelations(object):
         # list [UsageKey]
         self.children = []
 
+    def copy(self):
+        """
+        Returns a copy of these relations that can be updated
+        independently.
+        """
+        relations = _BlockRelations()
+        relations.parents = list(self.parents)
+        relations.children = list(self.children)
+        return relations
+
 
 class BlockStructure(object):
     """
@@ -265,6 +275,18 @@ class _BlockData(object):
         # defaultdict {string: dict}
         self.transformer_data = defaultdict(dict)
 
+    def copy(self):
+        """
+        Returns a copy of this block data whose dictionaries can be
+        updated independently.  The values themselves are not copied.
+        """
+        block_data = _BlockData()
+        block_data.xblock_fields = dict(self.xblock_fields)
+        block_data.transformer_data = defaultdict(dict, (
+            (transformer_name, dict(data)) for transformer_name, data in self.transformer_data.iteritems()
+        ))
+        return block_data
+
 
 class BlockStructureBlockData(BlockStructure):
     """
@@ -283,6 +305,33 @@ class BlockStructureBlockData(BlockStructure):
         # defaultdict {string: dict}
         self._transformer_data = defaultdict(dict)
 
+        # Usage keys of the blocks whose _BlockData is shared with the
+        # block structure this one was copied from, and so has to be
+        # copied before it is updated.
+        # set(UsageKey)
+        self._shared_block_data_keys = set()
+
+    def copy(self):
+        """
+        Returns a copy of this block structure that can be transformed
+        without changing this one.
+
+        The copy is cheap: block relations and transformer data are
+        copied, but the data of each block is shared until the copy
+        updates it (copy-on-write).  Collected values themselves are
+        never copied, so they must not be mutated in place.
+        """
+        block_structure = BlockStructureBlockData(self.root_block_usage_key)
+        block_structure._block_relations = defaultdict(_BlockRelations, (
+            (usage_key, relations.copy()) for usage_key, relations in self._block_relations.iteritems()
+        ))
+        block_structure._transformer_data = defaultdict(dict, (
+            (transformer_name, dict(data)) for transformer_name, data in self._transformer_data.iteritems()
+        ))
+        block_structure._block_data_map = defaultdict(_BlockData, self._block_data_map)
+        block_structure._shared_block_data_keys = set(self._block_data_map)
+        return block_structure
+
     def get_xblock_field(self, usage_key, field_name, default=None):
         """
         Returns the collected value of the xBlock field for the
@@ -372,7 +421,7 @@ class BlockStructureBlockData(BlockStructure):
                 given key for the given transformer's data for the
                 requested block.
         """
-        self._block_data_map[usage_key].transformer_data[transformer.name()][key] = value
+        self._get_block_data_for_update(usage_key).transformer_data[transformer.name()][key] = value
 
     def get_transformer_block_data(self, usage_key, transformer):
         """
@@ -409,8 +458,9 @@ class BlockStructureBlockData(BlockStructure):
             transformer (BlockStructureTransformer) - The transformer
                 whose data entry is to be deleted.
         """
-        transformer_block_data = self.get_transformer_block_data(usage_key, transformer)
-        transformer_block_data.pop(key, None)
+        if usage_key in self._block_data_map:
+            transformer_block_data = self._get_block_data_for_update(usage_key).transformer_data
+            transformer_block_data.get(transformer.name(), {}).pop(key, None)
 
     def remove_block(self, usage_key, keep_descendants):
         """
@@ -501,6 +551,17 @@ class BlockStructureBlockData(BlockStructure):
     #--- Internal methods ---#
     # To be used within the block_cache framework or by tests.
 
+    def _get_block_data_for_update(self, usage_key):
+        """
+        Returns the _BlockData of the block identified by the given
+        usage_key, first copying it if it is shared with the block
+        structure this one was copied from.
+        """
+        if usage_key in self._shared_block_data_keys:
+            self._shared_block_data_keys.discard(usage_key)
+            self._block_data_map[usage_key] = self._block_data_map[usage_key].copy()
+        return self._block_data_map[usage_key]
+
     def _get_transformer_data_version(self, transformer):
         """
         Returns the version number stored for the given transformer.
@@ -544,6 +605,19 @@ class BlockStructureModulestoreData(BlockStructureBlockData):
         # set(string)
         self._requested_xblock_fields = set()
 
+        # Usage keys of the blocks whose data is to be collected, when
+        # recollecting only part of a previously collected structure.
+        # Traversals yield only these blocks.  None if all blocks are
+        # to be collected.
+        # set(UsageKey)
+        self._blocks_to_collect = None
+
+        # Modulestore from which xBlocks that were not added are loaded,
+        # when recollecting only part of a previously collected
+        # structure.
+        # ModuleStoreRead
+        self._modulestore = None
+
     def request_xblock_fields(self, *field_names):
         """
         Records request for collecting data for the given xBlock fields.
@@ -568,8 +642,33 @@ class BlockStructureModulestoreData(BlockStructureBlockData):
             usage_key (UsageKey) - Usage key of the block whose
                 xBlock object is to be returned.
         """
+        if usage_key not in self._xblock_map and self._modulestore is not None:
+            self._add_xblock(usage_key, self._modulestore.get_item(usage_key))
         return self._xblock_map[usage_key]
 
+    def topological_traversal(self, filter_func=None, yield_descendants_of_unyielded=False):
+        """
+        See the description in BlockStructure.topological_traversal.
+
+        When only part of the structure is being recollected, only the
+        blocks to collect are yielded.
+        """
+        block_keys = super(BlockStructureModulestoreData, self).topological_traversal(
+            filter_func=filter_func,
+            yield_descendants_of_unyielded=yield_descendants_of_unyielded,
+        )
+        return self._filter_blocks_to_collect(block_keys)
+
+    def post_order_traversal(self, filter_func=None):
+        """
+        See the description in BlockStructure.post_order_traversal.
+
+        When only part of the structure is being recollected, only the
+        blocks to collect are yielded.
+        """
+        block_keys = super(BlockStructureModulestoreData, self).post_order_traversal(filter_func=filter_func)
+        return self._filter_blocks_to_collect(block_keys)
+
     #--- Internal methods ---#
     # To be used within the block_cache framework or by tests.
 
@@ -588,6 +687,15 @@ class BlockStructureModulestoreData(BlockStructureBlockData):
         """
         self._xblock_map[usage_key] = xblock
 
+    def _filter_blocks_to_collect(self, block_keys):
+        """
+        Returns the given iterator of block keys, limited to the blocks
+        to collect, if any.
+        """
+        if self._blocks_to_collect is None:
+            return block_keys
+        return (block_key for block_key in block_keys if block_key in self._blocks_to_collect)
+
     def _collect_requested_xblock_fields(self):
         """
         Iterates through all instantiated xBlocks that were added and
@@ -619,4 +727,4 @@ class BlockStructureModulestoreData(BlockStructureBlockData):
                 being collected and stored.
         """
         if hasattr(xblock, field_name):
-            self._block_data_map[usage_key].xblock_fields[field_name] = getattr(xblock, field_name)
+            self._get_block_data_for_update(usage_key).xblock_fields[field_name] = getattr(xblock, field_name)
@@ -2,15 +2,51 @@
 Module for factory class for BlockStructure objects.
 """
 # pylint: disable=protected-access
+import cPickle as pickle
+import zlib
 from logging import getLogger
+from time import time
+from uuid import uuid4
 
-from openedx.core.lib.cache_utils import zpickle, zunpickle
+from django.conf import settings
+
+from openedx.core.lib.cache_utils import SizeBoundedLRUCache, zpickle
+from openedx.core.lib.graph_traversals import traverse_post_order, traverse_pre_order
 
 from .block_structure import BlockStructureBlockData, BlockStructureModulestoreData
 
 
 logger = getLogger(__name__)  # pylint: disable=C0103
 
+# Default bound, in bytes of pickled data, of the process-local cache of
+# deserialized block structures.
+DEFAULT_STRUCTURE_LRU_MAX_SIZE = 100 * 1024 * 1024
+
+# Default number of seconds a block structure marked as stale
+# continues to be served from the cache.
+DEFAULT_MAX_STALENESS = 30 * 60
+
+_structure_lru = None  # pylint: disable=invalid-name
+
+
+def get_structure_lru():
+    """
+    Returns the process-local cache of deserialized block structures,
+    keyed by (root_block_usage_key, version), where version identifies
+    the collected data stored in the cache by serialize_to_cache.
+
+    Its total size, measured by the length of each structure's pickled
+    data, is bounded by the BLOCK_STRUCTURE_LRU_MAX_SIZE setting; a value
+    of 0 disables it.
+    """
+    global _structure_lru  # pylint: disable=global-statement
+    if _structure_lru is None:
+        _structure_lru = SizeBoundedLRUCache(
+            getattr(settings, 'BLOCK_STRUCTURE_LRU_MAX_SIZE', DEFAULT_STRUCTURE_LRU_MAX_SIZE),
+            metric_name='block_cache.structure_lru',
+        )
+    return _structure_lru
+
 
 class BlockStructureFactory(object):
     """
@@ -38,34 +74,138 @@ class BlockStructureFactory(object):
         # Create block structure.
         block_structure = BlockStructureModulestoreData(root_block_usage_key)
 
-        # Create internal set of blocks visited to use when recursing.
+        root_xblock = modulestore.get_item(root_block_usage_key, depth=None)
+        cls._add_xblock_subtree(block_structure, root_xblock, blocks_visited=set())
+        return block_structure
+
+    @classmethod
+    def create_for_update(cls, block_structure, modulestore, changed_usage_keys):
+        """
+        Creates and returns a block structure for recollecting the
+        given block structure, previously created from the cache,
+        after the subtrees rooted at changed_usage_keys were published.
+
+        The changed subtrees are reloaded from the modulestore, along
+        with their ancestors, whose collected data may depend on them.
+        Only these blocks are yielded by the traversals of the returned
+        structure, so transformers collect data for them alone; the
+        collected data of all other blocks is kept.
+
+        The given block structure is updated in place and should not be
+        used afterwards.
+
+        Arguments:
+            block_structure (BlockStructureBlockData) - The block
+                structure, as previously collected, to update.
+
+            modulestore (ModuleStoreRead) - The modulestore that
+                contains the data for the xBlocks within the block
+                structure.
+
+            changed_usage_keys ([UsageKey]) - Usage keys of the roots of
+                the changed subtrees.
+
+        Returns:
+            BlockStructureModulestoreData - The block structure to
+                collect, or None if the changes cannot be applied to the
+                given block structure: if a changed block is new, or the
+                children of an ancestor of a changed block changed.
+        """
+        changed_usage_keys = set(changed_usage_keys)
+        if not all(block_structure.has_block(usage_key) for usage_key in changed_usage_keys):
+            return None
+
+        # Find the ancestors of each changed block, and skip changed
+        # blocks within another changed subtree.
+        ancestors = set()
+        subtree_roots = []
+        for usage_key in changed_usage_keys:
+            block_ancestors = set(traverse_pre_order(usage_key, block_structure.get_parents))
+            block_ancestors.discard(usage_key)
+            if not block_ancestors & changed_usage_keys:
+                subtree_roots.append(usage_key)
+            ancestors |= block_ancestors
+        ancestors -= changed_usage_keys
+
+        updated_structure = BlockStructureModulestoreData(block_structure.root_block_usage_key)
+        updated_structure._block_relations = block_structure._block_relations
+        updated_structure._transformer_data = block_structure._transformer_data
+        updated_structure._block_data_map = block_structure._block_data_map
+        updated_structure._shared_block_data_keys = block_structure._shared_block_data_keys
+        updated_structure._modulestore = modulestore
+
+        for usage_key in ancestors:
+            xblock = modulestore.get_item(usage_key)
+            if [child.location for child in xblock.get_children()] != updated_structure.get_children(usage_key):
+                logger.info(
+                    "Children of %r changed; BlockStructure %r is to be collected in full.",
+                    usage_key,
+                    updated_structure.root_block_usage_key,
+                )
+                return None
+            updated_structure._add_xblock(usage_key, xblock)
+
+        # Replace the relations within each changed subtree with those
+        # in the modulestore.
         blocks_visited = set()
+        for usage_key in subtree_roots:
+            for block_key in list(traverse_post_order(usage_key, updated_structure.get_children)):
+                for child_key in updated_structure.get_children(block_key):
+                    updated_structure._block_relations[child_key].parents.remove(block_key)
+                updated_structure._block_relations[block_key].children = []
+            cls._add_xblock_subtree(updated_structure, modulestore.get_item(usage_key, depth=None), blocks_visited)
+
+        # Drop blocks no longer in the structure, with their data.
+        updated_structure._prune_unreachable()
+        for usage_key in updated_structure._block_data_map.keys():
+            if not updated_structure.has_block(usage_key):
+                del updated_structure._block_data_map[usage_key]
+
+        # Drop the data previously collected for the blocks to collect,
+        # so that none of it outlives the fields it was collected from.
+        updated_structure._blocks_to_collect = ancestors | blocks_visited
+        for usage_key in updated_structure._blocks_to_collect:
+            updated_structure._block_data_map.pop(usage_key, None)
+            updated_structure._shared_block_data_keys.discard(usage_key)
+        return updated_structure
 
-        def build_block_structure(xblock):
-            """
-            Recursively update the block structure with the given xBlock
-            and its descendants.
-            """
-            # Check if the xblock was already visited (can happen in
-            # DAGs).
-            if xblock.location in blocks_visited:
-                return
-
-            # Add the xBlock.
-            blocks_visited.add(xblock.location)
-            block_structure._add_xblock(xblock.location, xblock)
-
-            # Add relations with its children and recurse.
-            for child in xblock.get_children():
-                block_structure._add_relation(xblock.location, child.location)
-                build_block_structure(child)
+    @classmethod
+    def _add_xblock_subtree(cls, block_structure, xblock, blocks_visited):
+        """
+        Recursively updates the given block structure with the given
+        xBlock and its descendants, skipping blocks in blocks_visited
+        and adding the others to it.
+        """
+        # Check if the xblock was already visited (can happen in
+        # DAGs).
+        if xblock.location in blocks_visited:
+            return
 
-        root_xblock = modulestore.get_item(root_block_usage_key, depth=None)
-        build_block_structure(root_xblock)
-        return block_structure
+        # Add the xBlock.
+        blocks_visited.add(xblock.location)
+        block_structure._add_xblock(xblock.location, xblock)
+
+        # Add relations with its children and recurse.
+        for child in xblock.get_children():
+            block_structure._add_relation(xblock.location, child.location)
+            cls._add_xblock_subtree(block_structure, child, blocks_visited)
 
     @classmethod
-    def serialize_to_cache(cls, block_structure, cache):
+    def get_generation(cls, root_block_usage_key, cache):
+        """
+        Returns the generation of the block structure for the given
+        root_block_usage_key in the given cache, which changes each time
+        it is marked stale (see mark_stale_in_cache).
+
+        Callers collecting the block structure get its generation
+        beforehand and pass it to serialize_to_cache, so that the data
+        they collected is not taken to be current if the block structure
+        was marked stale meanwhile.
+        """
+        return cache.get(cls._encode_generation_cache_key(root_block_usage_key), 0)
+
+    @classmethod
+    def serialize_to_cache(cls, block_structure, cache, generation=None):
         """
         Store a compressed and pickled serialization of the given
         block structure into the given cache.
@@ -74,6 +214,13 @@ class BlockStructureFactory(object):
         The data stored in the cache includes the structure's
         block relations, transformer data, and block data.
 
+        A new version identifier is also stored, under
+        'root.version.<root_block_usage_key>', so that processes
+        holding a deserialized copy of older data know to reload it,
+        along with the generation the data was collected for.  The mark
+        that the block structure is stale is removed only if that
+        generation is still the current one.
+
         Arguments:
             block_structure (BlockStructure) - The block structure
                 that is to be serialized to the given cache.
@@ -81,17 +228,34 @@ class BlockStructureFactory(object):
             cache (django.core.cache.backends.base.BaseCache) - The
                 cache into which cacheable data of the block structure
                 is to be serialized.
+
+            generation (int) - The generation of the block structure,
+                as returned by get_generation before it was collected.
+                Defaults to the current generation.
         """
+        root_block_usage_key = block_structure.root_block_usage_key
+        if generation is None:
+            generation = cls.get_generation(root_block_usage_key, cache)
+
         data_to_cache = (
             block_structure._block_relations,
             block_structure._transformer_data,
             block_structure._block_data_map
         )
         zp_data_to_cache = zpickle(data_to_cache)
-        cache.set(
-            cls._encode_root_cache_key(block_structure.root_block_usage_key),
-            zp_data_to_cache
-        )
+        # The data and its generation are written before its version,
+        # since readers fetch the version first.
+        cache.set(cls._encode_root_cache_key(root_block_usage_key), zp_data_to_cache)
+        cache.set(cls._encode_collected_cache_key(root_block_usage_key), generation)
+        cache.set(cls._encode_version_cache_key(root_block_usage_key), uuid4().hex)
+
+        if cls.get_generation(root_block_usage_key, cache) == generation:
+            cache.delete(cls._encode_stale_cache_key(root_block_usage_key))
+        else:
+            logger.info(
+                "BlockStructure %r was marked stale while it was collected.",
+                root_block_usage_key,
+            )
         logger.debug(
             "Wrote BlockStructure %s to cache, size: %s",
             block_structure.root_block_usage_key,
@@ -122,34 +286,53 @@ class BlockStructureFactory(object):
 
         Returns:
             BlockStructure - The deserialized block structure starting
-            at root_block_usage_key, if found in the cache.
+            at root_block_usage_key, if found in the cache.  It is the
+            caller's to transform.
 
-            NoneType - If the root_block_usage_key is not found in the cache
-            or if the cached data is outdated for one or more of the
-            given transformers.
+            NoneType - If the root_block_usage_key is not found in the cache,
+            if it was marked stale (see mark_stale_in_cache) longer than
+            the BLOCK_STRUCTURE_MAX_STALENESS setting ago, or if the cached
+            data is outdated for one or more of the given transformers.
         """
-
-        # Find root_block_usage_key in the cache.
-        zp_data_from_cache = cache.get(cls._encode_root_cache_key(root_block_usage_key))
-        if not zp_data_from_cache:
-            logger.debug(
-                "BlockStructure %r not found in the cache.",
+        version_cache_key = cls._encode_version_cache_key(root_block_usage_key)
+        stale_cache_key = cls._encode_stale_cache_key(root_block_usage_key)
+        generation_cache_key = cls._encode_generation_cache_key(root_block_usage_key)
+        collected_cache_key = cls._encode_collected_cache_key(root_block_usage_key)
+        cached_values = cache.get_many([version_cache_key, stale_cache_key, generation_cache_key, collected_cache_key])
+
+        # Stale data is served until it is recollected, but not forever.
+        # The data is also stale if it was collected for an earlier
+        # generation, even if a concurrent update removed the mark.
+        stale_since = cached_values.get(stale_cache_key)
+        generation = cached_values.get(generation_cache_key, 0)
+        if stale_since is None and generation != cached_values.get(collected_cache_key, 0):
+            stale_since = time()
+        max_staleness = getattr(settings, 'BLOCK_STRUCTURE_MAX_STALENESS', DEFAULT_MAX_STALENESS)
+        if stale_since is not None and time() - stale_since > max_staleness:
+            logger.info(
+                "BlockStructure %r has been stale since %s.",
                 root_block_usage_key,
+                stale_since,
             )
             return None
-        else:
-            logger.debug(
-                "Read BlockStructure %r from cache, size: %s",
-                root_block_usage_key,
-                len(zp_data_from_cache),
-            )
 
-        # Deserialize and construct the block structure.
-        block_relations, transformer_data, block_data_map = zunpickle(zp_data_from_cache)
-        block_structure = BlockStructureBlockData(root_block_usage_key)
-        block_structure._block_relations = block_relations
-        block_structure._transformer_data = transformer_data
-        block_structure._block_data_map = block_data_map
+        # Deserialized structures are kept in a process-local LRU, keyed
+        # by the version of the data in the cache.  Callers get a
+        # copy-on-write copy of them to transform.
+        structure_lru = get_structure_lru()
+        version = cached_values.get(version_cache_key)
+        block_structure = structure_lru.get((root_block_usage_key, version)) if version else None
+
+        if block_structure is None:
+            block_structure, size = cls._deserialize_from_cache(root_block_usage_key, cache)
+            if block_structure is None:
+                return None
+            if version:
+                structure_lru.remove_if(lambda key: key[0] == root_block_usage_key)
+                structure_lru.set((root_block_usage_key, version), block_structure, size)
+
+        if (root_block_usage_key, version) in structure_lru:
+            block_structure = block_structure.copy()
 
         # Verify that the cached data for all the given transformers are
         # for their latest versions.
@@ -170,6 +353,58 @@ class BlockStructureFactory(object):
 
         return block_structure
 
+    @classmethod
+    def _deserialize_from_cache(cls, root_block_usage_key, cache):
+        """
+        Deserializes the block structure starting at root_block_usage_key
+        from the given cache.
+
+        Returns a tuple of the block structure (or None, if it is not
+        found in the cache) and the size of its pickled data.
+        """
+        # Find root_block_usage_key in the cache.
+        zp_data_from_cache = cache.get(cls._encode_root_cache_key(root_block_usage_key))
+        if not zp_data_from_cache:
+            logger.debug(
+                "BlockStructure %r not found in the cache.",
+                root_block_usage_key,
+            )
+            return None, 0
+        else:
+            logger.debug(
+                "Read BlockStructure %r from cache, size: %s",
+                root_block_usage_key,
+                len(zp_data_from_cache),
+            )
+
+        # Deserialize and construct the block structure.
+        p_data_from_cache = zlib.decompress(zp_data_from_cache)
+        block_relations, transformer_data, block_data_map = pickle.loads(p_data_from_cache)
+        block_structure = BlockStructureBlockData(root_block_usage_key)
+        block_structure._block_relations = block_relations
+        block_structure._transformer_data = transformer_data
+        block_structure._block_data_map = block_data_map
+        return block_structure, len(p_data_from_cache)
+
+    @classmethod
+    def mark_stale_in_cache(cls, root_block_usage_key, cache):
+        """
+        Marks the block structure for the given root_block_usage_key
+        as stale in the given cache, so it is only served for a limited
+        time while it is recollected.  Marking an already stale block
+        structure does not extend that time, but does start a new
+        generation of it, so that data being collected concurrently is
+        not taken to be current.
+        """
+        generation_cache_key = cls._encode_generation_cache_key(root_block_usage_key)
+        if not cache.add(generation_cache_key, 1, None):
+            try:
+                cache.incr(generation_cache_key)
+            except ValueError:
+                # The generation was evicted since it was added.
+                cache.set(generation_cache_key, 1, None)
+        cache.add(cls._encode_stale_cache_key(root_block_usage_key), time(), None)
+
     @classmethod
     def remove_from_cache(cls, root_block_usage_key, cache):
         """
@@ -185,7 +420,12 @@ class BlockStructureFactory(object):
                 cache from which the block structure is to be
                 removed.
         """
+        cache.delete(cls._encode_version_cache_key(root_block_usage_key))
         cache.delete(cls._encode_root_cache_key(root_block_usage_key))
+        cache.delete(cls._encode_stale_cache_key(root_block_usage_key))
+        cache.delete(cls._encode_collected_cache_key(root_block_usage_key))
+        cache.delete(cls._encode_generation_cache_key(root_block_usage_key))
+        get_structure_lru().remove_if(lambda key: key[0] == root_block_usage_key)
         # TODO also remove all block data?
 
     @classmethod
@@ -195,3 +435,36 @@ class BlockStructureFactory(object):
         for the given root_block_usage_key.
         """
         return "root.key." + unicode(root_block_usage_key)
+
+    @classmethod
+    def _encode_version_cache_key(cls, root_block_usage_key):
+        """
+        Returns the cache key to use for storing the version of the
+        block structure for the given root_block_usage_key.
+        """
+        return "root.version." + unicode(root_block_usage_key)
+
+    @classmethod
+    def _encode_stale_cache_key(cls, root_block_usage_key):
+        """
+        Returns the cache key to use for storing when the block
+        structure for the given root_block_usage_key became stale.
+        """
+        return "root.stale." + unicode(root_block_usage_key)
+
+    @classmethod
+    def _encode_generation_cache_key(cls, root_block_usage_key):
+        """
+        Returns the cache key to use for storing the generation of the
+        block structure for the given root_block_usage_key.
+        """
+        return "root.generation." + unicode(root_block_usage_key)
+
+    @classmethod
+    def _encode_collected_cache_key(cls, root_block_usage_key):
+        """
+        Returns the cache key to use for storing the generation for
+        which the cached block structure for the given
+        root_block_usage_key was collected.
+        """
+        return "root.collected." + unicode(root_block_usage_key)
@@ -0,0 +1,689 @@
+"""
+Module with a compact, array-backed implementation of a block structure.
+    CompactBlockStructure - responsible for block existence, relations,
+        and block & transformer data.
+
+Compared to BlockStructureBlockData, which keeps a _BlockRelations and
+a _BlockData object per block, a CompactBlockStructure:
+
+    * interns each usage key to an integer id, its index in a single
+      list of usage keys,
+    * stores the children and parents of all blocks as CSR (compressed
+      sparse row) arrays of ids, and
+    * stores collected xBlock fields and transformer block fields as
+      columns, one list per field, indexed by block id.
+
+For large courses this makes pickled structures substantially smaller
+and traversals faster, since traversals work on integer ids.
+"""
+from array import array
+from collections import defaultdict
+
+from openedx.core.lib.graph_traversals import traverse_topologically, traverse_post_order
+
+from .block_structure import BlockStructureBlockData, TRANSFORMER_VERSION_KEY
+from .exceptions import TransformerException
+
+
+class _Missing(object):
+    """
+    Marker for a block that has no value in a field column.  The class
+    itself is used as the marker so it pickles by reference.
+    """
+    pass
+
+
+class CompactBlockStructure(object):
+    """
+    A block structure with the same public interface as
+    BlockStructureBlockData, stored in arrays indexed by block id.
+
+    The relations of a block are read from the CSR arrays until the
+    block is updated (by remove_block), after which its relations are
+    kept in a list until the arrays are rebuilt by _prune_unreachable.
+    """
+    def __init__(self, root_block_usage_key):
+
+        # The usage key of the root block for this structure.
+        # UsageKey
+        self.root_block_usage_key = root_block_usage_key
+
+        # Usage keys of all blocks, indexed by block id.
+        # list [UsageKey]
+        self._usage_keys = []
+
+        # Map of a block's usage key to its block id.
+        # dict {UsageKey: int}
+        self._block_ids = {}
+
+        # CSR arrays of the blocks' children and parents: the relations
+        # of block i are the ids in ids[offsets[i]:offsets[i + 1]].
+        # array('l')
+        self._child_offsets = array('l', [0])
+        self._child_ids = array('l')
+        self._parent_offsets = array('l', [0])
+        self._parent_ids = array('l')
+
+        # Relations of blocks updated since the arrays were built.
+        # dict {int: list [int]}
+        self._updated_children = {}
+        self._updated_parents = {}
+
+        # Flags of the block ids that are no longer in the structure.
+        # bytearray
+        self._removed = bytearray()
+
+        # Map of xBlock field name to the field's values, by block id.
+        # dict {string: list [any picklable type]}
+        self._xblock_field_columns = {}
+
+        # Map of transformer name to its block fields' values, by
+        # block id.
+        # defaultdict {string: {string: list [any picklable type]}}
+        self._transformer_block_field_columns = defaultdict(dict)
+
+        # Map of a transformer's name to its non-block-specific data.
+        # defaultdict {string: dict}
+        self._transformer_data = defaultdict(dict)
+
+        self._add_block_id(root_block_usage_key)
+
+    def __iter__(self):
+        """
+        The default iterator for a block structure is a topological
+        traversal since it's the more common case and we currently
+        need to support DAGs.
+        """
+        return self.topological_traversal()
+
+    def __getstate__(self):
+        """
+        Returns the state to pickle, without the map of usage keys to
+        block ids, which is rebuilt when unpickled.
+        """
+        state = self.__dict__.copy()
+        del state['_block_ids']
+        return state
+
+    def __setstate__(self, state):
+        """
+        Restores the pickled state and rebuilds the map of usage keys
+        to block ids.
+        """
+        self.__dict__.update(state)
+        self._block_ids = {usage_key: block_id for block_id, usage_key in enumerate(self._usage_keys)}
+
+    @classmethod
+    def from_block_structure(cls, block_structure):
+        """
+        Returns a CompactBlockStructure with the blocks, relations and
+        collected data of the given BlockStructureBlockData.
+
+        Block ids are assigned in topological order, so blocks that are
+        traversed together are stored together.
+        """
+        compact_structure = cls(block_structure.root_block_usage_key)
+        block_ids = compact_structure._block_ids
+        for usage_key in block_structure.topological_traversal(yield_descendants_of_unyielded=True):
+            if usage_key not in block_ids:
+                compact_structure._add_block_id(usage_key)
+        for usage_key in block_structure.get_block_keys():
+            if usage_key not in block_ids:
+                compact_structure._add_block_id(usage_key)
+
+        compact_structure._build_relations(
+            [block_ids[child] for child in block_structure.get_children(usage_key)]
+            for usage_key in compact_structure._usage_keys
+        )
+
+        for usage_key, block_data in block_structure._block_data_map.iteritems():  # pylint: disable=protected-access
+            if usage_key not in block_ids:
+                continue
+            block_id = block_ids[usage_key]
+            for field_name, value in block_data.xblock_fields.iteritems():
+                compact_structure._get_column(compact_structure._xblock_field_columns, field_name)[block_id] = value
+            for transformer_name, transformer_data in block_data.transformer_data.iteritems():
+                columns = compact_structure._transformer_block_field_columns[transformer_name]
+                for key, value in transformer_data.iteritems():
+                    compact_structure._get_column(columns, key)[block_id] = value
+
+        transformer_data = block_structure._transformer_data  # pylint: disable=protected-access
+        compact_structure._transformer_data = defaultdict(dict, (
+            (transformer_name, dict(data)) for transformer_name, data in transformer_data.iteritems()
+        ))
+        return compact_structure
+
+    def to_block_structure(self):
+        """
+        Returns a BlockStructureBlockData with the blocks, relations and
+        collected data of this structure.
+        """
+        block_structure = BlockStructureBlockData(self.root_block_usage_key)
+        for usage_key in self.get_block_keys():
+            block_structure._add_block(block_structure._block_relations, usage_key)  # pylint: disable=protected-access
+        for usage_key in self.get_block_keys():
+            for child in self.get_children(usage_key):
+                block_structure._add_relation(usage_key, child)  # pylint: disable=protected-access
+
+        for block_id, usage_key in self._live_blocks():
+            block_data = block_structure._block_data_map[usage_key]  # pylint: disable=protected-access
+            for field_name, column in self._xblock_field_columns.iteritems():
+                if column[block_id] is not _Missing:
+                    block_data.xblock_fields[field_name] = column[block_id]
+            for transformer_name, columns in self._transformer_block_field_columns.iteritems():
+                for key, column in columns.iteritems():
+                    if column[block_id] is not _Missing:
+                        block_data.transformer_data[transformer_name][key] = column[block_id]
+
+        block_structure._transformer_data = defaultdict(dict, (  # pylint: disable=protected-access
+            (transformer_name, dict(data)) for transformer_name, data in self._transformer_data.iteritems()
+        ))
+        return block_structure
+
+    def copy(self):
+        """
+        Returns a copy of this block structure that can be transformed
+        without changing this one.  Collected values themselves are
+        not copied, so they must not be mutated in place.
+        """
+        compact_structure = CompactBlockStructure.__new__(CompactBlockStructure)
+        compact_structure.__dict__.update(self.__dict__)
+        compact_structure._usage_keys = list(self._usage_keys)
+        compact_structure._block_ids = dict(self._block_ids)
+        compact_structure._child_offsets = self._child_offsets[:]
+        compact_structure._child_ids = self._child_ids[:]
+        compact_structure._parent_offsets = self._parent_offsets[:]
+        compact_structure._parent_ids = self._parent_ids[:]
+        compact_structure._updated_children = {
+            block_id: list(children) for block_id, children in self._updated_children.iteritems()
+        }
+        compact_structure._updated_parents = {
+            block_id: list(parents) for block_id, parents in self._updated_parents.iteritems()
+        }
+        compact_structure._removed = bytearray(self._removed)
+        compact_structure._xblock_field_columns = {
+            field_name: list(column) for field_name, column in self._xblock_field_columns.iteritems()
+        }
+        compact_structure._transformer_block_field_columns = defaultdict(dict, (
+            (transformer_name, {key: list(column) for key, column in columns.iteritems()})
+            for transformer_name, columns in self._transformer_block_field_columns.iteritems()
+        ))
+        compact_structure._transformer_data = defaultdict(dict, (
+            (transformer_name, dict(data)) for transformer_name, data in self._transformer_data.iteritems()
+        ))
+        return compact_structure
+
+    #--- Block structure relation methods ---#
+
+    def get_parents(self, usage_key):
+        """
+        Returns the parents of the block identified by the given
+        usage_key.
+
+        Arguments:
+            usage_key - The usage key of the block whose parents
+                are to be returned.
+
+        Returns:
+            [UsageKey] - A list of usage keys of the block's parents.
+        """
+        block_id = self._live_block_id(usage_key)
+        if block_id is None:
+            return []
+        usage_keys = self._usage_keys
+        return [usage_keys[parent_id] for parent_id in self._get_parent_ids(block_id)]
+
+    def get_children(self, usage_key):
+        """
+        Returns the children of the block identified by the given
+        usage_key.
+
+        Arguments:
+            usage_key - The usage key of the block whose children
+                are to be returned.
+
+        Returns:
+            [UsageKey] - A list of usage keys of the block's children.
+        """
+        block_id = self._live_block_id(usage_key)
+        if block_id is None:
+            return []
+        usage_keys = self._usage_keys
+        return [usage_keys[child_id] for child_id in self._get_child_ids(block_id)]
+
+    def has_block(self, usage_key):
+        """
+        Returns whether a block with the given usage_key is in this
+        block structure.
+        """
+        return self._live_block_id(usage_key) is not None
+
+    def get_block_keys(self):
+        """
+        Returns the block keys in the block structure.
+
+        Returns:
+            iterator(UsageKey) - An iterator of the usage
+            keys of all the blocks in the block structure.
+        """
+        return (usage_key for __, usage_key in self._live_blocks())
+
+    #--- Block structure traversal methods ---#
+
+    def topological_traversal(
+            self,
+            filter_func=None,
+            yield_descendants_of_unyielded=False,
+    ):
+        """
+        Performs a topological sort of the block structure and yields
+        the usage_key of each block as it is encountered.
+
+        Arguments:
+            See the description in
+            openedx.core.lib.graph_traversals.traverse_topologically.
+
+        Returns:
+            generator - A generator of the usage keys of the blocks.
+        """
+        usage_keys = self._usage_keys
+        block_ids = traverse_topologically(
+            start_node=self._block_ids[self.root_block_usage_key],
+            get_parents=self._get_parent_ids,
+            get_children=self._get_child_ids,
+            filter_func=self._block_id_filter(filter_func),
+            yield_descendants_of_unyielded=yield_descendants_of_unyielded,
+        )
+        return (usage_keys[block_id] for block_id in block_ids)
+
+    def post_order_traversal(
+            self,
+            filter_func=None,
+    ):
+        """
+        Performs a post-order sort of the block structure and yields
+        the usage_key of each block as it is encountered.
+
+        Arguments:
+            See the description in
+            openedx.core.lib.graph_traversals.traverse_post_order.
+
+        Returns:
+            generator - A generator of the usage keys of the blocks.
+        """
+        usage_keys = self._usage_keys
+        block_ids = traverse_post_order(
+            start_node=self._block_ids[self.root_block_usage_key],
+            get_children=self._get_child_ids,
+            filter_func=self._block_id_filter(filter_func),
+        )
+        return (usage_keys[block_id] for block_id in block_ids)
+
+    #--- Block and transformer data methods ---#
+
+    def get_xblock_field(self, usage_key, field_name, default=None):
+        """
+        Returns the collected value of the xBlock field for the
+        requested block for the requested field_name; returns default if
+        not found.
+        """
+        return self._get_column_value(self._xblock_field_columns, field_name, usage_key, default)
+
+    def get_transformer_data(self, transformer, key, default=None):
+        """
+        Returns the value associated with the given key from the given
+        transformer's data dictionary; returns default if not found.
+        """
+        return self._transformer_data.get(transformer.name(), {}).get(key, default)
+
+    def set_transformer_data(self, transformer, key, value):
+        """
+        Updates the given transformer's data dictionary with the given
+        key and value.
+        """
+        self._transformer_data[transformer.name()][key] = value
+
+    def get_transformer_block_field(self, usage_key, transformer, key, default=None):
+        """
+        Returns the value associated with the given key for the given
+        transformer for the block identified by the given usage_key;
+        returns default if not found.
+        """
+        columns = self._transformer_block_field_columns.get(transformer.name(), {})
+        return self._get_column_value(columns, key, usage_key, default)
+
+    def set_transformer_block_field(self, usage_key, transformer, key, value):
+        """
+        Updates the given transformer's data dictionary with the given
+        key and value for the block identified by the given usage_key.
+        """
+        columns = self._transformer_block_field_columns[transformer.name()]
+        self._get_column(columns, key)[self._get_or_add_block_id(usage_key)] = value
+
+    def get_transformer_block_data(self, usage_key, transformer):
+        """
+        Returns the entire transformer data dict for the given
+        transformer for the block identified by the given usage_key;
+        returns an empty dict {} if not found.
+
+        Unlike BlockStructureBlockData, the dict is built from the
+        field columns, so updating it does not update the structure.
+        """
+        block_id = self._block_ids.get(usage_key)
+        if block_id is None:
+            return {}
+        columns = self._transformer_block_field_columns.get(transformer.name(), {})
+        return {
+            key: column[block_id]
+            for key, column in columns.iteritems()
+            if column[block_id] is not _Missing
+        }
+
+    def remove_transformer_block_field(self, usage_key, transformer, key):
+        """
+        Deletes the given key from the given transformer's data for
+        the block identified by the given usage_key.
+        """
+        block_id = self._block_ids.get(usage_key)
+        column = self._transformer_block_field_columns.get(transformer.name(), {}).get(key)
+        if block_id is not None and column is not None:
+            column[block_id] = _Missing
+
+    def remove_block(self, usage_key, keep_descendants):
+        """
+        Removes the block identified by the usage_key and all of its
+        related data from the block structure.  If descendants of the
+        removed block are to be kept, the structure's relations are
+        updated to reconnect the block's parents with its children.
+
+        Note: While the immediate relations of the block are updated
+        (removed), all descendants of the block will remain in the
+        structure unless the _prune_unreachable method is called.
+
+        Arguments:
+            usage_key (UsageKey) - Usage key of the block that is to be
+                removed.
+
+            keep_descendants (bool) - If True, the block structure's
+                relations (graph edges) are updated such that the
+                removed block's children become children of the
+                removed block's parents.
+        """
+        block_id = self._live_block_id(usage_key)
+        if block_id is None:
+            return
+        children = self._get_child_ids(block_id)
+        parents = self._get_parent_ids(block_id)
+
+        # Remove block from its children.
+        for child_id in children:
+            self._get_parent_ids_for_update(child_id).remove(block_id)
+
+        # Remove block from its parents.
+        for parent_id in parents:
+            self._get_child_ids_for_update(parent_id).remove(block_id)
+
+        # Remove block.
+        self._removed[block_id] = 1
+        self._updated_children[block_id] = []
+        self._updated_parents[block_id] = []
+        self._clear_block_data(block_id)
+
+        # Recreate the graph connections if descendants are to be kept.
+        if keep_descendants:
+            usage_keys = self._usage_keys
+            for child_id in children:
+                for parent_id in parents:
+                    self._add_relation(usage_keys[parent_id], usage_keys[child_id])
+
+    def remove_block_if(self, removal_condition, keep_descendants=False, **kwargs):
+        """
+        A higher-order function that traverses the block structure
+        using topological sort and removes any blocks encountered that
+        satisfy the removal_condition.
+
+        Arguments:
+            removal_condition ((usage_key)->bool) - A function that
+                takes a block's usage key as input and returns whether
+                or not to remove that block from the block structure.
+
+            keep_descendants (bool) - See the description in
+                remove_block.
+
+            kwargs (dict) - Optional keyword arguments to be forwarded
+                to topological_traversal.
+        """
+        def filter_func(block_key):
+            """
+            Filter function for removing blocks that satisfy the
+            removal_condition.
+            """
+            if removal_condition(block_key):
+                self.remove_block(block_key, keep_descendants)
+                return False
+            return True
+
+        for _ in self.topological_traversal(filter_func=filter_func, **kwargs):
+            pass
+
+    #--- Internal methods ---#
+    # To be used within the block_cache framework or by tests.
+
+    def _prune_unreachable(self):
+        """
+        Mutates this block structure by removing any unreachable
+        blocks, renumbering the remaining blocks and rebuilding the
+        CSR arrays.
+        """
+        # The root block keeps an id even if it was removed, since
+        # traversals start from it.
+        root_id = self._block_ids[self.root_block_usage_key]
+        reachable = set(traverse_post_order(start_node=root_id, get_children=self._get_child_ids))
+        kept_ids = [
+            block_id for block_id in xrange(len(self._usage_keys))
+            if block_id in reachable and (block_id == root_id or not self._removed[block_id])
+        ]
+        new_ids = {old_id: new_id for new_id, old_id in enumerate(kept_ids)}
+
+        children = [
+            [new_ids[child_id] for child_id in self._get_child_ids(old_id) if child_id in new_ids]
+            for old_id in kept_ids
+        ]
+        self._usage_keys = [self._usage_keys[old_id] for old_id in kept_ids]
+        self._block_ids = {usage_key: block_id for block_id, usage_key in enumerate(self._usage_keys)}
+        self._removed = bytearray(self._removed[old_id] for old_id in kept_ids)
+        self._build_relations(children)
+
+        self._xblock_field_columns = {
+            field_name: [column[old_id] for old_id in kept_ids]
+            for field_name, column in self._xblock_field_columns.iteritems()
+        }
+        for columns in self._transformer_block_field_columns.itervalues():
+            for key, column in columns.iteritems():
+                columns[key] = [column[old_id] for old_id in kept_ids]
+
+    def _add_relation(self, parent_key, child_key):
+        """
+        Adds a parent to child relationship in this block structure,
+        adding either block to the structure if needed.
+
+        Arguments:
+            parent_key (UsageKey) - Usage key of the parent block.
+            child_key (UsageKey) - Usage key of the child block.
+        """
+        parent_id = self._get_or_add_block_id(parent_key)
+        child_id = self._get_or_add_block_id(child_key)
+        self._removed[parent_id] = self._removed[child_id] = 0
+        self._get_child_ids_for_update(parent_id).append(child_id)
+        self._get_parent_ids_for_update(child_id).append(parent_id)
+
+    def _get_transformer_data_version(self, transformer):
+        """
+        Returns the version number stored for the given transformer.
+        """
+        return self.get_transformer_data(transformer, TRANSFORMER_VERSION_KEY, 0)
+
+    def _add_transformer(self, transformer):
+        """
+        Adds the given transformer to the block structure by recording
+        its current version number.
+        """
+        if transformer.VERSION == 0:
+            raise TransformerException('VERSION attribute is not set on transformer {0}.', transformer.name())
+        self.set_transformer_data(transformer, TRANSFORMER_VERSION_KEY, transformer.VERSION)
+
+    def _build_relations(self, children):
+        """
+        Replaces the CSR arrays with ones built from the given lists of
+        children ids, one per block id, and drops any updated relations.
+        """
+        children = list(children)
+        parents = [[] for __ in children]
+        child_offsets = array('l', [0])
+        child_ids = array('l')
+        for block_id, block_children in enumerate(children):
+            child_ids.extend(block_children)
+            child_offsets.append(len(child_ids))
+            for child_id in block_children:
+                parents[child_id].append(block_id)
+
+        parent_offsets = array('l', [0])
+        parent_ids = array('l')
+        for block_parents in parents:
+            parent_ids.extend(block_parents)
+            parent_offsets.append(len(parent_ids))
+
+        self._child_offsets, self._child_ids = child_offsets, child_ids
+        self._parent_offsets, self._parent_ids = parent_offsets, parent_ids
+        self._updated_children = {}
+        self._updated_parents = {}
+
+    def _get_child_ids(self, block_id):
+        """
+        Returns the ids of the children of the given block id.
+        """
+        if block_id in self._updated_children:
+            return self._updated_children[block_id]
+        return self._child_ids[self._child_offsets[block_id]:self._child_offsets[block_id + 1]].tolist()
+
+    def _get_parent_ids(self, block_id):
+        """
+        Returns the ids of the parents of the given block id.
+        """
+        if block_id in self._updated_parents:
+            return self._updated_parents[block_id]
+        return self._parent_ids[self._parent_offsets[block_id]:self._parent_offsets[block_id + 1]].tolist()
+
+    def _get_child_ids_for_update(self, block_id):
+        """
+        Returns the list of children ids of the given block id, to
+        be updated in place.
+        """
+        if block_id not in self._updated_children:
+            self._updated_children[block_id] = self._get_child_ids(block_id)
+        return self._updated_children[block_id]
+
+    def _get_parent_ids_for_update(self, block_id):
+        """
+        Returns the list of parent ids of the given block id, to
+        be updated in place.
+        """
+        if block_id not in self._updated_parents:
+            self._updated_parents[block_id] = self._get_parent_ids(block_id)
+        return self._updated_parents[block_id]
+
+    def _live_block_id(self, usage_key):
+        """
+        Returns the block id of the given usage key, or None if the
+        block is not in the structure.
+        """
+        block_id = self._block_ids.get(usage_key)
+        if block_id is None or self._removed[block_id]:
+            return None
+        return block_id
+
+    def _live_blocks(self):
+        """
+        Returns an iterator of (block id, usage key) tuples of the
+        blocks in the structure.
+        """
+        removed = self._removed
+        return (
+            (block_id, usage_key)
+            for block_id, usage_key in enumerate(self._usage_keys)
+            if not removed[block_id]
+        )
+
+    def _block_id_filter(self, filter_func):
+        """
+        Returns a version of the given usage key filter_func that
+        takes block ids.
+        """
+        if filter_func is None:
+            return None
+        usage_keys = self._usage_keys
+        return lambda block_id: filter_func(usage_keys[block_id])
+
+    def _add_block_id(self, usage_key, removed=False):
+        """
+        Assigns the next block id to the given usage key, with no
+        relations and no data, and returns it.
+        """
+        block_id = len(self._usage_keys)
+        self._usage_keys.append(usage_key)
+        self._block_ids[usage_key] = block_id
+        self._child_offsets.append(self._child_offsets[-1])
+        self._parent_offsets.append(self._parent_offsets[-1])
+        self._removed.append(1 if removed else 0)
+        for column in self._all_columns():
+            column.append(_Missing)
+        return block_id
+
+    def _get_or_add_block_id(self, usage_key):
+        """
+        Returns the block id of the given usage key.  As with
+        BlockStructureBlockData, data may be set for a block that is
+        not in the structure, so it is given an id of a removed block.
+        """
+        block_id = self._block_ids.get(usage_key)
+        if block_id is None:
+            block_id = self._add_block_id(usage_key, removed=True)
+        return block_id
+
+    def _get_column(self, columns, name):
+        """
+        Returns the named column in the given map of columns, adding
+        an empty one if needed.
+        """
+        if name not in columns:
+            columns[name] = [_Missing] * len(self._usage_keys)
+        return columns[name]
+
+    def _get_column_value(self, columns, name, usage_key, default):
+        """
+        Returns the value of the given block in the named column of the
+        given map of columns; returns default if not found.
+        """
+        column = columns.get(name)
+        block_id = self._block_ids.get(usage_key)
+        if column is None or block_id is None or column[block_id] is _Missing:
+            return default
+        return column[block_id]
+
+    def _all_columns(self):
+        """
+        Returns an iterator of all xBlock field and transformer block
+        field columns.
+        """
+        for column in self._xblock_field_columns.itervalues():
+            yield column
+        for columns in self._transformer_block_field_columns.itervalues():
+            for column in columns.itervalues():
+                yield column
+
+    def _clear_block_data(self, block_id):
+        """
+        Removes all collected data of the given block id.
+        """
+        for column in self._all_columns():
+            column[block_id] = _Missing
@@ -0,0 +1,139 @@
+"""
+Performance test comparing BlockStructureBlockData and
+CompactBlockStructure for a large course.
+"""
+# pylint: disable=protected-access
+import unittest
+from time import time
+
+from nose.plugins.skip import SkipTest
+from opaque_keys.edx.locator import CourseLocator
+
+from openedx.core.lib.cache_utils import zpickle, zunpickle
+
+from ..block_structure import BlockStructureBlockData
+from ..compact_block_structure import CompactBlockStructure
+from ..tests.test_utils import MockTransformer
+
+# The dependency below needs to be installed manually from the development.txt file, which doesn't
+# get installed during unit tests!
+try:
+    from code_block_timer import CodeBlockTimer
+except ImportError:
+    CodeBlockTimer = None
+
+# Shape of the synthetic course: 20 chapters of 10 sequentials of
+# 10 verticals of 10 problems, for a little over 22k blocks.
+NUM_CHAPTERS = 20
+NUM_SEQUENTIALS_PER_CHAPTER = 10
+NUM_VERTICALS_PER_SEQUENTIAL = 10
+NUM_PROBLEMS_PER_VERTICAL = 10
+
+
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class CompactBlockStructurePerfTest(unittest.TestCase):
+    """
+    Compares the serialized size, deserialization time and
+    _prune_unreachable time of the two block structure implementations.
+    """
+
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    def setUp(self):
+        super(CompactBlockStructurePerfTest, self).setUp()
+        course_key = CourseLocator('PerfX', 'Compact', 'Run')
+        self.block_structure = BlockStructureBlockData(course_key.make_usage_key('course', 'course'))
+        self.block_structure._add_transformer(MockTransformer)
+        self.removed_blocks = []
+
+        self._add_block(self.block_structure.root_block_usage_key, 0)
+        for chapter_index in xrange(NUM_CHAPTERS):
+            chapter = self._add_child(self.block_structure.root_block_usage_key, 'chapter', chapter_index)
+            for sequential_index in xrange(NUM_SEQUENTIALS_PER_CHAPTER):
+                sequential = self._add_child(chapter, 'sequential', sequential_index)
+                for vertical_index in xrange(NUM_VERTICALS_PER_SEQUENTIAL):
+                    vertical = self._add_child(sequential, 'vertical', vertical_index)
+                    for problem_index in xrange(NUM_PROBLEMS_PER_VERTICAL):
+                        self._add_child(vertical, 'problem', problem_index)
+                # Remove every other sequential, as access transformers
+                # would for a learner.
+                if sequential_index % 2:
+                    self.removed_blocks.append(sequential)
+
+        self.num_blocks = len(list(self.block_structure.get_block_keys()))
+
+    def _add_child(self, parent, block_type, index):
+        """
+        Adds a child block of the given type to the given parent, with
+        collected data typical of a course block.
+        """
+        usage_key = parent.course_key.make_usage_key(block_type, '{}_{}_{}'.format(parent.block_id, block_type, index))
+        self.block_structure._add_relation(parent, usage_key)
+        self._add_block(usage_key, index)
+        return usage_key
+
+    def _add_block(self, usage_key, index):
+        """
+        Sets the collected xBlock fields and transformer data of the
+        given block.
+        """
+        xblock_fields = self.block_structure._block_data_map[usage_key].xblock_fields
+        xblock_fields['display_name'] = u'{} {}'.format(usage_key.block_type, index)
+        xblock_fields['category'] = usage_key.block_type
+        xblock_fields['graded'] = usage_key.block_type == 'sequential'
+        xblock_fields['due'] = None
+        self.block_structure.set_transformer_block_field(usage_key, MockTransformer, 'merged_visible_to_staff_only', False)
+        self.block_structure.set_transformer_block_field(usage_key, MockTransformer, 'merged_start_date', None)
+
+    def _time_prune(self, block_structure, name):
+        """
+        Removes the blocks in removed_blocks and times pruning the
+        unreachable blocks of the given structure.
+        """
+        for usage_key in self.removed_blocks:
+            block_structure.remove_block(usage_key, keep_descendants=False)
+        with CodeBlockTimer("BlockStructure:{}:prune_unreachable:{}".format(name, self.num_blocks)):
+            block_structure._prune_unreachable()
+
+    def test_block_structure_timings(self):
+        if CodeBlockTimer is None:
+            raise SkipTest("CodeBlockTimer undefined.")
+
+        with CodeBlockTimer("BlockStructure:compact:from_block_structure:{}".format(self.num_blocks)):
+            compact_structure = CompactBlockStructure.from_block_structure(self.block_structure)
+
+        data_to_cache = (
+            self.block_structure._block_relations,
+            self.block_structure._transformer_data,
+            self.block_structure._block_data_map,
+        )
+        zp_block_structure = zpickle(data_to_cache)
+        zp_compact_structure = zpickle(compact_structure)
+
+        with CodeBlockTimer("BlockStructure:current:deserialize:{}".format(self.num_blocks)):
+            zunpickle(zp_block_structure)
+        with CodeBlockTimer("BlockStructure:compact:deserialize:{}".format(self.num_blocks)):
+            zunpickle(zp_compact_structure)
+
+        start = time()
+        list(self.block_structure.topological_traversal())
+        current_traversal_time = time() - start
+        start = time()
+        list(compact_structure.topological_traversal())
+        compact_traversal_time = time() - start
+
+        self._time_prune(self.block_structure, 'current')
+        self._time_prune(compact_structure, 'compact')
+
+        print "Blocks: {}".format(self.num_blocks)
+        print "Serialized size: current {} bytes, compact {} bytes".format(
+            len(zp_block_structure), len(zp_compact_structure)
+        )
+        print "Topological traversal: current {:.3f}s, compact {:.3f}s".format(
+            current_traversal_time, compact_traversal_time
+        )
+        self.assertEqual(set(compact_structure.get_block_keys()), set(self.block_structure.get_block_keys()))
@@ -6,7 +6,7 @@ from django.core.cache import get_cache
 from mock import patch
 from unittest import TestCase
 
-from ..block_cache import get_blocks
+from ..block_cache import get_blocks, update_block_cache
 from ..exceptions import TransformerException
 from .test_utils import (
     MockModulestoreFactory, MockCache, MockTransformer, ChildrenMapTestMixin
@@ -38,13 +38,18 @@ class TestBlockCache(TestCase, ChildrenMapTestMixin):
             """
             return 't1.val1.' + unicode(block_key)
 
+        # Keys of the blocks visited by the last collect.
+        collected_blocks = []
+
         @classmethod
         def collect(cls, block_structure):
             """
             Sets transformer block data for each block in the structure
             as it is visited using topological traversal.
             """
+            cls.collected_blocks = []
             for block_key in block_structure.topological_traversal():
+                cls.collected_blocks.append(block_key)
                 block_structure.set_transformer_block_field(
                     block_key, cls, cls.block_key(), cls.block_val(block_key)
                 )
@@ -111,3 +116,29 @@ class TestBlockCache(TestCase, ChildrenMapTestMixin):
                 self.assertGreater(self.modulestore.get_items_call_count, 0)
             else:
                 self.assertEquals(self.modulestore.get_items_call_count, 0)
+
+    def test_update_block_cache(self, mock_available_transforms):
+        mock_available_transforms.return_value = {transformer.name(): transformer for transformer in self.transformers}
+        get_blocks(
+            self.mock_cache, self.modulestore, self.usage_info, root_block_usage_key=0, transformers=self.transformers
+        )
+
+        # Block 2 gets a child.
+        children_map = [[1, 2], [3, 4], [5], [], [], []]
+        modulestore = MockModulestoreFactory.create(children_map)
+        update_block_cache(self.mock_cache, modulestore, root_block_usage_key=0, changed_usage_keys=[2])
+        self.assertEquals(self.TestTransformer1.collected_blocks, [0, 2, 5])
+
+        block_structure = get_blocks(
+            self.mock_cache, modulestore, self.usage_info, root_block_usage_key=0, transformers=self.transformers
+        )
+        self.assert_block_structure(block_structure, children_map)
+
+    def test_update_block_cache_in_full(self, mock_available_transforms):
+        mock_available_transforms.return_value = {transformer.name(): transformer for transformer in self.transformers}
+        get_blocks(
+            self.mock_cache, self.modulestore, self.usage_info, root_block_usage_key=0, transformers=self.transformers
+        )
+
+        update_block_cache(self.mock_cache, self.modulestore, root_block_usage_key=0)
+        self.assertEquals(len(self.TestTransformer1.collected_blocks), len(self.children_map))
@@ -216,3 +216,21 @@ class TestBlockStructureData(TestCase, ChildrenMapTestMixin):
         block_structure = self.create_block_structure(BlockStructureBlockData, ChildrenMapTestMixin.LINEAR_CHILDREN_MAP)
         block_structure.remove_block_if(lambda block: block == 2)
         self.assert_block_structure(block_structure, [[1], [], [], []], missing_blocks=[2])
+
+    def test_copy(self):
+        block_structure = self.create_block_structure(BlockStructureBlockData, ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP)
+        block_structure._add_transformer(MockTransformer)
+        for block in range(len(ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP)):
+            block_structure.set_transformer_block_field(block, MockTransformer, 'test', block)
+        copied_structure = block_structure.copy()
+
+        # Changes to the copy are not seen by the original.
+        copied_structure.set_transformer_block_field(1, MockTransformer, 'test', 'changed')
+        copied_structure.remove_transformer_block_field(2, MockTransformer, 'test')
+        copied_structure.remove_block(3, keep_descendants=False)
+        self.assertEquals(copied_structure.get_transformer_block_field(1, MockTransformer, 'test'), 'changed')
+        self.assertIsNone(copied_structure.get_transformer_block_field(2, MockTransformer, 'test'))
+
+        self.assert_block_structure(block_structure, ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP)
+        for block in range(len(ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP)):
+            self.assertEquals(block_structure.get_transformer_block_field(block, MockTransformer, 'test'), block)
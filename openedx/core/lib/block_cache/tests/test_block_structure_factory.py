@@ -2,10 +2,11 @@
 Tests for block_structure_factory.py
 """
 # pylint: disable=protected-access
+from django.test.utils import override_settings
 from mock import patch
 from unittest import TestCase
 
-from ..block_structure_factory import BlockStructureFactory
+from ..block_structure_factory import BlockStructureFactory, get_structure_lru
 from .test_utils import (
     MockCache, MockModulestoreFactory, MockTransformer, ChildrenMapTestMixin
 )
@@ -31,6 +32,7 @@ class TestBlockStructureFactory(TestCase, ChildrenMapTestMixin):
         mock_registry.return_value = {transformer.name(): transformer for transformer in self.transformers}
         self.addCleanup(mock_registry.stop)
         mock_registry.start()
+        get_structure_lru().clear()
 
     def add_transformers(self):
         """
@@ -112,3 +114,150 @@ class TestBlockStructureFactory(TestCase, ChildrenMapTestMixin):
                 transformers=self.transformers
             )
         )
+
+    def test_structure_lru(self):
+        cache = MockCache()
+        self.add_transformers()
+        BlockStructureFactory.serialize_to_cache(self.block_structure, cache)
+        structure_lru = get_structure_lru()
+        stats_before = dict(structure_lru.stats)
+
+        with patch.object(cache, 'get', wraps=cache.get) as mock_cache_get:
+            first = BlockStructureFactory.create_from_cache(0, cache, self.transformers)
+            self.assertEquals(mock_cache_get.call_count, 1)
+            self.assertEquals(structure_lru.stats['miss'], stats_before['miss'] + 1)
+
+            # The data is not read from the cache once the structure is
+            # deserialized.
+            mock_cache_get.reset_mock()
+            second = BlockStructureFactory.create_from_cache(0, cache, self.transformers)
+            self.assertEquals(mock_cache_get.call_count, 0)
+            self.assertEquals(structure_lru.stats['hit'], stats_before['hit'] + 1)
+
+        # Each caller gets its own copy to transform.
+        self.assertIsNot(first, second)
+        first.remove_block(1, keep_descendants=False)
+        first.set_transformer_block_field(0, MockTransformer, 'test', 'changed')
+        self.assert_block_structure(second, self.children_map)
+        self.assertEquals(
+            second.get_transformer_block_field(0, MockTransformer, 'test'),
+            '{} val'.format(MockTransformer.name()),
+        )
+
+    def test_structure_lru_invalidation(self):
+        cache = MockCache()
+        self.add_transformers()
+        BlockStructureFactory.serialize_to_cache(self.block_structure, cache)
+        BlockStructureFactory.create_from_cache(0, cache, self.transformers)
+
+        # Newly collected data is picked up instead of the local copy.
+        self.block_structure.set_transformer_block_field(0, MockTransformer, 'test', 'recollected')
+        BlockStructureFactory.serialize_to_cache(self.block_structure, cache)
+        from_cache_block_structure = BlockStructureFactory.create_from_cache(0, cache, self.transformers)
+        self.assertEquals(
+            from_cache_block_structure.get_transformer_block_field(0, MockTransformer, 'test'),
+            'recollected',
+        )
+        self.assertEquals(len(get_structure_lru()), 1)
+
+        BlockStructureFactory.remove_from_cache(0, cache)
+        self.assertEquals(len(get_structure_lru()), 0)
+
+    def test_stale_in_cache(self):
+        cache = MockCache()
+        self.add_transformers()
+        BlockStructureFactory.serialize_to_cache(self.block_structure, cache)
+
+        with patch('openedx.core.lib.block_cache.block_structure_factory.time', return_value=1000):
+            BlockStructureFactory.mark_stale_in_cache(0, cache)
+
+        # Stale data is served for BLOCK_STRUCTURE_MAX_STALENESS seconds.
+        with override_settings(BLOCK_STRUCTURE_MAX_STALENESS=60):
+            with patch('openedx.core.lib.block_cache.block_structure_factory.time', return_value=1060):
+                self.assertIsNotNone(BlockStructureFactory.create_from_cache(0, cache, self.transformers))
+            with patch('openedx.core.lib.block_cache.block_structure_factory.time', return_value=1061):
+                self.assertIsNone(BlockStructureFactory.create_from_cache(0, cache, self.transformers))
+
+                # Newly collected data is no longer stale.
+                BlockStructureFactory.serialize_to_cache(self.block_structure, cache)
+                self.assertIsNotNone(BlockStructureFactory.create_from_cache(0, cache, self.transformers))
+
+    def test_stale_while_collecting(self):
+        cache = MockCache()
+        self.add_transformers()
+        BlockStructureFactory.mark_stale_in_cache(0, cache)
+        generation = BlockStructureFactory.get_generation(0, cache)
+
+        # The block structure is marked stale again while it is collected.
+        with patch('openedx.core.lib.block_cache.block_structure_factory.time', return_value=1000):
+            BlockStructureFactory.mark_stale_in_cache(0, cache)
+        BlockStructureFactory.serialize_to_cache(self.block_structure, cache, generation)
+
+        with override_settings(BLOCK_STRUCTURE_MAX_STALENESS=60):
+            with patch('openedx.core.lib.block_cache.block_structure_factory.time', return_value=1061):
+                self.assertIsNone(BlockStructureFactory.create_from_cache(0, cache, self.transformers))
+
+                # Once recollected for the current generation, the data
+                # is no longer stale.
+                BlockStructureFactory.serialize_to_cache(
+                    self.block_structure, cache, BlockStructureFactory.get_generation(0, cache)
+                )
+                self.assertNotIn(BlockStructureFactory._encode_stale_cache_key(0), cache.map)
+                self.assertIsNotNone(BlockStructureFactory.create_from_cache(0, cache, self.transformers))
+
+    def test_create_for_update(self):
+        # Block 3 gets a new child, 5, and block 4 is removed.
+        #     0
+        #    / \
+        #   1  2
+        #  /
+        # 3
+        # |
+        # 5
+        cache = MockCache()
+        self.add_transformers()
+        BlockStructureFactory.serialize_to_cache(self.block_structure, cache)
+        updated_modulestore = MockModulestoreFactory.create([[1, 2], [3], [], [5], [], []])
+
+        block_structure = BlockStructureFactory.create_for_update(
+            BlockStructureFactory.create_from_cache(0, cache, self.transformers),
+            updated_modulestore,
+            changed_usage_keys=[1],
+        )
+        self.assert_block_structure(block_structure, [[1, 2], [3], [], [5], [], []], missing_blocks=[4])
+        self.assertEquals(block_structure._blocks_to_collect, {0, 1, 3, 5})
+        self.assertEquals(list(block_structure.topological_traversal()), [0, 1, 3, 5])
+
+        # The collected data of other blocks is kept, and that of the
+        # blocks to collect is dropped.
+        self.assertEquals(
+            block_structure.get_transformer_block_field(2, MockTransformer, 'test'),
+            '{} val'.format(MockTransformer.name()),
+        )
+        self.assertIsNone(block_structure.get_transformer_block_field(0, MockTransformer, 'test'))
+
+        # Blocks that are not reloaded are loaded when needed.
+        self.assertEquals(block_structure.get_xblock(2).location, 2)
+
+    def test_create_for_update_not_possible(self):
+        cache = MockCache()
+        self.add_transformers()
+        BlockStructureFactory.serialize_to_cache(self.block_structure, cache)
+
+        # A new block
+        self.assertIsNone(
+            BlockStructureFactory.create_for_update(
+                BlockStructureFactory.create_from_cache(0, cache, self.transformers),
+                MockModulestoreFactory.create([[1, 2], [3, 4], [5], [], [], []]),
+                changed_usage_keys=[5],
+            )
+        )
+
+        # A block moved to a new parent
+        self.assertIsNone(
+            BlockStructureFactory.create_for_update(
+                BlockStructureFactory.create_from_cache(0, cache, self.transformers),
+                MockModulestoreFactory.create([[1, 2, 4], [3], [], [], []]),
+                changed_usage_keys=[4],
+            )
+        )
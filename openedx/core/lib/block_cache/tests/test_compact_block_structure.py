@@ -0,0 +1,162 @@
+"""
+Tests for compact_block_structure.py
+"""
+# pylint: disable=protected-access
+import cPickle as pickle
+import ddt
+import itertools
+from unittest import TestCase
+
+from ..block_structure import BlockStructureBlockData
+from ..compact_block_structure import CompactBlockStructure
+from .test_utils import MockTransformer, ChildrenMapTestMixin
+
+
+@ddt.ddt
+class TestCompactBlockStructure(TestCase, ChildrenMapTestMixin):
+    """
+    Tests for CompactBlockStructure, verifying it behaves like
+    BlockStructureBlockData.
+    """
+    CHILDREN_MAPS = [
+        ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP,
+        ChildrenMapTestMixin.LINEAR_CHILDREN_MAP,
+        ChildrenMapTestMixin.DAG_CHILDREN_MAP,
+    ]
+
+    def create_structures(self, children_map):
+        """
+        Returns a BlockStructureBlockData for the given children_map,
+        with collected data on each block, and a CompactBlockStructure
+        created from it.
+        """
+        block_structure = self.create_block_structure(BlockStructureBlockData, children_map)
+        block_structure._add_transformer(MockTransformer)
+        block_structure.set_transformer_data(MockTransformer, 'global', 'global val')
+        for block in range(len(children_map)):
+            block_structure.set_transformer_block_field(block, MockTransformer, 'index', block)
+            block_structure._block_data_map[block].xblock_fields['display_name'] = 'Block {}'.format(block)
+        return block_structure, CompactBlockStructure.from_block_structure(block_structure)
+
+    def assert_same_data(self, compact_structure, block_structure, blocks):
+        """
+        Verifies the given structures have the same collected data for
+        the given blocks.
+        """
+        self.assertEquals(
+            compact_structure.get_transformer_data(MockTransformer, 'global'),
+            block_structure.get_transformer_data(MockTransformer, 'global'),
+        )
+        self.assertEquals(
+            compact_structure._get_transformer_data_version(MockTransformer),
+            block_structure._get_transformer_data_version(MockTransformer),
+        )
+        for block in blocks:
+            self.assertEquals(
+                compact_structure.get_xblock_field(block, 'display_name'),
+                block_structure.get_xblock_field(block, 'display_name'),
+            )
+            self.assertEquals(
+                compact_structure.get_transformer_block_data(block, MockTransformer),
+                block_structure.get_transformer_block_data(block, MockTransformer),
+            )
+
+    @ddt.data(*CHILDREN_MAPS)
+    def test_from_block_structure(self, children_map):
+        block_structure, compact_structure = self.create_structures(children_map)
+
+        self.assert_block_structure(compact_structure, children_map)
+        self.assertFalse(compact_structure.has_block(len(children_map) + 1))
+        self.assertEquals(list(compact_structure), list(block_structure))
+        self.assertEquals(list(compact_structure.post_order_traversal()), list(block_structure.post_order_traversal()))
+        self.assertEquals(set(compact_structure.get_block_keys()), set(block_structure.get_block_keys()))
+        self.assert_same_data(compact_structure, block_structure, range(len(children_map)))
+
+    @ddt.data(*CHILDREN_MAPS)
+    def test_pickle(self, children_map):
+        block_structure, compact_structure = self.create_structures(children_map)
+        unpickled_structure = pickle.loads(pickle.dumps(compact_structure, pickle.HIGHEST_PROTOCOL))
+
+        self.assert_block_structure(unpickled_structure, children_map)
+        self.assert_same_data(unpickled_structure, block_structure, range(len(children_map)))
+
+    @ddt.data(*itertools.product([True, False], range(7), CHILDREN_MAPS))
+    @ddt.unpack
+    def test_remove_block(self, keep_descendants, block_to_remove, children_map):
+        if (block_to_remove >= len(children_map)) or (keep_descendants and block_to_remove == 0):
+            return
+        block_structure, compact_structure = self.create_structures(children_map)
+
+        for structure in (block_structure, compact_structure):
+            structure.remove_block(block_to_remove, keep_descendants)
+        self.assertFalse(compact_structure.has_block(block_to_remove))
+        self.assertIsNone(compact_structure.get_xblock_field(block_to_remove, 'display_name'))
+        self.assert_same_structure(compact_structure, block_structure, children_map)
+
+        for structure in (block_structure, compact_structure):
+            structure._prune_unreachable()
+        self.assert_same_structure(compact_structure, block_structure, children_map)
+        # Pruned blocks no longer have ids; the root keeps its id.
+        self.assertEquals(
+            set(compact_structure._usage_keys) - {0},
+            set(block_structure.get_block_keys()) - {0},
+        )
+
+    def test_remove_block_if(self):
+        block_structure, compact_structure = self.create_structures(ChildrenMapTestMixin.DAG_CHILDREN_MAP)
+        for structure in (block_structure, compact_structure):
+            structure.remove_block_if(lambda block: block == 2)
+        self.assert_same_structure(compact_structure, block_structure, ChildrenMapTestMixin.DAG_CHILDREN_MAP)
+
+    def test_transformer_block_fields(self):
+        __, compact_structure = self.create_structures(ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP)
+
+        compact_structure.set_transformer_block_field(1, MockTransformer, 'new', None)
+        self.assertIsNone(compact_structure.get_transformer_block_field(1, MockTransformer, 'new', 'default'))
+        self.assertEquals(
+            compact_structure.get_transformer_block_field(2, MockTransformer, 'new', 'default'),
+            'default',
+        )
+
+        compact_structure.remove_transformer_block_field(1, MockTransformer, 'index')
+        self.assertEquals(compact_structure.get_transformer_block_data(1, MockTransformer), {'new': None})
+
+        # As with BlockStructureBlockData, data can be set for blocks
+        # that are not in the structure.
+        compact_structure.set_transformer_block_field('other', MockTransformer, 'index', 'other val')
+        self.assertFalse(compact_structure.has_block('other'))
+        self.assertEquals(compact_structure.get_transformer_block_field('other', MockTransformer, 'index'), 'other val')
+
+    def test_copy(self):
+        __, compact_structure = self.create_structures(ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP)
+        copied_structure = compact_structure.copy()
+
+        copied_structure.remove_block(1, keep_descendants=False)
+        copied_structure.set_transformer_block_field(2, MockTransformer, 'index', 'changed')
+        copied_structure._prune_unreachable()
+
+        self.assert_block_structure(copied_structure, [[2], [], [], [], []], missing_blocks=[1, 3, 4])
+        self.assert_block_structure(compact_structure, ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP)
+        self.assertEquals(compact_structure.get_transformer_block_field(2, MockTransformer, 'index'), 2)
+
+    @ddt.data(*CHILDREN_MAPS)
+    def test_to_block_structure(self, children_map):
+        block_structure, compact_structure = self.create_structures(children_map)
+        compact_structure.remove_block(len(children_map) - 1, keep_descendants=False)
+        block_structure.remove_block(len(children_map) - 1, keep_descendants=False)
+
+        converted_structure = compact_structure.to_block_structure()
+        self.assert_same_structure(converted_structure, block_structure, children_map)
+
+    def assert_same_structure(self, compact_structure, block_structure, children_map):
+        """
+        Verifies the given structures have the same blocks, relations
+        and collected data.
+        """
+        self.assertEquals(set(compact_structure.get_block_keys()), set(block_structure.get_block_keys()))
+        for block in range(len(children_map)):
+            self.assertEquals(compact_structure.has_block(block), block_structure.has_block(block))
+            self.assertEquals(set(compact_structure.get_children(block)), set(block_structure.get_children(block)))
+            self.assertEquals(set(compact_structure.get_parents(block)), set(block_structure.get_parents(block)))
+        self.assertEquals(list(compact_structure), list(block_structure))
+        self.assert_same_data(compact_structure, block_structure, block_structure.get_block_keys())
@@ -69,12 +69,33 @@ class MockCache(object):
         # An in-memory map of cache keys to cache values.
         self.map = {}
 
-    def set(self, key, val):
+    def set(self, key, val, timeout=None):  # pylint: disable=unused-argument
         """
         Associates the given key with the given value in the cache.
         """
         self.map[key] = val
 
+    def add(self, key, val, timeout=None):  # pylint: disable=unused-argument
+        """
+        Associates the given key with the given value in the cache,
+        unless the key is already in the cache.  Returns whether the
+        value was stored.
+        """
+        if key in self.map:
+            return False
+        self.map[key] = val
+        return True
+
+    def incr(self, key):
+        """
+        Increments the value associated with the given key in the cache;
+        raises ValueError if not found.
+        """
+        if key not in self.map:
+            raise ValueError("Key '{}' not found".format(key))
+        self.map[key] += 1
+        return self.map[key]
+
     def get(self, key, default=None):
         """
         Returns the value associated with the given key in the cache;
@@ -100,7 +121,7 @@ class MockCache(object):
         """
         Deletes the given key from the cache.
         """
-        del self.map[key]
+        self.map.pop(key, None)
 
 
 class MockModulestoreFactory(object):
@@ -3,7 +3,11 @@ Utilities related to caching.
 """
 import cPickle as pickle
 import functools
+import threading
 import zlib
+from collections import OrderedDict
+
+import dogstats_wrapper as dog_stats_api
 from xblock.core import XBlock
 
 
@@ -58,3 +62,108 @@ def zpickle(data):
 def zunpickle(zdata):
     """Given a zlib compressed pickled serialization, returns the deserialized data."""
     return pickle.loads(zlib.decompress(zdata))
+
+
+class SizeBoundedLRUCache(object):
+    """
+    A process-local, least-recently-used cache whose entries each have a
+    size (for instance, a number of bytes), and whose total size is bounded
+    by `max_size`. Least recently used entries are evicted to make room.
+
+    Counts of hits, misses and evictions are kept in `stats`, and are also
+    reported as "<metric_name>.hit", "<metric_name>.miss" and
+    "<metric_name>.eviction" metrics if a `metric_name` is given.
+
+    Cached values are shared by all callers, so they must not be mutated.
+    """
+    def __init__(self, max_size, metric_name=None):
+        self.max_size = max_size
+        self.metric_name = metric_name
+        self.stats = {'hit': 0, 'miss': 0, 'eviction': 0}
+        self._size = 0
+        # OrderedDict {key: (value, size)}, from least to most recently used.
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @property
+    def size(self):
+        """The total size of the cached entries."""
+        return self._size
+
+    def get(self, key, default=None):
+        """
+        Returns the value cached for the given key, marking it as the
+        most recently used; returns default if not found.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                self._record('miss')
+                return default
+            self._entries[key] = entry
+        self._record('hit')
+        return entry[0]
+
+    def set(self, key, value, size):
+        """
+        Caches the given value of the given size for the given key,
+        evicting the least recently used entries as needed.  Values
+        larger than max_size are not cached.
+        """
+        with self._lock:
+            self._discard(key)
+            if size > self.max_size:
+                return
+            self._entries[key] = (value, size)
+            self._size += size
+            while self._size > self.max_size:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self._record('eviction')
+
+    def delete(self, key):
+        """
+        Removes the entry for the given key, if any.
+        """
+        with self._lock:
+            self._discard(key)
+
+    def remove_if(self, removal_condition):
+        """
+        Removes all entries whose key satisfies removal_condition, a
+        function that takes a key and returns whether to remove it.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if removal_condition(key)]:
+                self._discard(key)
+
+    def clear(self):
+        """
+        Removes all entries.  Stats are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _discard(self, key):
+        """
+        Removes the entry for the given key, if any.  Must be called
+        with the lock held.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[1]
+
+    def _record(self, event):
+        """
+        Counts a hit, miss or eviction.
+        """
+        self.stats[event] += 1
+        if self.metric_name:
+            dog_stats_api.increment('{}.{}'.format(self.metric_name, event))
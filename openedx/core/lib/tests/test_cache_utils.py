@@ -5,7 +5,7 @@ import ddt
 from mock import MagicMock
 from unittest import TestCase
 
-from openedx.core.lib.cache_utils import memoize_in_request_cache
+from openedx.core.lib.cache_utils import memoize_in_request_cache, SizeBoundedLRUCache
 
 
 @ddt.ddt
@@ -62,3 +62,44 @@ class TestMemoizeInRequestCache(TestCase):
                 func_to_memoize(*arg_list2)
 
             self.assertEquals(self.func_to_count.call_count, 2)
+
+
+class TestSizeBoundedLRUCache(TestCase):
+    """
+    Test the SizeBoundedLRUCache class.
+    """
+    def setUp(self):
+        super(TestSizeBoundedLRUCache, self).setUp()
+        self.cache = SizeBoundedLRUCache(max_size=10)
+
+    def test_get_and_set(self):
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.set('a', 1, size=4)
+        self.assertEquals(self.cache.get('a'), 1)
+        self.assertEquals(self.cache.size, 4)
+        self.assertEquals(self.cache.stats, {'hit': 1, 'miss': 1, 'eviction': 0})
+
+    def test_least_recently_used_evicted(self):
+        self.cache.set('a', 1, size=4)
+        self.cache.set('b', 2, size=4)
+        self.cache.get('a')
+        self.cache.set('c', 3, size=4)
+
+        self.assertNotIn('b', self.cache)
+        self.assertIn('a', self.cache)
+        self.assertIn('c', self.cache)
+        self.assertEquals(self.cache.size, 8)
+        self.assertEquals(self.cache.stats['eviction'], 1)
+
+    def test_oversized_value_not_cached(self):
+        self.cache.set('a', 1, size=11)
+        self.assertNotIn('a', self.cache)
+        self.assertEquals(self.cache.size, 0)
+
+    def test_remove_if(self):
+        self.cache.set(('course', 1), 1, size=2)
+        self.cache.set(('course', 2), 2, size=2)
+        self.cache.set(('other', 1), 3, size=2)
+        self.cache.remove_if(lambda key: key[0] == 'course')
+        self.assertEquals(len(self.cache), 1)
+        self.assertEquals(self.cache.size, 2)